@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmarks the data query engine on a synthetic dataset.
+
+The default dataset has 10M observations (10,000 monthly series of 1,000
+observations with one observation level attribute).  Rows are generated
+lazily in the shape returned by `values_list()` so the benchmark measures
+the grouping into NumPy series blocks and the rendering of a sample, not the
+database.
+
+    python benchmarks/data_query.py --series 10000 --observations 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+    django.setup()
+
+from fiesta.core.data import DataQueryEngine
+
+DIMENSIONS = ('FREQ', 'REF_AREA', 'INDICATOR')
+
+def make_periods(observations):
+    return [
+        f'{1900 + month // 12}-{month % 12 + 1:02d}'
+        for month in range(observations)
+    ]
+
+def generate_rows(series, observations):
+    periods = make_periods(observations)
+    for number in range(series):
+        key = ('M', f'A{number // 100:03d}', f'I{number % 100:02d}')
+        for position, period in enumerate(periods):
+            yield (*key, period, float(position), 'A' if position % 10 else 'E')
+
+def run(series, observations, chunk_size):
+    engine = DataQueryEngine(
+        None, DIMENSIONS, attributes=('OBS_STATUS',), chunk_size=chunk_size)
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = blocks = 0
+    for block in engine.group(generate_rows(series, observations)):
+        blocks += 1
+        count += len(block)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'grouped {count:,} observations into {blocks:,} series '
+          f'in {elapsed:.2f}s ({count / elapsed:,.0f} obs/s, '
+          f'peak memory {peak / 2 ** 20:.1f} MiB, chunk size {chunk_size:,})')
+
+def run_filters(series, observations, chunk_size):
+    engine = DataQueryEngine(
+        None, DIMENSIONS, attributes=('OBS_STATUS',), chunk_size=chunk_size)
+    blocks = list(engine.group(generate_rows(series, observations)))
+    started = time.perf_counter()
+    count = sum(len(block.filter_periods('1950-01', '1980-12')) for block in blocks)
+    elapsed = time.perf_counter() - started
+    print(f'filtered {len(blocks):,} series by period to {count:,} observations '
+          f'in {elapsed:.2f}s')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--observations', type=int, default=1000)
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--filters', action='store_true',
+                        help='also time period filtering on 1/10 of the series')
+    args = parser.parse_args()
+    run(args.series, args.observations, args.chunk_size)
+    if args.filters:
+        run_filters(args.series // 10, args.observations, args.chunk_size)
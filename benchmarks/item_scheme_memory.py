@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Benchmarks the memory of the items of a large item scheme.
+
+The items of a codelist of 50,000 codes, each with an English and a French
+name and one code in ten without a parent, are held as:
+
+    * dict: dataclass serializers with an instance dictionary, the layout of
+      the serializers before they were slotted
+    * slots: the slotted serializers made by `BaseMetaSerializer`
+    * arrays: an `ItemArray` of parallel id, parent and name arrays
+
+    python benchmarks/item_scheme_memory.py --items 50000
+"""
+
+import argparse
+import dataclasses
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path[:0] = [os.path.join(ROOT, 'src'), ROOT]
+
+import django
+
+# The serializers need the models of the apps
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+django.setup()
+
+from typing import Iterable
+
+from fiesta.core.serializers.arrays import ItemArray
+from fiesta.core.serializers.base import field, Serializer
+
+LANGUAGES = ('en', 'fr')
+
+class TextSerializer(Serializer):
+    text: str = field(is_text=True)
+    lang: str = field(is_attribute=True, namespace_key='xml', default='en')
+
+class LocalRefSerializer(Serializer):
+    object_id: str = field(localname='id', is_attribute=True)
+    local: bool = field(is_attribute=True, default=True)
+    cls: str = field(localname='class', is_attribute=True)
+    package: str = field(is_attribute=True)
+
+class LocalReferenceSerializer(Serializer):
+    ref: LocalRefSerializer = field(namespace_key='')
+
+class CodeSerializer(Serializer):
+    object_id: str = field(is_attribute=True, localname='id')
+    urn: str = field(is_attribute=True)
+    uri: str = field(is_attribute=True)
+    name: Iterable[TextSerializer] = field(namespace_key='common')
+    description: Iterable[TextSerializer] = field(namespace_key='common')
+    parent: LocalReferenceSerializer = field(namespace_key='common')
+
+def unslotted(serializer):
+    """Returns a dataclass with the fields of a serializer and a dictionary"""
+    def __post_init__(self):
+        self._element = None
+        self._instance = None
+        self._created = None
+    return dataclasses.make_dataclass(
+        f'Unslotted{serializer.__name__}',
+        [(f.name, f.type, dataclasses.field(default=None))
+         for f in dataclasses.fields(serializer)],
+        namespace={'__post_init__': __post_init__})
+
+def make_rows(items):
+    for number in range(items):
+        parent = None if number % 10 == 0 else f'C{number - number % 10}'
+        yield (f'C{number}', parent, f'Code {number}', f'Code {number} (fr)')
+
+def make_serializers(rows, code, text, reference, ref):
+    return [
+        code(object_id=object_id,
+             name=[text(lang=lang, text=name)
+                   for lang, name in zip(LANGUAGES, names)],
+             description=[],
+             parent=reference(ref=ref(object_id=parent, cls='Code', package='codelist'))
+             if parent else reference())
+        for object_id, parent, *names in rows
+    ]
+
+def make_arrays(rows):
+    items = ItemArray(CodeSerializer, LANGUAGES)
+    positions = {}
+    for position, (object_id, parent, *names) in enumerate(rows):
+        positions[object_id] = position
+        items.pks.append(position)
+        items.ids.append(object_id)
+        items.parents.append(positions[parent] if parent else -1)
+        for column, name in zip(items.names, names):
+            column.append(name)
+        for column in items.descriptions:
+            column.append(None)
+    return items
+
+def measure(label, make, items):
+    rows = list(make_rows(items))
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = make(rows)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:>6}: {len(held):,} items held in {current / 2 ** 20:.1f} MiB '
+          f'({current / len(held):,.0f} B per item, peak {peak / 2 ** 20:.1f} MiB) '
+          f'made in {elapsed:.2f}s')
+    return held
+
+def run(items):
+    types = (CodeSerializer, TextSerializer, LocalReferenceSerializer, LocalRefSerializer)
+    before = tuple(unslotted(serializer) for serializer in types)
+    measure('dict', lambda rows: make_serializers(rows, *before), items)
+    measure('slots', lambda rows: make_serializers(rows, *types), items)
+    measure('arrays', make_arrays, items)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--items', type=int, default=50000)
+    args = parser.parse_args()
+    run(args.items)
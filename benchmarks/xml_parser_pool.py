@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Benchmarks the parsing of submitted messages with pooled parsers.
+
+Small structure messages, the typical submission of a few codelists, are
+parsed as:
+
+    * default: `etree.parse` with the default parser of lxml
+    * new: a hardened `etree.XMLParser` made for every message
+    * pooled: the hardened parser of the thread, see `fiesta.parsers.xml.pool`
+
+    python benchmarks/xml_parser_pool.py --messages 20000 --codes 20
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+    django.setup()
+
+from lxml import etree
+
+from fiesta.core.constants import NAMESPACE_MAP
+from fiesta.parsers.xml import pool
+
+def make_message(codes):
+    structure = NAMESPACE_MAP['structure']
+    common = NAMESPACE_MAP['common']
+    items = ''.join(
+        f'<str:Code id="C{number}" urn="urn:C{number}">'
+        f'<com:Name xml:lang="en">Code {number}</com:Name></str:Code>'
+        for number in range(codes)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<mes:Structure xmlns:mes="{NAMESPACE_MAP["message"]}" '
+        f'xmlns:str="{structure}" xmlns:com="{common}">'
+        f'<mes:Header><mes:ID>BENCH</mes:ID><mes:Test>false</mes:Test>'
+        f'<mes:Prepared>2020-01-01T00:00:00</mes:Prepared>'
+        f'<mes:Sender id="BENCH"/></mes:Header>'
+        f'<mes:Structures><str:Codelists>'
+        f'<str:Codelist id="CL" agencyID="BENCH" version="1.0">'
+        f'<com:Name xml:lang="en">Codelist</com:Name>{items}</str:Codelist>'
+        f'</str:Codelists></mes:Structures></mes:Structure>'
+    ).encode()
+
+def new_parser():
+    return etree.XMLParser(
+        resolve_entities=False, no_network=True, load_dtd=False,
+        huge_tree=False, compact=True)
+
+def measure(label, parse, message, messages):
+    started = time.perf_counter()
+    for _ in range(messages):
+        parse(io.BytesIO(message))
+    elapsed = time.perf_counter() - started
+    print(f'{label:>7}: {messages:,} messages in {elapsed:.2f}s '
+          f'({elapsed / messages * 1e6:.1f} us per message)')
+    return elapsed
+
+def run(messages, codes):
+    message = make_message(codes)
+    print(f'{len(message):,} bytes per message')
+    measure('default', etree.parse, message, messages)
+    new = measure('new', lambda stream: etree.parse(stream, new_parser()),
+                  message, messages)
+    pooled = measure('pooled', pool.parse, message, messages)
+    print(f'pooled saves {(new - pooled) / messages * 1e6:.1f} us per message')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--codes', type=int, default=20)
+    args = parser.parse_args()
+    run(args.messages, args.codes)
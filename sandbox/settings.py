@@ -21,7 +21,8 @@ INSTALLED_APPS = [
     'fiesta.apps.base',
     'fiesta.apps.codelist',
     'fiesta.apps.conceptscheme',
-    'fiesta.apps.datastructure'
+    'fiesta.apps.datastructure',
+    'fiesta.apps.data'
 ]
 ROOT_URLCONF = 'urls'
 DATABASES={
@@ -45,6 +45,17 @@ install_requires = [
     'isodate',
 ]
 
+data_requires = [
+    # for vectorised data queries
+    'numpy',
+]
+
+compression_requires = [
+    # for brotli and zstd encoded responses
+    'brotli',
+    'zstandard',
+]
+
 docs_requires = [
     'Sphinx==2.0.1',
     'sphinxcontrib-napoleon==0.7',
@@ -108,6 +119,8 @@ setup(
     include_package_data=True,
     install_requires=install_requires,
     extras_require={
+        'data': data_requires,
+        'compression': compression_requires,
         'docs': docs_requires,
         'test': test_requires,
         # 'sorl-thumbnail': [sorl_thumbnail_version],
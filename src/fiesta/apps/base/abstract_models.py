@@ -36,6 +36,11 @@ class User(AbstractUser):
         verbose_name = _('User')
         verbose_name_plural = _('Users')
 
+    @property
+    def organisation(self):
+        """The agency, data consumer or data provider of the user, if any"""
+        return self.agency or self.data_consumer or self.data_provider
+
 
 class Annotation(common.AbstractAnnotation):
     agency = models.ForeignKey(
@@ -0,0 +1,60 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+from fiesta.core.urns import fill_urns
+
+
+def fill(apps, schema_editor):
+    fill_urns(
+        apps, 'base',
+        maintainables=('DataProviderScheme', 'DataConsumerScheme', 'OrganisationUnitScheme'),
+        items=('DataProvider', 'DataConsumer', 'OrganisationUnit'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0002_auto_20191029_1812'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataproviderscheme',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='dataconsumerscheme',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='organisationunitscheme',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='dataprovider',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='dataconsumer',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='organisationunit',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,7 @@ from treebeard.mp_tree import MP_Node
 from versionfield import VersionField
 
 from ...settings import api_settings 
+from ...core.urns import make_item_urn, make_urn
 from ...core.validators import re_validators, errors
 
 from . import managers
@@ -181,6 +182,12 @@ class AbstractMaintainable(AbstractVersionable):
         'registry.SubmittedStructure',
         verbose_name=_('Submitted structures')
     )
+    urn = models.CharField(
+        _('URN'),
+        max_length=VERY_LARGE,
+        editable=False,
+        db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -198,6 +205,24 @@ class AbstractMaintainable(AbstractVersionable):
     def __str__(self):
         return f'{self.label}={self.agency}:{self.object_id}(self.version)'
 
+    def get_references(self):
+        """
+        Returns the maintainable artefacts this artefact references as (model,
+        primary keys) pairs.
+
+        Used to maintain the `registry.Dependency` edges, overridden by
+        artefacts that reference other artefacts.
+        """
+        return []
+
+    def save(self, *args, **kwargs):
+        self.urn = self.get_urn()
+        super().save(*args, **kwargs)
+
+    def get_urn(self):
+        return make_urn(self._meta.app_label, self._meta.object_name,
+                        self.agency.object_id, self.object_id, self.version)
+
     @property
     def label(self):
         return self.__class__._meta.label
@@ -234,6 +259,12 @@ class AbstractItem(AbstractNameable):
         validators=[re_validators['IDType']],
         db_index=True
     )
+    urn = models.CharField(
+        _('URN'),
+        max_length=VERY_LARGE,
+        editable=False,
+        db_index=True
+    )
 
     objects = managers.ItemManager()
 
@@ -253,6 +284,20 @@ class AbstractItem(AbstractNameable):
     def __str__(self):
         return f'{self.label}={self.container.agency}:{self.container.object_id}(self.container.version).{self.object_id}'
 
+    def save(self, *args, **kwargs):
+        self.urn = self.get_urn()
+        super().save(*args, **kwargs)
+
+    def get_urn(self):
+        container = self.container
+        # The URN of the scheme avoids fetching its agency for every item
+        if container.urn:
+            return make_item_urn(
+                container.urn, self._meta.object_name, self.object_id)
+        return make_urn(self._meta.app_label, self._meta.object_name,
+                        container.agency.object_id, container.object_id,
+                        container.version, self.object_id)
+
     @property
     def label(self):
         return self.__class__._meta.label
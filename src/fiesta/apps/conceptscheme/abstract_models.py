@@ -1,5 +1,6 @@
 # abstract_models.py
 
+from django.apps import apps
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -35,6 +36,11 @@ class ConceptScheme(common.AbstractNCNameMaintainable):
         verbose_name = _('Concept scheme')
         verbose_name_plural = _('Concept schemes')
 
+    def get_references(self):
+        codelists = set(self.concept_set.values_list(
+            'core_representation__enumeration', flat=True))
+        return [(apps.get_model('codelist', 'Codelist'), codelists - {None})]
+
 class Concept(common.AbstractNCNameItemWithParent):
     container = models.ForeignKey(
         'ConceptScheme', 
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+from fiesta.core.urns import fill_urns
+
+
+def fill(apps, schema_editor):
+    fill_urns(
+        apps, 'conceptscheme',
+        maintainables=('ConceptScheme',),
+        items=('Concept',),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conceptscheme', '0002_auto_20191029_1812'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conceptscheme',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='concept',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
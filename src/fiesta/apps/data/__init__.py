@@ -0,0 +1 @@
+default_app_config = 'fiesta.apps.data.apps.DataConfig'
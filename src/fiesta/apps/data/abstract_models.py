@@ -1,13 +1,19 @@
 # abstract_models.py
 
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
 from ...settings import api_settings 
 
-SMALL = api_settings.DEFAULT_SMALL_STRING_LENGTH
+SMALL = api_settings.DEFAULT_SMALL_STRING
+LARGE = api_settings.DEFAULT_LARGE_STRING
+HUGE = api_settings.DEFAULT_HUGE_STRING
 
 class AbstractData(models.Model):
-    registration = models.ForeignKey('registry.Registration')
+    registration = models.ForeignKey(
+        'registry.Registration',
+        on_delete=models.CASCADE
+    )
 
     class Meta:
         abstract = True
@@ -149,3 +155,174 @@ class PanelData(AbstractData):
 
     class Meta:
         abstract = True
+
+class Availability(models.Model):
+    """Data availability of a dataflow or of a provision agreement
+
+    Maintained incrementally by the data loading path (see
+    `fiesta.apps.data.availability.record_batch`) so that actual content
+    constraints can be computed without scanning the observation tables.
+    A row with no provision agreement tracks the dataflow as a whole.
+    """
+
+    dataflow = models.ForeignKey(
+        'datastructure.Dataflow',
+        on_delete=models.CASCADE,
+        verbose_name=_('Dataflow')
+    )
+    provision_agreement = models.ForeignKey(
+        'registry.ProvisionAgreement',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name=_('Provision agreement')
+    )
+    time_start = models.DateField(
+        _('Time coverage start'),
+        null=True,
+        blank=True
+    )
+    time_end = models.DateField(
+        _('Time coverage end'),
+        null=True,
+        blank=True
+    )
+    updated = models.DateTimeField(
+        _('Updated'),
+        auto_now=True
+    )
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Availability')
+        verbose_name_plural = _('Availabilities')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dataflow', 'provision_agreement'],
+                name='%(app_label)s_%(class)s_unique_provision_agreement'
+            ),
+            models.UniqueConstraint(
+                fields=['dataflow'],
+                condition=models.Q(provision_agreement__isnull=True),
+                name='%(app_label)s_%(class)s_unique_dataflow'
+            )
+        ]
+
+class AvailableValue(models.Model):
+    """A distinct dimension value that appears in the data of an availability"""
+
+    availability = models.ForeignKey(
+        'data.Availability',
+        on_delete=models.CASCADE,
+        related_name='values',
+        verbose_name=_('Availability')
+    )
+    component_id = models.CharField(
+        _('Component ID'),
+        max_length=SMALL
+    )
+    value = models.CharField(
+        _('Value'),
+        max_length=SMALL
+    )
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Available value')
+        verbose_name_plural = _('Available values')
+        ordering = ['availability', 'component_id', 'value']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['availability', 'component_id', 'value'],
+                name='%(app_label)s_%(class)s_unique_value'
+            )
+        ]
+
+class SeriesKeyLayout(models.Model):
+    """The bit layout of the packed series keys of a DSD
+
+    Fixed once the first series key is stored, the dimension with the first
+    position occupies the most significant bits so that keys sharing leading
+    dimension values form a contiguous range.
+    """
+
+    data_structure = models.OneToOneField(
+        'datastructure.DataStructure',
+        on_delete=models.CASCADE,
+        verbose_name=_('Data structure')
+    )
+    components = models.CharField(
+        _('Component IDs'),
+        max_length=HUGE
+    )
+    widths = models.CharField(
+        _('Bit widths'),
+        max_length=LARGE
+    )
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Series key layout')
+        verbose_name_plural = _('Series key layouts')
+
+class SeriesKeyCode(models.Model):
+    """The dictionary code of a dimension value within a DSD"""
+
+    data_structure = models.ForeignKey(
+        'datastructure.DataStructure',
+        on_delete=models.CASCADE,
+        verbose_name=_('Data structure')
+    )
+    component_id = models.CharField(
+        _('Component ID'),
+        max_length=SMALL
+    )
+    value = models.CharField(
+        _('Value'),
+        max_length=SMALL
+    )
+    code = models.PositiveIntegerField(_('Code'))
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Series key code')
+        verbose_name_plural = _('Series key codes')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['data_structure', 'component_id', 'value'],
+                name='%(app_label)s_%(class)s_unique_value'
+            ),
+            models.UniqueConstraint(
+                fields=['data_structure', 'component_id', 'code'],
+                name='%(app_label)s_%(class)s_unique_code'
+            )
+        ]
+
+class SeriesKey(models.Model):
+    """A series key of a DSD packed into a single integer
+
+    Domain specific observation models may reference this model instead of a
+    `Dimensions` subclass.
+    """
+
+    data_structure = models.ForeignKey(
+        'datastructure.DataStructure',
+        on_delete=models.CASCADE,
+        verbose_name=_('Data structure')
+    )
+    packed = models.BigIntegerField(_('Packed key'))
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Series key')
+        verbose_name_plural = _('Series keys')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['data_structure', 'packed'],
+                name='%(app_label)s_%(class)s_unique_packed'
+            )
+        ]
+        indexes = [
+            # Covers key lookups and range scans without visiting the table
+            models.Index(fields=['data_structure', 'packed', 'id']),
+        ]
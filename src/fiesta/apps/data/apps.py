@@ -1,5 +1,11 @@
-from fiesta.core.application import BaseFiestaConfig
+# apps.py
+
+from ...core.application import BaseFiestaConfig
 
 class DataConfig(BaseFiestaConfig):
     label = 'data'
     name = 'fiesta.apps.data'
+
+    def ready(self):
+        from . import receivers
+        receivers.connect(self)
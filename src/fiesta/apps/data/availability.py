@@ -0,0 +1,155 @@
+# availability.py
+
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import transaction
+
+from ...core.constraints import TIME_PERIOD, get_dimension_ids
+from ...utils.periods import period_bounds
+
+def get_scopes(dataflow, provision_agreement=None):
+    scopes = [None]
+    if provision_agreement is not None: scopes.append(provision_agreement)
+    return scopes
+
+def update_availability(dataflow, provision_agreement, start, end):
+    Availability = apps.get_model('data', 'Availability')
+    availability, _ = Availability.objects.select_for_update().get_or_create(
+        dataflow=dataflow, provision_agreement=provision_agreement)
+    if start and (not availability.time_start or start < availability.time_start):
+        availability.time_start = start
+    if end and (not availability.time_end or end > availability.time_end):
+        availability.time_end = end
+    availability.save()
+    return availability
+
+def record_batch(dataflow, keys, periods=(), provision_agreement=None):
+    """
+    Records the series keys and time periods of a batch of loaded data
+
+    Must be called by the data loading path of the domain specific data
+    applications once per batch.  Only values not already known are written,
+    so the cost is proportional to the batch and not to the stored data.
+
+    Parameters
+    ----------
+    dataflow: Dataflow
+        The dataflow the data is reported against
+    keys: iterable
+        Dot separated series keys or tuples of dimension values in the order
+        of the DSD
+    periods: iterable
+        The time periods of the observations in the batch
+    provision_agreement: ProvisionAgreement, optional
+        The provision agreement the data is reported under.  The dataflow
+        wide availability is always updated as well
+    """
+    AvailableValue = apps.get_model('data', 'AvailableValue')
+    dimensions = get_dimension_ids(dataflow.structure)
+    selected = [set() for _ in dimensions]
+    for key in keys:
+        if isinstance(key, str): key = key.split('.')
+        for values, value in zip(selected, key):
+            values.add(value)
+    start = end = None
+    bounds = [period_bounds(period) for period in set(periods)]
+    if bounds:
+        start = min(first for first, _ in bounds)
+        end = max(last for _, last in bounds)
+    with transaction.atomic():
+        for scope in get_scopes(dataflow, provision_agreement):
+            availability = update_availability(dataflow, scope, start, end)
+            known = set(availability.values.values_list('component_id', 'value'))
+            AvailableValue.objects.bulk_create([
+                AvailableValue(
+                    availability=availability, component_id=dimension,
+                    value=value)
+                for dimension, values in zip(dimensions, selected)
+                for value in values if (dimension, value) not in known
+            ], ignore_conflicts=True)
+
+def get_available_values(dataflow, provision_agreement=None):
+    """
+    Returns a dictionary of the distinct values per dimension that appear in
+    the data of a dataflow or provision agreement
+    """
+    AvailableValue = apps.get_model('data', 'AvailableValue')
+    result = defaultdict(list)
+    values = AvailableValue.objects.filter(
+        availability__dataflow=dataflow,
+        availability__provision_agreement=provision_agreement
+    ).values_list('component_id', 'value')
+    for component_id, value in values:
+        result[component_id].append(value)
+    return dict(result)
+
+def materialise_actual_constraint(dataflow, provision_agreement=None, object_id=None):
+    """
+    Creates or refreshes the actual content constraint of a dataflow or
+    provision agreement from its recorded availability
+
+    The constraint gets a single included cube region with one key value per
+    available dimension value and the time coverage as a time range.
+
+    Returns
+    -------
+        The ContentConstraint or None if no data has been recorded
+    """
+    Availability = apps.get_model('data', 'Availability')
+    ContentConstraint = apps.get_model('registry', 'ContentConstraint')
+    VersionDetail = apps.get_model('registry', 'VersionDetail')
+    CubeRegion = apps.get_model('registry', 'CubeRegion')
+    CubeRegionKey = apps.get_model('registry', 'CubeRegionKey')
+    CubeRegionKeyValue = apps.get_model('registry', 'CubeRegionKeyValue')
+    CubeRegionKeyTimeRange = apps.get_model('registry', 'CubeRegionKeyTimeRange')
+    TimePeriod = apps.get_model('registry', 'TimePeriod')
+    availability = Availability.objects.filter(
+        dataflow=dataflow, provision_agreement=provision_agreement).first()
+    if not availability: return None
+    owner = provision_agreement or dataflow
+    object_id = object_id or f'{owner.object_id}_ACTUAL'
+    with transaction.atomic():
+        constraint = ContentConstraint.objects.filter(
+            agency=owner.agency, object_id=object_id,
+            tipe=ContentConstraint.Type.ACTUAL
+        ).first()
+        if not constraint:
+            constraint = ContentConstraint.objects.create(
+                agency=owner.agency, object_id=object_id,
+                tipe=ContentConstraint.Type.ACTUAL, tolerance='')
+        attachment = {'provision_agreement': provision_agreement} \
+            if provision_agreement else {'dataflow': dataflow}
+        VersionDetail.objects.get_or_create(
+            content_constraint=constraint, version=owner.version, **attachment)
+        time_periods = set()
+        for time_range in CubeRegionKeyTimeRange.objects.filter(
+                cube_region_key__key_value__content_constraint=constraint):
+            time_periods.update((time_range.start_period_id, time_range.end_period_id))
+        CubeRegion.objects.filter(content_constraint=constraint).delete()
+        TimePeriod.objects.filter(pk__in=time_periods).delete()
+        region = CubeRegion.objects.create(
+            content_constraint=constraint, include=True)
+        key_values = []
+        for component_id, values in get_available_values(
+                dataflow, provision_agreement).items():
+            key = CubeRegionKey.objects.create(
+                key_value=region, component_id=component_id)
+            key_values.extend(
+                CubeRegionKeyValue(cube_region_key=key, value=value)
+                for value in values
+            )
+        CubeRegionKeyValue.objects.bulk_create(key_values)
+        if availability.time_start or availability.time_end:
+            key = CubeRegionKey.objects.create(
+                key_value=region, component_id=TIME_PERIOD)
+            CubeRegionKeyTimeRange.objects.create(
+                cube_region_key=key,
+                start_period=TimePeriod.objects.create(
+                    time_period=availability.time_start.isoformat())
+                if availability.time_start else None,
+                end_period=TimePeriod.objects.create(
+                    time_period=availability.time_end.isoformat())
+                if availability.time_end else None
+            )
+    return constraint
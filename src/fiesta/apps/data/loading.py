@@ -0,0 +1,116 @@
+# loading.py
+
+from itertools import islice
+
+from django.db import transaction
+
+from ...core.constraints import get_evaluator
+from ...core.data import DataQueryEngine
+from .availability import materialise_actual_constraint, record_batch
+
+def get_key_ids(engine, keys):
+    """
+    Returns a dictionary of series key tuple to the primary key of its row in
+    the key model of an engine, creating the missing rows
+
+    Parameters
+    ----------
+    engine: DataQueryEngine
+        The engine of an observation model with a key model
+    keys: set
+        Tuples of dimension values in the order of the DSD
+    """
+    if engine.series_keys:
+        ids = engine.series_keys.get_or_create_ids('.'.join(key) for key in keys)
+        return {tuple(key.split('.')): pk for key, pk in ids.items()}
+    key_model = engine.model._meta.get_field(engine.key_field).related_model
+    return {
+        key: key_model._default_manager.get_or_create(
+            **dict(zip(engine.dimensions, key)))[0].pk
+        for key in keys
+    }
+
+def load_data(dataflow, rows, provision_agreement=None, engine=None,
+              **fields):
+    """
+    Loads observations into the observation model of a dataflow, the data
+    submission path of the domain specific data applications
+
+    The series keys and time periods of each chunk of the engine are
+    validated against the allowed content constraints of the provision
+    agreement or of the dataflow, then the observations are written and
+    recorded by `record_batch`.  Once all the rows are written the actual
+    content constraints of the dataflow and of the provision agreement are
+    materialised from the availability.
+
+    Parameters
+    ----------
+    dataflow: Dataflow
+        The dataflow the data is reported against
+    rows: iterable
+        (series key, time period, value, *attributes) tuples, the key dot
+        separated or a tuple of dimension values in the order of the DSD and
+        the attributes in the order of the attributes of the engine
+    provision_agreement: ProvisionAgreement, optional
+        The provision agreement the data is reported under
+    engine: DataQueryEngine, optional
+        The engine of the observation model, by default the one registered
+        for the DSD in the `DEFAULT_DATA_MODELS` setting
+    fields:
+        The values of the other fields of the observations, e.g. their
+        registration
+
+    Returns
+    -------
+        The number of loaded observations
+
+    Raises
+    ------
+    ValueError
+        If a series key or time period is not allowed, nothing is loaded
+    """
+    engine = engine or DataQueryEngine.for_dataflow(dataflow)
+    evaluator = get_evaluator(provision_agreement or dataflow)
+    rows = iter(rows)
+    count = 0
+    try:
+        with transaction.atomic():
+            while True:
+                chunk = [
+                    (tuple(key.split('.')) if isinstance(key, str) else tuple(key), *rest)
+                    for key, *rest in islice(rows, engine.chunk_size)
+                ]
+                if not chunk: break
+                keys = {row[0] for row in chunk}
+                invalid = next(evaluator.invalid(list(keys)), None)
+                if invalid:
+                    raise ValueError(f'Series key {".".join(invalid)} is not allowed')
+                if evaluator.time_intervals:
+                    for period in {row[1] for row in chunk}:
+                        if not evaluator.is_allowed_period(period):
+                            raise ValueError(f'Time period {period} is not allowed')
+                key_ids = get_key_ids(engine, keys) if engine.key_field else None
+                observations = []
+                for key, time_period, value, *attributes in chunk:
+                    if key_ids is None:
+                        kwargs = dict(zip(engine.dimensions, key))
+                    else:
+                        kwargs = {f'{engine.key_field}_id': key_ids[key]}
+                    kwargs.update(zip(engine.attributes, attributes))
+                    kwargs[engine.time_field] = time_period
+                    kwargs[engine.value_field] = value
+                    observations.append(engine.model(**kwargs, **fields))
+                engine.model._default_manager.bulk_create(observations)
+                record_batch(dataflow, keys, [row[1] for row in chunk],
+                             provision_agreement)
+                count += len(chunk)
+            if count:
+                materialise_actual_constraint(dataflow)
+                if provision_agreement is not None:
+                    materialise_actual_constraint(dataflow, provision_agreement)
+    except Exception:
+        # The registry cached the codes and series ids of the rolled back
+        # chunks, which would be written as dangling keys by the next load
+        if engine.series_keys: engine.series_keys.reset()
+        raise
+    return count
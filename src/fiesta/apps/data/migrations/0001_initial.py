@@ -0,0 +1,60 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('datastructure', '0002_auto_20191029_1812'),
+        ('registry', '0002_auto_20261019_1152'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Availability',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time_start', models.DateField(blank=True, null=True, verbose_name='Time coverage start')),
+                ('time_end', models.DateField(blank=True, null=True, verbose_name='Time coverage end')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Updated')),
+                ('dataflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datastructure.Dataflow', verbose_name='Dataflow')),
+                ('provision_agreement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='registry.ProvisionAgreement', verbose_name='Provision agreement')),
+            ],
+            options={
+                'verbose_name': 'Availability',
+                'verbose_name_plural': 'Availabilities',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AvailableValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component_id', models.CharField(max_length=63, verbose_name='Component ID')),
+                ('value', models.CharField(max_length=63, verbose_name='Value')),
+                ('availability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='data.Availability', verbose_name='Availability')),
+            ],
+            options={
+                'verbose_name': 'Available value',
+                'verbose_name_plural': 'Available values',
+                'ordering': ['availability', 'component_id', 'value'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='availability',
+            constraint=models.UniqueConstraint(fields=('dataflow', 'provision_agreement'), name='data_availability_unique_provision_agreement'),
+        ),
+        migrations.AddConstraint(
+            model_name='availability',
+            constraint=models.UniqueConstraint(condition=models.Q(provision_agreement__isnull=True), fields=('dataflow',), name='data_availability_unique_dataflow'),
+        ),
+        migrations.AddConstraint(
+            model_name='availablevalue',
+            constraint=models.UniqueConstraint(fields=('availability', 'component_id', 'value'), name='data_availablevalue_unique_value'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastructure', '0002_auto_20191029_1812'),
+        ('data', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesKeyLayout',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('components', models.CharField(max_length=1023, verbose_name='Component IDs')),
+                ('widths', models.CharField(max_length=255, verbose_name='Bit widths')),
+                ('data_structure', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='datastructure.DataStructure', verbose_name='Data structure')),
+            ],
+            options={
+                'verbose_name': 'Series key layout',
+                'verbose_name_plural': 'Series key layouts',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SeriesKeyCode',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component_id', models.CharField(max_length=63, verbose_name='Component ID')),
+                ('value', models.CharField(max_length=63, verbose_name='Value')),
+                ('code', models.PositiveIntegerField(verbose_name='Code')),
+                ('data_structure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datastructure.DataStructure', verbose_name='Data structure')),
+            ],
+            options={
+                'verbose_name': 'Series key code',
+                'verbose_name_plural': 'Series key codes',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SeriesKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('packed', models.BigIntegerField(verbose_name='Packed key')),
+                ('data_structure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datastructure.DataStructure', verbose_name='Data structure')),
+            ],
+            options={
+                'verbose_name': 'Series key',
+                'verbose_name_plural': 'Series keys',
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='serieskeycode',
+            constraint=models.UniqueConstraint(fields=('data_structure', 'component_id', 'value'), name='data_serieskeycode_unique_value'),
+        ),
+        migrations.AddConstraint(
+            model_name='serieskeycode',
+            constraint=models.UniqueConstraint(fields=('data_structure', 'component_id', 'code'), name='data_serieskeycode_unique_code'),
+        ),
+        migrations.AddConstraint(
+            model_name='serieskey',
+            constraint=models.UniqueConstraint(fields=('data_structure', 'packed'), name='data_serieskey_unique_packed'),
+        ),
+        migrations.AddIndex(
+            model_name='serieskey',
+            index=models.Index(fields=['data_structure', 'packed', 'id'], name='data_series_data_st_5c15de_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# models.py
+
+from ...core.loading import is_model_registered
+
+from .abstract_models import (
+    Availability,
+    AvailableValue,
+    SeriesKeyLayout,
+    SeriesKeyCode,
+    SeriesKey
+)
+
+__all__ = []
+
+if not is_model_registered('data', 'Availability'):
+    class Availability(Availability):
+        pass
+
+    __all__.append('Availability')
+
+if not is_model_registered('data', 'AvailableValue'):
+    class AvailableValue(AvailableValue):
+        pass
+
+    __all__.append('AvailableValue')
+
+if not is_model_registered('data', 'SeriesKeyLayout'):
+    class SeriesKeyLayout(SeriesKeyLayout):
+        pass
+
+    __all__.append('SeriesKeyLayout')
+
+if not is_model_registered('data', 'SeriesKeyCode'):
+    class SeriesKeyCode(SeriesKeyCode):
+        pass
+
+    __all__.append('SeriesKeyCode')
+
+if not is_model_registered('data', 'SeriesKey'):
+    class SeriesKey(SeriesKey):
+        pass
+
+    __all__.append('SeriesKey')
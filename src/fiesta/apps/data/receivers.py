@@ -0,0 +1,26 @@
+# receivers.py
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+# The series module pulls in the data query engine, it is imported by the
+# receivers instead of at app loading
+
+def invalidate_data_structure(sender, instance, **kwargs):
+    from .series import invalidate_series_key_registry
+    invalidate_series_key_registry(instance.pk)
+
+def invalidate_layout(sender, instance, **kwargs):
+    from .series import invalidate_series_key_registry
+    invalidate_series_key_registry(instance.data_structure_id)
+
+def connect(app_config):
+    DataStructure = apps.get_model('datastructure', 'DataStructure')
+    SeriesKeyLayout = app_config.get_model('SeriesKeyLayout')
+    for signal in (post_save, post_delete):
+        signal.connect(
+            invalidate_data_structure, sender=DataStructure,
+            dispatch_uid=f'fiesta_series_keys_datastructure_{signal}')
+        signal.connect(
+            invalidate_layout, sender=SeriesKeyLayout,
+            dispatch_uid=f'fiesta_series_keys_layout_{signal}')
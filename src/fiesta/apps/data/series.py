@@ -0,0 +1,341 @@
+# series.py
+
+from threading import Lock, RLock
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ...core.constraints import get_dimension_ids
+from ...core.data import parse_key
+from ...settings import api_settings
+from ...utils.datastructures import LRUCache
+
+MAX_BITS = 63
+BATCH_SIZE = 500
+
+class SeriesKeyRegistry:
+    """
+    Dictionary encodes the series keys of a DSD into packed integers
+
+    Each dimension value is mapped to a small integer code per DSD and the
+    codes are packed into a single BIGINT with the first dimension in the most
+    significant bits.  Series ids are looked up through a bounded LRU cache
+    keyed by the dot separated key.
+
+    Parameters
+    ----------
+    data_structure: DataStructure
+    components: tuple
+        The dimension ids in order
+    widths: tuple
+        The number of bits of each dimension code
+    """
+
+    def __init__(self, data_structure, components, widths, cache_size=None):
+        if sum(widths) > MAX_BITS:
+            raise ValueError(
+                f'Series keys of {data_structure} need {sum(widths)} bits')
+        self.data_structure = data_structure
+        self.components = tuple(components)
+        self.widths = tuple(widths)
+        self.shifts = tuple(
+            sum(self.widths[position + 1:])
+            for position in range(len(self.widths))
+        )
+        self.codes = [{} for _ in self.components]
+        self.values = [{} for _ in self.components]
+        self.ids = LRUCache(cache_size or api_settings.DEFAULT_SERIES_KEY_CACHE_SIZE)
+        self._lock = Lock()
+
+    @classmethod
+    def for_data_structure(cls, data_structure, **kwargs):
+        """Returns the registry of a DSD creating its layout if needed"""
+        SeriesKeyLayout = apps.get_model('data', 'SeriesKeyLayout')
+        layout = SeriesKeyLayout.objects.filter(data_structure=data_structure).first()
+        if not layout:
+            components = get_dimension_ids(data_structure)
+            layout, _ = SeriesKeyLayout.objects.get_or_create(
+                data_structure=data_structure,
+                defaults={
+                    'components': ','.join(components),
+                    'widths': ','.join(
+                        str(width) for width in cls.get_widths(data_structure, components))
+                }
+            )
+        registry = cls(
+            data_structure, layout.components.split(','),
+            [int(width) for width in layout.widths.split(',')], **kwargs)
+        registry.load()
+        return registry
+
+    @classmethod
+    def get_widths(cls, data_structure, components):
+        """
+        Returns the bit width of each dimension with one bit of headroom over
+        the size of its codelist, see `fit_widths`
+        """
+        Dimension = apps.get_model('datastructure', 'Dimension')
+        dimensions = Dimension.objects.filter(
+            container__data_structure=data_structure, object_id__in=components
+        ).select_related(
+            'local_representation', 'concept_identity__core_representation')
+        dimensions = {dimension.object_id: dimension for dimension in dimensions}
+        sizes = []
+        for component_id in components:
+            dimension = dimensions[component_id]
+            representation = dimension.local_representation or getattr(
+                dimension.concept_identity, 'core_representation', None)
+            if representation and representation.enumeration_id:
+                sizes.append(representation.enumeration.code_set.count())
+            else:
+                sizes.append(None)
+        return cls.fit_widths(sizes, data_structure)
+
+    @staticmethod
+    def fit_widths(sizes, data_structure=None):
+        """
+        Returns the bit widths of dimensions of the given codelist sizes
+
+        The enumerated dimensions take one bit of headroom over their size.
+        The non enumerated ones, of size None, take
+        DEFAULT_SERIES_KEY_CODE_BITS each or an equal share of the bits the
+        enumerated ones leave if the key would not fit in MAX_BITS otherwise.
+
+        Raises
+        ------
+        ValueError
+            If the enumerated dimensions alone leave less than a bit per non
+            enumerated one
+        """
+        widths = [
+            None if size is None else max(size, 1).bit_length() + 1
+            for size in sizes
+        ]
+        free = [position for position, width in enumerate(widths) if width is None]
+        left = MAX_BITS - sum(width for width in widths if width is not None)
+        width = api_settings.DEFAULT_SERIES_KEY_CODE_BITS
+        if free and width * len(free) > left:
+            width = left // len(free)
+        if width < 1 or left < 0:
+            raise ValueError(
+                f'Series keys of {data_structure} do not fit in {MAX_BITS} bits')
+        for position in free:
+            widths[position] = width
+        return widths
+
+    def load(self, codes=None):
+        """
+        Loads the dictionary codes
+
+        Parameters
+        ----------
+        codes: iterable, optional
+            (component_id, value, code) tuples, read from the database when
+            omitted
+        """
+        if codes is None:
+            SeriesKeyCode = apps.get_model('data', 'SeriesKeyCode')
+            codes = SeriesKeyCode.objects.filter(
+                data_structure=self.data_structure
+            ).values_list('component_id', 'value', 'code')
+        positions = {component: i for i, component in enumerate(self.components)}
+        for component_id, value, code in codes:
+            position = positions.get(component_id)
+            if position is None: continue
+            self.codes[position][value] = code
+            self.values[position][code] = value
+
+    def reset(self):
+        """
+        Drops the codes and the series ids and reloads the committed codes,
+        the entries added by a rolled back transaction do not exist
+        """
+        with self._lock:
+            self.codes = [{} for _ in self.components]
+            self.values = [{} for _ in self.components]
+            self.ids.clear()
+            self.load()
+
+    def add_codes(self, missing):
+        """
+        Assigns codes to new dimension values
+
+        Concurrent writers may assign the same code to different values, in
+        which case the dictionary is reloaded and the remaining values retried
+
+        Parameters
+        ----------
+        missing: dict
+            position to set of values
+        """
+        SeriesKeyCode = apps.get_model('data', 'SeriesKeyCode')
+        with self._lock:
+            for _ in range(3):
+                missing = {
+                    position: {v for v in values if v not in self.codes[position]}
+                    for position, values in missing.items()
+                }
+                missing = {k: v for k, v in missing.items() if v}
+                if not missing: return
+                rows = []
+                for position, values in missing.items():
+                    start = max(self.values[position], default=-1) + 1
+                    if start + len(values) > 1 << self.widths[position]:
+                        raise ValueError(
+                            f'Too many values for {self.components[position]}')
+                    rows.extend(
+                        SeriesKeyCode(
+                            data_structure=self.data_structure,
+                            component_id=self.components[position],
+                            value=value, code=code)
+                        for code, value in enumerate(sorted(values), start)
+                    )
+                try:
+                    with transaction.atomic():
+                        SeriesKeyCode.objects.bulk_create(rows)
+                except IntegrityError:
+                    pass
+                self.load()
+            raise IntegrityError('Could not assign series key codes')
+
+    def get_missing_values(self, keys):
+        """Returns the values of the keys without a code by position"""
+        missing = {}
+        for key in keys:
+            for position, value in enumerate(self.split(key)):
+                if value not in self.codes[position]:
+                    missing.setdefault(position, set()).add(value)
+        return missing
+
+    def split(self, key):
+        return tuple(key.split('.')) if isinstance(key, str) else tuple(key)
+
+    def encode(self, key):
+        """
+        Returns the packed integer of a series key
+
+        Raises
+        ------
+        KeyError
+            If a dimension value has no code yet
+        """
+        packed = 0
+        for codes, shift, value in zip(self.codes, self.shifts, self.split(key)):
+            packed |= codes[value] << shift
+        return packed
+
+    def decode(self, packed):
+        """Returns the dimension values of a packed series key"""
+        return tuple(
+            values[(packed >> shift) & ((1 << width) - 1)]
+            for values, shift, width in zip(self.values, self.shifts, self.widths)
+        )
+
+    def get_or_create_ids(self, keys):
+        """
+        Returns a dictionary of series key to series id creating missing
+        series in bulk
+
+        Parameters
+        ----------
+        keys: iterable
+            Dot separated series keys
+        """
+        SeriesKey = apps.get_model('data', 'SeriesKey')
+        result = {}
+        missing = set()
+        for key in keys:
+            pk = self.ids.get(key)
+            if pk is None: missing.add(key)
+            else: result[key] = pk
+        if not missing: return result
+        new_values = self.get_missing_values(missing)
+        if new_values:
+            # Other processes may have assigned the codes already
+            self.load()
+            new_values = self.get_missing_values(missing)
+        if new_values: self.add_codes(new_values)
+        packed = {self.encode(key): key for key in missing}
+        SeriesKey.objects.bulk_create([
+            SeriesKey(data_structure=self.data_structure, packed=value)
+            for value in packed
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        values = list(packed)
+        for start in range(0, len(values), BATCH_SIZE):
+            for pk, value in SeriesKey.objects.filter(
+                    data_structure=self.data_structure,
+                    packed__in=values[start:start + BATCH_SIZE]
+            ).values_list('pk', 'packed'):
+                key = packed[value]
+                self.ids[key] = pk
+                result[key] = pk
+        return result
+
+    def filter(self, key='all'):
+        """
+        Returns the SeriesKey queryset matching a key expression
+
+        The leading dimensions with a single value become a range on the
+        packed key, which is served by the covering index, and every other
+        constrained dimension a filter on its masked bits
+        """
+        SeriesKey = apps.get_model('data', 'SeriesKey')
+        queryset = SeriesKey.objects.filter(data_structure=self.data_structure)
+        parsed = parse_key(key, self.components)
+        if any(values and set(values) - set(codes)
+               for values, codes in zip(parsed, self.codes)):
+            # Other processes may have assigned the codes since the last load
+            self.load()
+        selected = []
+        for position, values in enumerate(parsed):
+            if values is None:
+                selected.append(None)
+                continue
+            codes = [self.codes[position][v] for v in values if v in self.codes[position]]
+            if not codes: return queryset.none()
+            selected.append(codes)
+        prefix = 0
+        low = 0
+        while prefix < len(selected) and selected[prefix] and len(selected[prefix]) == 1:
+            low |= selected[prefix][0] << self.shifts[prefix]
+            prefix += 1
+        if prefix:
+            high = low | ((1 << self.shifts[prefix - 1]) - 1)
+            queryset = queryset.filter(packed__gte=low, packed__lte=high)
+        for position in range(prefix, len(selected)):
+            codes = selected[position]
+            if codes is None: continue
+            shift = self.shifts[position]
+            mask = ((1 << self.widths[position]) - 1) << shift
+            name = f'code_{position}'
+            queryset = queryset.annotate(**{name: F('packed').bitand(mask)}).filter(
+                **{f'{name}__in': [code << shift for code in codes]})
+        return queryset
+
+_registries = {}
+# Reentrant, creating the layout of a registry invalidates it
+_registries_lock = RLock()
+
+def get_series_key_registry(data_structure):
+    """
+    Returns the process wide registry of a DSD
+
+    The registries are dropped by `invalidate_series_key_registry` when their
+    DSD or layout is saved or deleted in this process, the codes assigned by
+    other processes are reloaded when a value misses
+    """
+    registry = _registries.get(data_structure.pk)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(data_structure.pk)
+            if registry is None:
+                registry = SeriesKeyRegistry.for_data_structure(data_structure)
+                _registries[data_structure.pk] = registry
+    return registry
+
+def invalidate_series_key_registry(data_structure_id=None):
+    """Drops the registry of a DSD or all of them"""
+    with _registries_lock:
+        if data_structure_id is None: _registries.clear()
+        else: _registries.pop(data_structure_id, None)
@@ -1,5 +1,6 @@
 # abstract_models.py
 
+from django.apps import apps
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from versionfield import VersionField
@@ -88,6 +89,26 @@ class DataStructure(common.AbstractMaintainable):
     class Meta(common.AbstractMaintainable.Meta):
         abstract = True
 
+    def get_references(self):
+        concept_schemes, codelists = set(), set()
+        for model_name in ['Dimension', 'PrimaryMeasure', 'Attribute']:
+            model = apps.get_model('datastructure', model_name)
+            components = model.objects.filter(container__data_structure=self)
+            concept_schemes.update(components.values_list(
+                'concept_identity__container', flat=True))
+            codelists.update(components.values_list(
+                'local_representation__enumeration', flat=True))
+            if model_name != 'PrimaryMeasure':
+                concept_schemes.update(components.values_list(
+                    'concept_role__container', flat=True))
+            if model_name == 'Dimension':
+                concept_schemes.update(components.values_list(
+                    'measure_local_representation', flat=True))
+        return [
+            (apps.get_model('conceptscheme', 'ConceptScheme'), concept_schemes - {None}),
+            (apps.get_model('codelist', 'Codelist'), codelists - {None}),
+        ]
+
 class AbstractComponentList(models.Model):
 
     data_structure = models.OneToOneField(
@@ -328,3 +349,6 @@ class Dataflow(common.AbstractMaintainable):
         abstract = True
         verbose_name = _('Dataflow')
         verbose_name_plural = _('Dataflows')
+
+    def get_references(self):
+        return [(self._meta.get_field('structure').related_model, [self.structure_id])]
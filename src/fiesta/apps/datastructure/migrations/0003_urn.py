@@ -0,0 +1,35 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+from fiesta.core.urns import fill_urns
+
+
+def fill(apps, schema_editor):
+    fill_urns(
+        apps, 'datastructure',
+        maintainables=('DataStructure', 'Dataflow'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastructure', '0002_auto_20191029_1812'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datastructure',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='dataflow',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 # abstract_models.py
 
+from django.apps import apps
 from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
@@ -9,10 +10,12 @@ from ...settings import api_settings
 from ...core.validators import re_validators
 
 from ..common import abstract_models as common
+from . import managers
 
 VERY_SMALL = api_settings.DEFAULT_VERY_SMALL_STRING
 SMALL = api_settings.DEFAULT_SMALL_STRING
 MEDIUM = api_settings.DEFAULT_MEDIUM_STRING
+VERY_LARGE = api_settings.DEFAULT_VERY_LARGE_STRING
 TINY = api_settings.DEFAULT_TINY_STRING
 
 class Action(models.IntegerChoices):
@@ -43,9 +46,10 @@ class Log(models.Model):
         COMPLETED = 4, _('Completed')
 
 
-    user = models.OneToOneField(
+    user = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.PROTECT,
+        null=True,
         verbose_name = _('User')
     )
     channel = models.IntegerField(
@@ -483,9 +487,9 @@ class Annotation(common.AbstractAnnotation):
 
 class ProvisionAgreement(common.AbstractMaintainable):
     dataflow = models.ForeignKey(
-        'registry.ProvisionAgreement', 
+        'datastructure.Dataflow', 
         on_delete=models.PROTECT,
-        verbose_name=_('Provision agreement')
+        verbose_name=_('Dataflow')
     )
     dataflow_version = VersionField(
         _('Dataflow version'),
@@ -504,6 +508,12 @@ class ProvisionAgreement(common.AbstractMaintainable):
         verbose_name = _('Provision agreement')
         verbose_name_plural = _('Provision agreements')
 
+    def get_references(self):
+        return [
+            (self._meta.get_field('dataflow').related_model, [self.dataflow_id]),
+            (apps.get_model('base', 'DataProviderScheme'), [self.dataprovider.container_id]),
+        ]
+
 
 class VersionDetail(models.Model):
     attachment_constraint = models.ForeignKey(
@@ -531,7 +541,7 @@ class VersionDetail(models.Model):
         on_delete=models.CASCADE,
         null=True
     )
-    version = VersionField(_('Version'))
+    version = VersionField(verbose_name=_('Version'))
 
     class Meta:
         abstract = True
@@ -549,6 +559,12 @@ class AttachmentConstraint(common.AbstractMaintainable):
         verbose_name = _('Attachment constraint')
         verbose_name_plural = _('Attachment constraints')
 
+    def get_references(self):
+        return [(
+            apps.get_model('datastructure', 'DataStructure'),
+            set(self.data_structures.values_list('pk', flat=True))
+        )]
+
 
 class ContentConstraint(common.AbstractMaintainable):
     
@@ -614,6 +630,22 @@ class ContentConstraint(common.AbstractMaintainable):
         verbose_name = _('Content constraint')
         verbose_name_plural = _('Content constraints')
 
+    def get_references(self):
+        references = [
+            (apps.get_model('datastructure', 'DataStructure'),
+             set(self.data_structures.values_list('pk', flat=True))),
+            (apps.get_model('datastructure', 'Dataflow'),
+             set(self.dataflows.values_list('pk', flat=True))),
+            (apps.get_model('registry', 'ProvisionAgreement'),
+             set(self.provision_agreements.values_list('pk', flat=True))),
+        ]
+        if self.data_provider_id:
+            references.append((
+                apps.get_model('base', 'DataProviderScheme'),
+                [self.data_provider.container_id]
+            ))
+        return references
+
 
 class AbstractRegion(models.Model):
     attachment_constraint = models.ForeignKey(
@@ -690,6 +722,8 @@ class CubeRegionKey(models.Model):
     key_value = models.ForeignKey(
         'CubeRegion',
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='key_value_set',
         related_query_name='key_value', 
         verbose_name=_('Cube region')
@@ -697,6 +731,8 @@ class CubeRegionKey(models.Model):
     attribute = models.ForeignKey(
         'CubeRegion',
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='attribute_set',
         related_query_name='attribute', 
         verbose_name=_('Cube region')
@@ -793,3 +829,120 @@ class TimePeriod(models.Model):
         abstract = True
         verbose_name = _('Time period')
         verbose_name_plural = _('Time periods')
+
+
+class Dependency(models.Model):
+    source_type = models.ForeignKey(
+        'contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        verbose_name=_('Source type'),
+        related_name='+'
+    )
+    source_id = models.PositiveIntegerField(
+        _('Source ID')
+    )
+    target_type = models.ForeignKey(
+        'contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        verbose_name=_('Target type'),
+        related_name='+'
+    )
+    target_id = models.PositiveIntegerField(
+        _('Target ID')
+    )
+
+    objects = managers.DependencyManager()
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Dependency')
+        verbose_name_plural = _('Dependencies')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_type', 'source_id', 'target_type', 'target_id'],
+                name='%(app_label)s_%(class)s_unique_edge'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['target_type', 'target_id', 'source_type', 'source_id']),
+        ]
+
+
+class LatestVersion(models.Model):
+    content_type = models.ForeignKey(
+        'contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        verbose_name=_('Content type'),
+        related_name='+'
+    )
+    agency = models.ForeignKey(
+        'base.Agency',
+        on_delete=models.CASCADE,
+        verbose_name=_('Agency'),
+        related_name='+'
+    )
+    object_id = models.CharField(
+        _('ID'),
+        max_length=VERY_SMALL
+    )
+    version = VersionField(
+        verbose_name=_('Version')
+    )
+    target_id = models.PositiveIntegerField(
+        _('Target ID')
+    )
+
+    objects = managers.LatestVersionManager()
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Latest version')
+        verbose_name_plural = _('Latest versions')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'agency', 'object_id'],
+                name='%(app_label)s_%(class)s_unique_artefact'
+            ),
+        ]
+
+
+class SearchEntry(models.Model):
+    content_type = models.ForeignKey(
+        'contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        verbose_name=_('Content type'),
+        related_name='+'
+    )
+    target_id = models.PositiveIntegerField(
+        _('Target ID')
+    )
+    owner_type = models.ForeignKey(
+        'contenttypes.ContentType',
+        on_delete=models.CASCADE,
+        verbose_name=_('Owner type'),
+        related_name='+'
+    )
+    owner_id = models.PositiveIntegerField(
+        _('Owner ID')
+    )
+    urn = models.CharField(
+        _('URN'),
+        max_length=VERY_LARGE
+    )
+    language = models.CharField(
+        _('Language'),
+        max_length=TINY
+    )
+    text = models.TextField(
+        _('Text')
+    )
+
+    objects = managers.SearchEntryManager()
+
+    class Meta:
+        abstract = True
+        verbose_name = _('Search entry')
+        verbose_name_plural = _('Search entries')
+        indexes = [
+            models.Index(fields=['owner_type', 'owner_id']),
+        ]
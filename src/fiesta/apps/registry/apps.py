@@ -5,3 +5,7 @@ from ...core.application import BaseFiestaConfig
 class RegistryConfig(BaseFiestaConfig):
     label = 'registry'
     name = 'fiesta.apps.registry'
+
+    def ready(self):
+        from . import receivers
+        receivers.connect(self)
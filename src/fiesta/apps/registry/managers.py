@@ -0,0 +1,336 @@
+# managers.py
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, models, transaction
+from django.db.models import Q
+from modeltranslation.utils import build_localized_fieldname
+
+class DependencyManager(models.Manager):
+    """
+    Maintains and queries the reference graph of the maintainable artefacts
+
+    Each row is an edge from an artefact to an artefact it references, e.g.
+    from a DSD to the codelists of its components.  The edges of an artefact
+    are replaced whenever the artefact is saved by a structure submission;
+    the edges of the artefacts stored before are built by the
+    `fiesta_rebuild_dependencies` command.
+    """
+
+    def edges_for(self, obj):
+        source_type = ContentType.objects.get_for_model(obj)
+        for model, pks in obj.get_references():
+            target_type = ContentType.objects.get_for_model(model)
+            for pk in pks:
+                if pk is None: continue
+                yield self.model(
+                    source_type=source_type, source_id=obj.pk,
+                    target_type=target_type, target_id=pk)
+
+    def replace(self, obj):
+        """Replaces the outgoing edges of an artefact"""
+        source_type = ContentType.objects.get_for_model(obj)
+        with transaction.atomic(using=self.db):
+            self.filter(source_type=source_type, source_id=obj.pk).delete()
+            self.bulk_create(self.edges_for(obj), ignore_conflicts=True)
+
+    def remove(self, obj):
+        """Removes the incoming and outgoing edges of an artefact"""
+        content_type = ContentType.objects.get_for_model(obj)
+        self.filter(
+            Q(source_type=content_type, source_id=obj.pk)
+            | Q(target_type=content_type, target_id=obj.pk)
+        ).delete()
+
+    def children(self, queryset, model):
+        """
+        Returns the primary keys of the artefacts of `model` referenced by the
+        artefacts of `queryset` as a subquery
+        """
+        return self.filter(
+            source_type=ContentType.objects.get_for_model(queryset.model),
+            source_id__in=queryset.values('pk'),
+            target_type=ContentType.objects.get_for_model(model),
+        ).values('target_id')
+
+    def parents(self, queryset, model):
+        """
+        Returns the primary keys of the artefacts of `model` that reference
+        the artefacts of `queryset` as a subquery
+        """
+        return self.filter(
+            target_type=ContentType.objects.get_for_model(queryset.model),
+            target_id__in=queryset.values('pk'),
+            source_type=ContentType.objects.get_for_model(model),
+        ).values('source_id')
+
+    def supports_recursive_queries(self, connection):
+        """Whether the database evaluates `WITH RECURSIVE` queries"""
+        if connection.vendor in ('postgresql', 'sqlite'): return True
+        if connection.vendor == 'mysql':
+            return connection.mysql_version >= (
+                (10, 2, 2) if connection.mysql_is_mariadb else (8, 0))
+        return False
+
+    def descendants(self, queryset):
+        """
+        Returns the artefacts referenced directly or indirectly by the
+        artefacts of `queryset`
+
+        The closure is computed by a single recursive query, `UNION` discards
+        the edges already visited so reference cycles terminate.  Databases
+        without recursive queries walk the edges one level at a time.
+
+        Returns
+        -------
+            A dictionary of model to set of primary keys
+        """
+        root_type = ContentType.objects.get_for_model(queryset.model)
+        connection = connections[self.db]
+        if self.supports_recursive_queries(connection):
+            closure = self._recursive_closure(root_type, queryset, connection)
+        else:
+            closure = self._walk_closure(root_type, queryset)
+        result = {}
+        for content_type_id, object_id in closure:
+            if content_type_id == root_type.pk: continue
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            result.setdefault(model, set()).add(object_id)
+        return result
+
+    def _recursive_closure(self, root_type, queryset, connection):
+        roots, params = queryset.values('pk').query.sql_with_params()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = (
+            f'WITH RECURSIVE closure(content_type_id, object_id) AS ('
+            f'SELECT {root_type.pk}, roots.id FROM ({roots}) roots '
+            f'UNION '
+            f'SELECT edge.target_type_id, edge.target_id FROM {table} edge '
+            f'INNER JOIN closure ON edge.source_type_id = closure.content_type_id '
+            f'AND edge.source_id = closure.object_id'
+            f') SELECT content_type_id, object_id FROM closure'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _walk_closure(self, root_type, queryset):
+        frontier = {(root_type.pk, pk) for pk in queryset.values_list('pk', flat=True)}
+        closure = set(frontier)
+        while frontier:
+            sources = {}
+            for content_type_id, object_id in frontier:
+                sources.setdefault(content_type_id, set()).add(object_id)
+            query = Q()
+            for content_type_id, object_ids in sources.items():
+                query |= Q(source_type_id=content_type_id, source_id__in=object_ids)
+            targets = set(self.filter(query).values_list('target_type_id', 'target_id'))
+            frontier = targets - closure
+            closure |= frontier
+        return closure
+
+class LatestVersionManager(models.Manager):
+    """
+    Maintains the pointer to the latest version of each maintainable artefact
+
+    One row per (model, agency, object_id) so that `version=latest` queries
+    are a probe of its unique index instead of a grouping over all versions.
+    """
+
+    def get_maintainable_models(self):
+        from ..common.abstract_models import AbstractMaintainable
+        return [
+            model for model in apps.get_models()
+            if issubclass(model, AbstractMaintainable)
+        ]
+
+    def refresh(self, model, agency_id, object_id):
+        """
+        Points the artefact to its latest stored version or removes its
+        pointer if no version is left
+        """
+        content_type = ContentType.objects.get_for_model(model)
+        latest = model._default_manager.filter(
+            agency_id=agency_id, object_id=object_id
+        ).order_by('-version').values_list('pk', 'version').first()
+        lookup = dict(
+            content_type=content_type, agency_id=agency_id, object_id=object_id)
+        with transaction.atomic(using=self.db):
+            if latest is None:
+                self.filter(**lookup).delete()
+            else:
+                self.update_or_create(
+                    defaults={'target_id': latest[0], 'version': latest[1]},
+                    **lookup)
+
+    def targets(self, model, **kwargs):
+        """
+        Returns the primary keys of the latest versions of `model` as a
+        subquery
+
+        Parameters
+        ----------
+        kwargs:
+            Lookups on the agency and object_id of the artefacts
+        """
+        return self.filter(
+            content_type=ContentType.objects.get_for_model(model), **kwargs
+        ).values('target_id')
+
+    def find_drift(self, model):
+        """
+        Yields the (agency_id, object_id) of the artefacts of `model` whose
+        pointer is missing, stale or points to a removed artefact
+        """
+        expected = {}
+        versions = model._default_manager.order_by(
+            'agency_id', 'object_id', '-version'
+        ).values_list('agency_id', 'object_id', 'pk')
+        for agency_id, object_id, pk in versions.iterator():
+            expected.setdefault((agency_id, object_id), pk)
+        pointers = self.filter(
+            content_type=ContentType.objects.get_for_model(model)
+        ).values_list('agency_id', 'object_id', 'target_id')
+        for agency_id, object_id, target_id in pointers.iterator():
+            key = (agency_id, object_id)
+            if expected.pop(key, None) != target_id:
+                yield key
+        yield from expected
+
+class SearchEntryManager(models.Manager):
+    """
+    Maintains and queries the full-text index of the names, descriptions and
+    annotation texts of the maintainable artefacts and of their items
+
+    One row per object, language and text.  The text is indexed by an FTS5
+    table on SQLite and by tsvector and trigram GIN indexes on PostgreSQL,
+    see migration 0005_searchentry, other databases fall back to
+    `icontains`.  The entries of an artefact are replaced whenever the
+    artefact is saved by a structure submission.
+    """
+    text_fields = ('name', 'description')
+
+    def get_item_models(self, model):
+        from ..common.abstract_models import AbstractItem
+        return [
+            relation.related_model for relation in model._meta.related_objects
+            if relation.field.name == 'container'
+            and issubclass(relation.related_model, AbstractItem)
+        ]
+
+    def texts_for(self, obj):
+        """Yields the (language, text) of an object and of its annotations"""
+        languages = [code for code, _ in settings.LANGUAGES]
+        for language in languages:
+            for name in self.text_fields:
+                yield language, getattr(
+                    obj, build_localized_fieldname(name, language), None)
+        if not hasattr(obj, 'annotation_set'): return
+        for annotation in obj.annotation_set.all():
+            for language in languages:
+                yield language, getattr(
+                    annotation, build_localized_fieldname('text', language), None)
+
+    def entries_for(self, obj, urn, owner):
+        content_type = ContentType.objects.get_for_model(obj)
+        owner_type = ContentType.objects.get_for_model(owner)
+        for language, text in self.texts_for(obj):
+            if not text: continue
+            yield self.model(
+                content_type=content_type, target_id=obj.pk,
+                owner_type=owner_type, owner_id=owner.pk,
+                urn=urn, language=language, text=text)
+
+    def reindex(self, obj):
+        """Replaces the entries of a maintainable artefact and its items"""
+        entries = list(self.entries_for(obj, obj.urn, obj))
+        for model in self.get_item_models(obj.__class__):
+            items = model._default_manager.filter(container=obj)
+            if hasattr(model, 'annotation_set'):
+                items = items.prefetch_related('annotation_set')
+            for item in items:
+                entries.extend(self.entries_for(item, item.urn, obj))
+        with transaction.atomic(using=self.db):
+            self.remove(obj)
+            self.bulk_create(entries, batch_size=500)
+
+    def remove(self, obj):
+        """Removes the entries of a maintainable artefact and its items"""
+        self.filter(
+            owner_type=ContentType.objects.get_for_model(obj), owner_id=obj.pk
+        ).delete()
+
+    def search(self, text, languages=None, classes=None, limit=50):
+        """
+        Returns the URNs of the artefacts and items matching all the words of
+        `text`, best first
+
+        Parameters
+        ----------
+        languages:
+            The languages of the matched texts, all if None
+        classes:
+            The SDMX class names of the matched objects, e.g. Codelist or
+            Code, all if None
+
+        Returns
+        -------
+            A list of (urn, score) pairs, the higher the score the better
+        """
+        words = text.split()
+        if not words: return []
+        connection = connections[self.db]
+        table = self.model._meta.db_table
+        conditions, params = [], []
+        if languages:
+            conditions.append(
+                f'entry.language IN ({", ".join(["%s"] * len(languages))})')
+            params.extend(languages)
+        if classes:
+            content_types = list(ContentType.objects.filter(
+                model__in=[name.lower() for name in classes]
+            ).values_list('pk', flat=True))
+            if not content_types: return []
+            conditions.append(
+                f'entry.content_type_id IN ({", ".join(["%s"] * len(content_types))})')
+            params.extend(content_types)
+        if connection.vendor == 'sqlite':
+            # Prefix match of every word quoted as FTS5 strings, the rank of
+            # FTS5 is its bm25 score, lower is better
+            match = ' '.join(
+                '"%s"*' % word.replace('"', '""') for word in words)
+            sql = (
+                f'SELECT entry.urn, -MIN({table}_fts.rank) FROM {table}_fts '
+                f'INNER JOIN {table} entry ON entry.id = {table}_fts.rowid '
+                f'WHERE {table}_fts MATCH %s'
+            )
+            params = [match] + params
+        elif connection.vendor == 'postgresql':
+            text = ' '.join(words)
+            sql = (
+                f'SELECT entry.urn, MAX('
+                f"ts_rank(to_tsvector('simple', entry.text), "
+                f"plainto_tsquery('simple', %s)) + similarity(entry.text, %s)"
+                f') FROM {table} entry '
+                f"WHERE (to_tsvector('simple', entry.text) @@ "
+                f"plainto_tsquery('simple', %s) OR entry.text %% %s)"
+            )
+            params = [text] * 4 + params
+        else:
+            queryset = self.all()
+            for word in words:
+                queryset = queryset.filter(text__icontains=word)
+            if languages:
+                queryset = queryset.filter(language__in=languages)
+            if classes:
+                queryset = queryset.filter(content_type__in=content_types)
+            urns = queryset.order_by('urn').values_list('urn', flat=True)
+            return [(urn, 0.0) for urn in urns.distinct()[:limit]]
+        for condition in conditions:
+            sql += f' AND {condition}'
+        sql += ' GROUP BY entry.urn ORDER BY 2 DESC, entry.urn LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cuberegionkey',
+            name='attribute',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attribute_set', related_query_name='attribute', to='registry.CubeRegion', verbose_name='Cube region'),
+        ),
+        migrations.AlterField(
+            model_name='cuberegionkey',
+            name='key_value',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='key_value_set', related_query_name='key_value', to='registry.CubeRegion', verbose_name='Cube region'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The edges of the stored artefacts are built by get_references, which the
+# historical models lack, so they are built by fiesta_rebuild_dependencies
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('datastructure', '0002_auto_20191029_1812'),
+        ('registry', '0002_auto_20261019_1152'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='provisionagreement',
+            name='dataflow',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='datastructure.Dataflow', verbose_name='Dataflow'),
+        ),
+        migrations.CreateModel(
+            name='Dependency',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.PositiveIntegerField(verbose_name='Source ID')),
+                ('target_id', models.PositiveIntegerField(verbose_name='Target ID')),
+                ('source_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType', verbose_name='Source type')),
+                ('target_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType', verbose_name='Target type')),
+            ],
+            options={
+                'verbose_name': 'Dependency',
+                'verbose_name_plural': 'Dependencies',
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dependency',
+            constraint=models.UniqueConstraint(fields=('source_type', 'source_id', 'target_type', 'target_id'), name='registry_dependency_unique_edge'),
+        ),
+        migrations.AddIndex(
+            model_name='dependency',
+            index=models.Index(fields=['target_type', 'target_id', 'source_type', 'source_id'], name='registry_de_target__298fa6_idx'),
+        ),
+    ]
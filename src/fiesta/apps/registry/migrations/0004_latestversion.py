@@ -0,0 +1,37 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+import versionfield
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('base', '0002_auto_20191029_1812'),
+        ('registry', '0003_dependency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=31, verbose_name='ID')),
+                ('version', versionfield.VersionField(verbose_name='Version')),
+                ('target_id', models.PositiveIntegerField(verbose_name='Target ID')),
+                ('agency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.Agency', verbose_name='Agency')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType', verbose_name='Content type')),
+            ],
+            options={
+                'verbose_name': 'Latest version',
+                'verbose_name_plural': 'Latest versions',
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='latestversion',
+            constraint=models.UniqueConstraint(fields=('content_type', 'agency', 'object_id'), name='registry_latestversion_unique_artefact'),
+        ),
+    ]
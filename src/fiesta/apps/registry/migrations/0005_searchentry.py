@@ -0,0 +1,82 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_text_index(apps, schema_editor):
+    table = apps.get_model('registry', 'SearchEntry')._meta.db_table
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+            f"text, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61')")
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, text) VALUES (new.id, new.text); "
+            f"END")
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, text) "
+            f"VALUES ('delete', old.id, old.text); END")
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, text) "
+            f"VALUES ('delete', old.id, old.text); "
+            f"INSERT INTO {table}_fts(rowid, text) VALUES (new.id, new.text); "
+            f"END")
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f"CREATE INDEX {table}_text_tsv ON {table} "
+            f"USING GIN (to_tsvector('simple', text))")
+        schema_editor.execute(
+            f"CREATE INDEX {table}_text_trgm ON {table} "
+            f"USING GIN (text gin_trgm_ops)")
+
+
+def drop_text_index(apps, schema_editor):
+    table = apps.get_model('registry', 'SearchEntry')._meta.db_table
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_text_tsv')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('registry', '0004_latestversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_id', models.PositiveIntegerField(verbose_name='Target ID')),
+                ('owner_id', models.PositiveIntegerField(verbose_name='Owner ID')),
+                ('urn', models.CharField(max_length=511, verbose_name='URN')),
+                ('language', models.CharField(max_length=15, verbose_name='Language')),
+                ('text', models.TextField(verbose_name='Text')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType', verbose_name='Content type')),
+                ('owner_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType', verbose_name='Owner type')),
+            ],
+            options={
+                'verbose_name': 'Search entry',
+                'verbose_name_plural': 'Search entries',
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['owner_type', 'owner_id'], name='registry_se_owner_t_38f1b7_idx'),
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
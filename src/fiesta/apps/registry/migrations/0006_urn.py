@@ -0,0 +1,41 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+from fiesta.core.urns import fill_urns
+
+
+def fill(apps, schema_editor):
+    fill_urns(
+        apps, 'registry',
+        maintainables=('ProvisionAgreement', 'AttachmentConstraint', 'ContentConstraint'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0005_searchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provisionagreement',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='attachmentconstraint',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='contentconstraint',
+            name='urn',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=511, verbose_name='URN'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.0.14 on 2026-10-19 11:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('registry', '0006_urn'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='log',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+    ]
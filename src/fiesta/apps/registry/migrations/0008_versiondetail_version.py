@@ -0,0 +1,19 @@
+# Generated by Django 3.0.14 on 2026-10-19 12:28
+
+from django.db import migrations
+import versionfield
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0007_log_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='versiondetail',
+            name='version',
+            field=versionfield.VersionField(verbose_name='Version'),
+        ),
+    ]
@@ -23,7 +23,10 @@ from .abstract_models import (
     CubeRegionKey,
     CubeRegionKeyValue, 
     CubeRegionKeyTimeRange,
-    TimePeriod
+    TimePeriod,
+    Dependency,
+    LatestVersion,
+    SearchEntry
 )
 
 __all__ = []
@@ -153,3 +156,21 @@ if not is_model_registered('registry', 'TimePeriod'):
         pass
 
     __all__.append('TimePeriod')
+
+if not is_model_registered('registry', 'Dependency'):
+    class Dependency(Dependency):
+        pass
+
+    __all__.append('Dependency')
+
+if not is_model_registered('registry', 'LatestVersion'):
+    class LatestVersion(LatestVersion):
+        pass
+
+    __all__.append('LatestVersion')
+
+if not is_model_registered('registry', 'SearchEntry'):
+    class SearchEntry(SearchEntry):
+        pass
+
+    __all__.append('SearchEntry')
@@ -0,0 +1,32 @@
+# receivers.py
+
+from django.db.models.signals import post_delete, post_save
+
+from ...core.constraints import constraint_cache
+from ...core.fragments import fragment_cache
+
+CONSTRAINT_MODELS = [
+    'ContentConstraint', 'VersionDetail', 'CubeRegion', 'CubeRegionKey',
+    'CubeRegionKeyValue', 'CubeRegionKeyTimeRange', 'TimePeriod', 'KeySet',
+    'Key', 'SubKey',
+]
+
+def clear_constraint_cache(sender, **kwargs):
+    constraint_cache.clear()
+
+def invalidate_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate(instance)
+
+def connect(app_config):
+    for model_name in CONSTRAINT_MODELS:
+        model = app_config.get_model(model_name)
+        for signal in (post_save, post_delete):
+            signal.connect(
+                clear_constraint_cache, sender=model,
+                dispatch_uid=f'fiesta_constraint_cache_{model_name}_{signal}')
+    LatestVersion = app_config.get_model('LatestVersion')
+    for model in LatestVersion.objects.get_maintainable_models():
+        for signal in (post_save, post_delete):
+            signal.connect(
+                invalidate_fragments, sender=model,
+                dispatch_uid=f'fiesta_fragment_cache_{model._meta.label_lower}_{signal}')
@@ -235,12 +235,14 @@ CLASS2WRAPPER = {
 }
 
 CLASS2RESOURCES = {
-    'AgencySchemeDataclass': ['agencyscheme', 'organisationscheme'],
-    'DataConsumerSchemeDataclass': ['dataconsumerscheme', 'organisationscheme'],
-    'DataProviderSchemeDataclass': ['dataproviderscheme', 'organisationschem'],
-    'OrganisationUnitSchemeDataclass': ['organisationunitscheme', 'organisationscheme'],
-    'CodelistDataclass': ['codelist'],
-    'ConceptSchemeDataclass': ['conceptscheme'],
+    'AgencyScheme': ['agencyscheme', 'organisationscheme'],
+    'DataConsumerScheme': ['dataconsumerscheme', 'organisationscheme'],
+    'DataProviderScheme': ['dataproviderscheme', 'organisationscheme'],
+    'OrganisationUnitScheme': ['organisationunitscheme', 'organisationscheme'],
+    'Codelist': ['codelist'],
+    'ConceptScheme': ['conceptscheme'],
+    'DataStructure': ['datastructure'],
+    'Dataflow': ['dataflow'],
 }
 
 RESOURCES = ['organisationscheme', 'agencyscheme', 'dataproviderscheme',
@@ -268,10 +270,20 @@ QUERY_PARAMS = {
     'structure': {
         'detail': ['full', 'allstubs', 'referencestubs'],
         'references': ['none', 'parents', 'parentsandsiblings', 'children',
-                       'descendants', 'all'] + RESOURCES
+                       'descendants', 'all'] + RESOURCES,
+        # Also retrieve the ancestors of the items of an item query
+        'ancestors': ['false', 'true'],
     },
     'schema': {
         'dimensionAtObservation': ['TIME_PERIOD', 'AllDimensions', 'MeasureDimension']
+    },
+    'data': {
+        'startPeriod': None,
+        'endPeriod': None,
+        'firstNObservations': None,
+        'lastNObservations': None,
+        'dimensionAtObservation': None,
+        'detail': ['full', 'dataonly', 'serieskeysonly', 'nodata'],
     }
 }
 
@@ -0,0 +1,413 @@
+# constraints.py
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from threading import RLock
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from django.apps import apps
+
+from ..utils.periods import period_bounds
+
+TIME_PERIOD = 'TIME_PERIOD'
+
+@dataclass(frozen=True)
+class TimeInterval:
+    """
+    A compiled `CubeRegionKeyTimeRange`.
+
+    A `BeforePeriod` only sets an upper bound, an `AfterPeriod` only a lower
+    bound and a `StartPeriod`/`EndPeriod` pair both
+    """
+
+    start: Optional[date] = None
+    end: Optional[date] = None
+    start_inclusive: bool = True
+    end_inclusive: bool = True
+
+    def __contains__(self, period):
+        first, last = period_bounds(period)
+        if self.start is not None:
+            if self.start_inclusive and first < self.start: return False
+            if not self.start_inclusive and first <= self.start: return False
+        if self.end is not None:
+            if self.end_inclusive and last > self.end: return False
+            if not self.end_inclusive and last >= self.end: return False
+        return True
+
+class KeyTrie:
+    """
+    A trie of series keys, one level per dimension
+
+    A missing sub key is stored as the `None` wildcard, as the SDMX
+    information model does not require keys to set every dimension
+    """
+
+    __slots__ = ('root', 'size')
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key):
+        node = self.root
+        for value in key:
+            node = node.setdefault(value, {})
+        self.size += 1
+
+    def match(self, key):
+        nodes = (self.root,)
+        for value in key:
+            matched = []
+            for node in nodes:
+                child = node.get(value)
+                if child is not None: matched.append(child)
+                child = node.get(None)
+                if child is not None: matched.append(child)
+            if not matched: return False
+            nodes = matched
+        return True
+
+Region = Tuple[Optional[FrozenSet[str]], ...]
+
+def _in_region(key, region):
+    for value, allowed in zip(key, region):
+        if allowed is not None and value not in allowed: return False
+    return True
+
+@dataclass
+class CompiledConstraint:
+    """The in memory form of a single content constraint"""
+
+    included_regions: List[Region] = field(default_factory=list)
+    excluded_regions: List[Region] = field(default_factory=list)
+    included_keys: Optional[KeyTrie] = None
+    excluded_keys: Optional[KeyTrie] = None
+    time_intervals: List[TimeInterval] = field(default_factory=list)
+
+    @property
+    def is_simple(self):
+        """
+        Whether the constraint is a single included cube region, the
+        overwhelmingly common case that can be merged into per dimension sets
+        """
+        return (len(self.included_regions) == 1 and not self.excluded_regions
+                and self.included_keys is None and self.excluded_keys is None)
+
+    def is_allowed(self, key):
+        if self.included_regions and not any(
+                _in_region(key, region) for region in self.included_regions):
+            return False
+        for region in self.excluded_regions:
+            if _in_region(key, region): return False
+        if self.included_keys is not None and not self.included_keys.match(key):
+            return False
+        if self.excluded_keys is not None and self.excluded_keys.match(key):
+            return False
+        return True
+
+class ConstraintEvaluator:
+    """
+    Validates series keys and time periods against all the allowed content
+    constraints attached to an artefact
+
+    Single included cube regions are merged into one allowed value set per
+    dimension, so that the common case costs a set lookup per dimension.  The
+    rest of the constraints are evaluated in turn and a key must satisfy all
+    of them.
+
+    Parameters
+    ----------
+    dimensions: tuple
+        The ids of the dimensions that make up a series key, in order and
+        excluding the time dimension
+    constraints: list
+        The compiled constraints
+    """
+
+    def __init__(self, dimensions, constraints=()):
+        self.dimensions = tuple(dimensions)
+        self.positions = {
+            dimension: position
+            for position, dimension in enumerate(self.dimensions)
+        }
+        allowed: Dict[int, FrozenSet[str]] = {}
+        self.constraints = []
+        self.time_intervals = []
+        for constraint in constraints:
+            if constraint.time_intervals:
+                self.time_intervals.append(tuple(constraint.time_intervals))
+            if constraint.is_simple:
+                for position, values in enumerate(constraint.included_regions[0]):
+                    if values is None: continue
+                    allowed[position] = allowed[position] & values if position in allowed else values
+            elif constraint.included_regions or constraint.excluded_regions \
+                    or constraint.included_keys is not None \
+                    or constraint.excluded_keys is not None:
+                self.constraints.append(constraint)
+        self.allowed = tuple(sorted(allowed.items()))
+
+    @property
+    def is_unconstrained(self):
+        return not (self.allowed or self.constraints or self.time_intervals)
+
+    def is_allowed(self, key):
+        """
+        Returns whether a series key is allowed
+
+        Parameters
+        ----------
+        key: str or tuple
+            Either a dot separated series key (ie `A.EUR.USD`) or a tuple of
+            dimension values in the order of the DSD
+        """
+        if isinstance(key, str): key = key.split('.')
+        if len(key) != len(self.dimensions): return False
+        for position, values in self.allowed:
+            if key[position] not in values: return False
+        for constraint in self.constraints:
+            if not constraint.is_allowed(key): return False
+        return True
+
+    def is_allowed_period(self, period):
+        """Returns whether an observation time period is allowed"""
+        for intervals in self.time_intervals:
+            if not any(period in interval for interval in intervals):
+                return False
+        return True
+
+    def validate(self, keys):
+        """
+        Returns a list of booleans, one per series key
+
+        Locals are bound up front as this is the hot loop of bulk data
+        validation
+        """
+        if self.is_unconstrained:
+            return [True] * len(keys)
+        if not self.constraints:
+            allowed = self.allowed
+            size = len(self.dimensions)
+            result = []
+            append = result.append
+            for key in keys:
+                if isinstance(key, str): key = key.split('.')
+                if len(key) != size:
+                    append(False)
+                    continue
+                for position, values in allowed:
+                    if key[position] not in values:
+                        append(False)
+                        break
+                else:
+                    append(True)
+            return result
+        is_allowed = self.is_allowed
+        return [is_allowed(key) for key in keys]
+
+    def invalid(self, keys):
+        """Yields the series keys that are not allowed"""
+        for key, valid in zip(keys, self.validate(keys)):
+            if not valid: yield key
+
+def get_dimension_ids(data_structure):
+    """
+    Returns the ids of the dimensions that make up the series keys of a data
+    structure, in order and excluding the time dimension
+    """
+    Dimension = apps.get_model('datastructure', 'Dimension')
+    return tuple(
+        Dimension.objects.filter(container__data_structure=data_structure)
+        .exclude(tipe=Dimension.Type.TIME_DIMENSION)
+        .order_by('position').values_list('object_id', flat=True)
+    )
+
+class ConstraintCompiler:
+    """
+    Compiles the allowed content constraints attached to a data structure,
+    dataflow or provision agreement.
+
+    Constraints attached to the dataflow of a provision agreement and to the
+    data structure of a dataflow also apply, as constraints are cumulative
+    down the structure usage chain.  Region rows are read with one flat
+    query per table rather than per constraint.
+    """
+
+    def __init__(self, artefact):
+        self.artefact = artefact
+
+    def get_attachments(self):
+        artefact = self.artefact
+        model_name = artefact._meta.model_name
+        attachments = {}
+        if model_name == 'provisionagreement':
+            attachments['provision_agreements'] = artefact
+            artefact = artefact.dataflow
+            model_name = 'dataflow'
+        if model_name == 'dataflow':
+            attachments['dataflows'] = artefact
+            artefact = artefact.structure
+            model_name = 'datastructure'
+        if model_name != 'datastructure':
+            raise TypeError(
+                f'Cannot compile constraints for {self.artefact._meta.label}')
+        attachments['data_structures'] = artefact
+        return artefact, attachments
+
+    def get_constraints(self, attachments):
+        ContentConstraint = apps.get_model('registry', 'ContentConstraint')
+        pks = set()
+        for field_name, artefact in attachments.items():
+            pks.update(ContentConstraint.objects.filter(
+                tipe=ContentConstraint.Type.ALLOWED,
+                **{field_name: artefact}
+            ).values_list('pk', flat=True))
+        return sorted(pks)
+
+    def get_cascaded(self, data_structure, component_id, value):
+        Dimension = apps.get_model('datastructure', 'Dimension')
+        dimension = Dimension.objects.filter(
+            container__data_structure=data_structure, object_id=component_id
+        ).select_related(
+            'local_representation', 'concept_identity__core_representation'
+        ).first()
+        if not dimension: return {value}
+        representation = dimension.local_representation or getattr(
+            dimension.concept_identity, 'core_representation', None)
+        if not representation or not representation.enumeration_id:
+            return {value}
+        code = representation.enumeration.code_set.filter(object_id=value).first()
+        if not code: return {value}
+        return {value, *code.get_descendants().values_list('object_id', flat=True)}
+
+    def compile_time_range(self, time_range):
+        if time_range.before_period:
+            period = time_range.before_period
+            return TimeInterval(
+                end=period_bounds(period.time_period)[1],
+                end_inclusive=period.is_inclusive)
+        if time_range.after_period:
+            period = time_range.after_period
+            return TimeInterval(
+                start=period_bounds(period.time_period)[0],
+                start_inclusive=period.is_inclusive)
+        start, end = time_range.start_period, time_range.end_period
+        return TimeInterval(
+            start=period_bounds(start.time_period)[0] if start else None,
+            end=period_bounds(end.time_period)[1] if end else None,
+            start_inclusive=start.is_inclusive if start else True,
+            end_inclusive=end.is_inclusive if end else True)
+
+    def compile(self):
+        data_structure, attachments = self.get_attachments()
+        dimensions = get_dimension_ids(data_structure)
+        pks = self.get_constraints(attachments)
+        if not pks: return ConstraintEvaluator(dimensions)
+        positions = {dimension: i for i, dimension in enumerate(dimensions)}
+        CubeRegion = apps.get_model('registry', 'CubeRegion')
+        CubeRegionKeyValue = apps.get_model('registry', 'CubeRegionKeyValue')
+        CubeRegionKeyTimeRange = apps.get_model('registry', 'CubeRegionKeyTimeRange')
+        SubKey = apps.get_model('registry', 'SubKey')
+        compiled = {pk: CompiledConstraint() for pk in pks}
+        regions = {
+            pk: (constraint_pk, include, defaultdict(set))
+            for pk, constraint_pk, include in CubeRegion.objects.filter(
+                content_constraint__in=pks
+            ).values_list('pk', 'content_constraint', 'include')
+        }
+        values = CubeRegionKeyValue.objects.filter(
+            cube_region_key__key_value__in=regions
+        ).values_list(
+            'cube_region_key__key_value', 'cube_region_key__component_id',
+            'value', 'cascade_values'
+        )
+        for region_pk, component_id, value, cascade_values in values:
+            if component_id not in positions: continue
+            selected = regions[region_pk][2][positions[component_id]]
+            if cascade_values:
+                selected.update(
+                    self.get_cascaded(data_structure, component_id, value))
+            else:
+                selected.add(value)
+        for constraint_pk, include, selected in regions.values():
+            region = tuple(
+                frozenset(selected[position]) if position in selected else None
+                for position in range(len(dimensions))
+            )
+            if include:
+                compiled[constraint_pk].included_regions.append(region)
+            elif selected:
+                compiled[constraint_pk].excluded_regions.append(region)
+        time_ranges = CubeRegionKeyTimeRange.objects.filter(
+            cube_region_key__key_value__in=regions,
+        ).select_related(
+            'cube_region_key', 'before_period', 'after_period',
+            'start_period', 'end_period'
+        )
+        for time_range in time_ranges:
+            region_pk = time_range.cube_region_key.key_value_id
+            constraint_pk, include, _ = regions[region_pk]
+            if include:
+                compiled[constraint_pk].time_intervals.append(
+                    self.compile_time_range(time_range))
+        keys = defaultdict(lambda: [None] * len(dimensions))
+        included = {}
+        sub_keys = SubKey.objects.filter(
+            key__key_set__content_constraint__in=pks
+        ).values_list(
+            'key__key_set__content_constraint', 'key__key_set__is_included',
+            'key', 'component_id', 'value'
+        )
+        for constraint_pk, is_included, key_pk, component_id, value in sub_keys:
+            if component_id not in positions: continue
+            keys[constraint_pk, key_pk][positions[component_id]] = value or None
+            included[constraint_pk, key_pk] = is_included
+        for (constraint_pk, key_pk), key in keys.items():
+            constraint = compiled[constraint_pk]
+            attr = 'included_keys' if included[constraint_pk, key_pk] else 'excluded_keys'
+            if getattr(constraint, attr) is None: setattr(constraint, attr, KeyTrie())
+            getattr(constraint, attr).add(key)
+        return ConstraintEvaluator(dimensions, compiled.values())
+
+class ConstraintCache:
+    """
+    Compiled evaluators per artefact version
+
+    Entries are dropped as a whole whenever a constraint or region row
+    changes, see `fiesta.apps.registry.receivers`
+    """
+
+    def __init__(self):
+        self._evaluators = {}
+        self._lock = RLock()
+
+    def key(self, artefact):
+        return (artefact._meta.label_lower, artefact.pk, str(artefact.version))
+
+    def get(self, artefact):
+        key = self.key(artefact)
+        evaluator = self._evaluators.get(key)
+        if evaluator is None:
+            with self._lock:
+                evaluator = self._evaluators.get(key)
+                if evaluator is None:
+                    evaluator = ConstraintCompiler(artefact).compile()
+                    self._evaluators[key] = evaluator
+        return evaluator
+
+    def clear(self):
+        with self._lock:
+            self._evaluators.clear()
+
+constraint_cache = ConstraintCache()
+
+def get_evaluator(artefact):
+    """
+    Returns the cached constraint evaluator of a data structure, dataflow or
+    provision agreement
+    """
+    return constraint_cache.get(artefact)
@@ -0,0 +1,326 @@
+# data.py
+
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Optional, Tuple
+
+from django.apps import apps
+from django.db.models import Q
+
+from ..settings import api_settings
+from ..utils.periods import period_bounds
+from .constraints import get_dimension_ids
+from .exceptions import NotImplementedError
+
+try:
+    import numpy as np
+except ImportError: # pragma: no cover
+    np = None
+
+def parse_key(key, dimensions):
+    """
+    Parses a SDMX RESTful key expression
+
+    Parameters
+    ----------
+    key: str
+        A key expression such as `A.B+C..D` where an empty part is a
+        wildcard and `+` separates alternative values. `all` matches any key
+    dimensions: tuple
+        The dimension ids of the DSD in order
+
+    Returns
+    -------
+        A tuple with one entry per dimension, either a tuple of values or
+        None for wildcards
+
+    Raises
+    ------
+    ValueError
+        If the number of key parts does not match the dimensions
+    """
+    if not key or key == 'all': return (None,) * len(dimensions)
+    parts = key.split('.')
+    if len(parts) != len(dimensions):
+        raise ValueError(
+            f'Key {key} has {len(parts)} dimensions instead of {len(dimensions)}')
+    return tuple(tuple(part.split('+')) if part else None for part in parts)
+
+def key_to_q(key, dimensions, prefix=''):
+    """Translates a parsed key into filters on the (indexed) key columns"""
+    q = Q()
+    for dimension, values in zip(dimensions, key):
+        if values is None: continue
+        if len(values) == 1:
+            q &= Q(**{f'{prefix}{dimension}': values[0]})
+        else:
+            q &= Q(**{f'{prefix}{dimension}__in': values})
+    return q
+
+def to_datetime64(periods):
+    """
+    Converts an array of SDMX time periods to the datetime64 of their start
+
+    Each distinct period is parsed once
+    """
+    unique, inverse = np.unique(periods, return_inverse=True)
+    starts = np.array(
+        [period_bounds(period)[0] for period in unique], dtype='datetime64[D]')
+    return starts[inverse]
+
+@dataclass
+class SeriesBlock:
+    """
+    The observations of a single series as NumPy arrays
+
+    Attributes
+    ----------
+    key: tuple
+        The dimension values of the series
+    time_period: ndarray
+        The time periods as reported, in ascending order
+    obs_value: ndarray
+        The observation values as float64, missing values are NaN
+    attributes: dict
+        Observation level attribute id to object ndarray
+    """
+
+    key: Tuple[str, ...]
+    time_period: Any
+    obs_value: Any
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.obs_value)
+
+    @property
+    def time_index(self):
+        return to_datetime64(self.time_period)
+
+    def select(self, index):
+        return SeriesBlock(
+            self.key, self.time_period[index], self.obs_value[index],
+            {name: values[index] for name, values in self.attributes.items()}
+        )
+
+    def concatenate(self, other):
+        return SeriesBlock(
+            self.key,
+            np.concatenate((self.time_period, other.time_period)),
+            np.concatenate((self.obs_value, other.obs_value)),
+            {name: np.concatenate((values, other.attributes[name]))
+             for name, values in self.attributes.items()}
+        )
+
+    def filter_periods(self, start_period=None, end_period=None):
+        if not (start_period or end_period): return self
+        time_index = self.time_index
+        mask = np.ones(len(self), dtype=bool)
+        if start_period:
+            mask &= time_index >= np.datetime64(period_bounds(start_period)[0])
+        if end_period:
+            mask &= time_index <= np.datetime64(period_bounds(end_period)[1])
+        return self.select(mask)
+
+@dataclass
+class DataQuery:
+    """The parameters of a SDMX RESTful data query"""
+
+    flow: Any
+    key: str = 'all'
+    provider: str = 'all'
+    start_period: Optional[str] = None
+    end_period: Optional[str] = None
+    first_n_observations: Optional[int] = None
+    last_n_observations: Optional[int] = None
+    dimension_at_observation: str = 'TIME_PERIOD'
+    detail: str = 'full'
+    resource: str = 'data'
+
+class DataQueryEngine:
+    """
+    Answers data queries against an observation model of a domain specific
+    data application
+
+    Observations are read with `values_list()` in chunks ordered by series key
+    and time period, so that the rows of a series are contiguous.  Each chunk
+    is transposed into column arrays and split into series at the positions
+    where any key column changes.  A series spanning two chunks is carried
+    over and concatenated.
+
+    Parameters
+    ----------
+    model: Model
+        The observation model, see `fiesta.apps.data.abstract_models`
+    dimensions: tuple
+        The dimension ids, which are also the field names of the key model
+    attributes: tuple
+        The observation level attribute fields
+    key_field: str
+        The foreign key to the key model or None if the dimensions are
+        fields of the observation model
+    series_keys: SeriesKeyRegistry
+        Set when the key model is the packed `data.SeriesKey`, rows are then
+        keyed by the packed integer and decoded once per series
+    """
+
+    def __init__(self, model, dimensions, attributes=(), key_field='dim_key',
+                 time_field='time_period', value_field='obs_value',
+                 chunk_size=None, series_keys=None):
+        if np is None:
+            raise NotImplementedError(
+                'Data queries require numpy, install django-fiesta[data]')
+        self.model = model
+        self.dimensions = tuple(dimensions)
+        self.attributes = tuple(attributes)
+        self.key_field = key_field
+        self.prefix = f'{key_field}__' if key_field else ''
+        self.series_keys = series_keys
+        self.time_field = time_field
+        self.value_field = value_field
+        self.chunk_size = chunk_size or api_settings.DEFAULT_DATA_CHUNK_SIZE
+
+    @classmethod
+    def for_dataflow(cls, dataflow, **kwargs):
+        """
+        Returns the engine of the observation model that is registered for
+        the DSD of a dataflow in the `DEFAULT_DATA_MODELS` setting
+        """
+        dsd = dataflow.structure
+        reference = f'{dsd.agency.object_id}:{dsd.object_id}'
+        models = api_settings.DEFAULT_DATA_MODELS
+        label = models.get(f'{reference}({dsd.version})') or models.get(reference)
+        if not label:
+            raise NotImplementedError(f'No observation model for {reference}')
+        model = apps.get_model(label)
+        attribute_ids = set(apps.get_model('datastructure', 'Attribute').objects
+            .filter(container__data_structure=dsd)
+            .values_list('object_id', flat=True))
+        attributes = tuple(
+            f.name for f in model._meta.concrete_fields if f.name in attribute_ids)
+        key_field = kwargs.get('key_field', 'dim_key')
+        related_model = model._meta.get_field(key_field).related_model \
+            if key_field else None
+        if related_model and related_model._meta.label_lower == 'data.serieskey':
+            from ..apps.data.series import get_series_key_registry
+            kwargs['series_keys'] = get_series_key_registry(dsd)
+        return cls(model, get_dimension_ids(dsd), attributes, **kwargs)
+
+    @property
+    def key_columns(self):
+        if self.series_keys: return (f'{self.prefix}packed',)
+        return tuple(f'{self.prefix}{dimension}' for dimension in self.dimensions)
+
+    @property
+    def columns(self):
+        return (
+            *self.key_columns, self.time_field, self.value_field,
+            *self.attributes
+        )
+
+    def get_queryset(self, key='all', attributes=True):
+        if self.series_keys:
+            q = Q(**{f'{self.key_field}__in': self.series_keys.filter(key)})
+        else:
+            q = key_to_q(
+                parse_key(key, self.dimensions), self.dimensions, self.prefix)
+        key_columns = self.key_columns
+        # Without the attribute columns the blocks have no attributes
+        columns = self.columns if attributes else self.columns[:len(key_columns) + 2]
+        return self.model.objects.filter(q).order_by(
+            *key_columns, self.time_field).values_list(*columns)
+
+    def chunks(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk: return
+            yield chunk
+
+    def group(self, rows):
+        """
+        Groups rows, ordered by series key and time period, into series
+
+        Parameters
+        ----------
+        rows: iterable
+            Tuples of the dimension values, time period, observation value and
+            attributes in the order of `columns`
+
+        Yields
+        ------
+            SeriesBlock objects
+        """
+        size = len(self.key_columns)
+        decode = self.series_keys.decode if self.series_keys else None
+        pending = None
+        for chunk in self.chunks(rows):
+            columns = list(zip(*chunk))
+            length = len(chunk)
+            changed = np.zeros(length - 1, dtype=bool)
+            for column in columns[:size]:
+                values = np.array(column, dtype=object)
+                changed |= values[1:] != values[:-1]
+            bounds = np.concatenate(
+                ([0], np.flatnonzero(changed) + 1, [length]))
+            time_period = np.array(columns[size], dtype=str)
+            obs_value = np.array(columns[size + 1], dtype=np.float64)
+            attributes = {
+                name: np.array(column, dtype=object)
+                for name, column in zip(self.attributes, columns[size + 2:])
+            }
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                key = chunk[start][:size]
+                block = SeriesBlock(
+                    decode(key[0]) if decode else key,
+                    time_period[start:end], obs_value[start:end],
+                    {name: values[start:end] for name, values in attributes.items()}
+                )
+                if pending is not None:
+                    if pending.key == block.key:
+                        block = pending.concatenate(block)
+                    else:
+                        yield pending
+                pending = block
+        if pending is not None:
+            yield pending
+
+    def execute(self, query):
+        """
+        Yields the series that match a DataQuery
+
+        The time period and first/last N observation filters are applied on
+        the arrays of each series.  The attributes are not read for the
+        `dataonly` detail.
+        """
+        queryset = self.get_queryset(
+            query.key, attributes=query.detail != 'dataonly')
+        for block in self.group(queryset.iterator(chunk_size=self.chunk_size)):
+            block = block.filter_periods(query.start_period, query.end_period)
+            if query.first_n_observations or query.last_n_observations:
+                first = query.first_n_observations or 0
+                last = query.last_n_observations or 0
+                index = np.arange(len(block))
+                block = block.select(
+                    (index < first) | (index >= len(block) - last))
+            if len(block): yield block
+
+@dataclass
+class DataSet:
+    """
+    The result of a data query handed to the renderers
+
+    Attributes
+    ----------
+    dataflow: Dataflow
+        The queried dataflow
+    dimensions: tuple
+        The dimension ids of the series keys
+    series: iterable
+        The SeriesBlock objects, consumed once while rendering
+    """
+
+    dataflow: Any
+    dimensions: Tuple[str, ...]
+    series: Any
+    _query: DataQuery = None
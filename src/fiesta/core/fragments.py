@@ -0,0 +1,71 @@
+# fragments.py
+
+from uuid import uuid4
+
+from django.core.cache import caches
+
+from ..settings import api_settings
+
+class FragmentCache:
+    """
+    The compressed artefacts of the streamed structure responses
+
+    The fragments are stored in the `DEFAULT_FRAGMENT_CACHE` cache keyed by
+    the artefact, the resource, the detail, the requested languages and the
+    content coding, so that the hot artefacts are served without being
+    rendered or compressed again.
+
+    Each artefact has a generation token in its keys that is replaced when
+    the artefact is saved or deleted, see `fiesta.apps.registry.receivers`,
+    the fragments of previous generations then expire.
+
+    The tokens are replaced in the cache of the alias, so a shared backend,
+    e.g. Memcached or Redis, is needed by deployments of several processes.
+    A LocMemCache is private to each process and the invalidation then
+    reaches only the process that saved the artefact, the others serve its
+    stale fragments until they expire.
+    """
+    prefix = 'fiesta:fragment'
+
+    @property
+    def enabled(self):
+        return bool(api_settings.DEFAULT_FRAGMENT_CACHE)
+
+    @property
+    def cache(self):
+        return caches[api_settings.DEFAULT_FRAGMENT_CACHE]
+
+    def get_generation_key(self, instance):
+        return f'{self.prefix}:generation:{instance._meta.label_lower}:{instance.pk}'
+
+    def get_generation(self, instance):
+        key = self.get_generation_key(instance)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Concurrent requests agree on the first token added
+            self.cache.add(key, uuid4().hex, None)
+            generation = self.cache.get(key)
+        return generation
+
+    def make_key(self, serializer, resource, detail, languages, encoding):
+        """Returns the key of the fragment of an artefact, None if it has none"""
+        instance = getattr(serializer, '_instance', None)
+        if instance is None or instance.pk is None: return
+        languages = '+'.join(languages) if languages else 'all'
+        return (f'{self.prefix}:{instance._meta.label_lower}:{instance.pk}:'
+                f'{self.get_generation(instance)}:{resource}:{detail}:'
+                f'{languages}:{encoding}')
+
+    def get(self, key):
+        if key is None: return
+        return self.cache.get(key)
+
+    def set(self, key, fragment):
+        if key is None: return
+        self.cache.set(key, fragment, api_settings.DEFAULT_FRAGMENT_CACHE_SECONDS)
+
+    def invalidate(self, instance):
+        if not self.enabled: return
+        self.cache.delete(self.get_generation_key(instance))
+
+fragment_cache = FragmentCache()
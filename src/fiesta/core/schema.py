@@ -1,10 +1,16 @@
 import os.path
+import threading
+
 from lxml import etree
 from rest_framework.exceptions import ParseError
 
 from ..settings import api_settings
 from .exceptions import NotImplementedError
 
+# The compiled schemas are reused, each thread has its own since validations
+# share the error log of a schema
+_local = threading.local()
+
 class Schema:
 
     def __init__(self, root):
@@ -23,14 +29,18 @@ class Schema:
         pass
 
     def get_main_schema(self, version, schema_file):
-        """Returns the schema to validate files"""
+        """Returns the schema to validate files, compiled once per thread"""
         path = os.path.join(
             api_settings.DEFAULT_SCHEMA_PATH, 'sdmx', 'ml', version, schema_file)
-        try:
-            tree = etree.parse(path)
-        except (etree.ParseError, ValueError) as exc:
-            raise ParseError('XML schema parse error - %s' % exc)
-        return etree.XMLSchema(tree)
+        schemas = getattr(_local, 'schemas', None)
+        if schemas is None: schemas = _local.schemas = {}
+        if path not in schemas:
+            try:
+                tree = etree.parse(path)
+            except (etree.ParseError, ValueError) as exc:
+                raise ParseError('XML schema parse error - %s' % exc)
+            schemas[path] = etree.XMLSchema(tree)
+        return schemas[path]
 
 class Schema21(Schema):
 
@@ -0,0 +1,158 @@
+# arrays.py
+
+from array import array
+
+from django.core.exceptions import FieldError
+from django.db.models import Count
+from modeltranslation.utils import build_localized_fieldname
+
+from ...utils.translation import get_requested_languages
+
+# The fields of the item serializers that the arrays can hold
+ARRAY_FIELDS = {'annotations', 'object_id', 'urn', 'uri', 'name', 'description', 'parent'}
+
+class ItemArray:
+    """
+    The items of an item scheme held in parallel arrays
+
+    The ids, the URNs, the positions of the parents and the requested
+    translations of the names and descriptions of the items are read with a single
+    `values_list()` query and an item serializer is only made while the
+    array is iterated, so that a large item scheme costs a few pointers per
+    item instead of a serializer, its text serializers and a model instance.
+
+    Items with annotations, which are not held in the arrays, are serialized
+    from their model instances.
+
+    Parameters
+    ----------
+    item_type: type
+        The serializer class of the items
+    languages: Iterable[str]
+        The languages of the names and descriptions
+    using: str
+        The database the annotated items are read from
+    """
+
+    __slots__ = ('item_type', 'languages', 'using', 'pks', 'ids', 'urns',
+                 'parents', 'names', 'descriptions', 'annotated')
+
+    def __init__(self, item_type, languages, using=None):
+        self.item_type = item_type
+        self.languages = tuple(languages)
+        self.using = using
+        self.pks = array('q')
+        self.ids = []
+        self.urns = []
+        # Position of the parent of each item, -1 for items without parent
+        self.parents = array('i')
+        # One list of texts per language, None where there is no translation
+        self.names = tuple([] for _ in self.languages)
+        self.descriptions = tuple([] for _ in self.languages)
+        self.annotated = set()
+
+    @staticmethod
+    def supports(item_type):
+        """Whether the items of a serializer class can be held in arrays"""
+        return {f.name for f in item_type._meta.fields} <= ARRAY_FIELDS
+
+    @staticmethod
+    def get_large_containers(item_model, containers, threshold, using=None):
+        """
+        Returns the primary keys of the item schemes with at least
+        `threshold` items with a single aggregate query
+        """
+        return set(
+            item_model._default_manager.using(using)
+            .filter(container__in=containers)
+            .values('container')
+            .annotate(count=Count('pk'))
+            .filter(count__gte=threshold)
+            .values_list('container', flat=True))
+
+    @classmethod
+    def from_container(cls, item_type, container, using=None):
+        """Reads the items of an item scheme into arrays"""
+        model = item_type._meta.model
+        languages = get_requested_languages()
+        items = cls(item_type, languages, using)
+        hierarchical = hasattr(model, 'steplen')
+        queryset = model._default_manager.using(using).filter(container=container)
+        columns = [
+            build_localized_fieldname(name, language)
+            for name in ('name', 'description') for language in languages
+        ]
+        if hierarchical:
+            rows = queryset.order_by('path').values_list(
+                'pk', 'object_id', 'urn', 'path', *columns)
+        else:
+            rows = queryset.order_by('object_id').values_list(
+                'pk', 'object_id', 'urn', *columns)
+        positions = {}
+        count = len(languages)
+        for position, (pk, object_id, urn, *texts) in enumerate(rows.iterator()):
+            items.pks.append(pk)
+            items.ids.append(object_id)
+            items.urns.append(urn or None)
+            parent = -1
+            if hierarchical:
+                # Parents are ordered before their children by the path
+                path = texts.pop(0)
+                positions[path] = position
+                parent = positions.get(path[:-model.steplen], -1)
+            items.parents.append(parent)
+            for column, text in zip(items.names, texts[:count]):
+                column.append(text or None)
+            for column, text in zip(items.descriptions, texts[count:]):
+                column.append(text or None)
+        try:
+            items.annotated = set(
+                queryset.filter(annotation__isnull=False)
+                .values_list('pk', flat=True).distinct())
+        except FieldError:
+            pass
+        return items
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        instances = {}
+        if self.annotated:
+            model = self.item_type._meta.model
+            instances = model._default_manager.using(self.using).in_bulk(self.annotated)
+        for position, pk in enumerate(self.pks):
+            if pk in instances:
+                yield self.item_type(instances[pk])
+            else:
+                yield self.make_item(position)
+
+    def make_texts(self, columns, position):
+        text_type = self.item_type._meta.fields_map['name'].type.__args__[0]
+        return [
+            text_type(lang=language, text=column[position])
+            for language, column in zip(self.languages, columns)
+            if column[position]
+        ]
+
+    def make_item(self, position):
+        """Returns the serializer of the item at a position"""
+        fields_map = self.item_type._meta.fields_map
+        kwargs = {
+            'object_id': self.ids[position],
+            'urn': self.urns[position],
+            'name': self.make_texts(self.names, position),
+            'description': self.make_texts(self.descriptions, position),
+        }
+        if 'parent' in fields_map:
+            reference_type = fields_map['parent'].type
+            parent = self.parents[position]
+            if parent < 0:
+                kwargs['parent'] = None
+            else:
+                # As made from the parent instance by ItemWithParentSerializer,
+                # which has none of the other attributes of the reference
+                ref_type = reference_type._meta.fields_map['ref'].type
+                kwargs['parent'] = reference_type(ref=ref_type(
+                    object_id=self.ids[parent], local=None))
+        return self.item_type(**kwargs)
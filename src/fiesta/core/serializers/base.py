@@ -2,19 +2,17 @@
 
 import inspect
 
-from importlib import import_module
-from dataclasses import dataclass, fields, InitVar, field
-from django.apps import apps
+from dataclasses import dataclass, fields, InitVar, field, make_dataclass, MISSING
 from django.conf import settings
 from django.db import models
 from types import MappingProxyType
-from typing import Iterable
+from typing import ClassVar, Iterable
 
-from ...settings import api_settings
 from ...utils import inspect as fiesta_inspect
 from ...utils.coders import encode
 
 from .options import ClassOptions, FieldOptions
+from .registry import registry
 
 def has_contribute_to_class(value):
     # Only call contribute_to_class() if it's bound.
@@ -42,13 +40,110 @@ def metafield(func):
         return f 
     return wrapper
 
+dataclass_field = field
 field = metafield(field)
 
+def is_field_annotation(annotation):
+    """Whether a class annotation declares a dataclass field"""
+    if annotation is InitVar or isinstance(annotation, InitVar): return False
+    return annotation is not ClassVar and getattr(annotation, '__origin__', None) is not ClassVar
+
+# The methods that `dataclass()` generates for the serializers
+DATACLASS_METHODS = ('__init__', '__repr__', '__eq__')
+
+def make_dataclass_methods(cls):
+    """
+    Generates the dataclass methods of a serializer class
+
+    They are generated by `dataclass()` for a plain class with the same
+    fields, so that they are the same as if the serializer was made with
+    them, and set on the class in place of its `LazyDataclassMethod`.
+    """
+    specs = []
+    for f in cls.__dataclass_fields__.values():
+        kwargs = dict(init=f.init, repr=f.repr, compare=f.compare,
+                      hash=f.hash, metadata=f.metadata)
+        if f.default is not MISSING: kwargs['default'] = f.default
+        if f.default_factory is not MISSING:
+            kwargs['default_factory'] = f.default_factory
+        specs.append((f.name, f.type, dataclass_field(**kwargs)))
+    namespace = {}
+    if hasattr(cls, '__post_init__'):
+        # Only its presence matters, the method of the instance is called
+        namespace['__post_init__'] = cls.__post_init__
+    plain = make_dataclass(cls.__name__, specs, namespace=namespace)
+    for name in DATACLASS_METHODS:
+        if isinstance(vars(cls).get(name), LazyDataclassMethod):
+            method = vars(plain)[name]
+            method.__qualname__ = f'{cls.__qualname__}.{name}'
+            setattr(cls, name, method)
+
+class LazyDataclassMethod:
+    """
+    A dataclass method of a serializer class generated on first access
+
+    Generating the methods of the 150+ serializers, with `exec()`, is most of
+    the cost of importing them, and most of them are never called by a
+    worker.
+    """
+
+    def __init__(self, cls, name):
+        self.cls = cls
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if isinstance(vars(self.cls).get(self.name), LazyDataclassMethod):
+            make_dataclass_methods(self.cls)
+        return vars(self.cls)[self.name].__get__(instance, owner)
+
 class BaseMetaSerializer(type):
-    """Metaclass for all serializers."""
+    """
+    Metaclass for all serializers.
+
+    Serializers are slotted dataclasses.  The slots of a class are its own
+    fields and any `__slots__` of the class body, the private attributes
+    that `Serializer` sets on initialization.  The attributes set by
+    `process`, e.g. the `m_` mirrors of the fields, and those set on some
+    serializers alone are kept in the `__dict__` slot of `Serializer`, which
+    is only made when such an attribute is set, so that the serializers of
+    a retrieval never get a dictionary.
+
+    The dataclass methods are generated on first use, see
+    `LazyDataclassMethod`.
+    """
 
     def __new__(cls, name, bases, attrs, **kwargs):
-        new_class = dataclass(super().__new__(cls, name, bases, attrs, **kwargs))
+        inherited = {slot for base in bases for klass in base.__mro__
+                     for slot in vars(klass).get('__slots__', ())}
+        annotations = attrs.get('__annotations__', {})
+        field_names = [key for key, annotation in annotations.items()
+                       if is_field_annotation(annotation)]
+        slots = list(attrs.get('__slots__', ()))
+        for key in field_names:
+            if key not in inherited and key not in slots: slots.append(key)
+        # The defaults are set back on the class while the dataclass is made
+        defaults = {key: attrs.pop(key, MISSING) for key in field_names
+                    if key not in inherited}
+        attrs['__slots__'] = tuple(slots)
+        new_class = super().__new__(cls, name, bases, attrs, **kwargs)
+        descriptors = {key: vars(new_class)[key] for key in defaults}
+        for key, default in defaults.items():
+            if default is MISSING: delattr(new_class, key)
+            else: setattr(new_class, key, default)
+        new_class = dataclass(new_class, init=False, repr=False, eq=False)
+        for name in DATACLASS_METHODS:
+            if name not in vars(new_class):
+                setattr(new_class, name, LazyDataclassMethod(new_class, name))
+        # As dataclass() with eq=True, unless the class defines `__hash__`
+        if vars(new_class).get('__hash__') is None: new_class.__hash__ = None
+        for key in field_names:
+            if key in descriptors:
+                setattr(new_class, key, descriptors[key])
+            elif key in vars(new_class):
+                # Redeclared field, the slot of the base class is used
+                setattr(new_class, key, next(
+                    vars(base)[key] for base in new_class.__mro__[1:]
+                    if key in vars(base)))
         attr_meta = attrs.get('Meta')
         meta = attr_meta or getattr(new_class, 'Meta', None)
         if not meta: meta = ClassOptions()
@@ -57,18 +152,8 @@ class BaseMetaSerializer(type):
                     if not key.startswith('_')}
             meta = ClassOptions(**args)
         new_class.add_to_class('_meta', meta)
-        new_class.contribute_to_field_metadata()
         return new_class
 
-    def contribute_to_field_metadata(cls):
-        """Transfer defaults to field metadata"""
-        for f in cls._meta.fields:
-            meta = f.metadata['fiesta']
-            meta._post_class_meta_defaults(cls)
-            # meta = f.metadata['fiesta']
-            # if not meta.localname:
-            # f.metadata['fiesta'].get_class_defaults(cls, f)
-
     def add_to_class(cls, name, value):
         if has_contribute_to_class(value):
             value.contribute_to_class(cls, name)
@@ -119,6 +204,8 @@ class Serializer(metaclass=BaseMetaSerializer):
     provided field kwargs.
     """
 
+    __slots__ = ('__dict__', '_element', '_instance', '_created')
+
     instance: InitVar = None
     complain: InitVar = True
     
@@ -157,30 +244,32 @@ class Serializer(metaclass=BaseMetaSerializer):
         for f in self._meta.fields:
             field_meta = f.metadata['fiesta']
             forward_accesor = field_meta.forward_accesor
-            value = getattr(instance, forward_accesor, None)
-            base = self.import_serializer('Serializer')
-            empty = self.import_serializer('Empty')
-            if issubclass(f.type, empty) and value:
-                value = f.type()
-            elif issubclass(f.type, base):
+            if fiesta_inspect.is_iterable_type(f.type):
+                item_type = f.type.__args__[0]
+                if not issubclass(item_type, Serializer):
+                    raise TypeError('Got an unexpected iterable type {item_type} while serializing {obj}')
+                # Not looked up, the lookup of a translated field would load
+                # its deferred translation in the active language
+                setattr(self, f.name, item_type.generate_many(instance, forward_accesor))
+                continue
+            value = fiesta_inspect.get_lookup(instance, forward_accesor)
+            if not inspect.isclass(f.type):
+                raise KeyError(f'Encountered an unknown type field: {f.type}')
+            elif issubclass(f.type, EmptySerializer):
+                value = f.type() if value else None
+            elif issubclass(f.type, Serializer):
                 if value:
                     value = f.type(value, complain=False)
                 else:
                     # Propagate instance forward if instance does not have a
                     # f.name attribute
                     value = f.type(instance, complain=False)
-            elif type(f.type) == type(Iterable):
-                item_type = f.type.__args__[0]
-                if not issubclass(item_type, base):
-                    raise TypeError('Got an unexpected iterable type {item_type} while serializing {obj}')
-                value = item_type.generate_many(instance, forward_accesor)
-            else:
-                raise KeyError(f'Encountered an unknown type field: {f.type}')
             setattr(self, f.name, value)
 
     @classmethod
     def generate_many(cls, instance, forward_accesor):
         item_set = getattr(instance, forward_accesor)
+        if hasattr(item_set, 'all'): item_set = item_set.all()
         return (cls(item) for item in item_set)
 
     def unroll(self):
@@ -291,13 +380,15 @@ class Serializer(metaclass=BaseMetaSerializer):
             value = getattr(self, f.name, None)
             if not value: 
                 child_obj = None
-            elif issubclass(f.type, Serializer):
+            elif inspect.isclass(f.type) and issubclass(f.type, Serializer):
                 child_obj = value.process(self, f, self._context)
-            elif type(f.type) == type(Iterable):
+            elif fiesta_inspect.is_iterable_type(f.type):
                 item_type = f.type.__args__[0]
                 if issubclass(item_type, Serializer):
                     child_obj= tuple(item.process(self, f, self._context)
                                      for item in value)
+                else:
+                    child_obj = value
             else:
                 child_obj = value
             m_name = f'm_{f.name}'
@@ -313,9 +404,72 @@ class Serializer(metaclass=BaseMetaSerializer):
         self._obj = self.process_postmake(self._obj)
         # Check whether to stop process now
         if self._process_stop(): return
-        if not self._skip_save: self._obj.save()
+        # The serializers without a model pass on the object of their container,
+        # which is saved by the container
+        if (self._meta.model and self._obj is not None and not self._skip_save
+                and not self.is_dry_run):
+            self.save_obj(self._obj)
+            self.process_postsave(self._obj)
         return self._obj 
 
+    @property
+    def is_dry_run(self):
+        """
+        Whether the message is only validated, the model instances are then
+        made in the in-memory store of the context and never saved
+        """
+        return getattr(self._context, 'dry_run', False)
+
+    def get_or_create_obj(self, **kwargs):
+        """`get_or_create()` of the model of the serializer"""
+        if self.is_dry_run:
+            return self._context.store.get_or_create(self._meta.model, **kwargs)
+        return self._meta.model.objects.get_or_create(**kwargs)
+
+    def get_or_make_obj(self, **kwargs):
+        """
+        Same as `get_or_create_obj` but a made instance is returned unsaved,
+        it is saved with `save_obj` once the fields are processed
+        """
+        if self.is_dry_run:
+            return self._context.store.get_or_create(self._meta.model, **kwargs)
+        try:
+            return self._meta.model.objects.get(**kwargs), False
+        except self._meta.model.DoesNotExist:
+            return self._meta.model(**kwargs), True
+
+    def save_obj(self, obj):
+        """
+        Saves the relevant model instance at the end of the process loop
+
+        Should be overridden in subclasses if the model needs arguments to
+        save, e.g. the parent of a tree node.
+        """
+        obj.save()
+
+    def create_obj(self, **kwargs):
+        """`create()` of the model of the serializer"""
+        if self.is_dry_run:
+            return self._context.store.create(self._meta.model, **kwargs)
+        return self._meta.model.objects.create(**kwargs)
+
+    def add_related(self, obj, name, *objs):
+        """
+        Adds objects to the many-to-many relation `name` of `obj`, skipped
+        when validating only since unsaved instances have no relations
+        """
+        if self.is_dry_run: return
+        getattr(obj, name).add(*objs)
+
+    def process_postsave(self, obj):
+        """
+        Run operations that need the saved model instance, e.g. updating
+        derived tables in the same transaction.
+
+        Should be overridden in subclasses if need to have such operations.
+        """
+        pass
+
     def process_prevalidate(self):
         """
         Run validations before the relevant model instance is made.
@@ -384,7 +538,7 @@ class Serializer(metaclass=BaseMetaSerializer):
         if self._stop: return True
 
     def update_translateable(self, obj, field):
-        for trans in getattr(self, field):
+        for trans in getattr(self, field) or ():
             setattr(obj, f'{field}_{trans.lang}', trans.text)
 
     def create_structure_header(self, content_type):
@@ -428,17 +582,12 @@ class Serializer(metaclass=BaseMetaSerializer):
     @staticmethod
     def get_from_reference(reference):
         ref = reference.ref 
-        serializers = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
-        serializer_name = f'{ref.cls}Serializer'
-        serializer = getattr(serializers, serializer_name)
-        model = apps.get_model(ref.package, ref.cls)
+        serializer, model = registry.get_reference(ref)
         instance = model.get_from_ref(ref) 
         return serializer(instance)
 
     def import_serializer(self, name):
-        serializers = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
-        name = f'{name}Serializer'
-        return getattr(serializers, name)
+        return registry.get(name)
 
 class EmptySerializer(Serializer, metaclass=BaseEmptyMetaSerializer):
     """
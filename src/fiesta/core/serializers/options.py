@@ -7,15 +7,15 @@ from django.db import models
 from django.db.models import Q
 from django.db.models.options import make_immutable_fields_list
 from django.utils.functional import cached_property
-from importlib import import_module
 from inflection import camelize
 from inflection import underscore
 from lxml.etree import QName
 from rest_framework.request import Request
 from typing import Tuple
 
-from ...settings import api_settings
 from .. import constants 
+from .registry import registry
+from .store import ArtefactStore
 
 @dataclass
 class ClassOptions: 
@@ -36,6 +36,10 @@ class ClassOptions:
         Names of Maintainable dataclasses that are its children as defined in the SDMX web services guidelines
     parents_names: Tuple[str]
         Names of Maintainable dataclasses that are its parents as defined in the SDMX web services guidelines
+    prefetch_related: Tuple[str]
+        Lookups prefetched per chunk of artefacts retrieved by a RESTful query
+    items_field_name: str
+        The field of the items of an item scheme, used for item queries
 
     Attribute Fields
     ----------------
@@ -44,11 +48,15 @@ class ClassOptions:
         `contribute_to_class`.
     object_name: str
         The name of the dataclass.  It is set in `contribute_to_class`.
+
+    The following are derived on first access, not when the serializer
+    class is made, so that importing the serializers is cheap.
+
     model: a Django model class
-        The django model object the dataclass uses to store its fields.  It is
-        set in `contribute_to_class`.
+        The django model object the dataclass uses to store its fields.
     fields: tuple of `Field`
-        The fields of the dataclass
+        The fields of the dataclass, the defaults of their metadata are set
+        on first access
     resources: tuple of string
         For a maintanable dataclass the resources that full detail of the
         artefact will be rendered in case detail keyword request argument is
@@ -70,32 +78,19 @@ class ClassOptions:
     namespace_key: str = ''
     children_names: Tuple[str] = field(default_factory=list)
     parents_names: Tuple[str] = field(default_factory=list)
+    prefetch_related: Tuple[str] = field(default_factory=list)
+    items_field_name: str = ''
     structures_field_name: str = '' 
     cls: object = field(init=False)
     object_name: str = field(init=False)
-    model: models.Model = field(init=False)
-    fields: Tuple[Field] = field(init=False)
-    resources: Tuple[str] = field(init=False)
-    attr_fields: Tuple[Field] = field(init=False)
-    nsmap: dict = field(init=False)
-    tag: QName = field(init=False)
-    non_attr_fields: Tuple[Field] = field(init=False)
-    underscore_name: str = field(init=False)
 
     def contribute_to_class(self, cls, name):
         cls._meta = self
 
-        # Post initializations of not initialized fields
+        # Post initializations of not initialized fields, the others are
+        # derived on first access
         self.cls = cls
         self.object_name = cls.__name__
-        self.model = self.get_model()
-        self.fields = fields(cls)
-        self.resources = self.get_resources()
-        self.attr_fields = self.get_attr_fields()
-        self.nsmap = self.get_nsmap()
-        self.tag = self.get_tag()
-        self.non_attr_fields = self.get_non_attr_fields()
-        self.underscore_name = underscore(self.object_name)
     
         # Store option values that are derived from other options if not provided
 
@@ -111,19 +106,52 @@ class ClassOptions:
         # new_meta.container_name = cls.get_container_name(new_meta)
         # cls._meta = new_meta
 
+    @cached_property
+    def model(self):
+        return self.get_model()
+
+    @cached_property
+    def fields(self):
+        cls_fields = fields(self.cls)
+        # Transfer defaults to field metadata
+        for f in cls_fields:
+            f.metadata['fiesta']._post_class_meta_defaults(self.cls)
+        return cls_fields
+
+    @cached_property
+    def resources(self):
+        return self.get_resources()
+
+    @cached_property
+    def attr_fields(self):
+        return self.get_attr_fields()
+
+    @cached_property
+    def nsmap(self):
+        return self.get_nsmap()
+
+    @cached_property
+    def tag(self):
+        return self.get_tag()
+
+    @cached_property
+    def non_attr_fields(self):
+        return self.get_non_attr_fields()
+
+    @cached_property
+    def underscore_name(self):
+        return underscore(self.object_name)
+
+    @cached_property
+    def class_name(self):
+        """The SDMX class name, e.g. Codelist for the CodelistSerializer"""
+        return self.object_name.rsplit('Serializer')[0]
+
     def get_children(self):
-        if isinstance(self.children_names, str):
-            self.children_names = [self.children_names]
-        module = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
-        return tuple(getattr(module, child_name)
-                     for child_name in self.children_names)
+        return registry.get_children(self.cls)
     
     def get_parents(self):
-        if isinstance(self.parent_names, str):
-            self.parent_names = [self.parent_names]
-        module = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
-        return tuple(getattr(module, parent_name)
-                     for parent_name in self.parent_names)
+        return registry.get_parents(self.cls)
 
     def select_child(self, field_name, children):
         for child in children:
@@ -131,7 +159,7 @@ class ClassOptions:
                 return child
 
     def get_resources(self):
-        return constants.CLASS2RESOURCES.get(self.object_name)  
+        return constants.CLASS2RESOURCES.get(self.class_name)
 
     def get_model(self):
         if not self.model_name: return
@@ -286,11 +314,11 @@ class FieldOptions:
         associated with.  It is defaulted to the name of the field camelized.
         If it is an element the first letter is capitalized.  It is not
         relevant if the `is_text` property is set.  The default is set on
-        `contribute_to_field_metadata`.
+        first access of `ClassOptions.fields`.
     namespace_key: str
         The namespace_key of the related element.  The default is the
-        namespace_key of the class and is set on
-        `contribute_to_field_metadata`.
+        namespace_key of the class and is set on first access of
+        `ClassOptions.fields`.
     related_name: str
         Name of the backward manager
     forward: bool
@@ -351,7 +379,7 @@ class FieldOptions:
         # Set related_name
         if not self.related_name: self.related_name = f'{self.fld.name}_set'
         # Set default forward_accesor
-        if self.forward_accesor: self.forward_accesor = self.fld.name
+        if not self.forward_accesor: self.forward_accesor = self.fld.name
 
 def default_results():
     # Returns a submitted structures mapping: 
@@ -384,26 +412,37 @@ class ProcessContextOptions:
     dsd: DataStructureSerializer
         The DataStructureSerializer instance set when processing an
         AttachmentConstraintSerializer
+    dry_run: bool
+        Whether the message is only validated against an in-memory store,
+        without writing to the database
+    store: ArtefactStore
+        The in-memory store of a validation only submission
 
     ----------------
     """
     request: Request
-    acquisition_obj: object 
+    log: object
     results: defaultdict = field(init=False, default_factory=default_results)
     result: object = field(init=False)
     action: str = field(init=False)
     external_dependencies: bool = field(init=False)
     dsd: object = field(init=False)
+    dry_run: bool = False
+    store: object = field(init=False, default=None)
+
+    def __post_init__(self):
+        if self.dry_run:
+            self.store = ArtefactStore()
     
-    def get_or_add_result(self, submitted_structure):
+    def get_or_add_result(self, result):
         r = self.results
-        ref = submitted_structure.maintainable_object.dref
+        ref = result.submitted_structure.maintainable_object.dref
         try:
             return r[ref.package][ref.cls][ref.agency_id][ref.object_id][ref.version]
         except KeyError:
-            r[ref.package][ref.cls][ref.agency][
-                ref.object_id][ref.version] = submitted_structure
-        return submitted_structure
+            r[ref.package][ref.cls][ref.agency_id][
+                ref.object_id][ref.version] = result
+        return result
 
     def generate_result(self):
         for package, vp in self.results.items():
@@ -439,21 +478,21 @@ class RegistrationProcessContextOptions:
     ----------------
     """
     request: Request
-    acquisition_obj: object 
+    log: object
     results: defaultdict = field(init=False, default_factory=default_results)
     result: object = field(init=False)
     action: str = field(init=False)
     external_dependencies: bool = field(init=False)
     
-    def get_or_add_result(self, submitted_structure):
+    def get_or_add_result(self, result):
         r = self.results
-        ref = submitted_structure.maintainable_object.dref
+        ref = result.submitted_structure.maintainable_object.dref
         try:
             return r[ref.package][ref.cls][ref.agency_id][ref.object_id][ref.version]
         except KeyError:
-            r[ref.package][ref.cls][ref.agency][
-                ref.object_id][ref.version] = submitted_structure
-        return submitted_structure
+            r[ref.package][ref.cls][ref.agency_id][
+                ref.object_id][ref.version] = result
+        return result
 
     def generate_result(self):
         for package, vp in self.results.items():
@@ -463,6 +502,36 @@ class RegistrationProcessContextOptions:
                         for version, result in vo.items():
                             yield result 
 
+@dataclass(frozen=True)
+class RESTfulQuery:
+    """
+    A RESTful structure query, of the RESTful views or an entry of a batch
+    query, with the fields that the planning and the rendering read.  The
+    queries of the views keep their `registry.Log`, which is not compared.
+    """
+    resource: str
+    agency_id: str = 'all'
+    resource_id: str = 'all'
+    version: str = 'latest'
+    detail: str = 'full'
+    references: str = 'none'
+    log: object = field(default=None, compare=False)
+
+@dataclass(frozen=True)
+class RESTfulSchemaQuery:
+    """
+    A RESTful schema query, rendered from the structure query of its context
+    artefact
+    """
+    context: str
+    agency_id: str
+    resource_id: str
+    version: str = 'latest'
+    observation_dimension: str = 'TIME_PERIOD'
+    log: object = field(default=None, compare=False)
+
+    resource = 'schema'
+
 @dataclass
 class RESTfulQueryContextOptions:
     """
@@ -481,19 +550,35 @@ class RESTfulQueryContextOptions:
         A map to store Q objects per queried maintainable structure.
     maintainable_query_field_names: Tuple[str]
         The maintainable artefact field names associated with the resource 
+    item_ids: Tuple[str]
+        The ids of the items of the queried item schemes to retrieve, None
+        for all the items
+    ancestors: bool
+        Whether the ancestors of the queried items are also retrieved
     """
     query: object
-    structures_field_names: Tuple[Field] = field(init=True)
+    structures_field_names: Tuple[Field] = field(init=False)
     queries: defaultdict = field(init=False, default_factory=lambda:
                                       defaultdict(Q))
-    maintainable_query_field_names: Tuple[str] = field(init=True)
+    maintainable_query_field_names: Tuple[str] = field(init=False)
+    item_ids: Tuple[str] = None
+    ancestors: bool = False
 
     def __post_init__(self):
+        self.set_query(self.query)
+
+    def set_query(self, query):
+        """
+        Sets the query being planned, the queries of the artefacts are kept
+        so that the queries of a batch are combined per maintainable class
+        """
+        self.query = query
         self.structures_field_names = self.get_structures_field_names()
         self.maintainable_query_field_names = self.get_maintainable_query_field_names()
 
     def get_maintainable_query_field_names(self):
-        return constants.RESOURCE2MAINTAINABLE(self.query_resource)
+        names = constants.RESOURCE2MAINTAINABLE.get(self.query.resource, ())
+        return (names,) if isinstance(names, str) else names
 
     def get_structures_field_names(self):
         if self.query.resource == 'organisationscheme':
@@ -0,0 +1,123 @@
+# registry.py
+
+from django.apps import apps
+from django.test.signals import setting_changed
+from importlib import import_module
+
+from ...settings import api_settings
+
+class SerializerRegistry:
+    """
+    The serializer classes of `DEFAULT_SERIALIZER_MODULE` resolved once
+
+    The registry is populated on first use, not by `FiestaConfig.ready()`,
+    so that starting a worker does not import the serializer module, and
+    maps the class names, the children and parents names of the class
+    options and the classes of references to the serializer classes, so that
+    no module is imported and no name is looked up while serializing.
+
+    It is cleared when the `FIESTA` setting changes and populated again on
+    next use, or `populate` is called with another module, to swap the
+    serializer module.
+    """
+
+    def __init__(self):
+        self.module = None
+        self.classes = {}
+        self.children = {}
+        self.parents = {}
+        self.references = {}
+
+    @property
+    def ready(self):
+        return self.module is not None
+
+    def populate(self, module_path=None):
+        """Resolves the serializer classes of a module, by default the setting"""
+        from .base import BaseMetaSerializer
+        module = import_module(module_path or api_settings.DEFAULT_SERIALIZER_MODULE)
+        classes = {
+            name: value for name, value in vars(module).items()
+            if isinstance(value, BaseMetaSerializer)
+        }
+        children = {}
+        parents = {}
+        for cls in set(classes.values()):
+            children[cls] = self.resolve(classes, cls._meta.children_names)
+            parents[cls] = self.resolve(classes, cls._meta.parents_names)
+        # Swapped at once so that concurrent lookups see a whole registry
+        self.classes, self.children, self.parents = classes, children, parents
+        self.references = {}
+        self.module = module
+
+    def clear(self):
+        self.module = None
+        self.classes = {}
+        self.children = {}
+        self.parents = {}
+        self.references = {}
+
+    @staticmethod
+    def resolve(classes, names):
+        if isinstance(names, str): names = [names]
+        return tuple(classes[name] for name in names or ())
+
+    def get_module(self):
+        if not self.ready: self.populate()
+        return self.module
+
+    def get(self, name):
+        """
+        Returns a serializer class by its name with or without the
+        `Serializer` suffix, e.g. Codelist or CodelistSerializer
+
+        Raises
+        ------
+        AttributeError
+            If the module has no such serializer
+        """
+        if not self.ready: self.populate()
+        classes = self.classes
+        try:
+            return classes[f'{name}Serializer']
+        except KeyError:
+            pass
+        try:
+            return classes[name]
+        except KeyError:
+            raise AttributeError(
+                f'{self.module.__name__} has no serializer {name}') from None
+
+    def get_children(self, cls):
+        if not self.ready: self.populate()
+        try:
+            return self.children[cls]
+        except KeyError:
+            # A class outside the serializer module
+            return self.resolve(self.classes, cls._meta.children_names)
+
+    def get_parents(self, cls):
+        if not self.ready: self.populate()
+        try:
+            return self.parents[cls]
+        except KeyError:
+            return self.resolve(self.classes, cls._meta.parents_names)
+
+    def get_reference(self, ref):
+        """Returns the serializer class and the model of a reference"""
+        key = (ref.package, ref.cls)
+        try:
+            return self.references[key]
+        except KeyError:
+            pass
+        result = self.get(ref.cls), apps.get_model(ref.package, ref.cls)
+        self.references[key] = result
+        return result
+
+registry = SerializerRegistry()
+
+def clear_registry(*args, **kwargs):
+    if kwargs['setting'] == 'FIESTA':
+        registry.clear()
+
+setting_changed.connect(clear_registry)
@@ -0,0 +1,52 @@
+# store.py
+
+from django.db import models
+
+class ArtefactStore:
+    """
+    In-memory store of the model instances of a validation only submission
+
+    The instances a submission looks up are read lazily from the database,
+    which is never written, and the instances the submission makes are kept
+    unsaved in the store so that later lookups of the same message see them.
+    """
+
+    def __init__(self):
+        self._objects = {}
+        self.created = []
+
+    @staticmethod
+    def make_key(model, lookup):
+        def value(v):
+            if not isinstance(v, models.Model): return v
+            # Unsaved instances only exist in this store
+            return (v.__class__, v.pk) if v.pk is not None else id(v)
+        return model, tuple(sorted((k, value(v)) for k, v in lookup.items()))
+
+    def get_or_create(self, model, defaults=None, **kwargs):
+        """
+        Same as `QuerySet.get_or_create()` but the made instance is not saved
+
+        The database is only read if no lookup value is an unsaved instance,
+        which no stored row can reference.
+        """
+        key = self.make_key(model, kwargs)
+        try:
+            return self._objects[key], False
+        except KeyError:
+            pass
+        obj = None
+        if not any(isinstance(v, models.Model) and v.pk is None
+                   for v in kwargs.values()):
+            obj = model._default_manager.filter(**kwargs).first()
+        created = obj is None
+        if created:
+            obj = self.create(model, **kwargs, **(defaults or {}))
+        self._objects[key] = obj
+        return obj, created
+
+    def create(self, model, **kwargs):
+        """Same as `QuerySet.create()` but the instance is not saved"""
+        obj = model(**kwargs)
+        self.created.append(obj)
+        return obj
@@ -1,31 +1,37 @@
 # structure.py
 
-import functools
 import lxml 
 
-from dataclasses import asdict
+from collections import defaultdict
+from dataclasses import asdict, replace
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+from itertools import islice
 from django.apps import apps
 from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
-from django.db import transaction 
-from django.db.models import Q, ProtectedError
+from django.db import router, transaction 
+from django.db.models import Prefetch, Q, ProtectedError, prefetch_related_objects
+from django.db.models.deletion import Collector
 from django.utils import translation
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ParseError
-from importlib import import_module
 from lxml.etree import QName
+from modeltranslation.utils import build_localized_fieldname
 from typing import Iterable, List
 
 from .. import status, constants, patterns
-from ...utils.translation import get_language
+from ...utils.coders import encode
+from ...utils.translation import (
+    defer_translations, get_language, get_requested_languages,
+    translated_prefetch)
 from ...settings import api_settings
-from ...external import Request as ExternalRequest
 from ..exceptions import ExternalError
+from ..urns import canonical_version, make_urn
 
+from .arrays import ItemArray
 from .base import field, Serializer, EmptySerializer
+from .registry import registry
 
 class CommonSerializer(Serializer):
 
@@ -40,11 +46,11 @@ class RegistrySerializer(Serializer):
 class StringSerializer(Serializer):
     text: str = field(is_text=True)
 
-    def __post_init__(self, *args, **kwargs):
-        if isinstance(self._instance, str):
-            self.text = self._instance
-        else:
-            self.text = self._instance.text
+    def __post_init__(self, instance, complain):
+        super().__post_init__(None, complain)
+        if instance is None: return
+        self._instance = instance
+        self.text = instance if isinstance(instance, str) else instance.text
 
 class ValueSerializer(Serializer):
     text: str = field(is_text=True)
@@ -56,9 +62,11 @@ class TextSerializer(Serializer):
 
     @classmethod
     def generate_many(cls, instance, forward_accesor):
-        for lang in settings.LANGUAGES:
-            text = getattr(instance, f'{forward_accesor}_lang')
-            yield cls(lang=lang, text=text)
+        # Only the requested translations are read, the others are deferred
+        for lang in get_requested_languages():
+            text = getattr(
+                instance, build_localized_fieldname(forward_accesor, lang), None)
+            if text: yield cls(lang=lang, text=text)
 
 class SimpleStringSerializer(Serializer):
     value: str = field(is_text=True)
@@ -183,10 +191,9 @@ class LocalRefSerializer(Serializer):
 
 class ReferenceSerializer(Serializer):
 
-    def __post_init__(self, *args, **kwargs):
-        super().__post_init__(*args, **kwargs)
-        if self._element: 
-            self.dref = self._urn_to_ref() or self.ref
+    @property
+    def dref(self):
+        return self._urn_to_ref() or self.ref
 
     def process_postmake(self):
         return self.m_ref
@@ -210,8 +217,7 @@ class MaintainableReferenceSerializer(ReferenceSerializer):
     def make_urn(self):
         if self.urn: return self.urn
         d = self.dref
-        urn = f'urn:sdmx:infomodel.{d.package}.{d.cls}={d.agency_id}:{d.object_id}({d.version})' 
-        return urn
+        return make_urn(d.package, d.cls, d.agency_id, d.object_id, d.version)
 
 class ItemReferenceSerializer(ReferenceSerializer):
     ref: ItemRefSerializer = field(namespace_key='')
@@ -255,19 +261,18 @@ class AnnotationSerializer(Serializer):
         # namespace_key = 'common'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             object_id=self.object_id,
             annotation_title=self.annotation_title,
             annotation_type=self.annotation_type,
             annotation_url=self.annotation_url,
-            annotable_object=self._wrapper._obj,
+            annotable_object=self._container._obj,
         )
         return obj
 
     @classmethod
     def generate_many(cls, instance, forward_accesor):
-        annotation_set = instance.annotation_set
-        return (cls(annotation) for annotation in annotation_set)
+        return (cls(annotation) for annotation in instance.annotation_set.all())
 
 
 class AnnotationsSerializer(CommonSerializer):
@@ -292,7 +297,8 @@ class IdentifiableSerializer(AnnotableSerializer):
             return self.object_id == other.object_id
 
     def make_urn(self):
-        pass
+        # The canonical URNs are stored with the maintainables and items
+        return getattr(self._instance, 'urn', None) or None
 
     def make_uri(self):
         pass
@@ -311,34 +317,48 @@ class NameableSerializer(IdentifiableSerializer):
     def get_item_set(self, related_name):
         return self._instance.text.filter(text_type=related_name) 
 
+    def process_postmake(self, obj):
+        obj = super().process_postmake(obj)
+        self.update_translateable(obj, 'name')
+        self.update_translateable(obj, 'description')
+        return obj
+
 
 class VersionableSerializer(NameableSerializer):
     version: str = field(is_attribute=True, default='1.0')
     valid_from: datetime = field(is_attribute=True)
     valid_to: datetime = field(is_attribute=True)
 
-    def __post_init__(self):
-        self.version = list(map(int, self.version)) 
+    def __post_init__(self, *args, **kwargs):
+        super().__post_init__(*args, **kwargs)
+        # The versions are stored with three parts, e.g. 1.0.0 for 1.0
+        if self._instance and self.version:
+            self.version = canonical_version(self.version)
+
+    @property
+    def version_key(self):
+        """The version as a tuple of integers, e.g. (1, 0) for 1.0"""
+        return tuple(int(part) for part in str(self.version).split('.'))
 
     def __eq__(self, other):
         if not super().__eq__(other): return
-        return self.version == other.version
+        return self.version_key == other.version_key
 
     def __lt__(self, other):
         if not super().__eq__(other): return
-        return self.version < other.version
+        return self.version_key < other.version_key
 
     def __gt__(self, other):
         if not super().__eq__(other): return
-        return self.version > other.version
+        return self.version_key > other.version_key
 
     def __ge__(self, other):
         if not super().__eq__(other): return
-        return self.version >= other.version
+        return self.version_key >= other.version_key
 
     def __le__(self, other):
         if not super().__eq__(other): return
-        return self.version <= other.version
+        return self.version_key <= other.version_key
 
 
     def process_postmake(self, obj):
@@ -351,6 +371,48 @@ class VersionableSerializer(NameableSerializer):
             obj.valid_to = self.valid_to
         return obj
 
+class MaintainableStub:
+    """
+    Stand-in for a MaintainableSerializer rendered as a stub
+
+    Holds only what a stub renders: the id, agency, version and names of the
+    artefact.
+
+    Parameters
+    ----------
+    meta: ClassOptions
+        The options of the serializer class it stands in for
+    names: list
+        (language, name) tuples
+    """
+
+    __slots__ = ('_meta', 'object_id', 'agency_id', 'version', 'names')
+
+    def __init__(self, meta, object_id, agency_id, version, names):
+        self._meta = meta
+        self.object_id = object_id
+        self.agency_id = agency_id
+        self.version = version
+        self.names = names
+
+    def unroll(self):
+        return self
+
+    def as_stub(self, class_meta, detail, resource):
+        return True
+
+    def make_structure_url(self):
+        return MaintainableSerializer.make_structure_url(self)
+
+    def to_attrs(self, as_stub=True):
+        return {
+            'id': self.object_id,
+            'agencyID': self.agency_id,
+            'version': self.version,
+            'isExternalReference': encode(True, bool),
+            'structureURL': self.make_structure_url(),
+        }
+
 class MaintainableSerializer(VersionableSerializer):
     agency_id: str = field(is_attribute=True, localname='agencyID',
                            forward=True, forward_accesor='agency__object_id')
@@ -364,13 +426,132 @@ class MaintainableSerializer(VersionableSerializer):
         return self.agency_id == other.agency_id
 
     def make_structure_url(self):
-        resource = constants.CLASS2RESOURCE(self._meta.name)[0]
-        return f'http://www.fiesta.org/{resource}/{self.agency_id}/{self.version}'
+        resource = self._meta.resources[0]
+        return (f'http://www.fiesta.org/{resource}/{self.agency_id}/'
+                f'{self.object_id}/{self.version}')
+
+    @classmethod
+    def generate_restful_many(cls, query, using=None, item_ids=None, ancestors=False):
+        """
+        Yields the serializers of the artefacts matching a query
+
+        The artefacts are fetched in chunks of `DEFAULT_RESTFUL_CHUNK_SIZE`
+        with `iterator()`, which uses a server-side cursor where the backend
+        supports it, and the `prefetch_related` lookups of the class are
+        prefetched per chunk so that memory is bounded by the chunk.
+
+        If `item_ids` is given only these items, and optionally their
+        ancestors, are fetched and the item schemes are rendered as partial.
+        Otherwise the items of item schemes with at least
+        `DEFAULT_ITEM_ARRAY_THRESHOLD` items are read into an `ItemArray`
+        instead of being prefetched.
+        """
+        chunk_size = api_settings.DEFAULT_RESTFUL_CHUNK_SIZE
+        threshold = api_settings.DEFAULT_ITEM_ARRAY_THRESHOLD
+        model = cls._meta.model
+        queryset = model.objects.using(using).filter(query).order_by('pk')
+        objects = defer_translations(queryset).iterator(chunk_size=chunk_size)
+        item_model = cls.get_item_model()
+        subsetting = bool(item_ids and item_model)
+        arrays = bool(item_model and not subsetting and threshold
+                      and ItemArray.supports(cls.get_item_type()))
+        prefetch = cls._meta.prefetch_related
+        item_prefetch = []
+        if item_model:
+            container = item_model._meta.get_field('container')
+            accessor = container.related_query_name()
+            item_prefetch = [lookup for lookup in prefetch
+                             if lookup.split('__')[0] in (accessor, f'{accessor}_set')]
+            prefetch = [lookup for lookup in prefetch if lookup not in item_prefetch]
+            # The subsets and arrays replace the items, which are then not
+            # read by the serializers, an empty queryset runs no query
+            no_items = Prefetch(container.remote_field.get_accessor_name(),
+                                queryset=item_model._default_manager.none())
+        if subsetting: item_prefetch = []
+        prefetch = [translated_prefetch(model, lookup) for lookup in prefetch]
+        item_prefetch = [translated_prefetch(model, lookup) for lookup in item_prefetch]
+        large = set()
+        while True:
+            chunk = list(islice(objects, chunk_size))
+            if not chunk: return
+            prefetch_related_objects(chunk, 'agency', *prefetch)
+            if subsetting:
+                items = cls.get_item_subset(chunk, item_ids, ancestors, using)
+                prefetch_related_objects(chunk, no_items)
+            elif arrays:
+                large = ItemArray.get_large_containers(item_model, chunk, threshold, using)
+                prefetch_related_objects(
+                    [obj for obj in chunk if obj.pk in large], no_items)
+            if item_prefetch:
+                prefetch_related_objects(
+                    [obj for obj in chunk if obj.pk not in large], *item_prefetch)
+            for obj in chunk:
+                serializer = cls(obj)
+                if subsetting:
+                    serializer.set_items(items.get(obj.pk, []))
+                elif obj.pk in large:
+                    setattr(serializer, cls._meta.items_field_name,
+                            ItemArray.from_container(cls.get_item_type(), obj, using))
+                yield serializer
 
     @classmethod
-    def generate_restful_many(cls, query):
-        for obj in cls._meta.model.objects.filter(query):
-            yield cls(obj)
+    def get_item_type(cls):
+        name = cls._meta.items_field_name
+        if not name: return
+        return cls._meta.fields_map[name].type.__args__[0]
+
+    @classmethod
+    def get_item_model(cls):
+        item_type = cls.get_item_type()
+        if not item_type: return
+        return item_type._meta.model
+
+    @classmethod
+    def get_item_subset(cls, containers, item_ids, ancestors=False, using=None):
+        """
+        Returns the requested items of the item schemes as a dictionary of
+        item scheme primary key to items
+
+        The ancestors of hierarchical items are read from their materialised
+        path so no tree traversal is needed.
+        """
+        model = cls.get_item_model()
+        items = defer_translations(model._default_manager.using(using).filter(
+            container__in=containers, object_id__in=item_ids))
+        hierarchical = hasattr(model, 'steplen')
+        if ancestors and hierarchical:
+            paths = set()
+            for path in items.values_list('path', flat=True):
+                paths.update(
+                    path[:end] for end in range(model.steplen, len(path) + 1, model.steplen))
+            items = defer_translations(
+                model._default_manager.using(using).filter(path__in=paths))
+        subset = {}
+        for item in items.order_by('path' if hierarchical else 'object_id'):
+            subset.setdefault(item.container_id, []).append(item)
+        return subset
+
+    def set_items(self, items):
+        item_type = self.get_item_type()
+        setattr(self, self._meta.items_field_name, [item_type(item) for item in items])
+        self.is_partial = True
+
+    @classmethod
+    def generate_restful_stubs(cls, query, using=None):
+        """
+        Yields MaintainableStub objects for the artefacts rendered as stubs
+
+        Only the stub attributes and the translated names are read, with a
+        single `values_list()` query, and no serializer is constructed.
+        """
+        languages = get_requested_languages()
+        name_fields = [build_localized_fieldname('name', code) for code in languages]
+        rows = cls._meta.model.objects.using(using).filter(query).values_list(
+            'object_id', 'agency__object_id', 'version', *name_fields)
+        for object_id, agency_id, version, *names in rows:
+            yield MaintainableStub(
+                cls._meta, object_id, agency_id, canonical_version(version),
+                [(code, name) for code, name in zip(languages, names) if name])
 
     @classmethod
     def make_root_query(cls, context):
@@ -380,31 +561,84 @@ class MaintainableSerializer(VersionableSerializer):
         if context.query.agency_id != 'all':
             kwargs['agency__object_id'] = context.query.agency_id
         if context.query.version == 'latest':
-            kwargs['latest'] = True
+            LatestVersion = apps.get_model('registry', 'LatestVersion')
+            kwargs['pk__in'] = LatestVersion.objects.targets(
+                cls._meta.model, **kwargs)
         elif context.query.version != 'all':
             kwargs['version'] = context.query.version
         return context.queries[cls] | Q(**kwargs)
 
     @classmethod
-    def make_related_query(cls, related_cls, context):
-        return context.queries[cls]
+    def make_related_query(cls, related_cls, context, parents=False):
+        """
+        Returns the query of the artefacts of this class that are referenced
+        by the artefacts matched for `related_cls`, or that reference them if
+        `parents` is True.
+
+        The references are read from the `registry.Dependency` edges instead
+        of joining through the components of each artefact.
+        """
+        Dependency = apps.get_model('registry', 'Dependency')
+        related = related_cls._meta.model.objects.filter(context.queries[related_cls])
+        if parents:
+            pks = Dependency.objects.parents(related, cls._meta.model)
+        else:
+            pks = Dependency.objects.children(related, cls._meta.model)
+        query = Q(pk__in=pks)
+        if cls in context.queries:
+            query = context.queries[cls] | query
+        return query
+
+    @classmethod
+    def get_descendant_classes(cls):
+        descendants = []
+        pending = list(cls._meta.get_children())
+        while pending:
+            descendant = pending.pop(0)
+            if descendant in descendants or descendant is cls: continue
+            descendants.append(descendant)
+            pending.extend(descendant._meta.get_children())
+        return descendants
+
+    @classmethod
+    def make_descendants_query(cls, context):
+        """
+        Sets the queries of all the artefacts that are referenced directly or
+        indirectly by the root artefacts with a single recursive query on the
+        `registry.Dependency` edges
+        """
+        Dependency = apps.get_model('registry', 'Dependency')
+        qrs = context.queries
+        roots = cls._meta.model.objects.filter(qrs[cls])
+        descendants = Dependency.objects.descendants(roots)
+        for descendant_cls in cls.get_descendant_classes():
+            pks = descendants.get(descendant_cls._meta.model)
+            if not pks: continue
+            query = Q(pk__in=pks)
+            if descendant_cls in qrs:
+                query = qrs[descendant_cls] | query
+            qrs[descendant_cls] = query
 
     @classmethod
     def _make_query_args(cls, context, depth):
+        if not depth:
+            context.queries[cls] = cls.make_root_query(context)
+        cls._make_references_query_args(context, depth + 1)
+
+    @classmethod
+    def _make_references_query_args(cls, context, depth=1):
+        """
+        Sets the queries of the artefacts referenced by, or referencing, the
+        artefacts matched for this class given the references of the query
+        """
         children = cls._meta.get_children()
         references = context.query.references
         qrs = context.queries
-        if not depth:
-            qrs[cls] = cls.make_root_query(context)
-        depth += 1
         if references in ['children', 'parentsandsiblings'] and depth == 1:
             for cld_cls in children:
                 qrs[cld_cls] = cld_cls.make_related_query(cls, context)
-        elif references in ['descendants', 'all'] and depth >= 1:
-            for cld_cls in children:
-                qrs[cld_cls] = cld_cls.make_related_query(cls, context)
-            for cld_cls in children:
-                cld_cls._make_query_args(context, depth)
+        elif references in ['descendants', 'all'] and depth == 1:
+            cls.make_descendants_query(context)
         elif references in constants.RESOURCES:
             for item in constants.RESOURCE2MAINTAINABLE[references]:
                 cld_cls = cls._meta.select_child(item, children)
@@ -412,15 +646,19 @@ class MaintainableSerializer(VersionableSerializer):
                 qrs[cld_cls] = cld_cls.make_related_query(cls, context)
         if references in ['parents', 'parentsandsiblings', 'all'] and depth == 1:
             for parent in cls._meta.get_parents():
-                qrs[parent] = parent.make_related_query(cls, context)
+                qrs[parent] = parent.make_related_query(cls, context, parents=True)
 
     def as_stub(self, class_meta, detail, resource):
         """Returns True if element should be rendered as stub."""
+        return self.is_stub(class_meta, detail, resource)
+
+    @staticmethod
+    def is_stub(class_meta, detail, resource):
         return (
             (detail == 'allstubs') 
             or
             ((detail == 'referencestubs') and 
-             (resource not in class_meta.resources))
+             (resource not in (class_meta.resources or ())))
         )
 
     def extract_maintainable(self, structures):
@@ -444,6 +682,8 @@ class MaintainableSerializer(VersionableSerializer):
                 status.FIESTA_2103_SOAP_PULLING_NOT_IMPLEMENTED
             ) 
             return
+        # Imported here since requests is slow to import
+        from ...external import Request as ExternalRequest
         header = self.create_structure_header()
         message = ExternalRequest(header).get(location)
         if not isinstance(message, StructureSerializer):
@@ -469,11 +709,9 @@ class MaintainableSerializer(VersionableSerializer):
             object_id=self.object_id,
             version=self.version,
             cls=self._meta.class_name,
-            package=self._meta.app
+            package=self._meta.app_name
         )
-        reference =  MaintainableReferenceSerializer(ref=ref)
-        reference.durn = reference.make_maintainable_urn()
-        return reference
+        return MaintainableReferenceSerializer(ref=ref)
 
     def to_submission_result(self):
         reference = self.to_reference()
@@ -482,12 +720,12 @@ class MaintainableSerializer(VersionableSerializer):
             action=self._context.action, 
             external_dependencies=self._context.external_dependencies
         )
-        submission_result = submitted_structure.to_result()
+        submission_result = submitted_structure.to_result(self._context)
         submission_result._container = self._container._container
         return submission_result
 
     def process_prevalidate(self):
-        self._context.result = self.get_or_add_result(self.to_submission_result())
+        self._context.result = self._context.get_or_add_result(self.to_submission_result())
         model = apps.get_model('base', 'agency')
         try:
             self.agency = model.objects.get(object_id=self.agency_id)
@@ -505,7 +743,7 @@ class MaintainableSerializer(VersionableSerializer):
                 self._stop = True
                 return
             self = sdmxobj
-        obj, created = self._meta.model.objects.get_or_create(
+        obj, created = self.get_or_create_obj(
             agency=self.agency,
             object_id=self.object_id,
             version=self.version
@@ -514,7 +752,7 @@ class MaintainableSerializer(VersionableSerializer):
         return obj 
 
     def process_validate(self, obj):
-        action = self._result.submitted_structure.action
+        action = self._context.result.submitted_structure.action
         if action == 'Delete':
             if obj.is_final:
                 self._context.result.status_message.update(
@@ -524,7 +762,7 @@ class MaintainableSerializer(VersionableSerializer):
                 self._stop = True
             else:
                 try:
-                    obj.delete()
+                    self.delete_obj(obj)
                 except ProtectedError:
                     self._context.result.status_message.update(
                         'Failure',
@@ -543,14 +781,51 @@ class MaintainableSerializer(VersionableSerializer):
                 )
                 self._stop = True
 
+    def delete_obj(self, obj):
+        """
+        Deletes the artefact and its derived rows, when validating only it is
+        just checked that no stored object protects it
+
+        Raises
+        ------
+        ProtectedError
+        """
+        if self.is_dry_run:
+            if obj.pk is not None:
+                Collector(using=router.db_for_read(obj.__class__)).collect([obj])
+            return
+        Dependency = apps.get_model('registry', 'Dependency')
+        LatestVersion = apps.get_model('registry', 'LatestVersion')
+        SearchEntry = apps.get_model('registry', 'SearchEntry')
+        with transaction.atomic():
+            Dependency.objects.remove(obj)
+            SearchEntry.objects.remove(obj)
+            obj.delete()
+            LatestVersion.objects.refresh(
+                obj.__class__, obj.agency_id, obj.object_id)
+
     def process_postmake(self, obj):
         obj = super().process_postmake(obj)
         if not obj.is_final:
             obj.is_final = self.is_final
         self._context.result.status_message.update('Success')
-        obj.submitted_structure.add(self._context.result.process(context=self._context))
+        self.add_related(obj, 'submitted_structure',
+                         self._context.result.process(self._container, context=self._context))
         return obj
 
+    def process_postsave(self, obj):
+        apps.get_model('registry', 'Dependency').objects.replace(obj)
+        apps.get_model('registry', 'LatestVersion').objects.refresh(
+            obj.__class__, obj.agency_id, obj.object_id)
+        apps.get_model('registry', 'SearchEntry').objects.reindex(obj)
+
+    def process(self, *args, **kwargs):
+        # The version is inserted by process_premake, so the artefact, its
+        # items and the derived rows, e.g. the latest version pointer, are
+        # saved in one transaction
+        with transaction.atomic():
+            return super().process(*args, **kwargs)
+
 class ItemSchemeSerializer(MaintainableSerializer):
     is_partial: bool = field(is_attribute=True, default=False)
 
@@ -561,14 +836,20 @@ class ItemSchemeSerializer(MaintainableSerializer):
         return self.items
     
     def __getattr__(self, name):
-        return self.__getitem__(name)
+        # Only the items are looked up, not the missing private attributes
+        if name.startswith('_') or name == 'items':
+            raise AttributeError(name)
+        try:
+            return self.__getitem__(name)
+        except KeyError:
+            raise AttributeError(name)
 
     def __getitem__(self, name):
         return self.items_as_dict[name]
 
     def __iter__(self):
         if not isinstance(self.items, dict):
-            return self.items
+            return iter(self.items)
         return iter(self.items.values())
 
     def __len__(self):
@@ -646,31 +927,50 @@ class StructuresItemsSerializer(Serializer):
     class Meta:
         namespace_key = 'structure'
 
-    def _make_query_args(self, context):
-        for f in self._meta.fields:
+    @classmethod
+    def _make_query_args(cls, context):
+        for f in cls._meta.fields:
             if f.name not in context.maintainable_query_field_names:
                 continue
             maintainable_type = f.type.__args__[0]
             maintainable_type._make_query_args(context, depth=0)
 
     def retrieve_restful(self, context):
+        detail = context.query.detail
+        resource = context.query.resource
         for f in self._meta.fields:
             maintainable_type = f.type.__args__[0]
             if maintainable_type not in context.queries: continue
             query = context.queries[maintainable_type]
-            setattr(self, f.name, maintainable_type.generate_restful_many(query))
+            # The generators are consumed by the renderer, possibly after
+            # the retrieval, so the database is bound now
+            kwargs = {'using': router.db_for_read(maintainable_type._meta.model)}
+            if maintainable_type.is_stub(maintainable_type._meta, detail, resource):
+                generate = maintainable_type.generate_restful_stubs
+            else:
+                generate = maintainable_type.generate_restful_many
+                if context.item_ids and f.name in context.maintainable_query_field_names:
+                    kwargs.update(item_ids=context.item_ids, ancestors=context.ancestors)
+            setattr(self, f.name, generate(query, **kwargs))
 
 class ItemSerializer(NameableSerializer):
-    pass
+
+    def process_premake(self):
+        obj, _ = self.get_or_make_obj(
+            object_id=self.object_id,
+            container=self._container._obj
+        )
+        return obj
 
 class ItemWithParentSerializer(ItemSerializer):
-    parent: LocalReferenceSerializer = field(namespace_key='common')
+    parent: LocalReferenceSerializer = field(namespace_key='structure')
 
     def __post_init__(self, *args, **kwargs):
         super().__post_init__(*args, **kwargs)
         if self._instance:
             parent = self._instance.get_parent()
-            self.parent = LocalReferenceSerializer(parent)
+            self.parent = LocalReferenceSerializer(
+                ref=LocalRefSerializer(parent, complain=False)) if parent else None
 
     def __eq__(self, other):
         if not super().__eq__(other): return
@@ -679,12 +979,12 @@ class ItemWithParentSerializer(ItemSerializer):
 
     def get_parent(self, parent_id):
         return self._meta.model.objects.get(object_id=parent_id,
-                                            wrapper=self._wrapper._obj)
+                                            container=self._container._obj)
 
     def process_prevalidate(self):
         parent_obj = None
         if self.parent:
-            parent_id = self.parent.dref.object_id
+            parent_id = self.parent.ref.object_id
             try:
                 parent_obj = self.get_parent(parent_id)
             except self._meta.model.DoesNotExist:
@@ -694,12 +994,8 @@ class ItemWithParentSerializer(ItemSerializer):
                 )
         self._parent_obj = parent_obj
 
-    def process_premake(self):
-        return self._meta.model.get_or_create(
-            object_id=self.object_id,
-            wrapper=self._wrapper._obj,
-            parent=self._parent_obj
-        )
+    def save_obj(self, obj):
+        obj.save(parent=self._parent_obj)
 
 
 class AgencySerializer(ItemSerializer):
@@ -753,7 +1049,7 @@ class AgencySchemeSerializer(ItemSchemeSerializer):
         structures_field_name = 'organisation_schemes'
 
     def __post_init__(self, *args, **kwargs):
-        super.__post_init__(*args, **kwargs)
+        super().__post_init__(*args, **kwargs)
         if self._instance:
             self.description = None
             self.annotations = None
@@ -762,7 +1058,7 @@ class AgencySchemeSerializer(ItemSchemeSerializer):
             )
             if self.object_id == 'SDMX':
                 self.agency = (
-                    AgencySerializer(instance) for instance in self._meta.model.get_rood_nodes() 
+                    AgencySerializer(instance) for instance in self._meta.model.get_root_nodes() 
                 )
             else:
                 self.agency = (
@@ -789,19 +1085,7 @@ class DataProviderSchemeSerializer(MaintainableSerializer):
         namespace_key = 'structure'
         structures_field_name = 'organisation_schemes'
         parents_names = ['ProvisionAgreementSerializer', 'ContentConstraintSerializer']
-
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'ProvisionAgreementSerializer':
-            qlist.append(Q(organisation__provisionagreement__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ContentConstraintSerializer':
-            qlist.append(Q(organisation__contentconstraint__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
+        prefetch_related = ['dataprovider_set']
 
     @classmethod
     def make_root_query(cls, context):
@@ -833,7 +1117,7 @@ class DataConsumerSchemeSerializer(MaintainableSerializer):
 
 
 class OrganisationUnitSchemeSerializer(ItemWithParentSchemeSerializer):
-    items: Iterable[OrganisationUnitSerializer] = field(localname='OrganisationUnit', namespace_key='structure') 
+    items: Iterable[OrganisationUnitSerializer] = field(localname='OrganisationUnit', namespace_key='structure', forward_accesor='organisationunit_set')
 
 class OrganisationSchemesSerializer(StructuresItemsSerializer):
     agency_scheme: Iterable[AgencySchemeSerializer] = field()
@@ -861,7 +1145,7 @@ class ContactSerializer(Serializer):
 class HeaderContactSerializer(Serializer):
 
     def process_premake(self):
-        return self._meta.model.objects.create(
+        return self.create_obj(
             party=self._container._obj
         )
 
@@ -878,26 +1162,21 @@ class PartySerializer(Serializer):
     timezone: str = field(namespace_key='message')
 
     class Meta:
-        app_name = 'base'
-        # model_name = 'Party'
-        # namespace_key = 'message'
+        app_name = 'registry'
+        model_name = 'party'
 
     def process_premake(self):
-        obj = self._meta.model.objects.create(
+        obj = self.create_obj(
             object_id=self.object_id,
-            timezone=self.timezone
+            timezone=self.timezone or ''
         )
         self.update_translateable(obj, 'name')
         return obj
 
-    def wsrest_party(self, registration):
-        if isinstance(registration.user, AnonymousUser):
-            self.object_id='not_supplied'
-            return
-        contact = HeaderContactSerializer(email=[registration.user.username])
-        receiver = registration.user.contact.organisation
-        self.object_id = receiver.object_id
-        self.contact = [contact]
+    def wsrest_party(self, log):
+        # Anonymous queries have no user
+        organisation = getattr(log.user, 'organisation', None)
+        self.object_id = organisation.object_id if organisation else 'not_supplied'
 
     def wsrest_sender(self):
         self.object_id = api_settings.DEFAULT_SENDER_ID 
@@ -944,7 +1223,7 @@ class HeaderSerializer(Serializer):
         namespace_key = 'message'
 
     def process_postmake(self, obj):
-        obj = self._meta.model.objects.create(
+        obj = self.create_obj(
             log=self._context.log,
             object_id=self.object_id,
             test=self.test,
@@ -952,27 +1231,33 @@ class HeaderSerializer(Serializer):
             sender=self.m_sender,
             receiver=self.m_receiver,
         )
-        self._sid = transaction.savepoint()
+        if not self.is_dry_run:
+            self._sid = transaction.savepoint()
         return obj
 
     def to_response(self):
+        # The header of a dry run is not saved, the ID is made from the log
+        # as for the RESTful queries
         header = HeaderSerializer(
-            object_id=self._obj.id,
+            object_id=f'IREF{self._context.log.pk}',
             test=self.test,
             prepared=datetime.now(),
             sender=self.receiver,
             receiver=self.sender,
         )
-        if self.test:
+        if self.test and self._sid:
             transaction.savepoint_rollback(self._sid)
         return header 
 
     def to_structure(self, log):
-        self.object_id=log.restful_query.id,
-        self.test=False,
-        self.prepared=log.prepared,
-        self.sender=PartySerializer().wsrest_sender(),
-        self.receiver=PartySerializer().wsrest_party(log.restful_query),
+        self.object_id = f'IREF{log.pk}'
+        self.test = False
+        self.prepared = datetime.now()
+        self.sender = PartySerializer()
+        self.sender.wsrest_sender()
+        self.receiver = PartySerializer()
+        self.receiver.wsrest_party(log)
+        return self
 
 
 class CodeSerializer(ItemWithParentSerializer):
@@ -983,29 +1268,17 @@ class CodeSerializer(ItemWithParentSerializer):
         namespace_key = 'structure'
 
 class CodelistSerializer(ItemWithParentSchemeSerializer):
-    items: Iterable[CodeSerializer] = field(localname='Code') 
+    items: Iterable[CodeSerializer] = field(localname='Code', forward_accesor='code_set')
 
     class Meta:
         app_name ='codelist'
         model_name = 'codelist'
         namespace_key = 'structure'
         structures_field_name = 'codelists'
+        prefetch_related = ['code_set']
+        items_field_name = 'items'
         parents_names = ['ConceptSchemeSerializer', 'DataStructureSerializer']
 
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'ConceptSchemeSerializer':
-            qlist.append(Q(representation__concept__wrapper__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'DataStructureSerializer':
-            qlist.append(Q(representation__dimension__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-            qlist.append(Q(representation__concept__dimension__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
-
 class CodelistsSerializer(StructuresItemsSerializer):
     codelist: Iterable[CodelistSerializer] = field(namespace_key='structure')
 
@@ -1031,7 +1304,7 @@ class FormatSerializer(Serializer):
         # model_name = 'format'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             **asdict(self)
         )
         return obj
@@ -1056,7 +1329,7 @@ class RepresentationSerializer(Serializer):
             if enumeration._stop: 
                 self._stop = True
                 return
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             text_format=self.m_text_format,
             enumeration=codelist_obj,
             enumeration_format=self.m_enumeration_format)
@@ -1073,7 +1346,7 @@ class ISOConceptReferenceSerializer(Serializer):
         namespace_key = 'structure'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             **asdict(self))
         return obj
 
@@ -1092,12 +1365,14 @@ class ConceptSerializer(ItemWithParentSerializer):
             obj.core_representation = self.m_core_representation
         if not obj.iso_concept_reference:
             obj.iso_concept_reference = self.m_iso_concept_reference
-        obj.save()
+        if not self.is_dry_run:
+            obj.save()
         return obj
 
 
 class ConceptSchemeSerializer(MaintainableSerializer):
-    concept: Iterable[ConceptSerializer] = field() 
+    is_partial: bool = field(is_attribute=True, default=False)
+    concept: Iterable[ConceptSerializer] = field(forward_accesor='concept_set')
 
     class Meta:
         app_name = 'conceptscheme'
@@ -1106,30 +1381,8 @@ class ConceptSchemeSerializer(MaintainableSerializer):
         children_names = 'CodelistSerializer'
         parents_names = ['DataStructureSerializer']
         structures_field_name = 'concepts'
-
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'DataStructureSerializer':
-            # From dimension concept_identity 
-            qlist.append(Q(concept__dimension_concept_identity__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-            # From measure dimension local_representation
-            qlist.append(Q(dimension__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-            # From dimension concept_roles
-            qlist.append(Q(concept__dimension_concept_role__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-            # From primarymeasure 
-            qlist.append(Q(concept__primarymeasure__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-            # From attribute concept_identity 
-            qlist.append(Q(concept__attribute_concept_identity__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-            # From attribute concept_roles
-            qlist.append(Q(concept__attribute_concept_role__wrapper__wrapper__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'CodelistSerializer':
-            qlist.append(Q(concept__representation__codelist__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
+        prefetch_related = ['concept_set']
+        items_field_name = 'concept'
 
 class ConceptsSerializer(StructuresItemsSerializer):
     concept_scheme: Iterable[ConceptSchemeSerializer] = field()
@@ -1143,9 +1396,9 @@ class ComponentSerializer(IdentifiableSerializer):
         namespace_key = 'structure'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             object_id = self.object_id,
-            wrapper = self._wrapper._obj,
+            wrapper = self._container._obj,
         )
         return obj
 
@@ -1186,7 +1439,7 @@ class DimensionSerializer(ComponentSerializer):
     def process_postmake(self, obj):
         obj = super().process_postmake(obj)
         obj.measure_local_representation = self.m_measure_local_representation
-        obj.concept_role.add(*self.m_concept_role)
+        self.add_related(obj, 'concept_role', *self.m_concept_role)
         obj.position = self.position
         obj.tipe = self.tipe
 
@@ -1203,8 +1456,8 @@ class GroupDimensionSerializer(AnnotableSerializer):
         model_name = 'groupdimension'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
-            wrapper = self._wrapper._obj,
+        obj, _ = self.get_or_create_obj(
+            wrapper = self._container._obj,
         )
 
         return obj
@@ -1235,17 +1488,17 @@ class AttributeRelationshipSerializer(Serializer):
         model_name = 'attributerelationship'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             object_id = self.object_id,
-            wrapper = self._wrapper._obj,
+            wrapper = self._container._obj,
         )
         return obj
 
     def process_postmake(self, obj):
         obj = super().process_postmake()
         obj.null = self.m_null
-        obj.dimension.add(*self.m_dimension)
-        obj.attachment_group.add(*self.m_attachment_group)
+        self.add_related(obj, 'dimension', *self.m_dimension)
+        self.add_related(obj, 'attachment_group', *self.m_attachment_group)
         obj.group = self.m_group
         obj.primary_measure = self.m_primary_measure
         return obj
@@ -1261,13 +1514,14 @@ class AttributeSerializer(ComponentSerializer):
         model_name = 'attribute'
 
     def __post_init__(self, *args, **kwargs):
+        super().__post_init__(*args, **kwargs)
         if self._instance:
             self.assignment_status = self._instance.ASSIGNMENT_STATUS_CHOICES[self.assignment_status]
 
 
     def process_postmake(self, obj):
         obj = super().process_postmake()
-        obj.concept_role.add(*self.m_concept_role)
+        self.add_related(obj, 'concept_role', *self.m_concept_role)
         obj.assignment_status = self.assignment_status
         return obj
 
@@ -1275,7 +1529,7 @@ class ComponentListSerializer(IdentifiableSerializer):
 
     def process_premake(self):
         obj, _ = self._meta.model.get_or_create(
-            data_structure =self._wrapper._obj,
+            data_structure =self._container._obj,
         )
         return obj
 
@@ -1321,7 +1575,7 @@ class GroupSerializer(ComponentListSerializer):
     def process_premake(self):
         return self._meta.model.get_or_create(
             object_id=self.object_id,
-            wrapper=self._wrapper._obj,
+            wrapper=self._container._obj,
         )
 
 class MeasureListSerializer(ComponentListSerializer):
@@ -1365,9 +1619,10 @@ class DataStructureSerializer(MaintainableSerializer):
         app_name = 'datastructure'
         model_name = 'datastructure'
         namespace_key = 'structure'
-        children_names = ['ConceptSchemeSerializer, CodelistSerializer']
+        children_names = ['ConceptSchemeSerializer', 'CodelistSerializer']
         parents_names = ['DataflowSerializer', 'AttachmentConstraintSerializer']
         structures_field_name = 'datastructures'
+        prefetch_related = ['dimensionlist', 'measurelist', 'attributelist']
 
     def expose_group(self):
         result_list, result_dict = [], {}
@@ -1386,48 +1641,19 @@ class DataStructureSerializer(MaintainableSerializer):
 
     def __post_init__(self, *args, **kwargs):
         super().__post_init__(*args, **kwargs)
-        self.dimension_list, self.dimension_dict = self.expose_components('dimension_list', 'dimension')
-        self.group_list, self.group_dict = self.expose_group()
-        self.measure_list, self.measure_dict = self.expose_components('measure_list', 'primary_measure')
-        self.attribute_list, self.attribute_dict = self.expose_components('attribute_list', 'attribute')
+        # The parsers set the components after the serializer is made
+        if self.data_structure_components is not None:
+            self.dimension_list, self.dimension_dict = self.expose_components('dimension_list', 'dimension')
+            self.group_list, self.group_dict = self.expose_group()
+            self.measure_list, self.measure_dict = self.expose_components('measure_list', 'primary_measure')
+            self.attribute_list, self.attribute_dict = self.expose_components('attribute_list', 'attribute')
         if not self._instance: return
-        serializers = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
         item_set = self._instance.content_constraint
-        self.content_constraint_list = [serializers.ContentConstraintSerializer(item) for item in item_set]
+        serializer = registry.get('ContentConstraint')
+        self.content_constraint_list = [serializer(item) for item in item_set]
         item_set = self._instance.attachment_constraint
         self.attachment_constraint_list = [AttachmentConstraintSerializer(item) for item in item_set]
 
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'CodelistSerializer':
-            # From dimension local_representation 
-            qlist.append(Q(dimension_list__dimension__local_representation__codelist__in=rel_objects.filter(rel_qry)))
-            # From primary_measure local_representation 
-            qlist.append(Q(measure_list__primarymeasure__local_representation__codelist__in=rel_objects.filter(rel_qry)))
-            # From attribute local_representation 
-            qlist.append(Q(attribute_list__attribute__local_representation__codelist__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ConceptSerializer':
-            # From dimension concept_identity and concept_role
-            qlist.append(Q(dimension_list__dimension__concept_identity__wrapper__in=rel_objects.filter(rel_qry)))
-            qlist.append(Q(dimension_list__dimension__concept_role__wrapper__in=rel_objects.filter(rel_qry)))
-            # From primarymeasure concept_identity
-            qlist.append(Q(measure_list__primarymeasure__concept_identity__wrapper__in=rel_objects.filter(rel_qry)))
-            # From attribute concept_identity and concept_role
-            qlist.append(Q(attribute_list__attribute__concept_identity__wrapper__in=rel_objects.filter(rel_qry)))
-            qlist.append(Q(attribute_list__attribute__concept_role__wrapper__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'DataflowSerializer':
-            qlist.append(Q(dataflow__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'AttachmentConstraintSerializer':
-            qlist.append(Q(attachment_constraint__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ContentConstraintSerializer':
-            qlist.append(Q(content_constraint__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
-
 class DataStructuresSerializer(StructuresItemsSerializer):
     data_structure: Iterable[DataStructureSerializer] = field()
 
@@ -1445,24 +1671,9 @@ class DataflowSerializer(MaintainableSerializer):
     def __post_init__(self, *args, **kwargs):
         super().__post_init__(*args, **kwargs)
         if not self._instance: return
-        serializers = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
         item_set = self._instance.content_constraint
-        self.content_constraint_list = [serializers.ContentConstraintSerializer(item) for item in item_set]
-
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'DataStructureSerializer':
-            qlist.append(Q(datastructure__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ProvisionAgreementSerializer':
-            qlist.append(Q(provision_agreement__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ContentConstraintSerializer':
-            qlist.append(Q(content_constraint__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
+        serializer = registry.get('ContentConstraint')
+        self.content_constraint_list = [serializer(item) for item in item_set]
 
 class DataflowsSerializer(StructuresItemsSerializer):
     dataflow : Iterable[DataflowSerializer] = field()
@@ -1482,24 +1693,9 @@ class ProvisionAgreementSerializer(MaintainableSerializer):
     def __post_init__(self, *args, **kwargs):
         super().__post_init__(*args, **kwargs)
         if not self._instance: return
-        serializers = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
         item_set = self._instance.content_constraint
-        self.content_constraint_list = [serializers.ContentConstraintSerializer(item) for item in item_set]
-
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'DataflowSerializer':
-            qlist.append(Q(dataflow__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'DataProviderSchemeSerializer':
-            qlist.append(Q(data_provider__wrapper__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ContentConstraintSerializer':
-            qlist.append(Q(content_constraint__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
+        serializer = registry.get('ContentConstraint')
+        self.content_constraint_list = [serializer(item) for item in item_set]
 
 class ProvisionAgreementsSerializer(StructuresItemsSerializer):
     provision_agreement: Iterable[ProvisionAgreementSerializer] = field()
@@ -1527,7 +1723,7 @@ class AttachmentConstraintAttachmentSerializer(Serializer):
             if getattr(self, attachment):
                 setattr(self, attachment, list(getattr(self, attachment)))
                 for item in getattr(self, attachment):
-                    item._obj.attachment_constraint.add(obj)
+                    self.add_related(item._obj, 'attachment_constraint', obj)
         return obj
 
 class ContentConstraintAttachmentSerializer(Serializer):
@@ -1543,14 +1739,15 @@ class ContentConstraintAttachmentSerializer(Serializer):
         namespace_key = 'structure'
 
     def process_postmake(self, obj):
-        obj = super().postmake(obj)
+        obj = super().process_postmake(obj)
+        # The data provider is a foreign key of the constraint, saved with it
         if self.data_provider:
-            self.m_data_provider.add(obj)
+            obj.data_provider = self.m_data_provider
         for attachment in ['data_structure', 'dataflow', 'provision_agreement']:
             if getattr(self, attachment):
                 setattr(self, attachment, list(getattr(self, attachment)))
                 for item in getattr(self, attachment):
-                    item._obj.content_constraint.add(obj)
+                    self.add_related(item._obj, 'content_constraint', obj)
         return obj
 
 class BaseSubKeySerializer(Serializer):
@@ -1565,8 +1762,8 @@ class SubKeySerializer(BaseSubKeySerializer):
         namespace_key = 'common'
 
     def process_postmake(self):
-        return self._meta.model.objects.create(
-            key=self._wrapper._obj,
+        return self.create_obj(
+            key=self._container._obj,
             component_id=self.component_id,
             value=self.value.text
         )
@@ -1579,8 +1776,8 @@ class CubeRegionKeyValueSerializer(BaseSubKeySerializer):
         namespace_key = 'common'
 
     def process_postmake(self):
-        return self._meta.model.objects.create(
-            key=self._wrapper._obj,
+        return self.create_obj(
+            key=self._container._obj,
             value=self.value.text
         )
 
@@ -1593,8 +1790,8 @@ class KeySerializer(Serializer):
         namespace_key = 'structure'
 
     def process_premake(self):
-        return self._meta.model.objects.create(
-            key_set=self._wrapper._obj,
+        return self.create_obj(
+            key_set=self._container._obj,
         )
 
 class TimePeriodSerializer(StringSerializer):
@@ -1607,7 +1804,7 @@ class TimePeriodSerializer(StringSerializer):
         namespace_key = 'structure'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             time_period=self.text,
             is_inclusive=self.inclusive
         )
@@ -1624,8 +1821,8 @@ class TimeRangeSerializer(CommonSerializer):
         after_period = self.m_after_period if self.after_period else None 
         start_period = self.m_start_period if self.start_period else None 
         end_period = self.m_end_period if self.end_period else None 
-        obj, _ = self._meta.model.objects.get_or_create(
-            cube_region_key=self._wrapper._obj,
+        obj, _ = self.get_or_create_obj(
+            cube_region_key=self._container._obj,
             before_period=before_period,
             after_period=after_period,
             start_period=start_period,
@@ -1644,8 +1841,8 @@ class CubeRegionKeySerializer(Serializer):
         namespace_key = 'common'
 
     def process_postmake(self):
-        return self._meta.model.objects.create(
-            cube_region=self._wrapper._obj,
+        return self.create_obj(
+            cube_region=self._container._obj,
             component_id=self.component_id,
         )
 
@@ -1659,14 +1856,14 @@ class DataKeySetSerializer(Serializer):
         namespace_key = 'structure'
 
     def process_premake(self):
-        if self._wrapper._meta.object_name == 'AttachmentConstraintSerializer':
-            return self._meta.model.objects.create(
-                attachment_constraint=self._wrapper._obj,
+        if self._container._meta.object_name == 'AttachmentConstraintSerializer':
+            return self.create_obj(
+                attachment_constraint=self._container._obj,
                 is_included=self.is_included
             )
         else:
-            return self._meta.model.objects.create(
-                content_constraint=self._wrapper._obj,
+            return self.create_obj(
+                content_constraint=self._container._obj,
                 is_included=self.is_included
             )
 
@@ -1681,8 +1878,8 @@ class CubeRegionSerializer(Serializer):
         namespace_key = 'common'
 
     def process_premake(self):
-        return self._meta.model.objects.create(
-            content_constraint=self._wrapper._obj,
+        return self.create_obj(
+            content_constraint=self._container._obj,
             include=self.include
         )
 
@@ -1696,17 +1893,7 @@ class AttachmentConstraintSerializer(MaintainableSerializer):
         namespace_key = 'structure'
         children_names = 'DataStructureSerializer'
         structures_field_name = 'constraints'
-
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'DataStructureSerializer':
-            qlist.append(Q(datastructure__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
+        prefetch_related = ['data_structures', 'keyset_set']
 
 class ReleaseCalendarSerializer(Serializer):
     periodicity: StringSerializer = field(is_text=True)
@@ -1719,7 +1906,7 @@ class ReleaseCalendarSerializer(Serializer):
         namespace_key = 'structure'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             periodicity=self.periodicity,
             offset=self.offset,
             tolerance=self.tolerance
@@ -1736,7 +1923,7 @@ class ReferencePeriodSerializer(Serializer):
         namespace_key = 'common'
 
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
+        obj, _ = self.get_or_create_obj(
             start_time = self.start_time,
             end_time = self.end_time
         )
@@ -1756,8 +1943,9 @@ class ContentConstraintSerializer(MaintainableSerializer):
         namespace_key = 'structure'
         children_names = ['DataProviderSchemeSerializer',
                           'DataStructureSerializer', 'DataflowSerializer',
-                          'ProvisionAgreementsSerializer']
+                          'ProvisionAgreementSerializer']
         structures_field_name = 'constraints'
+        prefetch_related = ['data_structures', 'dataflows', 'provision_agreements']
 
     def process_postmake(self, obj):
         obj = super().process_postmake(obj)
@@ -1768,23 +1956,6 @@ class ContentConstraintSerializer(MaintainableSerializer):
         obj.tipe = self.tipe
         return obj
 
-    @classmethod
-    def make_related_query(cls, related_cls, context):
-        qlist = []
-        qrs = context.queries
-        qlist.append(qrs[cls])
-        rel_qry = qrs[related_cls]
-        rel_objects = related_cls._meta.model.objects
-        if related_cls._meta.object_name == 'DataStructureSerializer':
-            qlist.append(Q(datastructure__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'DataflowSerializer':
-            qlist.append(Q(dataflow__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'ProvisionAgreementSerializer':
-            qlist.append(Q(provisionagreement__in=rel_objects.filter(rel_qry)))
-        elif related_cls._meta.object_name == 'DataProviderSchemeSerializer':
-            qlist.append(Q(organisation__wrappers__in=rel_objects.filter(rel_qry)))
-        return functools.reduce(lambda x, y: x | y, qlist)
-
 class ConstraintsSerializer(StructuresItemsSerializer):
     attachment_constraint: Iterable[AttachmentConstraintSerializer] = field()
     content_constraint: Iterable[ContentConstraintSerializer] = field()
@@ -1828,24 +1999,63 @@ class StructuresSerializer(Serializer):
         if subfield:  value = list(subfield.copy())
         return value
 
-    def __post_init__(self, *args, **kwargs):
-        super().__post_init__(*args, **kwargs)
-        # Expose maintainable lists higher up as lists and as dict
-        for fld in self._meta.fields:
-            for subfld in field._meta.fields:
-                maintainable_list, maintainable_dict = self.expose(fld.name, subfld.name)
-                setattr(self, f'{subfld.name}_list', maintainable_list)
-                setattr(self, f'{subfld.name}_dict', maintainable_dict)
-        
-    def retrieve_restful(self, context):
+    def plan_restful(self, context):
         for f in self._meta.fields:
             if f.name not in context.structures_field_names: continue
             f.type._make_query_args(context)
+
+    def retrieve_restful(self, context, plan=True):
+        if plan: self.plan_restful(context)
         for f in self._meta.fields:
             if f.name not in context.all_structures: continue
             value = f.type()
             value.retrieve_restful(context)
             setattr(self, f.name, value)
+        return self
+
+    def plan_restful_batch(self, context, queries):
+        """
+        Sets the queries of the artefacts of many RESTful queries
+
+        The root query of each distinct entry is OR-ed into the query of its
+        maintainable class, then the references of each class are resolved
+        from the root queries alone and OR-ed into the queries of the
+        referenced classes, so that they do not depend on the order of the
+        entries.
+
+        Parameters
+        ----------
+        context: RESTfulQueryContextOptions
+            The context of the batch, its query holds the detail and the
+            references applied to all the entries
+        queries: Iterable[RESTfulQuery]
+            The entries of the batch, duplicates are planned once
+        """
+        batch = context.query
+        for query in dict.fromkeys(queries):
+            context.set_query(replace(query, references='none'))
+            self.plan_restful(context)
+        context.set_query(batch)
+        if batch.references == 'none': return
+        planned = context.queries
+        roots = dict(planned)
+        for cls, root in roots.items():
+            context.queries = defaultdict(Q, {cls: root})
+            cls._make_references_query_args(context)
+            for related_cls, query in context.queries.items():
+                if related_cls is cls and query is root: continue
+                if related_cls in planned:
+                    query = planned[related_cls] | query
+                planned[related_cls] = query
+        context.queries = planned
+
+    def retrieve_restful_batch(self, context, queries):
+        """
+        Retrieves the artefacts of many RESTful queries at once, each
+        maintainable class with a single query, see `plan_restful_batch`
+        """
+        self.plan_restful_batch(context, queries)
+        return self.retrieve_restful(context, plan=False)
 
 class FooterMessageSerializer(Serializer):
 
@@ -1892,14 +2102,12 @@ class StructureSerializer(BaseSDMXMessageSerializer):
             action='Replace',
             external_dependencies=True
         ) 
-        sender = PartySerializer(object_id='ECB')
-        receiver = PartySerializer(object_id='FIESTA')
         header = HeaderSerializer(
-            object_id='SID1',
-            test=False,
+            object_id=self.header.object_id,
+            test=self.header.test,
             prepared=datetime.now(),
-            sender=sender,
-            receiver=receiver
+            sender=self.header.sender,
+            receiver=PartySerializer(object_id=api_settings.DEFAULT_SENDER_ID)
         )
         return RegistryInterfaceSubmitStructureRequestSerializer(
             header=header,
@@ -1908,24 +2116,37 @@ class StructureSerializer(BaseSDMXMessageSerializer):
 
     def retrieve_restful(self, context):
         self.structures = StructuresSerializer().retrieve_restful(context)
-        self.header = HeaderSerializer().to_structure(context.log.restful_query)
+        self.header = HeaderSerializer().to_structure(context.query.log)
+        return self
+
+    def retrieve_restful_batch(self, context, queries, log):
+        self.structures = StructuresSerializer().retrieve_restful_batch(
+            context, queries)
+        self.header = HeaderSerializer().to_structure(log)
+        return self
 
 class SubmittedStructureSerializer(RegistrySerializer):
     maintainable_object: MaintainableReferenceSerializer = field()
     action: str = field(is_attribute=True)
     external_dependencies: bool = field(is_attribute=True)
 
-    def to_result(self):
+    def to_result(self, context):
         new_self = self.__class__(
             maintainable_object=self.maintainable_object,
-            action=self.action or self._context.action,
-            external_dependencies=self.external_dependencies or self._context.external_dependencies
+            action=self.action or context.action,
+            external_dependencies=self.external_dependencies or context.external_dependencies
         )
+        status_message = StatusMessageSerializer()
+        status_message._context = context
         return SubmissionResultSerializer(
             submitted_structure=new_self,
-            status_message=StatusMessageSerializer()
+            status_message=status_message
         )
 
+    def process_prevalidate(self):
+        # Stored by its submission result
+        self._stop = True
+
 class SubmitStructureRequestSerializer(Serializer):
     structure_location: str = field() 
     structures: StructuresSerializer = field()
@@ -1939,12 +2160,14 @@ class SubmitStructureRequestSerializer(Serializer):
         namespace_key = 'registry'
 
     def __post_init__(self, *args, **kwargs):
+        super().__post_init__(*args, **kwargs)
         if self._instance:
-            self.action = self._instance.ACTION_CHOICES[self.action]
+            self.action = self._instance.get_action_display()
 
 
     def process_prevalidate(self):
         if not self.structures:
+            from ...external import Request as ExternalRequest
             header = self.create_structure_header()
             try:
                 external_request = ExternalRequest(header)
@@ -1961,15 +2184,16 @@ class SubmitStructureRequestSerializer(Serializer):
                 self.structures = structure.structures
         self._context.action = self.action
         self._context.external_dependencies = self.external_dependencies
-        for submitted_structure in self.submitted_structure:
-            self._context.get_or_add_result(submitted_structure.to_result())
+        for submitted_structure in self.submitted_structure or ():
+            self._context.get_or_add_result(submitted_structure.to_result(self._context))
 
     def process_premake(self):
-        obj = self._meta.model.objects.create(
-            submission=self._wrapper.m_header,
+        from ...apps.registry.abstract_models import Action
+        obj = self.create_obj(
+            header=self._container.m_header,
             structure_location=self.structure_location,
-            action=self._model.ACTION_CHOICES[self.action],
-            external_dependencies=self.external_dependencies
+            action=Action[(self.action or 'Append').upper()],
+            external_dependencies=bool(self.external_dependencies)
         )
         return obj
 
@@ -1982,11 +2206,16 @@ class StatusMessageTextSerializer(TextSerializer):
     text: Iterable[TextSerializer] = field(namespace_key='common')
     code: str = field(is_attribute=True)
 
+    class Meta:
+        app_name = 'registry'
+        model_name = 'errorcode'
+        namespace_key = 'registry'
+
     def process_premake(self):
-        obj, _ = self._meta.model.objects.get_or_create(
-            code = self.code 
+        return self.create_obj(
+            status_message=self._container._obj,
+            code=self.code
         )
-        return obj
 
 class StatusMessageSerializer(Serializer):
     message_text: Iterable[StatusMessageTextSerializer] = field()
@@ -1998,8 +2227,8 @@ class StatusMessageSerializer(Serializer):
         namespace_key = 'registry'
 
     def process_premake(self):
-        obj = self._meta.model.objects.create(
-            status=self.status
+        obj = self.create_obj(
+            status=self._meta.model.Status[self.status.upper()]
         )
         return obj
 
@@ -2016,7 +2245,7 @@ class StatusMessageSerializer(Serializer):
         language = (get_language(self._context.request.LANGUAGE_CODE))
         with translation.override(language):
             text_entry = ': '.join(filter(None, [translation.gettext(message.text), detail]))
-            text = [TextSerializer(language, text_entry)]
+            text = [TextSerializer(lang=language, text=text_entry)]
         self.message_text.append(StatusMessageTextSerializer(text=text, code=message.code))
 
 class SubmissionResultSerializer(Serializer):
@@ -2029,10 +2258,11 @@ class SubmissionResultSerializer(Serializer):
         namespace_key = 'registry'
 
     def process_premake(self):
-        return self._meta.model.objects.create(
-            structure_submission=self._wrapper._obj,
-            action = self._context.result.submitted_structure.action,
-            external_dependencies = self._context.result.submitted_structure.external_dependencies,
+        from ...apps.registry.abstract_models import Action
+        return self.create_obj(
+            submit_structure_request=self._container._obj,
+            action=Action[self.submitted_structure.action.upper()],
+            external_dependencies=self.submitted_structure.external_dependencies,
         )
 
     def process_postmake(self, obj):
@@ -2180,7 +2410,7 @@ class SubmitRegistrationsRequestSerializer(RegistrySerializer):
     registration_request: Iterable[RegistrationRequestSerializer] = field()
 
     def process_premake(self):
-        return self._wrapper.m_header 
+        return self._container.m_header 
 
     def to_response(self):
         return SubmitRegistrationsResponseSerializer(
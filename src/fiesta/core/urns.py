@@ -0,0 +1,166 @@
+# urns.py
+
+import re
+
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import islice
+
+from django.apps import apps
+
+# urn:sdmx:org.sdmx.infomodel.package-name.class-name=agency-id:object-id(version)
+MAINTAINABLE_URN = re.compile(
+    r'^urn:sdmx:org\.sdmx\.infomodel\.(?P<package>[a-z]+)\.'
+    r'(?P<class_name>[A-Za-z]+)=(?P<agency_id>[A-Za-z0-9_@$\-.]+):'
+    r'(?P<object_id>[A-Za-z0-9_@$\-]+)\((?P<version>[A-Za-z0-9.+*]+)\)'
+    r'(\.(?P<item_id>[A-Za-z0-9_@$\-.]+))?$'
+)
+
+CLASS2RESOURCE = {
+    'AgencyScheme': 'agencyscheme',
+    'DataProviderScheme': 'dataproviderscheme',
+    'DataConsumerScheme': 'dataconsumerscheme',
+    'OrganisationUnitScheme': 'organisationunitscheme',
+    'Codelist': 'codelist',
+    'ConceptScheme': 'conceptscheme',
+    'DataStructure': 'datastructure',
+    'Dataflow': 'dataflow',
+}
+
+ITEM2SCHEME = {
+    'Agency': 'AgencyScheme',
+    'DataProvider': 'DataProviderScheme',
+    'DataConsumer': 'DataConsumerScheme',
+    'OrganisationUnit': 'OrganisationUnitScheme',
+    'Code': 'Codelist',
+    'Concept': 'ConceptScheme',
+}
+
+@dataclass(frozen=True)
+class URN:
+    package: str
+    class_name: str
+    agency_id: str
+    object_id: str
+    version: str
+    item_id: str = None
+
+    @property
+    def resource(self):
+        """The RESTful resource of the artefact or of the scheme of the item"""
+        return CLASS2RESOURCE[ITEM2SCHEME.get(self.class_name, self.class_name)]
+
+    def __str__(self):
+        return make_urn(self.package, self.class_name, self.agency_id,
+                        self.object_id, self.version, self.item_id)
+
+def canonical_version(version):
+    """Returns the version as in URNs, e.g. 1.0 for the stored 1.0.0"""
+    version = str(version)
+    parts = version.split('.')
+    if len(parts) == 3 and parts[2] == '0':
+        return '.'.join(parts[:2])
+    return version
+
+def make_urn(package, class_name, agency_id, object_id, version, item_id=None):
+    """Returns the URN of a maintainable artefact or of one of its items"""
+    urn = (f'urn:sdmx:org.sdmx.infomodel.{package}.{class_name}='
+           f'{agency_id}:{object_id}({canonical_version(version)})')
+    return f'{urn}.{item_id}' if item_id else urn
+
+def make_item_urn(container_urn, class_name, item_id):
+    """Returns the URN of an item from the URN of its item scheme"""
+    prefix, reference = container_urn.split('=', 1)
+    return f'{prefix.rsplit(".", 1)[0]}.{class_name}={reference}.{item_id}'
+
+def parse_urn(urn, strict=True):
+    """
+    Parses the URN of a maintainable artefact or of one of its items
+
+    Parameters
+    ----------
+    strict: bool
+        Whether only the artefacts of the RESTful resources and their items
+        are accepted
+
+    Raises
+    ------
+    ValueError
+        If the URN is malformed or its class is not a supported maintainable
+        or item
+    """
+    match = MAINTAINABLE_URN.match(urn.strip())
+    if not match:
+        raise ValueError(f'Malformed URN {urn}')
+    urn = URN(**match.groupdict())
+    if not strict: return urn
+    if urn.class_name in ITEM2SCHEME:
+        if not urn.item_id:
+            raise ValueError(f'URN of item {urn.class_name} has no item ID')
+    elif urn.class_name not in CLASS2RESOURCE or urn.item_id:
+        raise ValueError(f'URN class {urn.class_name} is not supported')
+    return urn
+
+def resolve_urns(urns, using=None, chunk_size=500):
+    """
+    Maps URNs of maintainable artefacts and items to their model instances
+    with one query per model class, or per chunk of its URNs, on the indexed
+    `urn` column
+
+    Returns
+    -------
+        A dictionary of the given URN to its instance, URNs that are not
+        stored or whose class has no model, e.g. the agency schemes, are left
+        out
+
+    Raises
+    ------
+    ValueError
+        If a URN is malformed
+    """
+    canonical = defaultdict(dict)
+    for urn in urns:
+        parsed = parse_urn(urn, strict=False)
+        try:
+            model = apps.get_model(parsed.package, parsed.class_name)
+        except LookupError:
+            continue
+        if not hasattr(model, 'get_urn'): continue
+        canonical[model].setdefault(str(parsed), []).append(urn)
+    result = {}
+    for model, keys in canonical.items():
+        keys_iter = iter(keys)
+        while True:
+            chunk = list(islice(keys_iter, chunk_size))
+            if not chunk: break
+            queryset = model._default_manager.using(using).filter(urn__in=chunk)
+            for obj in queryset:
+                for urn in keys[obj.urn]:
+                    result[urn] = obj
+    return result
+
+def fill_urns(apps, app_label, maintainables=(), items=()):
+    """
+    Fills the urn column of the stored artefacts and items of an app, used
+    by the migrations that add the column
+
+    Parameters
+    ----------
+    maintainables: Iterable[str]
+        The model names of the maintainable artefacts
+    items: Iterable[str]
+        The model names of the items, their item schemes are filled first
+    """
+    for name in maintainables:
+        model = apps.get_model(app_label, name)
+        objs = list(model.objects.select_related('agency'))
+        for obj in objs:
+            obj.urn = make_urn(app_label, name, obj.agency.object_id,
+                               obj.object_id, obj.version)
+        model.objects.bulk_update(objs, ['urn'], batch_size=500)
+    for name in items:
+        model = apps.get_model(app_label, name)
+        objs = list(model.objects.select_related('container'))
+        for obj in objs:
+            obj.urn = make_item_urn(obj.container.urn, name, obj.object_id)
+        model.objects.bulk_update(objs, ['urn'], batch_size=500)
@@ -0,0 +1,169 @@
+# validation.py
+
+import logging
+import random
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from lxml import etree
+from rest_framework.exceptions import ParseError
+
+from ..settings import api_settings
+from .urns import make_urn, resolve_urns
+
+logger = logging.getLogger(__name__)
+
+INPUT_MODES = ('always', 'first', 'sample')
+OUTPUT_MODES = ('always', 'debug', 'sample', 'never')
+
+class ValidationStats:
+    """
+    The number of validated and skipped messages of the process and the
+    time spent validating them, per kind of message, input or output
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def record(self, kind, validated, elapsed=0.0):
+        with self.lock:
+            counts = self.counts.setdefault(
+                kind, {'validated': 0, 'skipped': 0, 'seconds': 0.0})
+            counts['validated' if validated else 'skipped'] += 1
+            counts['seconds'] += elapsed
+
+    def snapshot(self):
+        with self.lock:
+            return {kind: dict(counts) for kind, counts in self.counts.items()}
+
+    def reset(self):
+        with self.lock:
+            self.counts = {}
+
+validation_stats = ValidationStats()
+
+def sample(rate):
+    """Whether a message is picked by a sample of rate percent"""
+    return rate >= 100 or (rate > 0 and random.random() * 100 < rate)
+
+def is_trusted(request):
+    """
+    Whether the user of a request is authenticated and its organisation is
+    one of DEFAULT_TRUSTED_SENDERS, the Sender of the message is not trusted
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated: return False
+    organisation = getattr(user, 'organisation', None)
+    return (organisation is not None
+            and organisation.object_id in api_settings.DEFAULT_TRUSTED_SENDERS)
+
+def has_new_artefacts(root):
+    """
+    Whether a message has a maintainable artefact that is not stored yet,
+    the classes that are not stored as maintainables, e.g. the agency schemes,
+    are left out.  A message with an artefact that has no valid URN, e.g. an
+    id with a space, has one too and is left to the validation to reject.
+    """
+    LatestVersion = apps.get_model('registry', 'LatestVersion')
+    packages = {
+        model.__name__: model._meta.app_label
+        for model in LatestVersion.objects.get_maintainable_models()
+    }
+    urns = set()
+    try:
+        for element in root.iterfind('.//{*}Structures/*/*'):
+            class_name = etree.QName(element).localname
+            if class_name not in packages: continue
+            urns.add(make_urn(packages[class_name], class_name, element.get('agencyID'),
+                              element.get('id'), element.get('version', '1.0')))
+        return len(resolve_urns(urns)) < len(urns)
+    except ValueError:
+        return True
+
+def should_validate_input(root, request=None):
+    """
+    Whether a submitted message is validated against the schemas
+
+    The messages of untrusted users are always validated.  A user is
+    trusted if the request is authenticated and its organisation is one of
+    DEFAULT_TRUSTED_SENDERS, its messages are then validated by the
+    DEFAULT_TRUSTED_VALIDATION mode:
+
+        * always: every message
+        * first: the messages with an artefact submitted for the first time
+          and a sample of DEFAULT_TRUSTED_VALIDATION_RATE percent of the rest
+        * sample: a sample of DEFAULT_TRUSTED_VALIDATION_RATE percent
+    """
+    if not is_trusted(request):
+        return True
+    mode = api_settings.DEFAULT_TRUSTED_VALIDATION
+    rate = api_settings.DEFAULT_TRUSTED_VALIDATION_RATE
+    if mode == 'always':
+        return True
+    elif mode == 'first':
+        return sample(rate) or has_new_artefacts(root)
+    elif mode == 'sample':
+        return sample(rate)
+    raise ImproperlyConfigured(
+        f'DEFAULT_TRUSTED_VALIDATION must be one of {", ".join(INPUT_MODES)}')
+
+def should_validate_output():
+    """
+    Whether a rendered message is validated against the schemas, by the
+    DEFAULT_OUTPUT_VALIDATION mode:
+
+        * always: every message
+        * debug: every message when DEBUG is on, none otherwise
+        * sample: a sample of DEFAULT_OUTPUT_VALIDATION_RATE percent
+        * never: no message
+    """
+    mode = api_settings.DEFAULT_OUTPUT_VALIDATION
+    if mode == 'always':
+        return True
+    elif mode == 'debug':
+        return settings.DEBUG
+    elif mode == 'sample':
+        return sample(api_settings.DEFAULT_OUTPUT_VALIDATION_RATE)
+    elif mode == 'never':
+        return False
+    raise ImproperlyConfigured(
+        f'DEFAULT_OUTPUT_VALIDATION must be one of {", ".join(OUTPUT_MODES)}')
+
+def validate(element, schema_class, kind, enabled=True):
+    """
+    Validates a message against its schema, timed in `validation_stats`
+
+    Parameters
+    ----------
+    element: Element
+        The root element of the message
+    schema_class: type
+        The `Schema` of the version of the message
+    kind: str
+        The kind of the message the time is recorded for, input or output
+    enabled: bool
+        Whether the message is validated or only counted as skipped
+
+    Raises
+    ------
+    ParseError
+        With the errors of the schema if the message is invalid
+    """
+    if not enabled:
+        validation_stats.record(kind, False)
+        return
+    started = time.perf_counter()
+    schema = schema_class(element).schema
+    valid = schema(element)
+    elapsed = time.perf_counter() - started
+    validation_stats.record(kind, True, elapsed)
+    logger.debug('Validated %s %s in %.1f ms', kind,
+                 etree.QName(element).localname, elapsed * 1000)
+    if not valid:
+        errors = [(error.line, error.domain, error.type, error.message)
+                  for error in schema.error_log]
+        raise ParseError(errors)
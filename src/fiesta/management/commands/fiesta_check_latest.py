@@ -0,0 +1,33 @@
+# fiesta_check_latest.py
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = (
+        'Checks that the latest version pointers match the stored versions '
+        'of the maintainable artefacts and optionally repairs them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair', action='store_true',
+            help='Refresh the pointers that have drifted')
+
+    def handle(self, *args, **options):
+        LatestVersion = apps.get_model('registry', 'LatestVersion')
+        drifted = 0
+        for model in LatestVersion.objects.get_maintainable_models():
+            for agency_id, object_id in list(LatestVersion.objects.find_drift(model)):
+                drifted += 1
+                self.stdout.write(
+                    f'{model._meta.label}: agency {agency_id} {object_id}')
+                if options['repair']:
+                    LatestVersion.objects.refresh(model, agency_id, object_id)
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Latest versions are consistent'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {drifted} pointers'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{drifted} pointers have drifted, run with --repair'))
@@ -0,0 +1,321 @@
+# fiesta_export.py
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import django
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+
+from ...core.serializers.options import RESTfulQuery, RESTfulQueryContextOptions
+from ...core.urns import CLASS2RESOURCE, canonical_version, make_urn
+from ...settings import api_settings
+
+MANIFEST = 'manifest.json'
+
+@dataclass
+class Partition:
+    """
+    The maintainables of a class and an agency to export
+
+    artefacts maps the URNs to the revisions of the artefacts, the highest
+    primary key of their submitted structures, and versions the URNs to the
+    object ids and versions to query.
+    """
+    resource: str
+    agency_id: str
+    artefacts: dict = field(default_factory=dict)
+    versions: dict = field(default_factory=dict)
+
+    @property
+    def label(self):
+        return f'{self.resource} {self.agency_id}'
+
+@dataclass
+class Exported:
+    partition: Partition
+    files: dict = field(default_factory=dict)
+    error: str = None
+    size: int = 0
+    elapsed: float = 0
+
+def get_partitions():
+    """Returns the stored maintainables partitioned by class and agency"""
+    LatestVersion = apps.get_model('registry', 'LatestVersion')
+    partitions = {}
+    for model in LatestVersion.objects.get_maintainable_models():
+        resource = CLASS2RESOURCE.get(model.__name__)
+        # Only the RESTful resources can be retrieved
+        if not resource: continue
+        rows = model._default_manager.annotate(
+            revision=Max('submitted_structure')
+        ).values_list('agency__object_id', 'object_id', 'version', 'revision')
+        for agency_id, object_id, version, revision in rows.order_by(
+                'agency__object_id', 'object_id', 'version').iterator():
+            key = (resource, agency_id)
+            if key not in partitions:
+                partitions[key] = Partition(resource, agency_id)
+            urn = make_urn(model._meta.app_label, model.__name__, agency_id,
+                           object_id, version)
+            partitions[key].artefacts[urn] = revision
+            partitions[key].versions[urn] = (object_id, str(version))
+    return list(partitions.values())
+
+def get_path(per, resource, agency_id, object_id=None, version=None):
+    """Returns the path of a file relative to the export directory"""
+    if per == 'agency':
+        return os.path.join(resource, f'{agency_id}.xml.gz')
+    return os.path.join(
+        resource, agency_id, f'{object_id}-{canonical_version(version)}.xml.gz')
+
+def get_changed(partitions, manifest, per):
+    """
+    Returns the partitions with the artefacts changed since the manifest,
+    i.e. whole partitions per agency and only the changed artefacts per
+    artefact, and the files of the manifest that are kept
+    """
+    previous = {}
+    for path, entry in manifest.get('files', {}).items():
+        previous.update((urn, (path, revision))
+                        for urn, revision in entry['artefacts'].items())
+    changed = []
+    kept = set()
+    for partition in partitions:
+        urns = [urn for urn, revision in partition.artefacts.items()
+                if previous.get(urn, (None, -1))[1] != revision]
+        if per == 'agency':
+            path = get_path(per, partition.resource, partition.agency_id)
+            entry = manifest.get('files', {}).get(path)
+            if urns or not entry or len(entry['artefacts']) != len(partition.artefacts):
+                changed.append(partition)
+            else:
+                kept.add(path)
+            continue
+        kept.update(previous[urn][0] for urn in partition.artefacts
+                    if urn in previous and urn not in urns)
+        if urns:
+            changed.append(Partition(
+                partition.resource, partition.agency_id,
+                {urn: partition.artefacts[urn] for urn in urns},
+                {urn: partition.versions[urn] for urn in urns}))
+    return changed, kept
+
+def split_structures(structures):
+    """Yields each maintainable of the structures with structures of its own"""
+    from ...core.serializers.structure import StructuresSerializer
+    for f in structures._meta.fields:
+        container = getattr(structures, f.name, None)
+        if not container: continue
+        for g in container._meta.fields:
+            for maintainable in getattr(container, g.name, None) or ():
+                yield maintainable, StructuresSerializer(
+                    **{f.name: f.type(**{g.name: [maintainable]})})
+
+def write_message(directory, path, structures, resource, compresslevel):
+    """
+    Streams a structure message into a gzip file, replaced only when it is
+    whole
+
+    Returns
+    -------
+    (int, str)
+        The size and the SHA-256 of the compressed file
+    """
+    from ...core.serializers.structure import (
+        HeaderSerializer, PartySerializer, StructureSerializer)
+    from ...renderers import XMLRenderer
+    message = StructureSerializer(
+        header=HeaderSerializer(
+            object_id=f'EXPORT{os.getpid()}',
+            test=False,
+            prepared=datetime.now(),
+            sender=PartySerializer(object_id=api_settings.DEFAULT_SENDER_ID),
+            receiver=PartySerializer(object_id='not_supplied'),
+        ),
+        structures=structures,
+    )
+    target = os.path.join(directory, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f'{target}.tmp'
+    with gzip.open(temporary, 'wb', compresslevel=compresslevel) as f:
+        for chunk in XMLRenderer().stream(message, resource=resource, detail='full'):
+            f.write(chunk)
+    os.replace(temporary, target)
+    digest = hashlib.sha256()
+    with open(target, 'rb') as f:
+        for block in iter(lambda: f.read(2 ** 20), b''):
+            digest.update(block)
+    return os.path.getsize(target), digest.hexdigest()
+
+def export_partition(partition, directory, per, compresslevel):
+    """
+    Retrieves the artefacts of a partition with a single batch query and
+    writes their files, run in the worker processes
+    """
+    from ...core.serializers.structure import StructuresSerializer
+    started = time.perf_counter()
+    exported = Exported(partition)
+    try:
+        context = RESTfulQueryContextOptions(
+            RESTfulQuery(resource='structure', version='all'))
+        queries = [
+            RESTfulQuery(resource=partition.resource, agency_id=partition.agency_id,
+                         resource_id=object_id, version=version)
+            for object_id, version in partition.versions.values()
+        ]
+        structures = StructuresSerializer().retrieve_restful_batch(context, queries)
+        if per == 'agency':
+            path = get_path(per, partition.resource, partition.agency_id)
+            messages = [(path, structures, partition.artefacts)]
+        else:
+            revisions = {
+                (object_id, canonical_version(version)): (urn, partition.artefacts[urn])
+                for urn, (object_id, version) in partition.versions.items()
+            }
+            messages = []
+            for maintainable, single in split_structures(structures):
+                key = (maintainable.object_id, canonical_version(maintainable.version))
+                urn, revision = revisions[key]
+                path = get_path(per, partition.resource, partition.agency_id, *key)
+                messages.append((path, single, {urn: revision}))
+        for path, structures, artefacts in messages:
+            size, sha256 = write_message(
+                directory, path, structures, partition.resource, compresslevel)
+            exported.size += size
+            exported.files[path] = {
+                'resource': partition.resource,
+                'agency': partition.agency_id,
+                'artefacts': artefacts,
+                'size': size,
+                'sha256': sha256,
+            }
+    except Exception as exc:
+        exported.error = f'{exc.__class__.__name__}: {exc}'
+    exported.elapsed = time.perf_counter() - started
+    return exported
+
+class Command(BaseCommand):
+    help = (
+        'Exports every stored version of the maintainable artefacts to '
+        'gzipped SDMX-ML 2.1 structure messages per agency or per artefact, '
+        'rendered in worker processes, with a manifest of the files'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory', help='The directory of the files and of the manifest')
+        parser.add_argument(
+            '--per', choices=['agency', 'artefact'], default='agency',
+            help='Write a file per class and agency or per artefact')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes that render the partitions')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Export only the artefacts changed since the last manifest')
+        parser.add_argument(
+            '--compresslevel', type=int, default=6, choices=range(1, 10),
+            help='The gzip compression level')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        per = options['per']
+        os.makedirs(directory, exist_ok=True)
+        manifest = self.read_manifest(directory) if options['incremental'] else {}
+        if manifest and manifest.get('per') != per:
+            raise CommandError(
+                f'The last export was per {manifest.get("per")}, not per {per}')
+        partitions = get_partitions()
+        changed, kept = get_changed(partitions, manifest, per)
+        files = {path: entry for path, entry in manifest.get('files', {}).items()
+                 if path in kept}
+        self.stdout.write(
+            f'Exporting {sum(len(p.artefacts) for p in changed)} artefacts of '
+            f'{len(changed)} partitions, {len(files)} files unchanged')
+        failures = self.export(changed, directory, per, options, files)
+        # The files of the failed partitions are kept with their previous
+        # revisions, so that they are exported again by the next run
+        for path, entry in manifest.get('files', {}).items():
+            if (entry['resource'], entry['agency']) in failures:
+                files.setdefault(path, entry)
+        for path in manifest.get('files', {}):
+            if path not in files:
+                self.remove(directory, path)
+        self.write_manifest(directory, per, files)
+        if failures:
+            raise CommandError(f'{len(failures)} partitions failed to export')
+
+    def export(self, partitions, directory, per, options, files):
+        """
+        Exports the partitions in a process pool, returns the class and
+        agency of the failed ones
+        """
+        started = time.perf_counter()
+        size = 0
+        artefacts = 0
+        failures = set()
+        # Forked workers must not share the database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1),
+                                 initializer=django.setup) as executor:
+            futures = [
+                executor.submit(export_partition, partition, directory, per,
+                                options['compresslevel'])
+                for partition in partitions
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                exported = future.result()
+                prefix = f'[{done}/{len(partitions)}] {exported.partition.label}'
+                if exported.error:
+                    failures.add((exported.partition.resource, exported.partition.agency_id))
+                    self.stdout.write(self.style.ERROR(f'{prefix}: {exported.error}'))
+                    continue
+                files.update(exported.files)
+                size += exported.size
+                artefacts += len(exported.partition.artefacts)
+                self.stdout.write(
+                    f'{prefix}: {len(exported.partition.artefacts)} artefacts, '
+                    f'{len(exported.files)} files, {exported.size / 2 ** 20:.1f} MiB '
+                    f'in {exported.elapsed:.2f}s')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Exported {artefacts} artefacts, {size / 2 ** 20:.1f} MiB in '
+            f'{elapsed:.1f}s ({artefacts / elapsed if elapsed else 0:.1f} artefacts/s)')
+        return failures
+
+    def read_manifest(self, directory):
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write_manifest(self, directory, per, files):
+        manifest = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'per': per,
+            'files': dict(sorted(files.items())),
+        }
+        path = os.path.join(directory, MANIFEST)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f'{path}.tmp', path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {path} of {len(files)} files'))
+
+    def remove(self, directory, path):
+        """Removes the file of artefacts that are no longer stored"""
+        try:
+            os.remove(os.path.join(directory, path))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,435 @@
+# fiesta_import.py
+
+import glob
+import os
+import time
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from zipfile import BadZipFile, ZipFile, is_zipfile
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.http import HttpRequest
+from lxml import etree
+from rest_framework.exceptions import ParseError
+
+from ...core.constants import NAMESPACE_MAP
+from ...core.schema import Schema21
+from ...core.serializers.options import ProcessContextOptions
+from ...core.urns import ITEM2SCHEME, canonical_version, parse_urn
+from ...parsers import XMLParser21
+from ...parsers.xml import pool
+
+MESSAGE = NAMESPACE_MAP['message']
+
+@dataclass(frozen=True)
+class Source:
+    """A structure message file or a member of a zip archive"""
+    path: str
+    member: str = None
+
+    def __str__(self):
+        return f'{self.path}:{self.member}' if self.member else self.path
+
+    def read(self):
+        if self.member is None:
+            with open(self.path, 'rb') as f:
+                return f.read()
+        with ZipFile(self.path) as zf:
+            return zf.read(self.member)
+
+@dataclass
+class Artefact:
+    """
+    A maintainable artefact of a parsed file
+
+    key is (class, agency, id, version) and references are the keys of the
+    maintainables it refers to, the class of a reference is None when only
+    the maintainable of a component is known.
+    """
+    key: tuple
+    container: str
+    element: bytes
+    source: str
+    references: frozenset = frozenset()
+
+@dataclass
+class Parsed:
+    source: str
+    artefacts: list = field(default_factory=list)
+    error: str = None
+    size: int = 0
+    elapsed: float = 0
+
+def get_sources(paths):
+    """
+    Expands directories, glob patterns and zip archives to the structure
+    messages they hold, in a stable order
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path) for name in names
+                if name.lower().endswith(('.xml', '.zip')))
+        else:
+            files = sorted(glob.glob(path, recursive=True)) or [path]
+        for name in files:
+            if not os.path.isfile(name):
+                raise CommandError(f'{name} is not a file')
+            if is_zipfile(name):
+                with ZipFile(name) as zf:
+                    sources.extend(
+                        Source(name, info.filename) for info in zf.infolist()
+                        if not info.is_dir())
+            else:
+                sources.append(Source(name))
+    return sources
+
+def get_reference_key(ref):
+    """Returns the key of the maintainable of a Ref element, if not local"""
+    agency_id = ref.get('agencyID')
+    if agency_id is None: return
+    parent_id = ref.get('maintainableParentID')
+    if parent_id is None:
+        version = ref.get('version', '1.0')
+        return ref.get('class'), agency_id, ref.get('id'), canonical_version(version)
+    version = ref.get('maintainableParentVersion', '1.0')
+    return (ITEM2SCHEME.get(ref.get('class')), agency_id, parent_id,
+            canonical_version(version))
+
+def get_urn_key(urn):
+    try:
+        urn = parse_urn(urn, strict=False)
+    except ValueError:
+        return
+    class_name = urn.class_name
+    if urn.item_id: class_name = ITEM2SCHEME.get(class_name)
+    return class_name, urn.agency_id, urn.object_id, canonical_version(urn.version)
+
+def get_artefacts(root, source):
+    """Splits the Structures of a message into its maintainable artefacts"""
+    artefacts = []
+    for container in root.iterfind(f'{{{MESSAGE}}}Structures/*'):
+        for element in container:
+            if not isinstance(element.tag, str): continue
+            key = (etree.QName(element).localname, element.get('agencyID'),
+                   element.get('id'), canonical_version(element.get('version', '1.0')))
+            references = set()
+            for child in element.iter('Ref', '{*}URN'):
+                if child.tag == 'Ref':
+                    reference = get_reference_key(child)
+                else:
+                    reference = get_urn_key(child.text or '')
+                if reference and reference[1:] != key[1:]:
+                    references.add(reference)
+            artefacts.append(Artefact(
+                key=key,
+                container=container.tag,
+                element=etree.tostring(element),
+                source=source,
+                references=frozenset(references)
+            ))
+    return artefacts
+
+# The XSD schema of each worker process, parsed once
+_schema = None
+
+def parse_source(source, validate=True):
+    """
+    Parses and validates a structure message, run in the worker processes
+    so only plain data is returned
+    """
+    global _schema
+    started = time.perf_counter()
+    parsed = Parsed(str(source))
+    try:
+        content = source.read()
+        parsed.size = len(content)
+        root = pool.fromstring(content)
+        if etree.QName(root).localname != 'Structure':
+            raise ValueError(f'{etree.QName(root).localname} is not a structure message')
+        if validate:
+            if _schema is None: _schema = Schema21(root).schema
+            if not _schema(root):
+                error = _schema.error_log.last_error
+                raise ValueError(f'line {error.line}: {error.message}')
+        parsed.artefacts = get_artefacts(root, parsed.source)
+    except (OSError, BadZipFile, etree.XMLSyntaxError, ParseError, ValueError) as exc:
+        parsed.error = str(exc)
+    parsed.elapsed = time.perf_counter() - started
+    return parsed
+
+def get_levels(artefacts):
+    """
+    Orders the artefacts by dependency across files
+
+    The level of an artefact is one more than the highest level of the
+    imported artefacts it refers to, so the artefacts of a level only refer
+    to the stored ones and to the artefacts of lower levels. References to
+    artefacts that are not imported are left to be resolved from the
+    database.
+
+    Returns
+    -------
+    (levels, cyclic)
+        The artefacts of each level and the artefacts in reference cycles
+    """
+    by_id = defaultdict(list)
+    for artefact in artefacts:
+        by_id[artefact.key[1:]].append(artefact.key)
+    dependencies = {}
+    for artefact in artefacts:
+        keys = set()
+        for reference in artefact.references:
+            for key in by_id.get(reference[1:], ()):
+                if reference[0] in (None, key[0]): keys.add(key)
+        dependencies[artefact.key] = keys
+    level = {}
+    pending = dict(dependencies)
+    while pending:
+        ready = {key: 1 + max((level[k] for k in keys), default=-1)
+                 for key, keys in pending.items() if keys.issubset(level)}
+        if not ready: break
+        level.update(ready)
+        for key in ready: del pending[key]
+    levels = defaultdict(list)
+    cyclic = []
+    for artefact in artefacts:
+        if artefact.key in level:
+            levels[level[artefact.key]].append(artefact)
+        else:
+            cyclic.append(artefact)
+    return [levels[index] for index in sorted(levels)], cyclic
+
+def make_message(artefacts, sender):
+    """Returns the root of a structure message of the artefacts"""
+    nsmap = {'mes': MESSAGE, 'str': NAMESPACE_MAP['structure'],
+             'com': NAMESPACE_MAP['common']}
+    root = etree.Element(f'{{{MESSAGE}}}Structure', nsmap=nsmap)
+    header = etree.SubElement(root, f'{{{MESSAGE}}}Header')
+    etree.SubElement(header, f'{{{MESSAGE}}}ID').text = 'IMPORT'
+    etree.SubElement(header, f'{{{MESSAGE}}}Test').text = 'false'
+    etree.SubElement(header, f'{{{MESSAGE}}}Prepared').text = (
+        datetime.now().isoformat(timespec='seconds'))
+    etree.SubElement(header, f'{{{MESSAGE}}}Sender', id=sender)
+    structures = etree.SubElement(root, f'{{{MESSAGE}}}Structures')
+    containers = {}
+    for artefact in artefacts:
+        if artefact.container not in containers:
+            containers[artefact.container] = etree.SubElement(
+                structures, artefact.container)
+        containers[artefact.container].append(etree.fromstring(artefact.element))
+    return root
+
+class Command(BaseCommand):
+    help = (
+        'Imports the artefacts of directories, glob patterns or zip archives '
+        'of SDMX-ML 2.1 structure messages, parsed in a process pool and '
+        'submitted in dependency order in a few large transactions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Structure message files, directories, glob patterns or zip archives')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes that parse the files')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Maximum number of artefacts submitted in a transaction')
+        parser.add_argument(
+            '--username', default=None,
+            help='The user of the submissions, by default the first superuser')
+        parser.add_argument(
+            '--sender', default='FIESTA',
+            help='The sender of the submitted messages')
+        parser.add_argument(
+            '--no-validate', action='store_false', dest='validate',
+            help='Skip the XSD validation of the files')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only validate the artefacts against an in-memory store')
+
+    def handle(self, *args, **options):
+        sources = get_sources(options['paths'])
+        if not sources:
+            raise CommandError('No structure messages found')
+        self.failures = defaultdict(list)
+        self.imported = defaultdict(int)
+        self.counts = defaultdict(int)
+        log = self.create_log(options['username'])
+        log.update_progress(log.Progress.PARSING)
+        artefacts = self.parse(sources, options['workers'], options['validate'])
+        log.update_progress(log.Progress.PROCESSING)
+        self.submit(artefacts, log, options)
+        log.update_progress(log.Progress.COMPLETED)
+        self.report(sources)
+
+    def create_log(self, username):
+        User = get_user_model()
+        users = User.objects.all()
+        if username:
+            users = users.filter(**{User.USERNAME_FIELD: username})
+        else:
+            users = users.filter(is_superuser=True).order_by('pk')
+        user = users.first()
+        if not user:
+            raise CommandError(f'No user {username or "superuser"} found')
+        self.request = HttpRequest()
+        self.request.user = user
+        self.request.LANGUAGE_CODE = settings.LANGUAGE_CODE
+        log_model = apps.get_model('registry', 'log')
+        return log_model.objects.create(
+            user=user,
+            channel=log_model.Channel.UPLOADSTRUCTUREREST,
+            progress=log_model.Progress.SUBMITTED,
+        )
+
+    def parse(self, sources, workers, validate):
+        """Parses the files in a process pool, returns their artefacts"""
+        started = time.perf_counter()
+        size = 0
+        results = {}
+        # Forked workers must not share the database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = {executor.submit(parse_source, source, validate): source
+                       for source in sources}
+            for done, future in enumerate(as_completed(futures), 1):
+                parsed = future.result()
+                results[futures[future]] = parsed
+                size += parsed.size
+                prefix = f'[{done}/{len(sources)}] {parsed.source}'
+                if parsed.error:
+                    self.failures[parsed.source].append(parsed.error)
+                    self.stdout.write(self.style.ERROR(f'{prefix}: {parsed.error}'))
+                else:
+                    self.counts[parsed.source] = len(parsed.artefacts)
+                    self.stdout.write(
+                        f'{prefix}: {len(parsed.artefacts)} artefacts, '
+                        f'{parsed.size / 2 ** 20:.1f} MiB in {parsed.elapsed:.2f}s')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Parsed {len(sources)} files, {size / 2 ** 20:.1f} MiB in '
+            f'{elapsed:.1f}s ({size / 2 ** 20 / elapsed:.1f} MiB/s)')
+        # Files later on the command line replace the same artefacts of
+        # earlier ones
+        artefacts = {}
+        for source in sources:
+            for artefact in results[source].artefacts:
+                artefacts.pop(artefact.key, None)
+                artefacts[artefact.key] = artefact
+        return list(artefacts.values())
+
+    def submit(self, artefacts, log, options):
+        levels, cyclic = get_levels(artefacts)
+        for artefact in cyclic:
+            self.fail(artefact, 'Circular reference between imported artefacts')
+        batch_size = max(options['batch_size'], 1)
+        batches = [
+            level[start:start + batch_size]
+            for level in levels for start in range(0, len(level), batch_size)
+        ]
+        # Failed artefacts by (agency, id, version) like references
+        failed = {artefact.key[1:] for artefact in cyclic}
+        started = time.perf_counter()
+        for number, batch in enumerate(batches, 1):
+            batch_started = time.perf_counter()
+            pending = []
+            for artefact in batch:
+                if any(reference[1:] in failed for reference in artefact.references):
+                    self.fail(artefact, 'A referenced artefact failed to import')
+                    failed.add(artefact.key[1:])
+                else:
+                    pending.append(artefact)
+            for artefact, error in self.submit_batch(pending, log, options):
+                if error:
+                    self.fail(artefact, error)
+                    failed.add(artefact.key[1:])
+                else:
+                    self.imported[artefact.source] += 1
+            elapsed = time.perf_counter() - batch_started
+            self.stdout.write(
+                f'Batch {number}/{len(batches)}: {len(pending)} artefacts in '
+                f'{elapsed:.1f}s ({len(pending) / elapsed:.1f} artefacts/s)')
+        elapsed = time.perf_counter() - started
+        imported = sum(self.imported.values())
+        self.stdout.write(
+            f'Submitted {imported} artefacts in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.1f} artefacts/s)')
+
+    def submit_batch(self, artefacts, log, options):
+        """
+        Submits artefacts in a single message and transaction
+
+        A batch whose transaction fails is split in halves that are submitted
+        on their own, down to single artefacts, so only the artefacts that
+        fail are reported and the others are imported.
+
+        Yields
+        ------
+        (Artefact, str)
+            The artefacts and their error if they failed
+        """
+        if not artefacts: return
+        try:
+            errors = self.process(artefacts, log, options)
+        except Exception as exc:
+            if len(artefacts) == 1:
+                yield artefacts[0], f'{exc.__class__.__name__}: {exc}'
+                return
+            middle = len(artefacts) // 2
+            yield from self.submit_batch(artefacts[:middle], log, options)
+            yield from self.submit_batch(artefacts[middle:], log, options)
+            return
+        for artefact in artefacts:
+            yield artefact, errors.get(artefact.key[1:])
+
+    def process(self, artefacts, log, options):
+        """
+        Processes a message of the artefacts in a transaction
+
+        Returns
+        -------
+        dict
+            The errors of the failed artefacts by (agency, id, version)
+        """
+        root = make_message(artefacts, options['sender'])
+        context = ProcessContextOptions(self.request, log, dry_run=options['dry_run'])
+        with transaction.atomic():
+            message = XMLParser21().parse_root(root, validate=False).to_request()
+            message.process(context=context)
+        errors = {}
+        for result in context.generate_result():
+            if result.status_message.status != 'Failure': continue
+            ref = result.submitted_structure.maintainable_object.dref
+            texts = [text.text for message_text in result.status_message.message_text or ()
+                     for text in message_text.text or ()]
+            errors[ref.agency_id, ref.object_id, canonical_version(ref.version)] = (
+                '; '.join(texts) or 'Failure')
+        return errors
+
+    def fail(self, artefact, error):
+        self.failures[artefact.source].append(
+            f'{artefact.key[0]} {artefact.key[1]}:{artefact.key[2]}({artefact.key[3]}): {error}')
+
+    def report(self, sources):
+        for source in map(str, sources):
+            failures = self.failures.get(source, ())
+            summary = (f'{source}: {self.imported[source]}/{self.counts[source]} '
+                       f'artefacts imported')
+            if failures:
+                self.stdout.write(self.style.ERROR(f'{summary}, {len(failures)} failed'))
+                for failure in failures:
+                    self.stdout.write(f'  {failure}')
+            else:
+                self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,20 @@
+# fiesta_rebuild_dependencies.py
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the reference graph of the maintainable artefacts, e.g. for '
+        'artefacts stored before the dependency edges'
+    )
+
+    def handle(self, *args, **options):
+        Dependency = apps.get_model('registry', 'Dependency')
+        LatestVersion = apps.get_model('registry', 'LatestVersion')
+        rebuilt = 0
+        for model in LatestVersion.objects.get_maintainable_models():
+            for obj in model._default_manager.iterator():
+                Dependency.objects.replace(obj)
+                rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the edges of {rebuilt} artefacts'))
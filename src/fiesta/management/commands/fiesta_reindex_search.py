@@ -0,0 +1,20 @@
+# fiesta_reindex_search.py
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the full-text search entries of the maintainable artefacts '
+        'and of their items, e.g. for artefacts stored before the index'
+    )
+
+    def handle(self, *args, **options):
+        LatestVersion = apps.get_model('registry', 'LatestVersion')
+        SearchEntry = apps.get_model('registry', 'SearchEntry')
+        indexed = 0
+        for model in LatestVersion.objects.get_maintainable_models():
+            for obj in model._default_manager.select_related('agency').iterator():
+                SearchEntry.objects.reindex(obj)
+                indexed += 1
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {indexed} artefacts'))
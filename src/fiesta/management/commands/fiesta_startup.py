@@ -0,0 +1,67 @@
+# fiesta_startup.py
+
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...settings import api_settings
+
+SCRIPT = (
+    'import time, django; started = time.perf_counter(); django.setup(); '
+    'print(time.perf_counter() - started)'
+)
+
+class Command(BaseCommand):
+    help = (
+        'Reports the cold start time of fresh interpreters, the time of '
+        'django.setup() and of importing the serializer module'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=5,
+            help='Number of fresh interpreters to time')
+        parser.add_argument(
+            '--module', default=None,
+            help='The module whose import is reported, by default '
+                 'DEFAULT_SERIALIZER_MODULE')
+
+    def handle(self, *args, **options):
+        module = options['module'] or api_settings.DEFAULT_SERIALIZER_MODULE
+        env = dict(os.environ)
+        if settings.SETTINGS_MODULE:
+            env['DJANGO_SETTINGS_MODULE'] = settings.SETTINGS_MODULE
+        setups = []
+        imports = []
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+                env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(result.stderr.strip().splitlines()[-1])
+            setups.append(float(result.stdout.split()[-1]))
+            imports.append(self.get_import_time(result.stderr, module))
+        self.stdout.write(self.format('django.setup()', setups))
+        if None in imports:
+            self.stdout.write(self.style.WARNING(
+                f'{module} is not imported by django.setup()'))
+        else:
+            self.stdout.write(self.format(f'import {module}', imports))
+
+    @staticmethod
+    def get_import_time(report, module):
+        """Returns the cumulative import time of a module in seconds"""
+        for line in report.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split('|')
+            if len(parts) == 3 and parts[2].strip() == module:
+                return int(parts[1]) / 1e6
+
+    @staticmethod
+    def format(label, times):
+        return (f'{label}: median {statistics.median(times) * 1000:.1f} ms, '
+                f'min {min(times) * 1000:.1f} ms over {len(times)} runs')
@@ -2,18 +2,55 @@
 
 import inspect
 
-from importlib import import_module
-from lxml import etree # TODO work on xml security
+import zlib
+
+from lxml import etree
 from rest_framework.exceptions import ParseError, UnsupportedMediaType
 from rest_framework.parsers import BaseParser
-from typing import Iterable
-from zipfile import ZipFile, is_zipfile
+from ...utils import inspect as fiesta_inspect
+from zipfile import BadZipFile
 
 from ...settings import api_settings
 from ...utils.coders import decode 
+from ...utils.compression import (
+    DECODINGS, DecompressionLimitError, decompress_stream, is_zip,
+    iter_zip_members)
 from ...core import constants
 from ...core.exceptions import NotImplementedError, ParseSerializeError
 from ...core.schema import Schema21
+from ...core.validation import should_validate_input, validate as validate_message
+from . import pool
+
+def merge_structures(roots):
+    """
+    Merges the structure messages of the members of a zip archive into the
+    first one, under its header, so they are submitted as one message
+
+    The registry logs a single header and request per submission, and the
+    artefacts of a member may refer to those of the others.
+
+    Raises
+    ------
+    ParseError
+        If a member is not a structure message
+    """
+    message = constants.NAMESPACE_MAP['message']
+    for root in roots:
+        if root.tag != f'{{{message}}}Structure':
+            raise ParseError(
+                detail=f'The members of a zip archive must be structure messages, '
+                       f'not {etree.QName(root).localname}')
+    root = roots[0]
+    structures = root.find(f'{{{message}}}Structures')
+    containers = {container.tag: container for container in structures}
+    for other in roots[1:]:
+        for container in other.iterfind(f'{{{message}}}Structures/*'):
+            if container.tag in containers:
+                containers[container.tag].extend(list(container))
+            else:
+                containers[container.tag] = container
+                structures.append(container)
+    return root
 
 class BaseXMLParser(BaseParser):
     """
@@ -22,7 +59,8 @@ class BaseXMLParser(BaseParser):
     media_type = 'application/xml'
 
     def __init__(self, *args, **kwargs):
-        self.serializers = import_module(api_settings.DEFAULT_SERIALIZER_MODULE)
+        from ...core.serializers.registry import registry
+        self.serializers = registry.get_module()
     
     def get_version(self, media_type):
         try:
@@ -33,22 +71,45 @@ class BaseXMLParser(BaseParser):
             raise UnsupportedMediaType(media_type)
         return version.replace('.', '')
 
-    def get_root(self, stream):
-        if is_zipfile(stream):
-            temp = stream 
-            with ZipFile(temp, mode='r') as zf:
-                info = zf.infolist()[0]
-                stream= zf.open(info)
+    def get_content_encoding(self, parser_context):
+        request = (parser_context or {}).get('request')
+        if request is None: return
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not encoding or encoding == 'identity': return
+        if encoding not in DECODINGS:
+            raise UnsupportedMediaType(
+                request.content_type, detail=f'Unsupported content encoding {encoding}')
+        return encoding
+
+    def get_streams(self, stream, parser_context=None):
+        """
+        Yields the streams of the messages of a request body
+
+        A gzip or deflate encoded body is decompressed while it is parsed and
+        every member of a zip archive is a message of its own, within the
+        limits of DEFAULT_MAX_DECOMPRESSED_SIZE, DEFAULT_MAX_COMPRESSION_RATIO
+        and DEFAULT_MAX_ZIP_MEMBERS.
+        """
+        max_size = api_settings.DEFAULT_MAX_DECOMPRESSED_SIZE
+        max_ratio = api_settings.DEFAULT_MAX_COMPRESSION_RATIO
+        encoding = self.get_content_encoding(parser_context)
+        if encoding:
+            yield decompress_stream(stream, encoding, max_size, max_ratio)
+        elif getattr(stream, 'seekable', lambda: False)() and is_zip(stream):
+            for _, member in iter_zip_members(
+                    stream, max_size, max_ratio, api_settings.DEFAULT_MAX_ZIP_MEMBERS):
+                yield member
         else:
-            # undo side effect of is_zipfile
-            stream.seek(0)
+            yield stream
+
+    def get_root(self, stream):
         try:
-            tree = etree.parse(stream)
-        except (etree.ParseError, ValueError) as exc:
+            tree = pool.parse(stream)
+        except (etree.ParseError, ValueError, BadZipFile, zlib.error) as exc:
             raise ParseError(detail=f'XML parse error - {exc}')
         return tree.getroot()
 
-    def validate_roottag(self):
+    def validate_roottag(self, root):
         """Check that roottag is proper given version
 
         Redefine in subclasses"""
@@ -60,8 +121,16 @@ class BaseXMLParser(BaseParser):
         Parses the incoming bytestream as XML and returns the resulting data.
         """
         self.version = self.get_version(media_type)
-        self.root = self.get_root(stream)
-        self.validate_roottag()
+        try:
+            self.roots = [self.get_root(message)
+                          for message in self.get_streams(stream, parser_context)]
+        except (BadZipFile, DecompressionLimitError) as exc:
+            raise ParseError(detail=f'XML parse error - {exc}')
+        if not self.roots:
+            raise ParseError(detail='XML parse error - empty archive')
+        for root in self.roots:
+            self.validate_roottag(root)
+        self.root = self.roots[0]
 
 
     def get_serializer_class(self):
@@ -80,8 +149,8 @@ class BaseXMLParser(BaseParser):
         Redefine in subclasses
         """
 
-        if not serializer._elem: serializer._elem = self.root 
-        qname = etree.QName(serializer._elem.tag)
+        if serializer._element is None: serializer._element = self.root 
+        qname = etree.QName(serializer._element.tag)
         # First check that the element local name is the same as the Dataclass
         # model_name (case insensitive). 
         if complain:
@@ -92,14 +161,14 @@ class BaseXMLParser(BaseParser):
 
     def serialize_many_elements(self, serializer, field_meta):
         item_type = field_meta.fld.type.__args__[0]
-        for child_element in serializer._elem.itefind(field_meta.tag):
+        for child_element in serializer._element.iterfind(field_meta.tag):
             child_serializer = item_type()
-            child_serializer._elem = child_element
+            child_serializer._element = child_element
             self.populate_serializer(child_serializer, False)
             yield child_serializer
 
     def parse_structures(self, stream):
-        self.root = etree.parse(stream).getroot()
+        self.root = pool.parse(stream).getroot()
         serializer = self.serializers.StructuresSerializer()
         self.populate_serializer(serializer, False)
         return serializer
@@ -110,10 +179,30 @@ class XMLParser21(BaseXMLParser):
 
     def parse(self, stream, media_type=None, parser_context=None):
         super().parse(stream, media_type, parser_context)
-        schema = Schema21(self.root).schema
-        if not schema(self.root):
-            errors = [(error.line, error.domain, error.type, error.message) for error in schema.error_log]
-            raise ParseError(errors)
+        request = (parser_context or {}).get('request')
+        if len(self.roots) == 1:
+            return self.parse_root(self.root, should_validate_input(self.root, request))
+        # The members are validated before they are merged
+        for root in self.roots:
+            validate_message(root, Schema21, 'input', should_validate_input(root, request))
+        return self.parse_root(merge_structures(self.roots), validate=False)
+
+    def parse_root(self, root, validate=True):
+        """
+        Returns the serializer of an already parsed message, e.g. a message
+        assembled from the artefacts of many files by `fiesta_import`
+
+        Parameters
+        ----------
+        root: Element
+            The root element of the message
+        validate: bool
+            Whether the message is validated against the XSD schema, False if
+            it was already validated or the validation policy skips it, see
+            `fiesta.core.validation`
+        """
+        self.root = root
+        validate_message(self.root, Schema21, 'input', validate)
         serializer = self.get_serializer_class()()
         self.populate_serializer(serializer, True)
         return serializer
@@ -127,18 +216,18 @@ class XMLParser21(BaseXMLParser):
         elif payload_tag == 'Structures':
             return self.serializers.StructureSerializer
         else:
-            return NotImplementedError('Parsing a {payload_tag} payload not yet implemented') 
+            raise NotImplementedError(f'Parsing a {payload_tag} payload not yet implemented') 
 
     def validate_roottag(self, root):
         """Check that roottag is proper given version
         """
         roottag = etree.QName(root.tag)
         if roottag.namespace != constants.NAMESPACE_MAP['message']:
-            raise ParseError(detail='Invalid root tag: {roottag.text}')
-        if roottag.localname not in constants.SDMX_XML21_MESSAGES:
-            raise ParseError(detail='Invalid root tag localname: {roottag.localname}')
-        if roottag.localname not in constants.IMPLEMENTED_SDMX21_MESSAGES:
-            raise NotImplementedError(detail='Parsing SDMX-ML {roottag.localname} not implemented')
+            raise ParseError(detail=f'Invalid root tag: {roottag.text}')
+        if roottag.localname not in constants.SDMX_ML21_MESSAGES:
+            raise ParseError(detail=f'Invalid root tag localname: {roottag.localname}')
+        if roottag.localname not in constants.IMPLEMENTED_SDMX_ML21_MESSAGES:
+            raise NotImplementedError(detail=f'Parsing SDMX-ML {roottag.localname} not implemented')
 
     def populate_serializer(self, serializer, complain):
         """
@@ -155,26 +244,26 @@ class XMLParser21(BaseXMLParser):
             field_meta = f.metadata['fiesta']
             tag = field_meta.tag
             if field_meta.is_text:
-                value = decode(serializer._elem.text, f.type)
+                value = decode(serializer._element.text, f.type)
             elif field_meta.is_attribute:
-                value = decode(serializer._elem.attrib.get(tag), f.type)
+                value = decode(serializer._element.attrib.get(tag), f.type)
                 if not value: value = f.default
             elif inspect.isclass(f.type):
                 if issubclass(f.type, self.serializers.Serializer):
-                    child_element = serializer._elem.find(tag)
+                    child_element = serializer._element.find(tag)
                     if etree.iselement(child_element):
                         child_serializer = f.type()
-                        child_serializer._elem = child_element
+                        child_serializer._element = child_element
                         self.populate_serializer(child_serializer, False)
                         value = child_serializer
                 # Must be a simple element
                 else: 
                     try:
-                        value = serializer._elem.find(tag).text
+                        value = decode(serializer._element.find(tag).text, f.type)
                     except AttributeError:
                         pass
-            elif type(f.type) == type(Iterable):
-                value = self.serialize_many_elements(serializer, field_meta)
+            elif fiesta_inspect.is_iterable_type(f.type):
+                value = list(self.serialize_many_elements(serializer, field_meta))
             else:
                 raise ParseSerializeError(f'Encountered an unknown type field: {f.type}')
             setattr(serializer, f.name, value)
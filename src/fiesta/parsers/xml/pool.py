@@ -0,0 +1,65 @@
+# pool.py
+
+import threading
+
+from lxml import etree
+
+from ...settings import api_settings
+
+class DTDForbiddenError(ValueError):
+    """Raised when a message declares a document type, SDMX-ML has none"""
+
+# lxml parsers are not thread safe, each thread keeps its own
+_local = threading.local()
+
+def get_parser(huge_tree=None):
+    """
+    Returns the hardened parser of the current thread, made on first use
+
+    Entities are never resolved, so neither external entities nor nested
+    internal ones are expanded, no DTD is loaded and nothing is fetched from
+    the network. Leaf elements are stored compactly.
+
+    Parameters
+    ----------
+    huge_tree: bool
+        Whether the libxml2 limits of the depth and of the size of text nodes
+        are lifted, by default DEFAULT_XML_HUGE_TREE
+    """
+    if huge_tree is None: huge_tree = api_settings.DEFAULT_XML_HUGE_TREE
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None: parsers = _local.parsers = {}
+    parser = parsers.get(huge_tree)
+    if parser is None:
+        parser = parsers[huge_tree] = etree.XMLParser(
+            resolve_entities=False,
+            no_network=True,
+            load_dtd=False,
+            dtd_validation=False,
+            huge_tree=huge_tree,
+            compact=True,
+        )
+    return parser
+
+def check_doctype(tree):
+    if tree.docinfo.internalDTD is not None or tree.docinfo.system_url:
+        raise DTDForbiddenError('Document type declarations are not allowed')
+
+def parse(source, huge_tree=None):
+    """
+    Parses a file or stream with the parser of the current thread
+
+    Raises
+    ------
+    DTDForbiddenError
+        If the message declares a document type
+    """
+    tree = etree.parse(source, get_parser(huge_tree))
+    check_doctype(tree)
+    return tree
+
+def fromstring(text, huge_tree=None):
+    """Returns the root element of a message, see `parse`"""
+    root = etree.fromstring(text, get_parser(huge_tree))
+    check_doctype(root.getroottree())
+    return root
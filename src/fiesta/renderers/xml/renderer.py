@@ -2,41 +2,195 @@
 
 import inspect
 
+from datetime import datetime
+from io import BytesIO
 from rest_framework.renderers import BaseRenderer 
-from rest_framework.exceptions import UnsupportedMediaType, ParseError
+from rest_framework.exceptions import UnsupportedMediaType
 from lxml.etree import tostring
 from lxml import etree
-from typing import Iterable
+from ...utils import inspect as fiesta_inspect
 
-from ...core.schema import Schema
+from ...core.constants import NAMESPACE_MAP
+from ...core.data import DataSet
+from ...core.fragments import fragment_cache
+from ...core.schema import Schema21
+from ...core.validation import should_validate_output, validate, validation_stats
+from ...settings import api_settings
 
 from ...utils.coders import encode
+from ...utils.compression import CONCATENABLE, compress, compress_chunks
+from ...utils.translation import requested_languages
 from ...core.serializers.base import Serializer
+from ...core.serializers.structure import (
+    MaintainableStub, StructureSerializer, StructuresSerializer,
+    StructuresItemsSerializer)
 
 class XMLRenderer(BaseRenderer):
     media_type = 'application/sdmx-ml'
     format = 'application/xml'
 
     def render(self, data, media_type=None, renderer_context=None):
+        if not isinstance(data, (Serializer, DataSet)):
+            response = (renderer_context or {}).get('response')
+            code = response.status_code if response is not None else 500
+            return tostring(self.to_error_element(data, code), xml_declaration=True)
+        # The translations are read while rendering, so the requested
+        # languages are set around it
+        with requested_languages(getattr(data, '_languages', None)):
+            return self.render_languages(data, media_type)
+
+    def render_languages(self, data, media_type=None):
         try:
             version = media_type.split(';')[1].split('=')[1]
         except (IndexError, AttributeError):
             version = '2.1'
         if version != '2.1':
             raise UnsupportedMediaType(media_type)
-        data = data.unroll()
-        query = getattr(data, '_query')
-        if query.resource == 'schema':
+        # The responses of the submissions have no query
+        query = getattr(data, '_query', None)
+        resource = getattr(query, 'resource', None)
+        if resource == 'data':
+            return tostring(self.to_data_element(data), xml_declaration=True)
+        if resource == 'schema':
+            data = data.unroll()
             element = self.to_schema(data, query.context, query.observation_dimension)
-        elif query.resource == 'data':
-            pass
+            return tostring(element, xml_declaration=True)
+        return self.render_structure(data, resource, getattr(query, 'detail', None))
+
+    def render_structure(self, data, resource=None, detail=None, enabled=None):
+        """
+        Renders a structure message as a whole and validates it against the
+        schemas if the output validation policy selects it
+
+        Parameters
+        ----------
+        enabled: bool
+            Whether the message is validated, by default as decided by
+            `should_validate_output`
+        """
+        if enabled is None: enabled = should_validate_output()
+        element = self.to_structure_element(
+            data.unroll(), resource=resource, detail=detail)
+        validate(element, Schema21, 'output', enabled)
+        return tostring(element, xml_declaration=True)
+
+    def stream(self, data, resource=None, detail=None, encoding=None,
+               cache=False):
+        """
+        Renders a structure query result incrementally.
+
+        The message and the containers of the artefacts are opened with
+        `etree.xmlfile` and each artefact is built and written on its own, so
+        only one artefact element is held in memory and the result is not
+        unrolled.
+
+        The schemas validate whole messages, so a message the output
+        validation policy selects is rendered and validated as a whole by
+        `render_structure` before it is returned, raising a ParseError like
+        the buffered responses if it is invalid. The other messages are
+        rendered as they are iterated.
+
+        Parameters
+        ----------
+        encoding: str
+            The content coding the message is compressed with as it is
+            rendered, see `fiesta.utils.compression`
+        cache: bool
+            Whether the compressed artefacts are read from and stored in the
+            fragment cache, only for the concatenable encodings
+
+        Returns
+        -------
+            An iterator of bytes chunks of the message, one per rendered
+            artefact
+        """
+        languages = getattr(data, '_languages', None)
+        if should_validate_output():
+            with requested_languages(languages):
+                content = self.render_structure(data, resource, detail, enabled=True)
+            return compress_chunks([content], encoding) if encoding else iter([content])
+        validation_stats.record('output', False)
+        return self.generate_stream(data, resource, detail, encoding, cache, languages)
+
+    def generate_stream(self, data, resource, detail, encoding, cache, languages):
+        # Each step runs with the requested languages, the iteration may be
+        # resumed from other contexts, e.g. by the async views
+        if not encoding:
+            chunks = self.generate_chunks(data, resource, detail)
+        elif cache and encoding in CONCATENABLE and fragment_cache.enabled:
+            chunks = self.generate_cached_members(
+                data, resource, detail, encoding, languages)
         else:
-            element = self.to_structure_element(data, resource=query.resource, detail=query.detail)
-            schema = Schema(element).schema
-            if not schema(element):
-                errors = [(error.line, error.domain, error.type, error.message) for error in schema.error_log]
-                raise ParseError(errors)
-        return tostring(element, xml_declaration=True) 
+            chunks = compress_chunks(
+                self.generate_chunks(data, resource, detail), encoding)
+        while True:
+            with requested_languages(languages):
+                chunk = next(chunks, None)
+            if chunk is None: return
+            yield chunk
+
+    def generate_chunks(self, data, resource=None, detail=None):
+        buffer = BytesIO()
+        with etree.xmlfile(buffer, encoding='utf-8') as xf:
+            xf.write_declaration()
+            for serializer, field in self.write_structure_element(xf, data, None, resource, detail):
+                xf.write(self.to_structure_element(serializer, field, resource, detail))
+                xf.flush()
+                yield self.drain(buffer)
+        yield self.drain(buffer)
+
+    def generate_cached_members(self, data, resource, detail, encoding, languages):
+        """
+        Yields the message as concatenated members of the encoding, one for
+        the markup between the artefacts and one per artefact that is read
+        from the fragment cache or rendered, compressed and stored in it
+        """
+        buffer = BytesIO()
+        with etree.xmlfile(buffer, encoding='utf-8') as xf:
+            xf.write_declaration()
+            for serializer, field in self.write_structure_element(xf, data, None, resource, detail):
+                xf.flush()
+                markup = self.drain(buffer)
+                if markup: yield compress(markup, encoding)
+                key = fragment_cache.make_key(
+                    serializer, resource, detail, languages, encoding)
+                fragment = fragment_cache.get(key)
+                if fragment is None:
+                    element = self.to_structure_element(serializer, field, resource, detail)
+                    fragment = compress(tostring(element), encoding)
+                    fragment_cache.set(key, fragment)
+                yield fragment
+        markup = self.drain(buffer)
+        if markup: yield compress(markup, encoding)
+
+    def drain(self, buffer):
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    def write_structure_element(self, xf, serializer, field=None, resource=None, detail=None):
+        """
+        Opens the elements of the containers of a serializer in an
+        incremental writer and yields each artefact and its field, which
+        the caller writes.
+        """
+        containers = (
+            StructureSerializer, StructuresSerializer, StructuresItemsSerializer)
+        if not isinstance(serializer, containers):
+            yield serializer, field
+            return
+        tag = field.metadata['fiesta'].tag if field else serializer._meta.tag
+        attrib = {key: value for key, value in serializer.to_attrs(False).items() if value}
+        with xf.element(tag, attrib, nsmap=serializer._meta.nsmap):
+            for f in serializer._meta.non_attr_fields:
+                value = getattr(serializer, f.name, None)
+                if not value: continue
+                if isinstance(value, Serializer):
+                    yield from self.write_structure_element(xf, value, f, resource, detail)
+                else:
+                    for item in value:
+                        yield from self.write_structure_element(xf, item, f, resource, detail)
 
     def to_schema_element(self, serializer, context, observation_dimension):
         dsd = serializer.data_structure_list[0]
@@ -55,6 +209,77 @@ class XMLRenderer(BaseRenderer):
 
 
 
+    def to_data_element(self, data):
+        """
+        Renders a data query result into a generic data message.
+
+        Series arrays are converted to lists once per series so that the
+        element tree is built without per observation numpy scalar access.
+        The observations are omitted for the `serieskeysonly` and `nodata`
+        details, as the series have no attributes of their own.
+
+        Parameters
+        ----------
+        data: DataSet
+            The result of the data engine
+        """
+        message = lambda tag: etree.QName(NAMESPACE_MAP['message'], tag)
+        common = lambda tag: etree.QName(NAMESPACE_MAP['common'], tag)
+        generic = lambda tag: etree.QName(NAMESPACE_MAP['data'], tag)
+        nsmap = {key: NAMESPACE_MAP[key] for key in ['message', 'common', 'data']}
+        dataflow = data.dataflow
+        root = etree.Element(message('GenericData'), nsmap=nsmap)
+        header = etree.SubElement(root, message('Header'))
+        etree.SubElement(header, message('ID')).text = f'IREF{id(data)}'
+        etree.SubElement(header, message('Test')).text = 'false'
+        etree.SubElement(header, message('Prepared')).text = datetime.now().isoformat()
+        etree.SubElement(header, message('Sender'), id=api_settings.DEFAULT_SENDER_ID)
+        structure = etree.SubElement(
+            header, message('Structure'), structureID=dataflow.object_id,
+            dimensionAtObservation=data._query.dimension_at_observation)
+        usage = etree.SubElement(structure, common('StructureUsage'))
+        etree.SubElement(
+            usage, 'Ref', agencyID=dataflow.agency.object_id,
+            id=dataflow.object_id, version=str(dataflow.version))
+        data_set = etree.SubElement(
+            root, message('DataSet'), structureRef=dataflow.object_id)
+        observations = data._query.detail not in ('serieskeysonly', 'nodata')
+        for block in data.series:
+            series = etree.SubElement(data_set, generic('Series'))
+            series_key = etree.SubElement(series, generic('SeriesKey'))
+            for dimension, value in zip(data.dimensions, block.key):
+                etree.SubElement(series_key, generic('Value'), id=dimension, value=str(value))
+            if not observations: continue
+            attributes = {name: values.tolist() for name, values in block.attributes.items()}
+            for i, (period, value) in enumerate(zip(block.time_period.tolist(), block.obs_value.tolist())):
+                obs = etree.SubElement(series, generic('Obs'))
+                etree.SubElement(obs, generic('ObsDimension'), value=period)
+                if value == value:
+                    etree.SubElement(obs, generic('ObsValue'), value=repr(value))
+                values = [(name, values[i]) for name, values in attributes.items()
+                          if values[i] is not None]
+                if not values: continue
+                obs_attributes = etree.SubElement(obs, generic('Attributes'))
+                for name, value in values:
+                    etree.SubElement(obs_attributes, generic('Value'), id=name, value=str(value))
+        return root
+
+    def to_error_element(self, data, code):
+        """
+        Renders the messages of an error response, e.g. the detail of an
+        exception or the message of a rejected query, into an Error message
+        """
+        message = lambda tag: etree.QName(NAMESPACE_MAP['message'], tag)
+        common = lambda tag: etree.QName(NAMESPACE_MAP['common'], tag)
+        nsmap = {key: NAMESPACE_MAP[key] for key in ['message', 'common']}
+        if isinstance(data, dict): data = data.get('detail', data)
+        texts = data if isinstance(data, list) else [data]
+        root = etree.Element(message('Error'), nsmap=nsmap)
+        error = etree.SubElement(root, message('ErrorMessage'), code=str(code))
+        for text in texts:
+            etree.SubElement(error, common('Text')).text = str(text)
+        return root
+
     def to_structure_element(self, serializer, field=None, resource=None, detail=None):
         """
         Renders into a lxml Element object.
@@ -74,6 +299,9 @@ class XMLRenderer(BaseRenderer):
         """
         tag = field.metadata['fiesta'].tag if field else serializer._meta.tag
 
+        if isinstance(serializer, MaintainableStub):
+            return self.to_stub_element(serializer, tag)
+
         # Fast field value lookup
         getval = lambda f: getattr(serializer, f.name, None)
 
@@ -98,13 +326,17 @@ class XMLRenderer(BaseRenderer):
                 if issubclass(f.type, Serializer):
                     child_serializer = getval(f) 
                     if not child_serializer: continue
-                    element.append(self.to_structure_element(child_serializer, f, resource, detail))
+                    child = self.to_structure_element(child_serializer, f, resource, detail)
+                    # The serializers propagated the instance of their
+                    # container may have nothing to render, e.g. Annotations
+                    if len(child) or child.attrib or child.text is not None:
+                        element.append(child)
                 else:
                     child_tag = f.metadata['fiesta'].tag
                     child = etree.Element(child_tag)
                     child.text = encode(getval(f), f.type)
                     element.append(child)
-            elif type(f.type) == type(Iterable):
+            elif fiesta_inspect.is_iterable_type(f.type):
                 value = getval(f)
                 element.extend(self.to_structure_element(item, f, resource, detail) 
                                for item in value)
@@ -112,5 +344,17 @@ class XMLRenderer(BaseRenderer):
                 raise KeyError(f'Encountered an unknown type field: {f.type} while rendering as an element')
         return element
 
+    def to_stub_element(self, stub, tag):
+        """
+        Renders a MaintainableStub, i.e. its stub attributes and names.
+        """
+        element = self.make_element(stub, tag, stub.to_attrs())
+        name_tag = stub._meta.fields_map['name'].metadata['fiesta'].tag
+        lang = etree.QName(NAMESPACE_MAP['xml'], 'lang')
+        for code, name in stub.names:
+            child = etree.SubElement(element, name_tag, {lang: code})
+            child.text = name
+        return element
+
     def make_element(self, serializer, tag, attrib):
         return etree.Element(tag, attrib=attrib, nsmap=serializer._meta.nsmap)
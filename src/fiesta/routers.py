@@ -0,0 +1,71 @@
+# routers.py
+
+import random
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+from .settings import api_settings
+
+_read_database = ContextVar('fiesta_read_database', default=None)
+
+def get_sticky_key(user):
+    return f'fiesta:primary:{user.pk}'
+
+def pin_to_primary(user):
+    """
+    Reads of the user go to the primary database for `DEFAULT_STICKY_SECONDS`
+    so that a user sees their own writes before the replicas catch up
+    """
+    if user is None or not user.is_authenticated: return
+    cache.set(get_sticky_key(user), True, api_settings.DEFAULT_STICKY_SECONDS)
+
+def is_pinned(user):
+    if user is None or not user.is_authenticated: return False
+    return bool(cache.get(get_sticky_key(user)))
+
+@contextmanager
+def replica_reads(user=None):
+    """
+    Routes the reads made within the block to one of the
+    `DEFAULT_READ_DATABASES`, unless there are none or the user has written
+    recently
+    """
+    aliases = api_settings.DEFAULT_READ_DATABASES
+    alias = random.choice(aliases) if aliases and not is_pinned(user) else None
+    token = _read_database.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_database.reset(token)
+
+class ReplicaRouter:
+    """
+    Sends the reads of the RESTful structure retrieval to read replicas
+
+    Reads are routed to a replica only within `replica_reads` and the reads
+    of `DEFAULT_PRIMARY_MODELS`, e.g. the logs, always go to
+    `DEFAULT_PRIMARY_DATABASE`.  Writes are not routed, so they go to the
+    primary `default` database.
+
+    Add it to the DATABASE_ROUTERS setting::
+
+        DATABASE_ROUTERS = ['fiesta.routers.ReplicaRouter']
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_database.get()
+        if not alias: return
+        if model._meta.label_lower in api_settings.DEFAULT_PRIMARY_MODELS:
+            return api_settings.DEFAULT_PRIMARY_DATABASE
+        return alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {
+            api_settings.DEFAULT_PRIMARY_DATABASE,
+            *api_settings.DEFAULT_READ_DATABASES
+        }
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
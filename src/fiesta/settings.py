@@ -30,7 +30,73 @@ DEFAULTS = {
     'DEFAULT_NEW_USER_PASSWORD': 'not_so_secret_password',
     'DEFAULT_SERIALIZER_MODULE': 'fiesta.core.serializers',
     'DEFAULT_TOP_AGENCY': 'FIESTA',
-    'DEFAULT_VERSION': '2.1'
+    'DEFAULT_VERSION': '2.1',
+    # Observation models of the domain specific data applications, keyed by
+    # DSD reference (AGENCY:ID(VERSION) or AGENCY:ID)
+    'DEFAULT_DATA_MODELS': {},
+    'DEFAULT_DATA_CHUNK_SIZE': 100000,
+    # Series key dictionary encoding, see fiesta.apps.data.series
+    'DEFAULT_SERIES_KEY_CACHE_SIZE': 100000,
+    'DEFAULT_SERIES_KEY_CODE_BITS': 16,
+    # Number of artefacts fetched, prefetched and rendered at a time by the
+    # RESTful structure queries and whether the XML is streamed per artefact.
+    # Streaming is opt-in: by default the structure view still renders the
+    # whole message of every artefact into one response, which middleware
+    # and clients reading response.content rely on
+    'DEFAULT_RESTFUL_CHUNK_SIZE': 200,
+    'DEFAULT_STREAM_STRUCTURES': False,
+    # Content codings of the structure and schema responses by preference,
+    # negotiated with Accept-Encoding, br and zstd only if brotli and
+    # zstandard are installed, an empty list disables the compression
+    'DEFAULT_RESPONSE_ENCODINGS': ['zstd', 'br', 'gzip'],
+    # The cache alias of the compressed artefacts of the streamed structure
+    # responses, served as concatenated gzip members or zstd frames, and
+    # their lifetime, None disables the fragment cache, the invalidation of a
+    # LocMemCache alias reaches only the process that saved the artefact
+    'DEFAULT_FRAGMENT_CACHE': None,
+    'DEFAULT_FRAGMENT_CACHE_SECONDS': 3600,
+    # Item schemes with at least this many items are rendered from parallel
+    # arrays of their items instead of model instances, 0 disables it
+    'DEFAULT_ITEM_ARRAY_THRESHOLD': 1000,
+    # Route the wsrest structure and schema queries to the async views, which
+    # need Django 3.1, and the number of threads running their database work,
+    # 0 runs it in the thread sensitive executor of asgiref
+    'DEFAULT_ASYNC_VIEWS': False,
+    'DEFAULT_ASYNC_WORKERS': 16,
+    # Validate the test messages of SubmitStructure in memory instead of
+    # writing them and rolling back
+    'DEFAULT_DRY_RUN_TEST_MESSAGES': True,
+    # Maximum number of artefact references of a batch structure query
+    'DEFAULT_BATCH_MAX_QUERIES': 500,
+    # Limits of the gzip and deflate encoded request bodies and of the zip
+    # archives of the parsers against decompression bombs, 0 disables one
+    'DEFAULT_MAX_DECOMPRESSED_SIZE': 512 * 2 ** 20,
+    'DEFAULT_MAX_COMPRESSION_RATIO': 200,
+    'DEFAULT_MAX_ZIP_MEMBERS': 1000,
+    # Lift the libxml2 limits of the depth and of the text nodes of the
+    # parsed messages, only for trusted submitters of very large messages
+    'DEFAULT_XML_HUGE_TREE': False,
+    # Schema validation of the submitted messages, see fiesta.core.validation.
+    # The users of the organisations of the trusted senders are validated
+    # 'always', on the 'first' submission of an artefact or as a 'sample' of
+    # the rate in percent, the other users always
+    'DEFAULT_TRUSTED_SENDERS': [],
+    'DEFAULT_TRUSTED_VALIDATION': 'first',
+    'DEFAULT_TRUSTED_VALIDATION_RATE': 10,
+    # Schema validation of the rendered structure messages, 'always', only in
+    # 'debug', as a 'sample' of the rate in percent or 'never'
+    'DEFAULT_OUTPUT_VALIDATION': 'debug',
+    'DEFAULT_OUTPUT_VALIDATION_RATE': 1,
+    # Maximum number of URNs returned by a search of the names
+    'DEFAULT_SEARCH_RESULTS': 50,
+    # Read replicas of the RESTful structure queries, see fiesta.routers
+    'DEFAULT_PRIMARY_DATABASE': 'default',
+    'DEFAULT_READ_DATABASES': [],
+    'DEFAULT_STICKY_SECONDS': 15,
+    'DEFAULT_PRIMARY_MODELS': [
+        'registry.log', 'registry.submitstructurerequest',
+        'registry.submittedstructure', 'registry.statusmessage',
+    ],
 }
 
 IMPORT_STRINGS = []
@@ -1,7 +1,9 @@
 # urls.py
 
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import path, register_converter
 from fiesta import converters 
+from fiesta.settings import api_settings
 from fiesta.views import views
 from rest_framework.urlpatterns import format_suffix_patterns
 
@@ -12,18 +14,39 @@ register_converter(converters.ResourceConverter, 'res')
 register_converter(converters.AgencyConverter, 'age')
 register_converter(converters.ContextConverter, 'con')
 
+if api_settings.DEFAULT_ASYNC_VIEWS:
+    from fiesta.views import asynchronous
+    if not asynchronous.ASYNC_VIEWS:
+        raise ImproperlyConfigured('DEFAULT_ASYNC_VIEWS requires Django 3.1')
+    StructureView = asynchronous.AsyncSDMXRESTfulStructureView
+    SchemaView = asynchronous.AsyncSDMXRESTfulSchemaView
+else:
+    StructureView = views.SDMXRESTfulStructureView
+    SchemaView = views.SDMXRESTfulSchemaView
+
 urlpatterns = [
     path('wsreg/SubmitStructure/', views.SubmitStructureRequestView.as_view()),
-    path('wsrest/schema/<con:context>/<age:agencyID>/<str:resourceID>', views.SDMXRESTfulSchemaView.as_view()),
-    path('wsrest/schema/<con:context>/<age:agencyID>/<str:resourceID>/<str:version>', views.SDMXRESTfulSchemaView.as_view()),
-    path('wsrest/<res:resource>/', views.SDMXRESTfulStructureView.as_view()),
+    path('wsrest/schema/<con:context>/<age:agencyID>/<str:resourceID>', SchemaView.as_view()),
+    path('wsrest/schema/<con:context>/<age:agencyID>/<str:resourceID>/<str:version>', SchemaView.as_view()),
+    path('wsrest/batch/', views.SDMXRESTfulBatchView.as_view()),
+    path('wsrest/search/', views.SDMXSearchView.as_view()),
+    path('wsrest/urn/', views.SDMXURNView.as_view()),
+    path('wsrest/data/<str:flowRef>/', views.SDMXRESTfulDataView.as_view()),
+    path('wsrest/data/<str:flowRef>/<str:key>/',
+         views.SDMXRESTfulDataView.as_view()),
+    path('wsrest/data/<str:flowRef>/<str:key>/<str:providerRef>/',
+         views.SDMXRESTfulDataView.as_view()),
+    path('wsrest/<res:resource>/', StructureView.as_view()),
     path('wsrest/<res:resource>/<age:agencyID>/',
-         views.SDMXRESTfulStructureView.as_view()),
+         StructureView.as_view()),
     path('wsrest/<res:resource>/<age:agencyID>/<str:resourceID>/', 
-         views.SDMXRESTfulStructureView.as_view()),
+         StructureView.as_view()),
     path('wsrest/<res:resource>/<age:agencyID>/<str:resourceID>/'
          '<str:version>/', 
-         views.SDMXRESTfulStructureView.as_view()),
+         StructureView.as_view()),
+    path('wsrest/<res:resource>/<age:agencyID>/<str:resourceID>/'
+         '<str:version>/<str:itemID>/', 
+         StructureView.as_view()),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
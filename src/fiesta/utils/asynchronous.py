@@ -0,0 +1,97 @@
+# asynchronous.py
+
+import asyncio
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from ..settings import api_settings
+
+_executor = None
+_executor_lock = threading.Lock()
+_done = object()
+
+def get_executor():
+    """
+    Returns the process wide executor of the synchronous work of the async
+    views or None if `DEFAULT_ASYNC_WORKERS` is 0, in which case the work runs
+    in the thread sensitive executor of asgiref
+    """
+    global _executor
+    workers = api_settings.DEFAULT_ASYNC_WORKERS
+    if not workers: return
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='fiesta')
+    return _executor
+
+def _call(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+async def run_sync(func, *args, **kwargs):
+    """Awaits a synchronous function, e.g. ORM work, off the event loop"""
+    executor = get_executor()
+    if executor is None:
+        return await sync_to_async(func)(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, partial(_call, func, *args, **kwargs))
+
+async def aiterate(iterable, maxsize=8):
+    """
+    Iterates asynchronously over a synchronous iterable
+
+    With an executor the iterable is consumed by a single worker thread, so
+    that database cursors stay on the thread that opened them, and handed
+    over through a queue of `maxsize` items that applies back pressure.  The
+    worker stops early if the consumer closes the iteration.
+    """
+    executor = get_executor()
+    iterator = iter(iterable)
+    if executor is None:
+        pull = sync_to_async(next)
+        while True:
+            item = await pull(iterator, _done)
+            if item is _done: return
+            yield item
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize)
+    stopped = threading.Event()
+    error = []
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            for item in iterator:
+                if stopped.is_set(): return
+                put(item)
+        except Exception as exc:
+            error.append(exc)
+        finally:
+            if not stopped.is_set(): put(_done)
+            close_old_connections()
+
+    future = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _done: break
+            yield item
+    finally:
+        stopped.set()
+        while not future.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+    if error: raise error[0]
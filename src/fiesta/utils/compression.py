@@ -0,0 +1,228 @@
+# compression.py
+
+import io
+import zlib
+
+from zipfile import ZipFile, is_zipfile
+
+try:
+    import brotli
+except ImportError: # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError: # pragma: no cover
+    zstandard = None
+
+# Content codings of request bodies that are decompressed, deflate is the
+# zlib format but some clients send raw deflate streams
+DECODINGS = {
+    'gzip': zlib.MAX_WBITS | 16,
+    'x-gzip': zlib.MAX_WBITS | 16,
+    'deflate': zlib.MAX_WBITS,
+}
+
+CHUNK_SIZE = 64 * 1024
+
+class DecompressionLimitError(ValueError):
+    """Raised when a compressed body exceeds the size or ratio limits"""
+
+def check_limits(size, compressed, max_size, max_ratio):
+    if max_size and size > max_size:
+        raise DecompressionLimitError(
+            f'Decompressed size exceeds {max_size} bytes')
+    # Small bodies compress well without being a threat
+    if max_ratio and size > CHUNK_SIZE and size > compressed * max_ratio:
+        raise DecompressionLimitError(
+            f'Compression ratio exceeds {max_ratio}')
+
+class DecompressingReader(io.RawIOBase):
+    """
+    A readable stream of a gzip or deflate compressed stream
+
+    The compressed stream is read in chunks and decompressed on demand, at
+    most as many bytes as requested are inflated at a time, so a consumer
+    like `etree.parse` never holds the whole body and the limits are checked
+    before any more output is made.
+
+    Parameters
+    ----------
+    raw: file-like
+        The compressed stream
+    encoding: str
+        The content coding, one of DECODINGS
+    max_size: int
+        The maximum decompressed size, 0 for no limit
+    max_ratio: int
+        The maximum ratio of the decompressed to the compressed size, 0 for
+        no limit
+    """
+
+    def __init__(self, raw, encoding, max_size=0, max_ratio=0):
+        self.raw = raw
+        self.wbits = DECODINGS[encoding]
+        self.decompressor = zlib.decompressobj(self.wbits)
+        self.max_size = max_size
+        self.max_ratio = max_ratio
+        self.size = 0
+        self.compressed = 0
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            data = self.inflate(len(buffer))
+            if data or self.decompressor.eof: break
+            chunk = self.raw.read(CHUNK_SIZE)
+            if not chunk:
+                data = self.decompressor.flush()
+                break
+            self.compressed += len(chunk)
+            self.pending += chunk
+        self.size += len(data)
+        check_limits(self.size, self.compressed, self.max_size, self.max_ratio)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def inflate(self, length):
+        if not self.pending: return b''
+        try:
+            data = self.decompressor.decompress(self.pending, length)
+        except zlib.error:
+            if self.wbits != zlib.MAX_WBITS or self.size: raise
+            # A raw deflate stream without the zlib header
+            self.wbits = -zlib.MAX_WBITS
+            self.decompressor = zlib.decompressobj(self.wbits)
+            data = self.decompressor.decompress(self.pending, length)
+        self.pending = self.decompressor.unconsumed_tail
+        return data
+
+def decompress_stream(stream, encoding, max_size=0, max_ratio=0):
+    """Returns a buffered reader of the decompressed stream"""
+    return io.BufferedReader(
+        DecompressingReader(stream, encoding, max_size, max_ratio), CHUNK_SIZE)
+
+def iter_zip_members(stream, max_size=0, max_ratio=0, max_members=0):
+    """
+    Yields the name and a stream of each file of a zip archive
+
+    The sizes of the members are checked against the limits, in total and
+    each, before any is read. The streams are only read up to the declared
+    sizes, which are checked against the CRC.
+
+    Raises
+    ------
+    DecompressionLimitError
+        If the archive exceeds the limits
+    """
+    with ZipFile(stream) as zf:
+        members = [info for info in zf.infolist() if not info.is_dir()]
+        if max_members and len(members) > max_members:
+            raise DecompressionLimitError(
+                f'Archive has more than {max_members} members')
+        size = compressed = 0
+        for info in members:
+            check_limits(info.file_size, info.compress_size, max_size, max_ratio)
+            size += info.file_size
+            compressed += info.compress_size
+        check_limits(size, compressed, max_size, max_ratio)
+        for info in members:
+            with zf.open(info) as member:
+                yield info.filename, member
+
+def is_zip(stream):
+    """Whether a seekable stream is a zip archive, it is left at its start"""
+    try:
+        return is_zipfile(stream)
+    finally:
+        stream.seek(0)
+
+# Content codings of responses by preference and their default levels, brotli
+# and zstd only if installed
+ENCODINGS = ('zstd', 'br', 'gzip')
+LEVELS = {'zstd': 3, 'br': 5, 'gzip': 6}
+
+# Content codings whose members, frames for zstd, can be concatenated, so
+# that compressed fragments are stored and served as they are
+CONCATENABLE = frozenset(['gzip', 'zstd'])
+
+def get_available_encodings():
+    available = {'gzip': True, 'br': brotli is not None, 'zstd': zstandard is not None}
+    return tuple(encoding for encoding in ENCODINGS if available[encoding])
+
+class Compressor:
+    """
+    An incremental compressor of a content coding
+
+    Parameters
+    ----------
+    encoding: str
+        One of ENCODINGS, it must be available
+    level: int
+        The compression level or quality, by default the LEVELS
+    """
+
+    def __init__(self, encoding, level=None):
+        level = LEVELS[encoding] if level is None else level
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self.compress, self.finish = compressor.compress, compressor.flush
+        elif encoding == 'br':
+            compressor = brotli.Compressor(quality=level)
+            self.compress, self.finish = compressor.process, compressor.finish
+        elif encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress, self.finish = compressor.compress, compressor.flush
+        else:
+            raise ValueError(f'Unsupported content encoding {encoding}')
+
+def compress(data, encoding, level=None):
+    """Returns the data compressed as a whole, a member for gzip"""
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+def compress_chunks(chunks, encoding, level=None):
+    """
+    Yields the chunks compressed incrementally, only non empty outputs are
+    yielded so a chunk may be held back until the compressor emits a block
+    """
+    compressor = Compressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data: yield data
+    yield compressor.finish()
+
+def negotiate_encoding(accept_encoding, encodings=None):
+    """
+    Returns the content coding of an Accept-Encoding header, preferred by
+    its quality and then by the order of the encodings, or None for identity
+
+    Parameters
+    ----------
+    accept_encoding: str
+        The header, e.g. gzip;q=0.8, br
+    encodings: Iterable[str]
+        The available encodings by preference, by default all
+    """
+    if not accept_encoding: return
+    encodings = get_available_encodings() if encodings is None else encodings
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        qualities[coding.strip().lower()] = quality
+    best = None
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = encoding, quality
+    return best and best[0]
@@ -1,3 +1,6 @@
+from collections import OrderedDict
+from threading import Lock
+
 
 class AttrDict(dict):
     def __init__(self, *args, **kwargs):
@@ -17,3 +20,41 @@ class AttrDict(dict):
 
 class Empty:
     pass
+
+class LRUCache:
+    """
+    A bounded, thread safe mapping that evicts the least recently used entry
+    once `maxsize` entries are stored
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    __setitem__ = set
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
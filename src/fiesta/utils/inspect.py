@@ -1,3 +1,4 @@
+import collections.abc
 import inspect
 
 def non_string_iterable(obj):
@@ -8,3 +9,20 @@ def non_string_iterable(obj):
     if isclass: condition = issubclass(obj, str)
     else: condition = isinstance(obj, str)
     return hasattr(obj, '__iter__') and not condition 
+
+def is_iterable_type(annotation):
+    """
+    Check whether a type annotation is a parametrized Iterable or List, e.g.
+    Iterable[TextSerializer]
+    """
+    return getattr(annotation, '__origin__', None) in (collections.abc.Iterable, list)
+
+def get_lookup(obj, lookup, default=None):
+    """
+    Follow a lookup of attributes separated by double underscores, e.g.
+    agency__object_id, returns default if any of them is missing or None
+    """
+    for name in lookup.split('__'):
+        obj = getattr(obj, name, None)
+        if obj is None: return default
+    return obj
@@ -0,0 +1,86 @@
+# periods.py
+
+import re
+
+from datetime import date, datetime, timedelta
+from dateutil.parser import parse as datetime_convert
+from functools import lru_cache
+
+# Reporting periods as defined in the SDMX-ML common schema, ie 2010-Q1,
+# 2010-M02, 2010-W05 and the like.  The `A`, `S`, `T`, `Q` and `M` kinds are
+# expressed as a number of months
+REPORTING_PERIOD = re.compile(
+    r'^(?P<year>\d{4})-(?P<kind>[ASTQMWD])(?P<index>\d{1,3})$')
+MONTHS_PER_KIND = {'A': 12, 'S': 6, 'T': 4, 'Q': 3, 'M': 1}
+GREGORIAN_YEAR = re.compile(r'^\d{4}$')
+GREGORIAN_YEAR_MONTH = re.compile(r'^(?P<year>\d{4})-(?P<month>\d{2})$')
+
+def _shift_month(year, month, months):
+    index = year * 12 + month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _reporting_bounds(match):
+    year = int(match.group('year'))
+    kind = match.group('kind')
+    index = int(match.group('index'))
+    if kind == 'W':
+        jan4 = date(year, 1, 4)
+        start = jan4 - timedelta(days=jan4.weekday()) + timedelta(weeks=index - 1)
+        return start, start + timedelta(days=6)
+    if kind == 'D':
+        start = date(year, 1, 1) + timedelta(days=index - 1)
+        return start, start
+    months = MONTHS_PER_KIND[kind]
+    start = _shift_month(year, 1, (index - 1) * months)
+    end = _shift_month(start.year, start.month, months) - timedelta(days=1)
+    return start, end
+
+@lru_cache(maxsize=65536)
+def period_bounds(period):
+    """
+    Returns the first and last day of a SDMX time period.
+
+    Observational time periods repeat a lot during bulk validation and data
+    loading so the result is cached.
+
+    Parameters
+    ----------
+    period: str
+        A gregorian (2010, 2010-02, 2010-02-15), reporting (2010-Q1,
+        2010-W05) or date time period.  Time ranges (start/duration) are
+        bounded by their start.
+
+    Returns
+    -------
+        A (date, date) tuple
+
+    Raises
+    ------
+    ValueError
+        If the period cannot be parsed
+    """
+    period = period.strip()
+    if '/' in period:
+        start, _ = period_bounds(period.split('/')[0])
+        return start, start
+    if GREGORIAN_YEAR.match(period):
+        year = int(period)
+        return date(year, 1, 1), date(year, 12, 31)
+    match = GREGORIAN_YEAR_MONTH.match(period)
+    if match:
+        start = date(int(match.group('year')), int(match.group('month')), 1)
+        return start, _shift_month(start.year, start.month, 1) - timedelta(days=1)
+    match = REPORTING_PERIOD.match(period)
+    if match:
+        return _reporting_bounds(match)
+    value = datetime_convert(period)
+    if isinstance(value, datetime): value = value.date()
+    return value, value
+
+def period_start(period):
+    """Returns the first day of a SDMX time period."""
+    return period_bounds(period)[0]
+
+def period_end(period):
+    """Returns the last day of a SDMX time period."""
+    return period_bounds(period)[1]
@@ -1,9 +1,93 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.translation.trans_real import parse_accept_lang_header
+from modeltranslation.translator import NotRegistered, translator
+from modeltranslation.utils import build_localized_fieldname
 
 # LANGUAGE_CODE = 'en-us'
 # LANGUAGES = [
 
+# The languages requested by the client of the current query, None for all
+_requested_languages = ContextVar('fiesta_requested_languages', default=None)
+
 def get_language(language_request):
     if language_request and language_request not in settings.LANGUAGES:
         return settings.LANGUAGE_CODE.split('-')[0]
     return language_request.split('-')[0]
+
+def get_languages():
+    """Returns the codes of the configured languages"""
+    return tuple(code for code, _ in settings.LANGUAGES)
+
+def get_requested_languages():
+    """Returns the codes of the languages retrieved and rendered"""
+    return _requested_languages.get() or get_languages()
+
+@contextmanager
+def requested_languages(languages):
+    """Retrieves and renders only `languages` within the block, all if None"""
+    token = _requested_languages.set(tuple(languages) if languages else None)
+    try:
+        yield
+    finally:
+        _requested_languages.reset(token)
+
+def parse_accept_language(header):
+    """
+    Returns the configured languages accepted by an Accept-Language header
+    in order of preference, or None if all are accepted
+    """
+    if not header: return
+    configured = get_languages()
+    accepted = []
+    for code, _ in parse_accept_lang_header(header):
+        if code == '*': return
+        code = code.split('-')[0]
+        if code in configured and code not in accepted:
+            accepted.append(code)
+    return tuple(accepted) or None
+
+def get_deferred_translations(model, languages=None):
+    """
+    Returns the translation fields of a model in the languages that are not
+    requested, so that they can be deferred
+    """
+    languages = languages or get_requested_languages()
+    try:
+        options = translator.get_options_for_model(model)
+    except NotRegistered:
+        return []
+    return [
+        build_localized_fieldname(name, code)
+        for name in options.fields for code in get_languages()
+        if code not in languages
+    ]
+
+def defer_translations(queryset, languages=None):
+    deferred = get_deferred_translations(queryset.model, languages)
+    return queryset.defer(*deferred) if deferred else queryset
+
+def translated_prefetch(model, lookup, languages=None):
+    """
+    Returns a Prefetch of a single level lookup of `model` that defers the
+    translations of the languages that are not requested, other lookups are
+    returned as they are
+    """
+    if '__' in lookup: return lookup
+    for relation in model._meta.related_objects:
+        if relation.get_accessor_name() == lookup:
+            related_model = relation.related_model
+            break
+    else:
+        try:
+            related_model = model._meta.get_field(lookup).related_model
+        except FieldDoesNotExist:
+            return lookup
+    if not related_model or not get_deferred_translations(related_model, languages):
+        return lookup
+    return Prefetch(lookup, queryset=defer_translations(
+        related_model._default_manager.all(), languages))
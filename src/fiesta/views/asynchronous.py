@@ -0,0 +1,119 @@
+# asynchronous.py
+
+import asyncio
+
+import django
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.views import APIView
+
+from ..renderers import XMLRenderer
+from ..utils.asynchronous import aiterate, run_sync
+from ..utils.compression import compress
+from .views import RESTfulStructureMixin, check_query_params
+
+# Asynchronous views are served from Django 3.1 and asynchronous iterators are
+# consumed by StreamingHttpResponse from Django 4.2
+ASYNC_VIEWS = django.VERSION >= (3, 1)
+ASYNC_STREAMING = django.VERSION >= (4, 2)
+
+class AsyncAPIView(View):
+    """
+    Base of the ASGI native views
+
+    Runs the content negotiation, authentication, permission and throttling
+    checks of `APIView.initial` with the same policies before the handler and
+    renders their errors the way the synchronous views do.
+    """
+    authentication_classes = APIView.authentication_classes
+    permission_classes = APIView.permission_classes
+    throttle_classes = APIView.throttle_classes
+
+    def initial(self, request, *args, **kwargs):
+        """Returns the rendered error response of the checks or None"""
+        view = APIView(
+            authentication_classes=self.authentication_classes,
+            permission_classes=self.permission_classes,
+            throttle_classes=self.throttle_classes)
+        view.args, view.kwargs = args, kwargs
+        view.request = view.initialize_request(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+        try:
+            # Also sets the user of the authenticators on the request
+            view.initial(view.request, *args, **kwargs)
+        except Exception as exc:
+            response = view.finalize_response(
+                view.request, view.handle_exception(exc), *args, **kwargs)
+            return response.render()
+
+    def render_error(self, message, error_status):
+        """Renders the message of a rejected query as the synchronous views do"""
+        renderer = XMLRenderer()
+        response = HttpResponse(status=error_status, content_type=renderer.media_type)
+        response.content = renderer.render(
+            message, renderer.media_type, {'response': response})
+        return response
+
+    async def dispatch(self, request, *args, **kwargs):
+        error = await run_sync(self.initial, request, *args, **kwargs)
+        if error is not None: return error
+        response = super().dispatch(request, *args, **kwargs)
+        if asyncio.iscoroutine(response): response = await response
+        return response
+
+class AsyncSDMXRESTfulStructureView(RESTfulStructureMixin, AsyncAPIView):
+    """
+    ASGI native version of `SDMXRESTfulStructureView`
+
+    The queries run in the executor of `fiesta.utils.asynchronous` and the
+    message is streamed one artefact at a time so that the event loop is never
+    blocked by the database or the rendering.
+    """
+
+    async def get(self, request, resource, agencyID='all', resourceID='all',
+                  version='latest', itemID='all'):
+        error = check_query_params(request.GET, 'structure')
+        if error: return self.render_error(*error)
+        query = await run_sync(
+            lambda: self.create_structure_query(
+                request.user, request.GET, resource, agencyID, resourceID,
+                version))
+        item_options = self.get_item_options(request.GET, itemID)
+        data = await run_sync(
+            self.retrieve, query, user=request.user,
+            languages=self.get_languages(request), **item_options)
+        encoding = self.get_encoding(request)
+        renderer = XMLRenderer()
+        # A message selected for the output validation is rendered before
+        # it is streamed
+        chunks = await run_sync(
+            renderer.stream, data, resource=query.resource, detail=query.detail,
+            encoding=encoding, cache=not item_options)
+        if ASYNC_STREAMING:
+            response = StreamingHttpResponse(
+                aiterate(chunks), content_type=renderer.media_type)
+        else:
+            content = await run_sync(b''.join, chunks)
+            response = HttpResponse(content, content_type=renderer.media_type)
+        return self.set_encoding(response, encoding)
+
+class AsyncSDMXRESTfulSchemaView(RESTfulStructureMixin, AsyncAPIView):
+    """ASGI native version of `SDMXRESTfulSchemaView`"""
+
+    async def get(self, request, context, agencyID, resourceID, version='latest'):
+        error = check_query_params(request.GET, 'schema')
+        if error: return self.render_error(*error)
+        schema_query, structure_query = await run_sync(
+            lambda: self.create_schema_query(
+                request.user, request.GET, context, agencyID, resourceID,
+                version))
+        data = await run_sync(
+            self.retrieve, schema_query, structure_query, request.user,
+            self.get_languages(request))
+        encoding = self.get_encoding(request)
+        renderer = XMLRenderer()
+        content = await run_sync(renderer.render, data)
+        if encoding: content = await run_sync(compress, content, encoding)
+        response = HttpResponse(content, content_type=renderer.media_type)
+        return self.set_encoding(response, encoding)
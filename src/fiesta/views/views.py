@@ -2,59 +2,91 @@
 
 from django.apps import apps
 from django.core.files.base import ContentFile
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from rest_framework import status 
 from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from ..core import constants
+from ..core.data import DataQuery, DataQueryEngine, DataSet, parse_key
 from ..core.serializers.options import (
-    ProcessContextOptions, RESTfulQueryContextOptions)
+    ProcessContextOptions, RESTfulQuery, RESTfulQueryContextOptions,
+    RESTfulSchemaQuery)
 from ..core.serializers.structure import StructureSerializer
+from ..core.urns import CLASS2RESOURCE, ITEM2SCHEME, parse_urn, resolve_urns
 from ..core.exceptions import (
     NotImplementedError, ParseSerializeError, ExternalError
 )
 
 from ..permissions import HasMaintainablePermission
+from ..renderers import XMLRenderer
+from ..routers import pin_to_primary, replica_reads
+from ..settings import api_settings
+from ..utils.compression import compress, get_available_encodings, negotiate_encoding
+from ..utils.periods import period_bounds
+from ..utils.translation import parse_accept_language, requested_languages
 
 class SubmitStructureRequestView(APIView):
     permission_classes = [HasMaintainablePermission]
 
+    def is_dry_run(self, request, data):
+        """
+        Whether the submission is only validated, requested by the `dryRun`
+        query parameter or, if `DEFAULT_DRY_RUN_TEST_MESSAGES`, by a test
+        message
+        """
+        if request.query_params.get('dryRun') == 'true': return True
+        header = getattr(data, 'header', None)
+        return bool(api_settings.DEFAULT_DRY_RUN_TEST_MESSAGES
+                    and header and header.test)
+
+    def to_request(self, data):
+        """Structure messages are submitted as SubmitStructureRequests"""
+        if isinstance(data, StructureSerializer):
+            return data.to_request()
+        return data
+
     def post(self, request, format=None):
         log_model = apps.get_model('registry', 'log')
         log = log_model.objects.create(
             user=request.user,
-            channel=log_model.CHANNEL_CHOICES.UPLOADSTRUCTUREREST,
-            progress=log_model.PROGRESS_CHOICES.SUBMITTED,
+            channel=log_model.Channel.UPLOADSTRUCTUREREST,
+            progress=log_model.Progress.SUBMITTED,
         )
-        log.update_progress(log_model.PROGRESS_CHOICES.NEGOTIATING)
-        request.body
-        log.update_progress(log_model.PROGRESS_CHOICES.PARSING)
+        log.update_progress(log_model.Progress.NEGOTIATING)
+        body = request.body
+        log.update_progress(log_model.Progress.PARSING)
         try:
             data = request.data
         except (ParseError, ParseSerializeError, NotImplementedError,
                 ExternalError) as exc:
-            exceptions_file = ContentFile(exc.detail)
-            log.exceptions_file.save(f'EXCEPTIONS_{data.m_header.id}', exceptions_file)
-            request_file = ContentFile(request.stream)
-            log.request_file.save(f'REQUEST_{data.m_header.id}', request_file)
-            log.update_progress(log_model.PROGRESS_CHOICES.COMPLETED) 
+            # The message has no header yet, the files are named by the log
+            log.exceptions_file.save(
+                f'EXCEPTIONS_{log.pk}.txt', ContentFile(str(exc.detail)))
+            log.request_file.save(f'REQUEST_{log.pk}.xml', ContentFile(body))
+            log.update_progress(log_model.Progress.COMPLETED) 
             raise exc
-        log.update_progress(log_model.PROGRESS_CHOICES.COMPLETED)
-        context = ProcessContextOptions(request, log)
+        log.update_progress(log_model.Progress.PROCESSING)
+        data = self.to_request(data)
+        context = ProcessContextOptions(
+            request, log, dry_run=self.is_dry_run(request, data))
         data.process(context=context)
-        outdata = data.to_response()
-        if data._context.result.submitted_structure.maintainable_object.ref.agency_id == 'MAIN':
-            response_status = status.HTTP_400_BAD_REQUEST
-        else:
-            response_status = status.HTTP_200_OK
-        request_file = ContentFile(request.stream)
-        log.request_file.save(f'REQUEST_{data.m_header.id}', request_file)
-        response = Response(outdata, status=response_status)
-        response_file = ContentFile(response)
-        log.response_file.save(f'RESPONSE_{data.m_header.id}', response_file)
-        log.update_progress('Finished') 
-        return response
+        # The user reads the submitted artefacts from the primary until the
+        # replicas catch up, a dry run writes nothing
+        if not context.dry_run: pin_to_primary(request.user)
+        renderer = XMLRenderer()
+        content = renderer.render(data.to_response(), renderer.media_type)
+        # The header of a dry run is not saved, the files are named by its ID
+        # as in the message
+        header_id = data.header.object_id
+        log.request_file.save(f'REQUEST_{header_id}.xml', ContentFile(body))
+        log.response_file.save(f'RESPONSE_{header_id}.xml', ContentFile(content))
+        log.update_progress(log_model.Progress.COMPLETED) 
+        return HttpResponse(content, content_type=renderer.media_type)
 
 class SubmitRegistrationsRequestView(APIView):
     
@@ -83,94 +115,386 @@ class SubmitRegistrationsRequestView(APIView):
         log.update_progress('Finished')
         return Response(outdata, status=response_status)
 
-class SDMXRESTfulStructureView(APIView):
+def check_query_params(query_params, kind):
+    """
+    Returns the (message, status) of the error response if a query parameter
+    or its value is not allowed for a RESTful query of the given kind or None
+    """
+    for key, value in query_params.items():
+        if key not in constants.QUERY_PARAMS[kind]:
+            return (f'Query key {key} is not acceptable',
+                    status.HTTP_406_NOT_ACCEPTABLE)
+        if value not in constants.QUERY_PARAMS[kind][key]:
+            return (f'Query value {value} for query parameter {key} is not '
+                    'allowed', status.HTTP_405_METHOD_NOT_ALLOWED)
 
-    def get(self, request, resource, agencyID='all', resourceID='all',
-            version='latest'):
-        log_model = apps.get_model('registry', 'querylog')
-        log = log_model.objects.create(
-            user=request.user,
-            channel='RESTful_query',
-            progress='Submitted',
+class RESTfulStructureMixin:
+    """
+    Synchronous steps of the RESTful structure and schema queries shared by
+    the views and their asynchronous versions
+    """
+
+    def get_encoding(self, request):
+        """
+        Returns the content coding of the response negotiated with the
+        Accept-Encoding header of the request, or None for identity
+        """
+        available = get_available_encodings()
+        return negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING'),
+            [e for e in api_settings.DEFAULT_RESPONSE_ENCODINGS if e in available])
+
+    def set_encoding(self, response, encoding):
+        """Sets the content coding and the varying headers of a response"""
+        if encoding: response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ['Accept-Language', 'Accept-Encoding'])
+        return response
+
+    def get_item_options(self, query_params, itemID):
+        """Returns the context options of the item query segment"""
+        if itemID == 'all': return {}
+        return {
+            'item_ids': tuple(itemID.split('+')),
+            'ancestors': query_params.get('ancestors') == 'true',
+        }
+
+    def create_log(self, user):
+        log_model = apps.get_model('registry', 'log')
+        return log_model.objects.create(
+            user=user if user.is_authenticated else None,
+            channel=log_model.Channel.REQUESTSTRUCTUREREST,
+            progress=log_model.Progress.SUBMITTED,
         )
-        query_model = apps.get_model('registry', 'restfulstructurequery')
-        query_params = request.query_params
-        for key, value in query_params:
-            if key not in ['detail', 'references']:
-                return Response(
-                    f'Query key {key} is not acceptable',
-                    status=status.HTTP_406_NOT_ACCEPTABLE
-                )
-            if value not in constants.QUERY_PARAMS['structure'][key]:
-                return Response(
-                    f'Query value {value} for query parameter {key} is not '
-                    'allowed',
-                    status=status.HTTP_405_METHOD_NOT_ALLOWED
-                )
-            detail = query_params.get('detail', 'full') 
-            references = query_params.get('references', 'none') 
-        query = query_model.objects.create(
-            log = log,
+
+    def create_structure_query(self, user, query_params, resource, agencyID,
+                               resourceID, version):
+        return RESTfulQuery(
             resource=resource,
             agency_id=agencyID,
             resource_id=resourceID,
             version=version,
-            detail=detail,
-            references=references
+            detail=query_params.get('detail', 'full'),
+            references=query_params.get('references', 'none'),
+            log=self.create_log(user),
         )
-        log.update_progress('Processing')
-        context = RESTfulQueryContextOptions(query)
-        data = StructureSerializer().retrieve_restful(context)
+
+    def create_schema_query(self, user, query_params, context, agencyID,
+                            resourceID, version):
+        log = self.create_log(user)
+        schema_query = RESTfulSchemaQuery(
+            context=context,
+            agency_id=agencyID,
+            resource_id=resourceID,
+            version=version,
+            observation_dimension=query_params.get(
+                'dimensionAtObservation', 'TIME_PERIOD'),
+            log=log,
+        )
+        structure_query = RESTfulQuery(
+            resource=context,
+            agency_id=agencyID,
+            resource_id=resourceID,
+            version=version,
+            detail='full',
+            references='children',
+            log=log,
+        )
+        return schema_query, structure_query
+
+    def get_languages(self, request):
+        """
+        Returns the languages of the Accept-Language header of the request,
+        the responses then vary on the header, or None for all
+        """
+        return parse_accept_language(request.META.get('HTTP_ACCEPT_LANGUAGE'))
+
+    def retrieve(self, query, structure_query=None, user=None, languages=None,
+                 **options):
+        log = query.log
+        log.update_progress(log.Progress.PROCESSING)
+        context = RESTfulQueryContextOptions(structure_query or query, **options)
+        with replica_reads(user), requested_languages(languages):
+            data = StructureSerializer().retrieve_restful(context)
         data._query = query 
-        log.update_progress('Finished')
-        return Response(data, status=status.HTTP_200_OK)
+        # The renderer renders only these languages
+        data._languages = languages
+        log.update_progress(log.Progress.COMPLETED)
+        return data
 
-class SDMXRESTfulSchemaView(APIView):
+class SDMXRESTfulStructureView(RESTfulStructureMixin, APIView):
+
+    def get(self, request, resource, agencyID='all', resourceID='all',
+            version='latest', itemID='all'):
+        error = check_query_params(request.query_params, 'structure')
+        if error:
+            message, error_status = error
+            return Response(message, status=error_status)
+        query = self.create_structure_query(
+            request.user, request.query_params, resource, agencyID,
+            resourceID, version)
+        item_options = self.get_item_options(request.query_params, itemID)
+        data = self.retrieve(
+            query, user=request.user, languages=self.get_languages(request),
+            **item_options)
+        encoding = self.get_encoding(request)
+        renderer = XMLRenderer()
+        if api_settings.DEFAULT_STREAM_STRUCTURES:
+            # The artefacts of item queries are partial, so not cached
+            response = StreamingHttpResponse(
+                renderer.stream(data, resource=query.resource, detail=query.detail,
+                                encoding=encoding, cache=not item_options),
+                content_type=renderer.media_type)
+        elif encoding:
+            content = renderer.render(data, renderer.media_type)
+            response = HttpResponse(
+                compress(content, encoding), content_type=renderer.media_type)
+        else:
+            response = Response(data, status=status.HTTP_200_OK)
+        return self.set_encoding(response, encoding)
+
+class SDMXRESTfulSchemaView(RESTfulStructureMixin, APIView):
 
     def get(self, request, context, agencyID, resourceID, version='latest'):
+        error = check_query_params(request.query_params, 'schema')
+        if error:
+            message, error_status = error
+            return Response(message, status=error_status)
+        schema_query, structure_query = self.create_schema_query(
+            request.user, request.query_params, context, agencyID,
+            resourceID, version)
+        data = self.retrieve(schema_query, structure_query, request.user,
+                             self.get_languages(request))
+        encoding = self.get_encoding(request)
+        if encoding:
+            renderer = XMLRenderer()
+            content = renderer.render(data, renderer.media_type)
+            response = HttpResponse(
+                compress(content, encoding), content_type=renderer.media_type)
+        else:
+            response = Response(data, status=status.HTTP_200_OK)
+        return self.set_encoding(response, encoding)
 
-        log_model = apps.get_model('registry', 'querylog')
-        log = log_model.objects.create(
-            user=request.user,
-            channel='RESTful_query',
-            progress='Submitted',
-        )
-        schema_query_model = apps.get_model('registry', 'restfulschemaquery')
-        structure_query_model = apps.get_model('registry', 'restfulstructurequery')
+class SDMXRESTfulBatchView(RESTfulStructureMixin, APIView):
+    """
+    Retrieves many artefacts with one structure query
+
+    The body is a JSON object with a `queries` list whose entries are either
+    URNs or objects with the `resource`, `agencyID`, `resourceID` and
+    `version` of an artefact, and optionally the `detail` and `references`
+    applied to all the entries.  The entries retrieve whole artefacts, the
+    URNs of items are rejected.
+    """
+    parser_classes = [JSONParser]
+
+    def get_query(self, entry):
+        if isinstance(entry, str):
+            urn = parse_urn(entry)
+            if urn.item_id:
+                raise ValueError(
+                    f'Item URN {entry} is not supported, batch queries '
+                    f'retrieve whole artefacts')
+            return RESTfulQuery(
+                resource=urn.resource, agency_id=urn.agency_id,
+                resource_id=urn.object_id, version=urn.version)
+        if not isinstance(entry, dict):
+            raise ValueError(f'Query {entry} is neither a URN nor an object')
+        resource = entry.get('resource')
+        if resource not in constants.RESOURCE2MAINTAINABLE:
+            raise ValueError(f'Resource {resource} is not supported')
+        return RESTfulQuery(
+            resource=resource,
+            agency_id=entry.get('agencyID', 'all'),
+            resource_id=entry.get('resourceID', 'all'),
+            version=entry.get('version', 'latest'))
+
+    def post(self, request, format=None):
+        data = request.data if isinstance(request.data, dict) else {}
+        entries = data.get('queries')
+        if not isinstance(entries, list) or not entries:
+            return Response('A non empty list of queries is required',
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_queries = api_settings.DEFAULT_BATCH_MAX_QUERIES
+        if len(entries) > max_queries:
+            return Response(f'At most {max_queries} queries are allowed',
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        options = {key: data[key] for key in ('detail', 'references')
+                   if key in data}
+        error = check_query_params(options, 'structure')
+        if error:
+            message, error_status = error
+            return Response(message, status=error_status)
+        try:
+            queries = [self.get_query(entry) for entry in entries]
+        except ValueError as exc:
+            return Response(str(exc), status=status.HTTP_400_BAD_REQUEST)
+        batch = RESTfulQuery(resource='structure', **options)
+        log = self.create_log(request.user)
+        log.update_progress(log.Progress.PROCESSING)
+        context = RESTfulQueryContextOptions(batch)
+        languages = self.get_languages(request)
+        with replica_reads(request.user), requested_languages(languages):
+            data = StructureSerializer().retrieve_restful_batch(
+                context, queries, log)
+        data._query = batch
+        data._languages = languages
+        log.update_progress(log.Progress.COMPLETED)
+        response = Response(data, status=status.HTTP_200_OK)
+        patch_vary_headers(response, ['Accept-Language'])
+        return response
+
+class SDMXSearchView(APIView):
+    """
+    Searches the names, descriptions and annotation texts of the artefacts
+    and their items
+
+    Query parameters are `q`, the words to match, and optionally `lang`, the
+    languages of the texts, and `resource`, the RESTful resources of the
+    matched artefacts and items, each separated by `+`.
+    """
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request, format=None):
+        text = request.query_params.get('q', '')
+        if not text.strip():
+            return Response('Query parameter q is required',
+                            status=status.HTTP_400_BAD_REQUEST)
+        # An unencoded + separator is decoded as a space
+        languages = request.query_params.get('lang', '').replace(' ', '+')
+        classes = None
+        resources = request.query_params.get('resource', '').replace(' ', '+')
+        if resources:
+            resources = resources.split('+')
+            classes = [
+                name for name, resource in CLASS2RESOURCE.items()
+                if resource in resources
+            ]
+            classes += [
+                item for item, scheme in ITEM2SCHEME.items()
+                if scheme in classes
+            ]
+        SearchEntry = apps.get_model('registry', 'SearchEntry')
+        with replica_reads(request.user):
+            results = SearchEntry.objects.search(
+                text, languages=languages.split('+') if languages else None,
+                classes=classes, limit=api_settings.DEFAULT_SEARCH_RESULTS)
+        return Response([{'urn': urn, 'score': score} for urn, score in results])
+
+class SDMXURNView(APIView):
+    """
+    Resolves the URNs of artefacts and items given by the repeated `urn`
+    query parameter to the stored objects and their RESTful query paths
+
+    Each URN is reported as not found if it is not stored, its class has no
+    model or, with the error, if it is malformed.
+    """
+    renderer_classes = [JSONRenderer]
+
+    def get_path(self, urn):
+        parsed = parse_urn(urn, strict=False)
+        scheme = ITEM2SCHEME.get(parsed.class_name, parsed.class_name)
+        resource = CLASS2RESOURCE.get(scheme)
+        if not resource: return
+        path = (f'wsrest/{resource}/{parsed.agency_id}/{parsed.object_id}/'
+                f'{parsed.version}/')
+        return f'{path}{parsed.item_id}/' if parsed.item_id else path
+
+    def get(self, request, format=None):
+        urns = request.query_params.getlist('urn')
+        if not urns:
+            return Response('Query parameter urn is required',
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_queries = api_settings.DEFAULT_BATCH_MAX_QUERIES
+        if len(urns) > max_queries:
+            return Response(f'At most {max_queries} URNs are allowed',
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        errors = {}
+        for urn in urns:
+            try:
+                parse_urn(urn, strict=False)
+            except ValueError as exc:
+                errors[urn] = str(exc)
+        with replica_reads(request.user):
+            resolved = resolve_urns(urn for urn in urns if urn not in errors)
+        results = []
+        for urn in urns:
+            obj = resolved.get(urn)
+            if obj is None:
+                result = {'urn': urn, 'found': False}
+                if urn in errors: result['error'] = errors[urn]
+                results.append(result)
+                continue
+            results.append({
+                'urn': urn,
+                'found': True,
+                'model': obj._meta.label,
+                'path': self.get_path(urn),
+            })
+        return Response(results)
+
+class SDMXRESTfulDataView(APIView):
+
+    def get_dataflow(self, flowRef):
+        parts = flowRef.split(',')
+        if len(parts) == 1: parts = ['all', parts[0], 'latest']
+        elif len(parts) == 2: parts.append('latest')
+        agency_id, object_id, version = parts
+        queryset = apps.get_model('datastructure', 'dataflow').objects.filter(
+            object_id=object_id)
+        if agency_id != 'all':
+            queryset = queryset.filter(agency__object_id=agency_id)
+        if version != 'latest':
+            queryset = queryset.filter(version=version)
+        dataflow = queryset.select_related(
+            'agency', 'structure__agency').order_by('-version').first()
+        if not dataflow:
+            raise Http404(f'Dataflow {flowRef} not found')
+        return dataflow
+
+    def get(self, request, flowRef, key='all', providerRef='all'):
         query_params = request.query_params
-        for key, value in query_params:
-            if key not in ['dimensionAtObservation']:
+        for param, value in query_params.items():
+            if param not in constants.QUERY_PARAMS['data']:
                 return Response(
-                    f'Query key {key} is not acceptable',
+                    f'Query key {param} is not acceptable',
                     status=status.HTTP_406_NOT_ACCEPTABLE
                 )
-            if value not in constants.QUERY_PARAMS['schema'][key]:
+            allowed = constants.QUERY_PARAMS['data'][param]
+            if allowed is not None and value not in allowed:
                 return Response(
-                    f'Query value {value} for query parameter {key} is not '
+                    f'Query value {value} for query parameter {param} is not '
                     'allowed',
                     status=status.HTTP_405_METHOD_NOT_ALLOWED
                 )
-            observation_dimension = query_params.get('dimensionAtObservation', 'TIME_PERIOD') 
-        schema_query = schema_query_model.objects.create(
-            log = log,
-            context=context,
-            agency_id=agencyID,
-            resource_id=resourceID,
-            version=version,
-            observation_dimension=observation_dimension
-        )
-        structure_query = structure_query_model.objects.create(
-            log = log,
-            resource=context,
-            agency_id=agencyID,
-            resource_id=resourceID,
-            version=version,
-            detail='full',
-            references='children'
-        )
-        log.update_progress('Processing')
-        context = RESTfulQueryContextOptions(structure_query)
-        data = StructureSerializer().retrieve_restful(context)
-        data._query = schema_query
-        log.update_progress('Finished')
+        # The observation models have neither data providers nor other
+        # observation dimensions
+        if providerRef != 'all':
+            raise NotImplementedError(
+                f'Data provider {providerRef} is not supported, query all')
+        dimension = query_params.get('dimensionAtObservation', 'TIME_PERIOD')
+        if dimension != 'TIME_PERIOD':
+            raise NotImplementedError(
+                f'Dimension at observation {dimension} is not supported, '
+                'query TIME_PERIOD')
+        dataflow = self.get_dataflow(flowRef)
+        engine = DataQueryEngine.for_dataflow(dataflow)
+        try:
+            parse_key(key, engine.dimensions)
+            first_n = query_params.get('firstNObservations')
+            last_n = query_params.get('lastNObservations')
+            query = DataQuery(
+                flow=dataflow,
+                key=key,
+                provider=providerRef,
+                start_period=query_params.get('startPeriod'),
+                end_period=query_params.get('endPeriod'),
+                first_n_observations=int(first_n) if first_n else None,
+                last_n_observations=int(last_n) if last_n else None,
+                dimension_at_observation=dimension,
+                detail=query_params.get('detail', 'full')
+            )
+            for period in (query.start_period, query.end_period):
+                if period: period_bounds(period)
+        except ValueError as exc:
+            raise ParseError(str(exc))
+        data = DataSet(dataflow, engine.dimensions, engine.execute(query), query)
         return Response(data, status=status.HTTP_200_OK)
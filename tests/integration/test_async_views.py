@@ -0,0 +1,153 @@
+# test_async_views.py
+
+import asyncio
+import importlib
+from unittest import mock, skipUnless
+
+import pytest
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, override_settings
+from django.urls import include, path
+from rest_framework.permissions import IsAuthenticated
+
+from fiesta import urls
+from fiesta.views import asynchronous
+from fiesta.utils.asynchronous import aiterate, run_sync
+
+from .test_submission import FIESTA, SubmissionTestCase, xpath
+
+def consume(iterable):
+    async def collect():
+        return [item async for item in aiterate(iterable, maxsize=2)]
+    return asyncio.run(collect())
+
+def failing():
+    yield 1
+    raise ValueError('failed')
+
+@pytest.mark.parametrize('workers', [0, 2])
+class TestAsyncHelpers:
+
+    def test_run_sync(self, workers):
+        with override_settings(FIESTA={'DEFAULT_ASYNC_WORKERS': workers}):
+            assert asyncio.run(run_sync(sum, [1, 2, 3])) == 6
+
+    def test_aiterate_keeps_order(self, workers):
+        with override_settings(FIESTA={'DEFAULT_ASYNC_WORKERS': workers}):
+            assert consume(iter(range(20))) == list(range(20))
+
+    def test_aiterate_raises_errors_of_the_iterable(self, workers):
+        with override_settings(FIESTA={'DEFAULT_ASYNC_WORKERS': workers}):
+            with pytest.raises(ValueError):
+                consume(failing())
+
+class AuthenticatedStructureView(asynchronous.AsyncSDMXRESTfulStructureView):
+    permission_classes = [IsAuthenticated]
+
+@override_settings(FIESTA=dict(FIESTA, DEFAULT_ASYNC_WORKERS=0))
+class AsyncStructureViewTest(SubmissionTestCase):
+    """
+    Calls the async views directly, they are awaited the same way by the ASGI
+    handler of Django 3.1
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def call(self, view_class, path, user=None, **kwargs):
+        request = RequestFactory().get(path)
+        request.user = user or AnonymousUser()
+        return async_to_sync(view_class.as_view())(request, **kwargs)
+
+    def test_renders_the_queried_artefact(self):
+        response = self.call(
+            asynchronous.AsyncSDMXRESTfulStructureView, '/wsrest/codelist/ECB/CL_FREQ/',
+            resource='codelist', agencyID='ECB', resourceID='CL_FREQ')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(xpath(response.content, '//structure:Codelist/@id'), ['CL_FREQ'])
+        self.assertEqual(len(xpath(response.content, '//structure:Code')), 10)
+
+    def test_renders_the_queried_items(self):
+        response = self.call(
+            asynchronous.AsyncSDMXRESTfulStructureView,
+            '/wsrest/codelist/ECB/CL_FREQ/1.0/A+M/', resource='codelist',
+            agencyID='ECB', resourceID='CL_FREQ', version='1.0', itemID='A+M')
+        self.assertEqual(xpath(response.content, '//structure:Code/@id'), ['A', 'M'])
+
+    def test_unknown_query_parameter(self):
+        response = self.call(
+            asynchronous.AsyncSDMXRESTfulStructureView, '/wsrest/codelist/?foo=bar',
+            resource='codelist')
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['406'])
+        self.assertEqual(xpath(response.content, '//common:Text/text()'),
+                         ['Query key foo is not acceptable'])
+
+    def test_not_allowed_query_value(self):
+        response = self.call(
+            asynchronous.AsyncSDMXRESTfulSchemaView,
+            '/wsrest/schema/datastructure/ECB/ECB_EXR1?dimensionAtObservation=X',
+            context='datastructure', agencyID='ECB', resourceID='ECB_EXR1')
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Content-Type'], 'application/sdmx-ml')
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['405'])
+
+    def test_checks_the_permissions(self):
+        response = self.call(
+            AuthenticatedStructureView, '/wsrest/codelist/ECB/CL_FREQ/',
+            resource='codelist', agencyID='ECB', resourceID='CL_FREQ')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['403'])
+        self.assertFalse(apps.get_model('registry', 'Log').objects.filter(
+            channel=apps.get_model('registry', 'Log').Channel.REQUESTSTRUCTUREREST).exists())
+        response = self.call(
+            AuthenticatedStructureView, '/wsrest/codelist/ECB/CL_FREQ/', user=self.user,
+            resource='codelist', agencyID='ECB', resourceID='CL_FREQ')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            apps.get_model('registry', 'Log').objects.get(
+                channel=apps.get_model('registry', 'Log').Channel.REQUESTSTRUCTUREREST).user, self.user)
+
+# The asynchronous views next to the synchronous submission view
+urlpatterns = [
+    path('fiesta/', include('fiesta.urls')),
+    path('async/<str:resource>/', asynchronous.AsyncSDMXRESTfulStructureView.as_view()),
+    path('async/<str:resource>/<str:agencyID>/',
+         asynchronous.AsyncSDMXRESTfulStructureView.as_view()),
+]
+
+@skipUnless(asynchronous.ASYNC_VIEWS, 'Asynchronous views require Django 3.1')
+@override_settings(ROOT_URLCONF=__name__, FIESTA=dict(FIESTA, DEFAULT_ASYNC_WORKERS=0))
+class AsyncClientTest(SubmissionTestCase):
+    """The async views served by the ASGI handler"""
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    async def test_renders_the_queried_artefacts(self):
+        response = await self.async_client.get('/async/codelist/ECB/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(xpath(response.content, '//structure:Codelist/@id'),
+                         ['CL_DECIMALS', 'CL_FREQ'])
+
+    async def test_query_parameter_errors(self):
+        response = await self.async_client.get('/async/codelist/?foo=bar')
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['406'])
+
+class TestAsyncRoutes:
+
+    def test_require_django_3_1(self):
+        try:
+            with mock.patch.object(asynchronous, 'ASYNC_VIEWS', False), \
+                    override_settings(FIESTA={'DEFAULT_ASYNC_VIEWS': True}):
+                with pytest.raises(ImproperlyConfigured):
+                    importlib.reload(urls)
+        finally:
+            importlib.reload(urls)
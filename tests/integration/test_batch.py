@@ -0,0 +1,103 @@
+# test_batch.py
+
+from django.apps import apps
+
+from fiesta.core.serializers.options import RESTfulQuery, RESTfulQueryContextOptions
+from fiesta.core.serializers.structure import StructuresSerializer
+
+from .test_dependencies import DependencyTestCase
+from .test_submission import FIESTA, SubmissionTestCase, xpath
+
+FREQ = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_FREQ(1.0)'
+DECIMALS = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_DECIMALS(1.0)'
+
+class BatchQueryTest(SubmissionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def batch(self, queries, **options):
+        return self.client.post('/fiesta/wsrest/batch/', dict(options, queries=queries),
+                                content_type='application/json')
+
+    def get_codelists(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(xpath(response.content, '//structure:Codelist/@id'))
+
+    def test_retrieves_the_artefacts_of_urns_and_objects(self):
+        response = self.batch([
+            FREQ,
+            {'resource': 'codelist', 'agencyID': 'ECB', 'resourceID': 'CL_DECIMALS'},
+        ])
+        self.assertEqual(self.get_codelists(response), ['CL_DECIMALS', 'CL_FREQ'])
+        self.assertEqual(
+            len(xpath(response.content, '//structure:Codelist[@id="CL_FREQ"]/structure:Code')),
+            10)
+
+    def test_retrieves_duplicates_once(self):
+        self.assertEqual(self.get_codelists(self.batch([FREQ, FREQ])), ['CL_FREQ'])
+
+    def test_applies_the_detail_to_all_the_entries(self):
+        response = self.batch([FREQ, DECIMALS], detail='allstubs')
+        self.assertEqual(self.get_codelists(response), ['CL_DECIMALS', 'CL_FREQ'])
+        self.assertEqual(xpath(response.content, '//structure:Code'), [])
+
+    def test_rejects_item_urns(self):
+        response = self.batch([FREQ, 'urn:sdmx:org.sdmx.infomodel.codelist.Code=ECB:CL_FREQ(1.0).A'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['400'])
+
+    def test_rejects_invalid_entries(self):
+        for entry in ['urn:sdmx:CL_FREQ', {'resource': 'bogus'}, 42]:
+            self.assertEqual(self.batch([entry]).status_code, 400, entry)
+
+    def test_rejects_invalid_options(self):
+        self.assertEqual(self.batch([FREQ], detail='bogus').status_code, 405)
+
+    def test_requires_queries(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+
+    def test_limits_the_queries(self):
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_BATCH_MAX_QUERIES=1)):
+            self.assertEqual(self.batch([FREQ, DECIMALS]).status_code, 413)
+
+class BatchReferencesTest(DependencyTestCase):
+    """
+    CL_AREA is referenced by ECB_EXR1 and by ECB_EXR2, whose dataflow is
+    F1, so F1 is a grandparent of CL_AREA and no parent of ECB_EXR1
+    """
+
+    def setUp(self):
+        super().setUp()
+        agency = apps.get_model('base', 'Agency').objects.get(object_id='ECB')
+        other = self.DataStructure.objects.create(
+            agency=agency, object_id='ECB_EXR2', version='1.0')
+        flow = apps.get_model('datastructure', 'Dataflow').objects.create(
+            agency=agency, object_id='F1', version='1.0', structure=other)
+        self.link(self.dsd, self.area)
+        self.link(other, self.area)
+        self.link(flow, other)
+
+    def plan(self, queries):
+        context = RESTfulQueryContextOptions(
+            RESTfulQuery(resource='structure', references='parents'))
+        StructuresSerializer().plan_restful_batch(context, queries)
+        planned = {}
+        for cls, query in context.queries.items():
+            ids = cls._meta.model.objects.filter(query).values_list('object_id', flat=True)
+            if ids: planned[cls._meta.model_name] = sorted(ids)
+        return planned
+
+    def test_references_do_not_depend_on_the_entry_order(self):
+        codelist = RESTfulQuery(resource='codelist', agency_id='ECB',
+                                resource_id='CL_AREA', version='1.0')
+        dsd = RESTfulQuery(resource='datastructure', agency_id='ECB',
+                           resource_id='ECB_EXR1', version='1.0')
+        expected = {
+            'codelist': ['CL_AREA'],
+            'conceptscheme': ['ECB_CONCEPTS'],
+            'datastructure': ['ECB_EXR1', 'ECB_EXR2'],
+        }
+        self.assertEqual(self.plan([codelist, dsd]), expected)
+        self.assertEqual(self.plan([dsd, codelist]), expected)
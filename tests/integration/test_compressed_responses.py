@@ -0,0 +1,187 @@
+# test_compressed_responses.py
+
+import gzip
+import io
+
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.test import override_settings
+
+from fiesta.core.fragments import fragment_cache
+from fiesta.renderers import XMLRenderer
+from fiesta.utils.compression import brotli, zstandard
+from fiesta.views.views import RESTfulStructureMixin
+
+from .test_submission import (
+    FIESTA, SubmissionTestCase, canonical, read_message, xpath)
+
+def decompress(content, encoding):
+    if encoding == 'br':
+        return brotli.decompress(content)
+    if encoding == 'zstd':
+        # The fragments are concatenated frames
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(content), read_across_frames=True)
+        return reader.read()
+    # The fragments are concatenated members
+    return gzip.decompress(content)
+
+@override_settings(FIESTA=dict(FIESTA, DEFAULT_OUTPUT_VALIDATION='never'))
+class CompressedRendererTest(SubmissionTestCase):
+    """XMLRenderer.stream compressing the message as it is rendered"""
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def retrieve(self, resource='codelist', agency_id='ECB'):
+        mixin = RESTfulStructureMixin()
+        query = mixin.create_structure_query(
+            self.user, {}, resource, agency_id, 'all', 'latest')
+        return mixin.retrieve(query, user=self.user), query
+
+    def render(self, encoding=None):
+        data, query = self.retrieve()
+        chunks = list(XMLRenderer().stream(
+            data, resource=query.resource, detail=query.detail, encoding=encoding))
+        content = b''.join(chunks)
+        return chunks, decompress(content, encoding) if encoding else content
+
+    def test_compressed_messages_equal_the_identity_ones(self):
+        _, identity = self.render()
+        chunks, content = self.render('gzip')
+        self.assertEqual(canonical(content), canonical(identity))
+        self.assertTrue(all(chunks))
+
+    def test_validated_messages_are_compressed_whole(self):
+        data, query = self.retrieve()
+        buffered = XMLRenderer().render_structure(data, query.resource, query.detail)
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_OUTPUT_VALIDATION='always')), \
+                mock.patch('fiesta.renderers.xml.renderer.validate'):
+            chunks, content = self.render('gzip')
+        self.assertEqual(canonical(content), canonical(buffered))
+        # One member of the whole message
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), content)
+
+# Without the GZipMiddleware of the test settings, which compresses the
+# identity responses of the views whenever gzip is accepted
+@override_settings(
+    FIESTA=dict(FIESTA, DEFAULT_OUTPUT_VALIDATION='never'),
+    MIDDLEWARE=[
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+    ],
+)
+class CompressedResponseTest(SubmissionTestCase):
+    """Structure responses negotiated with Accept-Encoding"""
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def get(self, path, encoding, stream=False):
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_OUTPUT_VALIDATION='never',
+                                       DEFAULT_STREAM_STRUCTURES=stream)):
+            response = self.query(path, HTTP_ACCEPT_ENCODING=encoding)
+            content = (b''.join(response.streaming_content) if response.streaming
+                       else response.content)
+        self.assertEqual(response.status_code, 200)
+        return response, content
+
+    def assert_compressed(self, encoding, stream=False):
+        path = 'codelist/ECB/'
+        identity = self.query(path).content
+        response, content = self.get(path, f'{encoding}, identity;q=0.5', stream)
+        self.assertEqual(response['Content-Encoding'], encoding)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('Accept-Language', response['Vary'])
+        self.assertEqual(canonical(decompress(content, encoding)), canonical(identity))
+
+    def test_buffered_responses(self):
+        self.assert_compressed('gzip')
+
+    def test_streamed_responses(self):
+        self.assert_compressed('gzip', stream=True)
+
+    def test_identity_responses(self):
+        for encoding in ['identity', 'deflate', 'gzip;q=0']:
+            with self.subTest(encoding=encoding):
+                response, content = self.get('codelist/ECB/', encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(xpath(content, '//structure:Codelist/@id'),
+                                 ['CL_DECIMALS', 'CL_FREQ'])
+
+    def test_response_encodings_setting(self):
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_RESPONSE_ENCODINGS=[])):
+            response = self.query('codelist/ECB/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_responses(self):
+        self.assert_compressed('br')
+        self.assert_compressed('br', stream=True)
+
+    @skipUnless(zstandard, 'zstandard is not installed')
+    def test_zstandard_responses(self):
+        self.assert_compressed('zstd')
+        self.assert_compressed('zstd', stream=True)
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'fiesta-fragments'},
+    },
+    FIESTA=dict(FIESTA, DEFAULT_OUTPUT_VALIDATION='never', DEFAULT_STREAM_STRUCTURES=True,
+                DEFAULT_FRAGMENT_CACHE='fragments'),
+)
+class FragmentCacheTest(SubmissionTestCase):
+    """The compressed artefacts of the streamed responses in a LocMem alias"""
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def get(self, path='codelist/ECB/'):
+        with mock.patch.object(fragment_cache, 'set', wraps=fragment_cache.set) as store:
+            response = self.query(path, HTTP_ACCEPT_ENCODING='gzip')
+            content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        # The fragments stored are the artefacts the request rendered
+        rendered = [key for (key, _), _ in store.call_args_list if key is not None]
+        return content, len(rendered)
+
+    def get_names(self, content):
+        return xpath(content, '//structure:Code[@id="A"]/common:Name/text()')
+
+    def test_reuses_the_fragments(self):
+        content, rendered = self.get()
+        self.assertEqual(rendered, 2)
+        cached, rendered = self.get()
+        self.assertEqual(rendered, 0)
+        self.assertEqual(canonical(cached), canonical(content))
+
+    def test_item_queries_are_not_cached(self):
+        self.get()
+        content, rendered = self.get('codelist/ECB/CL_FREQ/1.0/A/')
+        self.assertEqual(rendered, 0)
+        self.assertEqual(xpath(content, '//structure:Code/@id'), ['A'])
+
+    def test_resubmission_invalidates_the_fragments(self):
+        content, _ = self.get()
+        self.assertEqual(self.get_names(content), ['Annual'])
+        self.submit(read_message('ecb_codelists.xml').replace(b'>Annual<', b'>Per annum<'))
+        # Both codelists of the message are saved again
+        content, rendered = self.get()
+        self.assertEqual(rendered, 2)
+        self.assertEqual(self.get_names(content), ['Per annum'])
+
+    def test_saving_an_artefact_invalidates_its_fragments(self):
+        self.get()
+        codelist = apps.get_model('codelist', 'Codelist').objects.get(object_id='CL_FREQ')
+        codelist.save()
+        _, rendered = self.get()
+        self.assertEqual(rendered, 1)
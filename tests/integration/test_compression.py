@@ -0,0 +1,79 @@
+# test_compression.py
+
+import gzip
+import io
+import zlib
+
+import pytest
+
+from zipfile import ZipFile
+
+from fiesta.utils.compression import (
+    DecompressionLimitError, compress, compress_chunks, decompress_stream,
+    is_zip, iter_zip_members, negotiate_encoding
+)
+
+MESSAGE = b'<Structure>' + b'<Codelist id="CL"/>' * 10000 + b'</Structure>'
+
+def test_gzip_and_deflate_bodies():
+    for encoding, body in [('gzip', gzip.compress(MESSAGE)),
+                           ('deflate', zlib.compress(MESSAGE))]:
+        assert decompress_stream(io.BytesIO(body), encoding).read() == MESSAGE
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    raw = compressor.compress(MESSAGE) + compressor.flush()
+    assert decompress_stream(io.BytesIO(raw), 'deflate').read() == MESSAGE
+
+def test_decompression_limits():
+    bomb = gzip.compress(b'\0' * 2 ** 22)
+    with pytest.raises(DecompressionLimitError):
+        decompress_stream(io.BytesIO(bomb), 'gzip', max_ratio=100).read()
+    with pytest.raises(DecompressionLimitError):
+        decompress_stream(io.BytesIO(bomb), 'gzip', max_size=2 ** 20).read()
+
+def test_zip_members():
+    stream = io.BytesIO()
+    with ZipFile(stream, 'w') as zf:
+        zf.writestr('a.xml', MESSAGE)
+        zf.writestr('b/', '')
+        zf.writestr('b/c.xml', b'<Structure/>')
+    assert is_zip(stream) and stream.tell() == 0
+    assert [(name, member.read()) for name, member in iter_zip_members(stream)] == [
+        ('a.xml', MESSAGE), ('b/c.xml', b'<Structure/>')]
+    with pytest.raises(DecompressionLimitError):
+        list(iter_zip_members(stream, max_members=1))
+    with pytest.raises(DecompressionLimitError):
+        list(iter_zip_members(stream, max_size=len(MESSAGE)))
+    assert not is_zip(io.BytesIO(MESSAGE))
+
+def test_negotiate_encoding():
+    encodings = ('zstd', 'br', 'gzip')
+    assert negotiate_encoding('gzip, deflate, br', encodings) == 'br'
+    assert negotiate_encoding('br;q=0.5, gzip', encodings) == 'gzip'
+    assert negotiate_encoding('*;q=0.1, gzip;q=0', encodings) == 'zstd'
+    assert negotiate_encoding('identity', encodings) is None
+    assert negotiate_encoding('gzip', ('br',)) is None
+    assert negotiate_encoding(None, encodings) is None
+
+def test_compressed_chunks_and_members():
+    chunks = [MESSAGE[:100], MESSAGE[100:]]
+    assert gzip.decompress(b''.join(compress_chunks(chunks, 'gzip'))) == MESSAGE
+    # Members compressed apart are served as one body
+    members = b''.join(compress(chunk, 'gzip') for chunk in chunks)
+    assert gzip.decompress(members) == MESSAGE
+
+def test_brotli_chunks():
+    brotli = pytest.importorskip('brotli')
+    chunks = [MESSAGE[:100], MESSAGE[100:]]
+    assert brotli.decompress(b''.join(compress_chunks(chunks, 'br'))) == MESSAGE
+    assert brotli.decompress(compress(MESSAGE, 'br')) == MESSAGE
+
+def test_zstandard_chunks_and_frames():
+    zstandard = pytest.importorskip('zstandard')
+    chunks = [MESSAGE[:100], MESSAGE[100:]]
+    decompressor = zstandard.ZstdDecompressor()
+    assert decompressor.decompressobj().decompress(
+        b''.join(compress_chunks(chunks, 'zstd'))) == MESSAGE
+    # Frames compressed apart are served as one body
+    frames = b''.join(compress(chunk, 'zstd') for chunk in chunks)
+    reader = decompressor.stream_reader(io.BytesIO(frames), read_across_frames=True)
+    assert reader.read() == MESSAGE
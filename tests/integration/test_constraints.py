@@ -0,0 +1,243 @@
+# test_constraints.py
+
+import pytest
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from fiesta.core.constraints import (
+    CompiledConstraint, ConstraintEvaluator, KeyTrie, TimeInterval,
+    constraint_cache, get_evaluator)
+from fiesta.utils.periods import period_bounds
+
+DIMENSIONS = ('FREQ', 'CURRENCY', 'CURRENCY_DENOM')
+
+@pytest.fixture(scope='module')
+def simple_evaluator():
+    constraint = CompiledConstraint(
+        included_regions=[(
+            frozenset({'A', 'M'}), frozenset({'USD', 'JPY'}), None)],
+        time_intervals=[TimeInterval(
+            start=period_bounds('2000')[0], end=period_bounds('2010-Q4')[1])]
+    )
+    return ConstraintEvaluator(DIMENSIONS, [constraint])
+
+@pytest.fixture(scope='module')
+def key_set_evaluator():
+    included = KeyTrie()
+    included.add(('A', 'USD', None))
+    excluded = KeyTrie()
+    excluded.add(('A', 'USD', 'JPY'))
+    constraint = CompiledConstraint(
+        included_keys=included, excluded_keys=excluded,
+        excluded_regions=[(None, None, frozenset({'GBP'}))]
+    )
+    return ConstraintEvaluator(DIMENSIONS, [constraint])
+
+class TestConstraintEvaluator:
+
+    def test_unconstrained_evaluator_allows_any_key(self):
+        evaluator = ConstraintEvaluator(DIMENSIONS)
+        assert evaluator.validate(['A.USD.EUR', 'X.Y.Z']) == [True, True]
+
+    def test_key_in_cube_region_is_allowed(self, simple_evaluator):
+        assert simple_evaluator.is_allowed('M.JPY.EUR')
+
+    def test_key_outside_cube_region_is_not_allowed(self, simple_evaluator):
+        assert not simple_evaluator.is_allowed('Q.JPY.EUR')
+
+    def test_key_with_wrong_length_is_not_allowed(self, simple_evaluator):
+        assert not simple_evaluator.is_allowed('M.JPY')
+
+    def test_bulk_validation(self, simple_evaluator):
+        keys = ['A.USD.EUR', ('M', 'GBP', 'EUR'), 'M.JPY.EUR']
+        assert simple_evaluator.validate(keys) == [True, False, True]
+        assert list(simple_evaluator.invalid(keys)) == [('M', 'GBP', 'EUR')]
+
+    def test_time_range(self, simple_evaluator):
+        assert simple_evaluator.is_allowed_period('2010-12')
+        assert not simple_evaluator.is_allowed_period('2011-M01')
+        assert not simple_evaluator.is_allowed_period('1999-W52')
+
+    def test_wildcarded_key_set(self, key_set_evaluator):
+        assert key_set_evaluator.is_allowed('A.USD.EUR')
+        assert not key_set_evaluator.is_allowed('M.USD.EUR')
+
+    def test_excluded_key_and_region(self, key_set_evaluator):
+        assert not key_set_evaluator.is_allowed('A.USD.JPY')
+        assert not key_set_evaluator.is_allowed('A.USD.GBP')
+
+    def test_simple_constraints_are_intersected(self):
+        constraints = [
+            CompiledConstraint(included_regions=[(frozenset({'A', 'M'}), None, None)]),
+            CompiledConstraint(included_regions=[(frozenset({'M', 'Q'}), None, None)]),
+        ]
+        evaluator = ConstraintEvaluator(DIMENSIONS, constraints)
+        assert evaluator.validate(['A.X.Y', 'M.X.Y', 'Q.X.Y']) == [False, True, False]
+
+class TestPeriods:
+
+    @pytest.mark.parametrize('period,bounds', [
+        ('2010', ('2010-01-01', '2010-12-31')),
+        ('2010-02', ('2010-02-01', '2010-02-28')),
+        ('2010-Q2', ('2010-04-01', '2010-06-30')),
+        ('2010-S2', ('2010-07-01', '2010-12-31')),
+        ('2010-W01', ('2010-01-04', '2010-01-10')),
+        ('2010-02-15', ('2010-02-15', '2010-02-15')),
+    ])
+    def test_period_bounds(self, period, bounds):
+        start, end = period_bounds(period)
+        assert (start.isoformat(), end.isoformat()) == bounds
+
+def add_constraint(object_id='ALLOWED', **attachment):
+    """
+    Attaches an allowed content constraint to the artefact of a single
+    `data_structure`, `dataflow` or `provision_agreement` keyword
+    """
+    (_, artefact), = attachment.items()
+    ContentConstraint = apps.get_model('registry', 'ContentConstraint')
+    constraint = ContentConstraint.objects.create(
+        agency=artefact.agency, object_id=object_id,
+        tipe=ContentConstraint.Type.ALLOWED, tolerance='')
+    apps.get_model('registry', 'VersionDetail').objects.create(
+        content_constraint=constraint, version=artefact.version, **attachment)
+    return constraint
+
+def add_region(constraint, include=True, cascade=(), **values):
+    """Adds a cube region selecting the values of the components"""
+    region = apps.get_model('registry', 'CubeRegion').objects.create(
+        content_constraint=constraint, include=include)
+    CubeRegionKey = apps.get_model('registry', 'CubeRegionKey')
+    CubeRegionKeyValue = apps.get_model('registry', 'CubeRegionKeyValue')
+    for component_id, selected in values.items():
+        key = CubeRegionKey.objects.create(key_value=region, component_id=component_id)
+        CubeRegionKeyValue.objects.bulk_create(
+            CubeRegionKeyValue(cube_region_key=key, value=value,
+                               cascade_values=value in cascade)
+            for value in selected)
+    return region
+
+def add_time_range(region, **periods):
+    """Adds a time range of `before`, `after`, `start` or `end` periods"""
+    TimePeriod = apps.get_model('registry', 'TimePeriod')
+    key = apps.get_model('registry', 'CubeRegionKey').objects.create(
+        key_value=region, component_id='TIME_PERIOD')
+    return apps.get_model('registry', 'CubeRegionKeyTimeRange').objects.create(
+        cube_region_key=key, **{
+            f'{name}_period': TimePeriod.objects.create(
+                time_period=period, is_inclusive=inclusive)
+            for name, (period, inclusive) in periods.items()
+        })
+
+class ConstraintCompilerTest(TestCase):
+    """The evaluators compiled from the stored constraints of a dataflow"""
+
+    def setUp(self):
+        # The evaluators are cached by primary key, which the rolled back
+        # tests reuse
+        constraint_cache.clear()
+        self.addCleanup(constraint_cache.clear)
+        agency = apps.get_model('base', 'Agency').objects.create(object_id='ECB')
+        concepts = apps.get_model('conceptscheme', 'ConceptScheme').objects.create(
+            agency=agency, object_id='ECB_CONCEPTS', version='1.0')
+        currencies = apps.get_model('codelist', 'Codelist').objects.create(
+            agency=agency, object_id='CL_CURRENCY', version='1.0')
+        Code = apps.get_model('codelist', 'Code')
+        europe = Code.add_root(container=currencies, object_id='EU')
+        for object_id in ['EUR', 'DEM']:
+            europe.add_child(container=currencies, object_id=object_id)
+        Code.add_root(container=currencies, object_id='USD')
+        self.dsd = apps.get_model('datastructure', 'DataStructure').objects.create(
+            agency=agency, object_id='ECB_EXR1', version='1.0')
+        dimensions = apps.get_model('datastructure', 'DimensionList').objects.create(
+            data_structure=self.dsd)
+        Dimension = apps.get_model('datastructure', 'Dimension')
+        for position, (object_id, enumeration, tipe) in enumerate([
+                ('FREQ', None, Dimension.Type.DIMENSION),
+                ('CURRENCY', currencies, Dimension.Type.DIMENSION),
+                ('TIME_PERIOD', None, Dimension.Type.TIME_DIMENSION)]):
+            Dimension.objects.create(
+                container=dimensions, object_id=object_id, position=position,
+                tipe=tipe, measure_local_representation=concepts,
+                concept_identity=apps.get_model('conceptscheme', 'Concept').add_root(
+                    container=concepts, object_id=object_id),
+                local_representation=apps.get_model('common', 'Representation')
+                .objects.create(enumeration=enumeration))
+        self.dataflow = apps.get_model('datastructure', 'Dataflow').objects.create(
+            agency=agency, object_id='EXR', version='1.0', structure=self.dsd)
+
+    def compile(self):
+        constraint_cache.clear()
+        return get_evaluator(self.dataflow)
+
+    def test_without_constraints(self):
+        evaluator = self.compile()
+        self.assertEqual(evaluator.dimensions, ('FREQ', 'CURRENCY'))
+        self.assertTrue(evaluator.is_unconstrained)
+
+    def test_regions(self):
+        add_region(add_constraint(dataflow=self.dataflow),
+                   FREQ=['A', 'M'], CURRENCY=['USD', 'EUR'])
+        constraint = add_constraint('EXCLUDED', data_structure=self.dsd)
+        add_region(constraint, include=False, CURRENCY=['EUR'])
+        evaluator = self.compile()
+        self.assertEqual(evaluator.validate(['A.USD', 'M.EUR', 'Q.USD']), [True, False, False])
+
+    def test_regions_are_read_with_flat_queries(self):
+        constraint = add_constraint(dataflow=self.dataflow)
+        add_region(constraint, FREQ=['A'])
+        with CaptureQueriesContext(connection) as single:
+            self.compile()
+        for object_id in ['OTHER', 'ANOTHER']:
+            add_region(add_constraint(object_id, dataflow=self.dataflow), FREQ=['A', 'M'])
+            add_region(constraint, include=False, CURRENCY=['EUR', 'USD'])
+        with CaptureQueriesContext(connection) as many:
+            evaluator = self.compile()
+        self.assertEqual(len(many), len(single))
+        self.assertEqual(evaluator.validate(['A.DEM', 'A.USD', 'M.DEM']), [True, False, False])
+
+    def test_cascaded_values(self):
+        add_region(add_constraint(dataflow=self.dataflow), cascade=['EU'], CURRENCY=['EU'])
+        evaluator = self.compile()
+        self.assertEqual(
+            evaluator.validate(['A.EU', 'A.EUR', 'A.DEM', 'A.USD']), [True, True, True, False])
+
+    def test_time_ranges(self):
+        region = add_region(add_constraint(dataflow=self.dataflow), FREQ=['A', 'M'])
+        add_time_range(region, start=('2010', True), end=('2011-06', False))
+        add_time_range(add_region(add_constraint('BEFORE', dataflow=self.dataflow)),
+                       before=('2011-03', True))
+        # The time ranges of the excluded regions do not bound the periods
+        excluded = add_constraint('EXCLUDED', dataflow=self.dataflow)
+        add_time_range(add_region(excluded, include=False), after=('2010-06', True))
+        evaluator = self.compile()
+        self.assertEqual(
+            [evaluator.is_allowed_period(period)
+             for period in ['2009-12', '2010-01', '2011-03', '2011-04']],
+            [False, True, True, False])
+        self.assertTrue(evaluator.is_allowed('A.USD'))
+
+    def test_key_sets(self):
+        constraint = add_constraint(dataflow=self.dataflow)
+        for is_included, key in [(True, {'FREQ': 'A', 'CURRENCY': ''}),
+                                 (False, {'FREQ': 'A', 'CURRENCY': 'USD'})]:
+            key_set = apps.get_model('registry', 'KeySet').objects.create(
+                content_constraint=constraint, is_included=is_included)
+            key_model = apps.get_model('registry', 'Key').objects.create(key_set=key_set)
+            for component_id, value in key.items():
+                apps.get_model('registry', 'SubKey').objects.create(
+                    key=key_model, component_id=component_id, value=value)
+        evaluator = self.compile()
+        self.assertEqual(evaluator.validate(['A.EUR', 'A.USD', 'M.EUR']), [True, False, False])
+
+    def test_saving_a_constraint_clears_the_cache(self):
+        evaluator = get_evaluator(self.dataflow)
+        self.assertIs(get_evaluator(self.dataflow), evaluator)
+        region = add_region(add_constraint(dataflow=self.dataflow), FREQ=['A'])
+        evaluator = get_evaluator(self.dataflow)
+        self.assertFalse(evaluator.is_allowed('M.USD'))
+        self.assertIs(get_evaluator(self.dataflow), evaluator)
+        region.delete()
+        self.assertTrue(get_evaluator(self.dataflow).is_allowed('M.USD'))
@@ -0,0 +1,101 @@
+# test_data_engine.py
+
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from fiesta.core.data import DataQuery, DataQueryEngine, DataSet, key_to_q, parse_key
+from fiesta.renderers import XMLRenderer
+
+from .test_submission import xpath
+
+DIMENSIONS = ('FREQ', 'CURRENCY', 'CURRENCY_DENOM')
+
+def make_rows():
+    rows = []
+    for key in [('M', 'JPY', 'EUR'), ('M', 'USD', 'EUR')]:
+        for month in range(1, 13):
+            rows.append((*key, f'2010-{month:02d}', float(month), 'A'))
+    return rows
+
+DATAFLOW = SimpleNamespace(
+    object_id='EXR', version='1.0', agency=SimpleNamespace(object_id='ECB'))
+
+def render(series, **kwargs):
+    query = DataQuery(DATAFLOW, **kwargs)
+    return XMLRenderer().render(DataSet(DATAFLOW, DIMENSIONS, series, query))
+
+@pytest.fixture
+def engine():
+    return DataQueryEngine(
+        None, DIMENSIONS, attributes=('OBS_STATUS',), chunk_size=5)
+
+class TestKeyExpressions:
+
+    def test_all_is_wildcarded(self):
+        assert parse_key('all', DIMENSIONS) == (None, None, None)
+
+    def test_alternatives_and_wildcards(self):
+        assert parse_key('M+A..EUR', DIMENSIONS) == (('M', 'A'), None, ('EUR',))
+
+    def test_wrong_length_raises(self):
+        with pytest.raises(ValueError):
+            parse_key('M.USD', DIMENSIONS)
+
+    def test_key_to_q(self):
+        q = key_to_q(parse_key('M+A..EUR', DIMENSIONS), DIMENSIONS, 'dim_key__')
+        assert ('dim_key__FREQ__in', ('M', 'A')) in q.children
+        assert ('dim_key__CURRENCY_DENOM', 'EUR') in q.children
+
+class TestDataQueryEngine:
+
+    def test_rows_are_grouped_across_chunks(self, engine):
+        blocks = list(engine.group(make_rows()))
+        assert [block.key for block in blocks] == [
+            ('M', 'JPY', 'EUR'), ('M', 'USD', 'EUR')]
+        assert [len(block) for block in blocks] == [12, 12]
+        assert blocks[1].obs_value.dtype == np.float64
+        assert list(blocks[0].time_period[:2]) == ['2010-01', '2010-02']
+        assert list(blocks[0].attributes['OBS_STATUS'][:1]) == ['A']
+
+    def test_filter_periods(self, engine):
+        block = next(engine.group(make_rows()))
+        filtered = block.filter_periods('2010-Q2', '2010-06')
+        assert list(filtered.obs_value) == [4.0, 5.0, 6.0]
+
+    def test_time_index(self, engine):
+        block = next(engine.group(make_rows()))
+        assert block.time_index[0] == np.datetime64('2010-01-01')
+
+class TestDataElement:
+
+    def test_full(self, engine):
+        content = render(engine.group(make_rows()[:13]))
+        assert xpath(content, '//message:Structure/@dimensionAtObservation') == [
+            'TIME_PERIOD']
+        assert xpath(content, '//common:StructureUsage/Ref/@id') == ['EXR']
+        assert xpath(content, '//data:Series[2]/data:SeriesKey/data:Value/@value') == [
+            'M', 'USD', 'EUR']
+        assert len(xpath(content, '//data:Series[1]/data:Obs')) == 12
+        assert xpath(content, '//data:Series[2]/data:Obs/data:ObsDimension/@value') == [
+            '2010-01']
+        assert xpath(content, '//data:Series[2]//data:ObsValue/@value') == ['1.0']
+        assert xpath(content, '//data:Series[2]//data:Attributes/data:Value/@value') == [
+            'A']
+
+    def test_missing_values_and_attributes_are_omitted(self, engine):
+        block = next(engine.group(make_rows()[:1]))
+        block.obs_value[0] = np.nan
+        block.attributes['OBS_STATUS'][0] = None
+        content = render([block])
+        assert len(xpath(content, '//data:Obs')) == 1
+        assert not xpath(content, '//data:ObsValue')
+        assert not xpath(content, '//data:Attributes')
+
+    @pytest.mark.parametrize('detail', ['serieskeysonly', 'nodata'])
+    def test_series_keys_only(self, engine, detail):
+        content = render(engine.group(make_rows()[:13]), detail=detail)
+        assert len(xpath(content, '//data:Series')) == 2
+        assert not xpath(content, '//data:Obs')
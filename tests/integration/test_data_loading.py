@@ -0,0 +1,158 @@
+# test_data_loading.py
+
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from django.apps import apps
+from django.db import connection, models
+from django.test import TestCase
+
+from fiesta.apps.data.loading import load_data
+from fiesta.apps.data.series import get_series_key_registry
+from fiesta.core.constraints import constraint_cache
+from fiesta.core.data import DataQuery, DataQueryEngine
+
+from .test_constraints import add_constraint, add_region, add_time_range
+
+class Observation(models.Model):
+    """The observation model of a domain specific data application"""
+    dim_key = models.ForeignKey('data.SeriesKey', on_delete=models.CASCADE)
+    time_period = models.CharField(max_length=31)
+    obs_value = models.FloatField(null=True)
+    OBS_STATUS = models.CharField(max_length=1, blank=True)
+
+    class Meta:
+        app_label = 'tests'
+
+class DataTestCase(TestCase):
+    """
+    Stores the EXR dataflow of a DSD with the FREQ and CURRENCY dimensions,
+    whose observations are loaded into `Observation`
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            editor.create_model(Observation)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(Observation)
+
+    def setUp(self):
+        # A dataflow of the previous test may have had the same pk
+        constraint_cache.clear()
+        self.addCleanup(constraint_cache.clear)
+        agency = apps.get_model('base', 'Agency').objects.create(object_id='ECB')
+        concepts = apps.get_model('conceptscheme', 'ConceptScheme').objects.create(
+            agency=agency, object_id='ECB_CONCEPTS', version='1.0')
+        representation = apps.get_model('common', 'Representation').objects.create()
+        dsd = apps.get_model('datastructure', 'DataStructure').objects.create(
+            agency=agency, object_id='ECB_EXR1', version='1.0')
+        dimensions = apps.get_model('datastructure', 'DimensionList').objects.create(
+            data_structure=dsd)
+        for position, object_id in enumerate(['FREQ', 'CURRENCY']):
+            concept = apps.get_model('conceptscheme', 'Concept').add_root(
+                container=concepts, object_id=object_id)
+            apps.get_model('datastructure', 'Dimension').objects.create(
+                container=dimensions, object_id=object_id, position=position,
+                concept_identity=concept, local_representation=representation,
+                measure_local_representation=concepts)
+        self.dataflow = apps.get_model('datastructure', 'Dataflow').objects.create(
+            agency=agency, object_id='EXR', version='1.0', structure=dsd)
+        self.engine = DataQueryEngine(
+            Observation, ('FREQ', 'CURRENCY'), attributes=('OBS_STATUS',),
+            series_keys=get_series_key_registry(dsd), chunk_size=3)
+
+    def load(self, rows):
+        return load_data(self.dataflow, rows, engine=self.engine)
+
+class LoadDataTest(DataTestCase):
+
+    def get_actual_constraint(self):
+        ContentConstraint = apps.get_model('registry', 'ContentConstraint')
+        constraint = ContentConstraint.objects.get(tipe=ContentConstraint.Type.ACTUAL)
+        region, = apps.get_model('registry', 'CubeRegion').objects.filter(
+            content_constraint=constraint)
+        values = {}
+        for key in region.key_value_set.all():
+            if hasattr(key, 'cuberegionkeytimerange'):
+                time_range = key.cuberegionkeytimerange
+                values[key.component_id] = (time_range.start_period.time_period,
+                                             time_range.end_period.time_period)
+            else:
+                values[key.component_id] = set(
+                    key.cuberegionkeyvalue_set.values_list('value', flat=True))
+        return constraint, region, values
+
+    def test_writes_the_observations_in_chunks(self):
+        rows = [('M.USD', f'2010-{month:02d}', float(month), 'A') for month in range(1, 8)]
+        self.assertEqual(self.load(rows), 7)
+        self.assertEqual(Observation.objects.count(), 7)
+        self.assertEqual(set(Observation.objects.values_list('OBS_STATUS', flat=True)), {'A'})
+        series = list(self.engine.execute(DataQuery(self.dataflow)))
+        self.assertEqual([block.key for block in series], [('M', 'USD')])
+        self.assertEqual(list(series[0].obs_value), [float(month) for month in range(1, 8)])
+
+    def test_materialises_the_actual_constraint(self):
+        self.load([('M.USD', '2010-01', 1.0, 'A'), (('A', 'JPY'), '2009', 2.0, 'A')])
+        constraint, region, values = self.get_actual_constraint()
+        self.assertEqual(constraint.object_id, 'EXR_ACTUAL')
+        self.assertTrue(region.include)
+        self.assertEqual(values, {
+            'FREQ': {'M', 'A'}, 'CURRENCY': {'USD', 'JPY'},
+            'TIME_PERIOD': ('2009-01-01', '2010-01-31'),
+        })
+        availability = apps.get_model('data', 'Availability').objects.get()
+        self.assertEqual((availability.time_start, availability.time_end),
+                         (date(2009, 1, 1), date(2010, 1, 31)))
+
+    def test_refreshes_the_actual_constraint(self):
+        self.load([('M.USD', '2010-01', 1.0, 'A')])
+        self.load([('Q.GBP', '2011-Q1', 3.0, 'A')])
+        constraint, region, values = self.get_actual_constraint()
+        self.assertEqual(values, {
+            'FREQ': {'M', 'Q'}, 'CURRENCY': {'USD', 'GBP'},
+            'TIME_PERIOD': ('2010-01-01', '2011-03-31'),
+        })
+        self.assertEqual(apps.get_model('registry', 'TimePeriod').objects.count(), 2)
+
+    def test_rolled_back_loads_leave_no_cached_keys(self):
+        def rows():
+            yield from [('M.USD', f'2010-{month:02d}', 1.0, 'A') for month in range(1, 5)]
+            raise ValueError('Broken source')
+        with self.assertRaises(ValueError):
+            self.load(rows())
+        SeriesKey = apps.get_model('data', 'SeriesKey')
+        self.assertFalse(SeriesKey.objects.exists())
+        self.assertFalse(apps.get_model('data', 'SeriesKeyCode').objects.exists())
+        self.assertEqual(self.engine.series_keys.codes, [{}, {}])
+        self.assertIsNone(self.engine.series_keys.ids.get('M.USD'))
+        self.assertEqual(self.load([('M.USD', '2010-01', 1.0, 'A')]), 1)
+        observation = Observation.objects.get()
+        self.assertTrue(SeriesKey.objects.filter(pk=observation.dim_key_id).exists())
+        series = list(self.engine.execute(DataQuery(self.dataflow)))
+        self.assertEqual([block.key for block in series], [('M', 'USD')])
+
+    def test_validates_the_allowed_constraints(self):
+        region = add_region(add_constraint(dataflow=self.dataflow), CURRENCY=['USD'])
+        add_time_range(region, start=('2010', True))
+        for rows, message in [
+                ([('M.USD', '2010-01', 1.0, 'A'), ('M.JPY', '2010-01', 2.0, 'A')],
+                 'Series key M.JPY is not allowed'),
+                ([('M.USD', '2010-01', 1.0, 'A'), ('M.USD', '2009-12', 2.0, 'A')],
+                 'Time period 2009-12 is not allowed')]:
+            with self.subTest(message=message), self.assertRaisesMessage(ValueError, message):
+                self.load(rows)
+        self.assertFalse(Observation.objects.exists())
+        self.assertEqual(self.load([('M.USD', '2010-01', 1.0, 'A')]), 1)
+
+    def test_nothing_to_load(self):
+        self.assertEqual(self.load([]), 0)
+        self.assertFalse(apps.get_model('registry', 'ContentConstraint').objects.exists())
@@ -0,0 +1,71 @@
+# test_data_views.py
+
+from unittest import mock
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from fiesta.core.data import DataQueryEngine
+
+from .test_data_loading import DataTestCase
+from .test_submission import xpath
+
+class DataViewTest(DataTestCase):
+    """The RESTful data queries of the EXR dataflow"""
+
+    def setUp(self):
+        super().setUp()
+        self.load([
+            ('M.USD', '2010-01', 1.0, 'A'), ('M.USD', '2010-02', 2.0, 'E'),
+            ('M.JPY', '2010-01', 3.0, 'A'),
+        ])
+        patcher = mock.patch.object(
+            DataQueryEngine, 'for_dataflow', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, path, status_code=200):
+        response = self.client.get(f'/fiesta/wsrest/data/{path}')
+        self.assertEqual(response.status_code, status_code)
+        return response.content
+
+    def get_keys(self, content):
+        return xpath(content, '//data:SeriesKey/data:Value[@id="CURRENCY"]/@value')
+
+    def test_full(self):
+        content = self.get('ECB,EXR,1.0/M.USD/')
+        self.assertEqual(self.get_keys(content), ['USD'])
+        self.assertEqual(xpath(content, '//data:ObsValue/@value'), ['1.0', '2.0'])
+        self.assertEqual(
+            xpath(content, '//data:Attributes/data:Value[@id="OBS_STATUS"]/@value'),
+            ['A', 'E'])
+        self.assertEqual(
+            xpath(content, '//message:Structure/@dimensionAtObservation'),
+            ['TIME_PERIOD'])
+
+    def test_dataonly(self):
+        content = self.get('EXR/M.USD/?detail=dataonly')
+        self.assertEqual(xpath(content, '//data:ObsValue/@value'), ['1.0', '2.0'])
+        self.assertFalse(xpath(content, '//data:Attributes'))
+
+    def test_serieskeysonly(self):
+        for detail in ['serieskeysonly', 'nodata']:
+            with self.subTest(detail=detail):
+                content = self.get(f'EXR/?detail={detail}&startPeriod=2010-02')
+                self.assertEqual(self.get_keys(content), ['USD'])
+                self.assertFalse(xpath(content, '//data:Obs'))
+
+    def test_unsupported_providers(self):
+        content = self.get('EXR/all/ECB,DATA_PROVIDERS,1.0,ECB/', 501)
+        self.assertTrue(xpath(content, '//message:Error'))
+        self.assertEqual(self.get_keys(self.get('EXR/all/all/')), ['JPY', 'USD'])
+
+    def test_unsupported_dimension_at_observation(self):
+        for dimension in ['AllDimensions', 'CURRENCY']:
+            with self.subTest(dimension=dimension):
+                content = self.get(f'EXR/?dimensionAtObservation={dimension}', 501)
+                self.assertTrue(xpath(content, '//message:Error'))
+
+    def test_unknown_detail(self):
+        self.get('EXR/?detail=everything', 405)
@@ -0,0 +1,171 @@
+# test_dependencies.py
+
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase
+
+from .test_submission import xpath
+
+class DependencyTestCase(TestCase):
+    """
+    Stores a concept scheme whose concept is enumerated by CL_AREA and a DSD
+    without components, whose edges are added by `link`
+    """
+
+    def setUp(self):
+        self.Dependency = apps.get_model('registry', 'Dependency')
+        self.Codelist = apps.get_model('codelist', 'Codelist')
+        self.ConceptScheme = apps.get_model('conceptscheme', 'ConceptScheme')
+        self.DataStructure = apps.get_model('datastructure', 'DataStructure')
+        agency = apps.get_model('base', 'Agency').objects.create(object_id='ECB')
+        self.area, self.freq = [
+            self.Codelist.objects.create(
+                agency=agency, object_id=object_id, version='1.0', name_en=object_id)
+            for object_id in ['CL_AREA', 'CL_FREQ']
+        ]
+        self.concepts = self.ConceptScheme.objects.create(
+            agency=agency, object_id='ECB_CONCEPTS', version='1.0', name_en='Concepts')
+        self.concept = apps.get_model('conceptscheme', 'Concept').add_root(
+            container=self.concepts, object_id='REF_AREA', name_en='Reference area',
+            core_representation=apps.get_model('common', 'Representation').objects.create(
+                enumeration=self.area))
+        self.dsd = self.DataStructure.objects.create(
+            agency=agency, object_id='ECB_EXR1', version='1.0')
+        self.Dependency.objects.replace(self.concepts)
+
+    def link(self, source, target):
+        self.Dependency.objects.create(
+            source_type=ContentType.objects.get_for_model(source), source_id=source.pk,
+            target_type=ContentType.objects.get_for_model(target), target_id=target.pk)
+
+    def edges(self):
+        return set(self.Dependency.objects.values_list('source_id', 'target_id'))
+
+class DependencyTest(DependencyTestCase):
+
+    def test_replace_follows_the_references(self):
+        self.assertEqual(self.edges(), {(self.concepts.pk, self.area.pk)})
+        self.concept.core_representation.enumeration = self.freq
+        self.concept.core_representation.save()
+        self.Dependency.objects.replace(self.concepts)
+        self.assertEqual(self.edges(), {(self.concepts.pk, self.freq.pk)})
+
+    def test_remove_drops_the_incoming_and_outgoing_edges(self):
+        self.link(self.dsd, self.concepts)
+        self.link(self.dsd, self.freq)
+        self.Dependency.objects.remove(self.concepts)
+        self.assertEqual(self.edges(), {(self.dsd.pk, self.freq.pk)})
+
+    def test_children(self):
+        concepts = self.ConceptScheme.objects.all()
+        self.assertEqual(
+            list(self.Codelist.objects.filter(
+                pk__in=self.Dependency.objects.children(concepts, self.Codelist))),
+            [self.area])
+        self.assertFalse(self.Dependency.objects.children(concepts, self.DataStructure))
+
+    def test_parents(self):
+        codelists = self.Codelist.objects.filter(object_id='CL_AREA')
+        self.link(self.dsd, self.area)
+        self.assertEqual(
+            list(self.ConceptScheme.objects.filter(
+                pk__in=self.Dependency.objects.parents(codelists, self.ConceptScheme))),
+            [self.concepts])
+        self.assertEqual(
+            list(self.DataStructure.objects.filter(
+                pk__in=self.Dependency.objects.parents(codelists, self.DataStructure))),
+            [self.dsd])
+
+    def test_rebuild_command(self):
+        # Artefacts stored before the edges, and a stale edge
+        self.Dependency.objects.all().delete()
+        self.link(self.dsd, self.freq)
+        self.link(self.concepts, self.freq)
+        out = StringIO()
+        call_command('fiesta_rebuild_dependencies', stdout=out)
+        self.assertEqual(self.edges(), {(self.concepts.pk, self.area.pk)})
+        self.assertIn('Rebuilt the edges of 4 artefacts', out.getvalue())
+
+class RecursiveDescendantsTest(DependencyTestCase):
+    """Descendants through the recursive query"""
+    recursive = True
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            type(self.Dependency.objects), 'supports_recursive_queries',
+            return_value=self.recursive)
+        self.supports_recursive_queries = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def descendants(self):
+        return self.Dependency.objects.descendants(
+            self.DataStructure.objects.filter(pk=self.dsd.pk))
+
+    def test_follows_indirect_references_once(self):
+        # The DSD reaches CL_AREA directly and through the concept scheme
+        self.link(self.dsd, self.concepts)
+        self.link(self.dsd, self.area)
+        self.link(self.concepts, self.freq)
+        self.assertEqual(self.descendants(), {
+            self.ConceptScheme: {self.concepts.pk},
+            self.Codelist: {self.area.pk, self.freq.pk},
+        })
+        self.assertTrue(self.supports_recursive_queries.called)
+
+    def test_terminates_on_cycles(self):
+        self.link(self.dsd, self.concepts)
+        self.link(self.area, self.concepts)
+        self.link(self.area, self.dsd)
+        self.assertEqual(self.descendants(), {
+            self.ConceptScheme: {self.concepts.pk},
+            self.Codelist: {self.area.pk},
+        })
+
+    def test_without_references(self):
+        self.assertEqual(self.descendants(), {})
+
+class WalkedDescendantsTest(RecursiveDescendantsTest):
+    """Descendants of the databases without recursive queries"""
+    recursive = False
+
+class ReferencesQueryTest(DependencyTestCase):
+    """The references of the RESTful queries are read from the edges"""
+
+    def get_ids(self, path):
+        response = self.client.get(f'/fiesta/wsrest/{path}')
+        self.assertEqual(response.status_code, 200)
+        return {
+            'codelists': xpath(response.content, '//structure:Codelist/@id'),
+            'concepts': xpath(response.content, '//structure:ConceptScheme/@id'),
+        }
+
+    def test_children(self):
+        self.assertEqual(
+            self.get_ids('conceptscheme/ECB/ECB_CONCEPTS/1.0/?references=children'),
+            {'codelists': ['CL_AREA'], 'concepts': ['ECB_CONCEPTS']})
+
+    def test_parents(self):
+        self.assertEqual(
+            self.get_ids('codelist/ECB/CL_AREA/1.0/?references=parents'),
+            {'codelists': ['CL_AREA'], 'concepts': ['ECB_CONCEPTS']})
+        self.assertEqual(
+            self.get_ids('codelist/ECB/CL_FREQ/1.0/?references=parents'),
+            {'codelists': ['CL_FREQ'], 'concepts': []})
+
+    def test_descendants(self):
+        self.assertEqual(
+            self.get_ids('conceptscheme/ECB/ECB_CONCEPTS/1.0/?references=descendants'),
+            {'codelists': ['CL_AREA'], 'concepts': ['ECB_CONCEPTS']})
+
+    def test_all(self):
+        self.assertEqual(
+            self.get_ids('codelist/ECB/CL_AREA/1.0/?references=all'),
+            {'codelists': ['CL_AREA'], 'concepts': ['ECB_CONCEPTS']})
+        self.assertEqual(
+            self.get_ids('codelist/ECB/CL_FREQ/1.0/?references=none'),
+            {'codelists': ['CL_FREQ'], 'concepts': []})
@@ -0,0 +1,37 @@
+# test_export_command.py
+
+from fiesta.management.commands.fiesta_export import (
+    get_changed, get_path, Partition
+)
+
+CL_FREQ = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_FREQ(1.0)'
+CL_UNIT = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_UNIT(1.0)'
+
+def make_partition(**artefacts):
+    return Partition(
+        'codelist', 'ECB', dict(artefacts.values()),
+        {urn: (name, '1.0') for name, (urn, _) in artefacts.items()})
+
+def make_manifest(per, files):
+    return {'per': per, 'files': {
+        path: {'resource': 'codelist', 'agency': 'ECB', 'artefacts': artefacts}
+        for path, artefacts in files.items()}}
+
+def test_incremental_per_agency():
+    path = get_path('agency', 'codelist', 'ECB')
+    manifest = make_manifest('agency', {path: {CL_FREQ: 1, CL_UNIT: 2}})
+    partition = make_partition(CL_FREQ=(CL_FREQ, 1), CL_UNIT=(CL_UNIT, 2))
+    assert get_changed([partition], manifest, 'agency') == ([], {path})
+    partition = make_partition(CL_FREQ=(CL_FREQ, 1))
+    assert get_changed([partition], manifest, 'agency') == ([partition], set())
+
+def test_incremental_per_artefact():
+    freq = get_path('artefact', 'codelist', 'ECB', 'CL_FREQ', '1.0.0')
+    unit = get_path('artefact', 'codelist', 'ECB', 'CL_UNIT', '1.0')
+    assert freq == 'codelist/ECB/CL_FREQ-1.0.xml.gz'
+    manifest = make_manifest('artefact', {freq: {CL_FREQ: 1}, unit: {CL_UNIT: 2}})
+    partition = make_partition(CL_FREQ=(CL_FREQ, 1), CL_UNIT=(CL_UNIT, 3))
+    changed, kept = get_changed([partition], manifest, 'artefact')
+    assert kept == {freq}
+    assert [p.artefacts for p in changed] == [{CL_UNIT: 3}]
+    assert changed[0].versions == {CL_UNIT: ('CL_UNIT', '1.0')}
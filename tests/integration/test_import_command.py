@@ -0,0 +1,60 @@
+# test_import_command.py
+
+import os
+
+from zipfile import ZipFile
+
+from fiesta.management.commands.fiesta_import import (
+    Command, get_levels, get_sources, make_message, parse_source, Source
+)
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+DSD = os.path.join(DATA, 'dsd_ecb_ivf1.xml')
+
+def test_sources_of_archives(tmp_path):
+    archive = tmp_path / 'dump.zip'
+    with ZipFile(archive, 'w') as zf:
+        zf.write(DSD, 'a/dsd.xml')
+        zf.writestr('b/', '')
+    (tmp_path / 'notes.txt').write_text('')
+    sources = get_sources([str(tmp_path)])
+    assert sources == [Source(str(archive), 'a/dsd.xml')]
+    assert parse_source(sources[0], validate=False).artefacts
+
+def test_artefacts_ordered_by_dependency():
+    parsed = parse_source(Source(DSD), validate=False)
+    assert parsed.error is None
+    levels, cyclic = get_levels(parsed.artefacts)
+    assert not cyclic
+    classes = [{artefact.key[0] for artefact in level} for level in levels]
+    assert classes == [
+        {'AgencyScheme', 'Codelist', 'ConceptScheme'}, {'DataStructure'},
+        {'Dataflow'}, {'ContentConstraint'}]
+    message = make_message(levels[1], 'FIESTA')
+    assert message[1][0][0].get('id') == 'ECB_IVF1'
+
+def test_parse_errors_are_reported(tmp_path):
+    path = tmp_path / 'broken.xml'
+    path.write_text('<Structure>')
+    parsed = parse_source(Source(str(path)))
+    assert parsed.error and not parsed.artefacts
+
+def test_failed_batches_are_bisected():
+    parsed = parse_source(Source(DSD), validate=False)
+    artefacts = [artefact for level in get_levels(parsed.artefacts)[0]
+                 for artefact in level][:6]
+    broken = artefacts[2]
+    batches = []
+
+    class BisectingCommand(Command):
+        def process(self, artefacts, log, options):
+            batches.append(len(artefacts))
+            if broken in artefacts: raise ValueError('Broken artefact')
+            return {}
+
+    results = list(BisectingCommand().submit_batch(artefacts, None, {}))
+    assert [artefact for artefact, _ in results] == artefacts
+    assert [error for _, error in results if error] == ['ValueError: Broken artefact']
+    assert results[2] == (broken, 'ValueError: Broken artefact')
+    # The halves without the broken artefact are submitted whole
+    assert batches == [6, 3, 1, 2, 1, 1, 3]
@@ -0,0 +1,92 @@
+# test_latest_version.py
+
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+
+from .test_submission import HIERARCHY, SubmissionTestCase
+
+class LatestVersionTest(TestCase):
+
+    def setUp(self):
+        self.LatestVersion = apps.get_model('registry', 'LatestVersion')
+        self.Codelist = apps.get_model('codelist', 'Codelist')
+        self.agency = apps.get_model('base', 'Agency').objects.create(object_id='ECB')
+
+    def make_codelist(self, version, object_id='CL_FREQ'):
+        return self.Codelist.objects.create(
+            agency=self.agency, object_id=object_id, version=version)
+
+    def refresh(self, object_id='CL_FREQ'):
+        self.LatestVersion.objects.refresh(self.Codelist, self.agency.pk, object_id)
+
+    def latest(self, object_id='CL_FREQ'):
+        return self.Codelist.objects.filter(
+            pk__in=self.LatestVersion.objects.targets(
+                self.Codelist, agency__object_id='ECB', object_id=object_id))
+
+    def test_points_to_the_highest_version(self):
+        self.make_codelist('1.0')
+        highest = self.make_codelist('1.10')
+        self.make_codelist('1.2')
+        self.refresh()
+        self.assertEqual(list(self.latest()), [highest])
+
+    def test_moves_back_when_the_latest_version_is_deleted(self):
+        previous = self.make_codelist('1.0')
+        latest = self.make_codelist('2.0')
+        self.refresh()
+        latest.delete()
+        self.refresh()
+        self.assertEqual(list(self.latest()), [previous])
+
+    def test_is_removed_with_the_last_version(self):
+        self.make_codelist('1.0').delete()
+        self.refresh()
+        self.assertFalse(self.LatestVersion.objects.exists())
+
+    def test_keeps_one_pointer_per_artefact(self):
+        self.make_codelist('1.0')
+        self.make_codelist('1.0', object_id='CL_AREA')
+        self.refresh()
+        self.refresh()
+        self.refresh('CL_AREA')
+        self.assertEqual(self.LatestVersion.objects.count(), 2)
+
+    def test_finds_missing_and_stale_pointers(self):
+        self.make_codelist('1.0')
+        self.make_codelist('1.0', object_id='CL_AREA')
+        self.refresh()
+        self.make_codelist('2.0')
+        self.assertEqual(
+            set(self.LatestVersion.objects.find_drift(self.Codelist)),
+            {(self.agency.pk, 'CL_FREQ'), (self.agency.pk, 'CL_AREA')})
+
+    def test_command_repairs_the_drifted_pointers(self):
+        self.make_codelist('1.0')
+        latest = self.make_codelist('1.1')
+        out = StringIO()
+        call_command('fiesta_check_latest', '--repair', stdout=out)
+        self.assertIn('Repaired 1 pointers', out.getvalue())
+        self.assertEqual(list(self.latest()), [latest])
+        out = StringIO()
+        call_command('fiesta_check_latest', stdout=out)
+        self.assertIn('Latest versions are consistent', out.getvalue())
+
+class SubmittedLatestVersionTest(SubmissionTestCase):
+
+    def test_the_pointer_is_updated_with_the_version(self):
+        LatestVersion = apps.get_model('registry', 'LatestVersion')
+        self.client.raise_request_exception = False
+        with self.settings(DEBUG_PROPAGATE_EXCEPTIONS=False), \
+                mock.patch.object(type(LatestVersion.objects), 'refresh',
+                                  side_effect=DatabaseError):
+            self.assertEqual(self.submit(HIERARCHY).status_code, 500)
+        # The version is rolled back with its pointer
+        self.assertFalse(apps.get_model('codelist', 'Codelist').objects.exists())
+        self.submit(HIERARCHY)
+        self.assertEqual(LatestVersion.objects.count(), 1)
@@ -0,0 +1,45 @@
+# test_routers.py
+
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+
+from fiesta.routers import pin_to_primary, replica_reads
+
+@override_settings(FIESTA={'DEFAULT_READ_DATABASES': ['replica']})
+class ReplicaRouterTest(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        Group.objects.using('replica').create(name='replica')
+
+    def test_reads_go_to_the_primary_by_default(self):
+        self.assertFalse(Group.objects.filter(name='replica').exists())
+
+    def test_reads_within_replica_reads_go_to_the_replica(self):
+        with replica_reads() as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertTrue(Group.objects.filter(name='replica').exists())
+
+    def test_writes_go_to_the_primary(self):
+        with replica_reads():
+            Group.objects.create(name='primary')
+        self.assertTrue(Group.objects.using('default').filter(name='primary').exists())
+
+    @override_settings(FIESTA={
+        'DEFAULT_READ_DATABASES': ['replica'],
+        'DEFAULT_PRIMARY_MODELS': ['auth.group']
+    })
+    def test_primary_models_are_read_from_the_primary(self):
+        with replica_reads():
+            self.assertFalse(Group.objects.filter(name='replica').exists())
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        user = self.make_user()
+        pin_to_primary(user)
+        with replica_reads(user) as alias:
+            self.assertIsNone(alias)
+            self.assertFalse(Group.objects.filter(name='replica').exists())
+
+    def make_user(self):
+        from django.contrib.auth import get_user_model
+        return get_user_model().objects.create(username='submitter')
@@ -0,0 +1,71 @@
+# test_search.py
+
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+
+from .test_submission import FIESTA, SubmissionTestCase, read_message
+
+DECIMALS = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_DECIMALS(1.0)'
+FREQ = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_FREQ(1.0)'
+ANNUAL = 'urn:sdmx:org.sdmx.infomodel.codelist.Code=ECB:CL_FREQ(1.0).A'
+
+class SearchTest(SubmissionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def search(self, **params):
+        response = self.client.get('/fiesta/wsrest/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [result['urn'] for result in response.json()]
+
+    def test_indexes_the_artefacts_and_their_items(self):
+        self.assertEqual(self.search(q='frequency'), [FREQ])
+        self.assertEqual(self.search(q='Annual'), [ANNUAL])
+        SearchEntry = apps.get_model('registry', 'SearchEntry')
+        self.assertEqual(SearchEntry.objects.filter(urn=ANNUAL).get().text, 'Annual')
+
+    def test_matches_all_the_words_by_prefix(self):
+        self.assertEqual(sorted(self.search(q='code list')), [DECIMALS, FREQ])
+        self.assertEqual(self.search(q='freq cod'), [FREQ])
+        self.assertEqual(self.search(q='frequency decimals'), [])
+
+    def test_filters_the_resources(self):
+        self.assertEqual(self.search(q='annual', resource='conceptscheme'), [])
+        self.assertEqual(self.search(q='annual', resource='codelist'), [ANNUAL])
+        # The + of an unencoded query string is decoded as a space
+        self.assertEqual(
+            self.search(q='annual', resource='conceptscheme codelist'), [ANNUAL])
+
+    def test_filters_the_languages(self):
+        self.assertEqual(self.search(q='annual', lang='en'), [ANNUAL])
+        self.assertEqual(self.search(q='annual', lang='fr'), [])
+
+    def test_limits_the_results(self):
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_SEARCH_RESULTS=1)):
+            self.assertEqual(len(self.search(q='code list')), 1)
+
+    def test_requires_a_text(self):
+        response = self.client.get('/fiesta/wsrest/search/', {'q': ' '})
+        self.assertEqual(response.status_code, 400)
+
+    def test_resubmission_replaces_the_entries(self):
+        message = read_message('ecb_codelists.xml').replace(b'>Annual<', b'>Per annum<')
+        self.submit(message)
+        self.assertEqual(self.search(q='annual'), [])
+        self.assertEqual(self.search(q='annum'), [ANNUAL])
+
+    def test_falls_back_to_icontains(self):
+        with mock.patch.object(connection, 'vendor', 'other'):
+            self.assertEqual(self.search(q='requenc'), [FREQ])
+            self.assertEqual(self.search(q='annual', resource='codelist'), [ANNUAL])
+            self.assertEqual(sorted(self.search(q='code list')), [DECIMALS, FREQ])
+
+    def test_remove_drops_the_entries_of_the_items(self):
+        codelist = apps.get_model('codelist', 'Codelist').objects.get(object_id='CL_FREQ')
+        apps.get_model('registry', 'SearchEntry').objects.remove(codelist)
+        self.assertEqual(self.search(q='annual'), [])
+        self.assertEqual(self.search(q='decimals'), [DECIMALS])
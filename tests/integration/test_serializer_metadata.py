@@ -0,0 +1,87 @@
+# test_serializer_metadata.py
+
+import inspect
+
+from dataclasses import fields
+from typing import Iterable
+
+from django.apps import apps
+
+from fiesta.core.serializers import structure
+from fiesta.core.serializers.base import (
+    DATACLASS_METHODS, LazyDataclassMethod, Serializer, field)
+from fiesta.core.serializers.registry import registry
+
+def make_classes():
+    """Serializer classes made in the test, so nothing resolved them yet"""
+
+    class LabelSerializer(Serializer):
+        text: str = field(is_text=True)
+        lang: str = field(is_attribute=True, namespace_key='xml', default='en')
+
+        def __post_init__(self, *args, **kwargs):
+            super().__post_init__(*args, **kwargs)
+            self.text = self.text and self.text.strip()
+
+    class LabelsSerializer(Serializer):
+        labels: Iterable[LabelSerializer] = field(localname='Label')
+        label_id: str = field(is_attribute=True)
+
+        class Meta:
+            namespace_key = 'structure'
+
+    return LabelSerializer, LabelsSerializer
+
+def is_lazy(cls, name):
+    return isinstance(vars(cls).get(name), LazyDataclassMethod)
+
+def test_methods_are_generated_on_first_use():
+    label, labels = make_classes()
+    assert all(is_lazy(label, name) for name in DATACLASS_METHODS)
+    instance = label(text=' Euro ')
+    assert not any(is_lazy(label, name) for name in DATACLASS_METHODS)
+    assert (instance.text, instance.lang) == ('Euro', 'en')
+    assert instance == label(text='Euro')
+    assert instance != label(text='Euro', lang='fr')
+    assert repr(instance).endswith("LabelSerializer(text='Euro', lang='en')")
+    assert label.__init__.__qualname__.endswith('LabelSerializer.__init__')
+    # The subclasses are generated on their own
+    assert all(is_lazy(labels, name) for name in DATACLASS_METHODS)
+
+def test_methods_equal_the_dataclass_ones():
+    _, labels = make_classes()
+    signature = inspect.signature(labels.__init__)
+    assert list(signature.parameters) == [
+        'self', 'instance', 'complain', 'labels', 'label_id']
+    assert signature.parameters['label_id'].default is None
+    assert labels(label_id='A').labels is None
+    assert labels.__hash__ is None
+
+def test_equality_is_resolved_through_the_bases():
+    first = structure.CodeSerializer(object_id='A')
+    assert first == structure.CodeSerializer(object_id='A')
+    assert first != structure.CodeSerializer(object_id='B')
+
+def test_serializer_module_classes():
+    for name in ['CodelistSerializer', 'ConceptSchemeSerializer', 'DataStructureSerializer']:
+        cls = getattr(structure, name)
+        parameters = list(inspect.signature(cls.__init__).parameters)[3:]
+        assert parameters == [f.name for f in fields(cls) if f.init]
+
+def test_metadata_is_derived_on_first_use():
+    _, labels = make_classes()
+    meta = labels._meta
+    derived = ['fields', 'attr_fields', 'non_attr_fields', 'tag', 'nsmap', 'model']
+    assert not any(name in vars(meta) for name in derived)
+    assert meta.tag.localname == 'Labels'
+    assert [f.metadata['fiesta'].localname for f in meta.non_attr_fields] == ['Label']
+    assert [f.metadata['fiesta'].localname for f in meta.attr_fields] == ['labelId']
+    assert list(meta.nsmap) == ['structure']
+    assert meta.model is None
+    assert all(name in vars(meta) for name in derived)
+
+def test_ready_leaves_the_registry_to_first_use():
+    registry.clear()
+    apps.get_app_config('fiesta').ready()
+    assert not registry.ready
+    assert registry.get('Codelist') is structure.CodelistSerializer
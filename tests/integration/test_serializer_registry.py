@@ -0,0 +1,27 @@
+# test_serializer_registry.py
+
+import pytest
+
+from django.test import override_settings
+
+from fiesta.core.serializers import structure
+from fiesta.core.serializers.registry import registry
+
+def test_classes_are_resolved():
+    registry.populate()
+    assert registry.get('Codelist') is structure.CodelistSerializer
+    assert registry.get('CodelistSerializer') is structure.CodelistSerializer
+    with pytest.raises(AttributeError):
+        registry.get('Unknown')
+
+def test_children_and_parents():
+    registry.populate()
+    dataflow = structure.DataflowSerializer._meta
+    assert dataflow.get_children() == (structure.DataStructureSerializer,)
+    assert dataflow.get_parents() == (structure.ContentConstraintSerializer,)
+
+def test_registry_is_cleared_when_settings_change():
+    registry.populate()
+    with override_settings(FIESTA={'DEFAULT_SERIALIZER_MODULE': 'fiesta.core.serializers'}):
+        assert not registry.ready
+        assert registry.get('Codelist') is structure.CodelistSerializer
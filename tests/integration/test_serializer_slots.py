@@ -0,0 +1,38 @@
+# test_serializer_slots.py
+
+from fiesta.core.serializers import structure
+from fiesta.core.serializers.arrays import ItemArray
+
+def test_fields_are_slotted():
+    assert 'object_id' in structure.IdentifiableSerializer.__slots__
+    assert 'parent' in structure.ItemWithParentSerializer.__slots__
+    code = structure.CodeSerializer(object_id='A')
+    assert code.object_id == 'A'
+    assert not vars(code)
+
+def test_defaults_and_other_attributes():
+    assert structure.TextSerializer(text='Euro').lang == 'en'
+    code = structure.CodeSerializer(object_id='A')
+    code.m_object_id = 'A'
+    assert vars(code) == {'m_object_id': 'A'}
+
+def test_item_array():
+    items = ItemArray(structure.CodeSerializer, ('en', 'fr'))
+    for position, (object_id, parent, name) in enumerate(
+            [('A', -1, 'Alpha'), ('B', 0, None)]):
+        items.pks.append(position)
+        items.ids.append(object_id)
+        items.urns.append(f'urn:{object_id}')
+        items.parents.append(parent)
+        items.names[0].append(name)
+        items.names[1].append(None)
+        for column in items.descriptions:
+            column.append(None)
+    assert ItemArray.supports(structure.CodeSerializer)
+    assert not ItemArray.supports(structure.ConceptSerializer)
+    first, second = items
+    assert len(items) == 2
+    assert [(t.lang, t.text) for t in first.name] == [('en', 'Alpha')]
+    assert first.parent is None and first.urn == 'urn:A'
+    assert second.name == []
+    assert second.parent.ref.object_id == 'A'
@@ -0,0 +1,112 @@
+# test_series_keys.py
+
+from unittest import mock
+
+import pytest
+from django.apps import apps
+from django.test import TestCase, override_settings
+
+from fiesta.apps.data import series
+from fiesta.apps.data.series import (
+    MAX_BITS, SeriesKeyRegistry, get_series_key_registry)
+from fiesta.utils.datastructures import LRUCache
+
+@pytest.fixture
+def registry():
+    registry = SeriesKeyRegistry(
+        None, ('FREQ', 'CURRENCY', 'CURRENCY_DENOM'), (3, 8, 8), cache_size=2)
+    registry.load([
+        ('FREQ', 'A', 0), ('FREQ', 'M', 1),
+        ('CURRENCY', 'JPY', 0), ('CURRENCY', 'USD', 1),
+        ('CURRENCY_DENOM', 'EUR', 0),
+    ])
+    return registry
+
+class TestLRUCache:
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')
+        cache['c'] = 3
+        assert 'b' not in cache
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        assert len(cache) == 2
+
+class TestSeriesKeyRegistry:
+
+    def test_first_dimension_takes_the_most_significant_bits(self, registry):
+        assert registry.shifts == (16, 8, 0)
+        assert registry.encode('M.USD.EUR') == (1 << 16) | (1 << 8)
+
+    def test_decode_reverses_encode(self, registry):
+        for key in ['A.JPY.EUR', 'M.USD.EUR']:
+            assert registry.decode(registry.encode(key)) == tuple(key.split('.'))
+
+    def test_unknown_value_raises(self, registry):
+        with pytest.raises(KeyError):
+            registry.encode('Q.USD.EUR')
+
+    def test_layout_wider_than_a_bigint_raises(self):
+        with pytest.raises(ValueError):
+            SeriesKeyRegistry(None, ('A', 'B'), (32, 32))
+
+
+    def test_enumerated_dimensions_take_a_bit_of_headroom(self):
+        assert SeriesKeyRegistry.fit_widths([2, 40, 1]) == [3, 7, 2]
+
+    def test_non_enumerated_dimensions_share_the_bits_left(self):
+        widths = SeriesKeyRegistry.fit_widths([None, 200, None, None, None])
+        assert widths == [13, 9, 13, 13, 13]
+        assert sum(widths) <= MAX_BITS
+
+    @override_settings(FIESTA={'DEFAULT_SERIES_KEY_CODE_BITS': 8})
+    def test_non_enumerated_dimensions_take_the_setting(self):
+        assert SeriesKeyRegistry.fit_widths([None, 3]) == [8, 3]
+
+    def test_enumerated_dimensions_wider_than_a_bigint_raise(self):
+        with pytest.raises(ValueError):
+            SeriesKeyRegistry.fit_widths([2 ** 40, 2 ** 30])
+        with pytest.raises(ValueError):
+            SeriesKeyRegistry.fit_widths([2 ** 40, 2 ** 20, None])
+
+class SeriesKeyRegistryDatabaseTest(TestCase):
+
+    def setUp(self):
+        agency = apps.get_model('base', 'Agency').objects.create(object_id='ECB')
+        self.dsd = apps.get_model('datastructure', 'DataStructure').objects.create(
+            agency=agency, object_id='ECB_EXR1', version='1.0')
+        self.layout = apps.get_model('data', 'SeriesKeyLayout').objects.create(
+            data_structure=self.dsd, components='FREQ,CURRENCY', widths='3,8')
+
+    def test_reloads_the_codes_assigned_by_other_processes(self):
+        registry = SeriesKeyRegistry.for_data_structure(self.dsd)
+        other = SeriesKeyRegistry.for_data_structure(self.dsd)
+        ids = other.get_or_create_ids(['M.USD'])
+        self.assertEqual(list(registry.filter('M.USD').values_list('pk', flat=True)),
+                         [ids['M.USD']])
+        self.assertEqual(registry.get_or_create_ids(['M.USD', 'M.JPY'])['M.USD'],
+                         ids['M.USD'])
+        other.load()
+        self.assertEqual(registry.codes, other.codes)
+
+    @mock.patch('fiesta.apps.data.series.get_dimension_ids', return_value=('FREQ',))
+    @mock.patch.object(SeriesKeyRegistry, 'get_widths', return_value=[3])
+    def test_registry_creates_the_missing_layout(self, get_widths, get_dimension_ids):
+        self.layout.delete()
+        registry = get_series_key_registry(self.dsd)
+        self.assertEqual((registry.components, registry.widths), (('FREQ',), (3,)))
+        self.assertTrue(apps.get_model('data', 'SeriesKeyLayout').objects.filter(
+            data_structure=self.dsd).exists())
+
+    def test_registry_is_shared_until_its_layout_changes(self):
+        registry = get_series_key_registry(self.dsd)
+        self.assertIs(get_series_key_registry(self.dsd), registry)
+        self.layout.widths = '4,8'
+        self.layout.save()
+        registry = get_series_key_registry(self.dsd)
+        self.assertEqual(registry.widths, (4, 8))
+        pk = self.dsd.pk
+        self.dsd.delete()
+        self.assertNotIn(pk, series._registries)
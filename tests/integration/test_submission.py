@@ -0,0 +1,347 @@
+# test_submission.py
+
+import os
+import tempfile
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from lxml import etree
+from rest_framework.exceptions import ParseError
+
+from fiesta.core.constants import NAMESPACE_MAP
+from fiesta.core.serializers.options import (
+    RESTfulQuery, RESTfulQueryContextOptions)
+from fiesta.core.serializers.structure import CodelistSerializer, StructureSerializer
+from fiesta.core.validation import has_new_artefacts
+from fiesta.renderers import XMLRenderer
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+MEDIA_TYPE = 'application/xml;version=2.1'
+
+# The SDMX schemas are not part of the tests, the messages of the users of
+# the trusted ECB are not validated against them
+FIESTA = {
+    'DEFAULT_TRUSTED_SENDERS': ['ECB'],
+    'DEFAULT_TRUSTED_VALIDATION': 'sample',
+    'DEFAULT_TRUSTED_VALIDATION_RATE': 0,
+}
+
+HIERARCHY = b"""<?xml version='1.0' encoding='UTF-8'?>
+<mes:Structure xmlns:mes="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" xmlns:str="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure" xmlns:com="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common">
+<mes:Header><mes:ID>AREAS</mes:ID><mes:Test>false</mes:Test><mes:Prepared>2020-01-01T00:00:00</mes:Prepared><mes:Sender id="ECB"/></mes:Header>
+<mes:Structures><str:Codelists>
+<str:Codelist agencyID="ECB" id="CL_AREA" version="1.0"><com:Name xml:lang="en">Areas</com:Name>
+<str:Code id="EU"><com:Name xml:lang="en">European Union</com:Name></str:Code>
+<str:Code id="GR"><com:Name xml:lang="en">Greece</com:Name><str:Parent><Ref id="EU"/></str:Parent></str:Code>
+</str:Codelist>
+</str:Codelists></mes:Structures>
+</mes:Structure>"""
+
+def read_message(filename):
+    with open(os.path.join(DATA, filename), 'rb') as f:
+        return f.read()
+
+def xpath(content, path):
+    root = etree.fromstring(content)
+    return root.xpath(path, namespaces=NAMESPACE_MAP)
+
+@override_settings(FIESTA=FIESTA, MEDIA_ROOT=tempfile.mkdtemp())
+class SubmissionTestCase(TestCase):
+    """Submits messages and queries them through the views"""
+
+    def setUp(self):
+        Agency = apps.get_model('base', 'Agency')
+        for object_id in ['ECB', 'SDMX']:
+            Agency.objects.create(object_id=object_id)
+        self.user = get_user_model().objects.create(
+            username='submitter', is_superuser=True,
+            agency=Agency.objects.get(object_id='ECB'))
+        self.client.force_login(self.user)
+
+    def submit(self, message=None, query=''):
+        if message is None: message = read_message('ecb_codelists.xml')
+        return self.client.post(f'/fiesta/wsreg/SubmitStructure/{query}',
+                                message, content_type=MEDIA_TYPE)
+
+    def query(self, path, **extra):
+        return self.client.get(f'/fiesta/wsrest/{path}', **extra)
+
+class SubmitStructureTest(SubmissionTestCase):
+
+    def test_reports_the_status_of_every_artefact(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            xpath(response.content, '//registry:StatusMessage/@status'),
+            ['Success', 'Success'])
+        self.assertEqual(
+            xpath(response.content, '//registry:MaintainableObject/Ref/@id'),
+            ['CL_DECIMALS', 'CL_FREQ'])
+
+    def test_stores_the_artefacts_and_their_items(self):
+        self.submit()
+        codelist = apps.get_model('codelist', 'Codelist').objects.get(
+            object_id='CL_FREQ')
+        self.assertEqual(codelist.name_en, 'Frequency code list')
+        self.assertEqual(
+            codelist.urn, 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_FREQ(1.0)')
+        code = codelist.code_set.get(object_id='A')
+        self.assertEqual(code.name_en, 'Annual')
+        self.assertEqual(
+            code.urn, 'urn:sdmx:org.sdmx.infomodel.codelist.Code=ECB:CL_FREQ(1.0).A')
+        self.assertEqual(codelist.code_set.count(), 10)
+        self.assertEqual(
+            apps.get_model('registry', 'LatestVersion').objects.count(), 2)
+
+    def test_stores_the_parents_of_the_items(self):
+        self.submit(HIERARCHY)
+        code = apps.get_model('codelist', 'Code').objects.get(object_id='GR')
+        self.assertEqual(code.get_parent().object_id, 'EU')
+
+    def test_logs_the_request_and_the_response(self):
+        response = self.submit()
+        log = apps.get_model('registry', 'Log').objects.get()
+        self.assertEqual(log.progress, str(log.Progress.COMPLETED))
+        self.assertIn('REQUEST_IDREF134865', log.request_file.name)
+        self.assertEqual(log.response_file.read(), response.content)
+
+class DryRunTest(SubmissionTestCase):
+
+    def assertNothingWritten(self):
+        for label in ['codelist.Codelist', 'codelist.Code', 'registry.Header',
+                      'registry.SubmittedStructure', 'registry.LatestVersion',
+                      'registry.SearchEntry']:
+            self.assertFalse(apps.get_model(label).objects.exists(), label)
+
+    def get_results(self, response):
+        results, = xpath(response.content, '//message:SubmitStructureResponse')
+        return etree.tostring(results)
+
+    def test_writes_nothing(self):
+        response = self.submit(query='?dryRun=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertNothingWritten()
+
+    def test_test_messages_write_nothing(self):
+        message = read_message('ecb_codelists.xml').replace(
+            b'<mes:Test>false</mes:Test>', b'<mes:Test>true</mes:Test>')
+        self.submit(message)
+        self.assertNothingWritten()
+
+    def test_returns_the_response_of_a_submission(self):
+        dry_run = self.submit(query='?dryRun=true')
+        submission = self.submit()
+        self.assertEqual(self.get_results(dry_run), self.get_results(submission))
+
+    def test_logs_under_the_message_id(self):
+        self.submit(query='?dryRun=true')
+        log = apps.get_model('registry', 'Log').objects.get()
+        self.assertIn('REQUEST_IDREF134865', log.request_file.name)
+        self.assertIn('RESPONSE_IDREF134865', log.response_file.name)
+
+class RetrieveStructureTest(SubmissionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def test_renders_the_queried_artefact(self):
+        response = self.query('codelist/ECB/CL_FREQ/')
+        self.assertEqual(response.status_code, 200)
+        codelist, = xpath(response.content, '//structure:Codelist')
+        self.assertEqual(codelist.get('agencyID'), 'ECB')
+        self.assertEqual(codelist.get('version'), '1.0')
+        self.assertEqual(
+            codelist.get('urn'), 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_FREQ(1.0)')
+        self.assertEqual(len(codelist.findall('structure:Code', NAMESPACE_MAP)), 10)
+        self.assertEqual(xpath(response.content, '//common:Annotations'), [])
+
+    def test_renders_the_queried_items(self):
+        response = self.query('codelist/ECB/CL_FREQ/1.0/A+M/')
+        self.assertEqual(xpath(response.content, '//structure:Code/@id'), ['A', 'M'])
+        self.assertEqual(
+            xpath(response.content, '//structure:Codelist/@isPartial'), ['true'])
+
+    def test_renders_the_parents_of_the_items(self):
+        self.submit(HIERARCHY)
+        response = self.query('codelist/ECB/CL_AREA/')
+        self.assertEqual(
+            xpath(response.content, '//structure:Code[@id="GR"]/structure:Parent/Ref/@id'),
+            ['EU'])
+        self.assertEqual(
+            xpath(response.content, '//structure:Code[@id="EU"]/structure:Parent'), [])
+
+    def test_renders_through_the_serializer(self):
+        Log = apps.get_model('registry', 'Log')
+        log = Log.objects.create(channel=Log.Channel.REQUESTSTRUCTUREREST)
+        query = RESTfulQuery('codelist', 'ECB', 'CL_FREQ', log=log)
+        data = StructureSerializer().retrieve_restful(RESTfulQueryContextOptions(query))
+        data._query = query
+        content = XMLRenderer().render(data)
+        self.assertEqual(xpath(content, '//message:Receiver/@id'), ['not_supplied'])
+        self.assertEqual(xpath(content, '//structure:Codelist/@id'), ['CL_FREQ'])
+        self.assertEqual(
+            xpath(content, '//structure:Code[@id="A"]/common:Name/text()'), ['Annual'])
+
+    def test_renders_rejected_queries_as_error_messages(self):
+        response = self.query('codelist/ECB/CL_FREQ/', data={'detail': 'bogus'})
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(
+            xpath(response.content, '//message:ErrorMessage/@code'), ['405'])
+
+class StubTest(SubmissionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def test_allstubs_render_the_stub_attributes_and_names(self):
+        response = self.query('codelist/ECB/', data={'detail': 'allstubs'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(xpath(response.content, '//structure:Code'), [])
+        codelist, = xpath(response.content, '//structure:Codelist[@id="CL_FREQ"]')
+        self.assertEqual(codelist.get('agencyID'), 'ECB')
+        self.assertEqual(codelist.get('version'), '1.0')
+        self.assertEqual(codelist.get('isExternalReference'), 'true')
+        self.assertEqual(
+            codelist.get('structureURL'), 'http://www.fiesta.org/codelist/ECB/CL_FREQ/1.0')
+        self.assertEqual(
+            codelist.xpath('common:Name/text()', namespaces=NAMESPACE_MAP),
+            ['Frequency code list'])
+
+    def test_referencestubs_render_the_queried_resource_in_full(self):
+        response = self.query('codelist/ECB/CL_FREQ/', data={'detail': 'referencestubs'})
+        codelist, = xpath(response.content, '//structure:Codelist')
+        self.assertIsNone(codelist.get('structureURL'))
+        self.assertEqual(len(codelist.findall('structure:Code', NAMESPACE_MAP)), 10)
+
+    def test_stubs_are_read_with_a_single_query(self):
+        with self.assertNumQueries(1):
+            stubs = list(CodelistSerializer.generate_restful_stubs(Q(object_id='CL_FREQ')))
+        stub, = stubs
+        self.assertEqual(
+            stub.make_structure_url(), 'http://www.fiesta.org/codelist/ECB/CL_FREQ/1.0')
+        self.assertEqual(stub.names, [('en', 'Frequency code list')])
+
+def reject(element, schema_class, kind, enabled=True):
+    """Stands in for the schema validation, rejects every validated message"""
+    if enabled: raise ParseError('Rejected by the schema')
+
+@mock.patch('fiesta.parsers.xml.parser.validate_message', reject)
+class ValidationPolicyTest(SubmissionTestCase):
+
+    def test_trusts_the_organisation_of_the_user_not_the_sender(self):
+        self.user.agency = apps.get_model('base', 'Agency').objects.get(object_id='SDMX')
+        self.user.save()
+        self.assertEqual(self.submit().status_code, 400)
+
+    @override_settings(FIESTA=dict(FIESTA, DEFAULT_TRUSTED_VALIDATION='first'))
+    def test_validates_the_first_submission_of_the_artefacts(self):
+        self.assertEqual(self.submit().status_code, 400)
+        with override_settings(FIESTA=FIESTA):
+            self.submit()
+        self.assertEqual(self.submit().status_code, 200)
+
+    @override_settings(FIESTA=dict(FIESTA, DEFAULT_TRUSTED_VALIDATION='first'))
+    def test_validates_the_artefacts_without_a_valid_urn(self):
+        message = read_message('ecb_codelists.xml').replace(b'id="CL_FREQ"', b'id="CL X"')
+        self.assertTrue(has_new_artefacts(etree.fromstring(message)))
+        self.assertEqual(self.submit(message).status_code, 400)
+
+def canonical(content):
+    """
+    The exclusive canonical form of a message without the ID and the time
+    of its header, so equal messages compare equal whatever the placement of
+    their namespace declarations
+    """
+    root = etree.fromstring(content)
+    for path in ['message:Header/message:ID', 'message:Header/message:Prepared']:
+        for element in root.xpath(path, namespaces=NAMESPACE_MAP):
+            element.getparent().remove(element)
+    return etree.tostring(root, method='c14n', exclusive=True)
+
+@override_settings(FIESTA=dict(FIESTA, DEFAULT_OUTPUT_VALIDATION='never'))
+class StreamedStructureTest(SubmissionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+
+    def stream(self, path, **options):
+        fiesta = dict(FIESTA, DEFAULT_STREAM_STRUCTURES=True, DEFAULT_OUTPUT_VALIDATION='never')
+        fiesta.update(options)
+        with self.settings(FIESTA=fiesta):
+            response = self.query(path)
+            self.assertTrue(response.streaming)
+            return response, list(response.streaming_content)
+
+    def test_streamed_messages_equal_the_buffered_ones(self):
+        for path in ['codelist/ECB/', 'codelist/ECB/CL_FREQ/1.0/A+M/',
+                     'codelist/ECB/?detail=allstubs']:
+            with self.subTest(path=path):
+                buffered = self.query(path)
+                streamed, chunks = self.stream(path)
+                self.assertEqual(streamed.status_code, buffered.status_code)
+                self.assertEqual(canonical(b''.join(chunks)), canonical(buffered.content))
+
+    def test_streams_one_chunk_per_artefact(self):
+        _, chunks = self.stream('codelist/ECB/')
+        self.assertGreater(len(chunks), 2)
+
+    @mock.patch('fiesta.renderers.xml.renderer.validate', side_effect=reject)
+    def test_validates_the_messages_of_the_output_policy(self, validate):
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_STREAM_STRUCTURES=True,
+                                       DEFAULT_OUTPUT_VALIDATION='always')):
+            response = self.query('codelist/ECB/')
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['400'])
+        self.assertTrue(validate.call_args[0][3])
+
+    @mock.patch('fiesta.renderers.xml.renderer.validate')
+    def test_validated_messages_equal_the_streamed_ones(self, validate):
+        _, chunks = self.stream('codelist/ECB/')
+        _, validated = self.stream('codelist/ECB/', DEFAULT_OUTPUT_VALIDATION='always')
+        self.assertEqual(len(validated), 1)
+        self.assertEqual(canonical(validated[0]), canonical(b''.join(chunks)))
+        validate.assert_called_once()
+
+class ItemArrayTest(SubmissionTestCase):
+    """The item schemes rendered from arrays equal the prefetched ones"""
+
+    def setUp(self):
+        super().setUp()
+        self.submit()
+        self.submit(HIERARCHY)
+
+    def test_arrays_render_the_same_items(self):
+        for path in ['codelist/ECB/CL_FREQ/', 'codelist/ECB/CL_AREA/']:
+            with self.subTest(path=path):
+                prefetched = self.query(path)
+                with self.settings(FIESTA=dict(FIESTA, DEFAULT_ITEM_ARRAY_THRESHOLD=1)):
+                    arrays = self.query(path)
+                self.assertEqual(canonical(arrays.content), canonical(prefetched.content))
+                self.assertTrue(xpath(arrays.content, '//structure:Code/@urn'))
+
+@override_settings(FIESTA=dict(FIESTA, DEFAULT_READ_DATABASES=['replica']))
+class ReadAfterSubmitTest(SubmissionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_reads_of_the_submitter_go_to_the_primary(self):
+        self.submit()
+        response = self.query('codelist/ECB/CL_FREQ/')
+        self.assertEqual(xpath(response.content, '//structure:Codelist/@id'), ['CL_FREQ'])
+
+    def test_reads_of_the_other_users_go_to_the_replica(self):
+        self.submit()
+        self.client.force_login(get_user_model().objects.create(username='reader'))
+        response = self.query('codelist/ECB/CL_FREQ/')
+        self.assertEqual(xpath(response.content, '//structure:Codelist'), [])
@@ -0,0 +1,110 @@
+# test_translation.py
+
+import pytest
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from fiesta.utils.translation import (
+    get_requested_languages, parse_accept_language, requested_languages)
+
+from .test_submission import FIESTA, SubmissionTestCase, read_message, xpath
+
+LANGUAGES = [('en', 'English'), ('fr', 'French'), ('de', 'German')]
+
+@override_settings(LANGUAGES=LANGUAGES)
+@pytest.mark.parametrize('header, languages', [
+    (None, None),
+    ('*', None),
+    ('it', None),
+    ('fr-CH, fr;q=0.9, en;q=0.8, *;q=0.5', None),
+    ('fr-CH, fr;q=0.9, en;q=0.8', ('fr', 'en')),
+    ('de;q=0.5, en', ('en', 'de')),
+])
+def test_parse_accept_language(header, languages):
+    assert parse_accept_language(header) == languages
+
+@override_settings(LANGUAGES=LANGUAGES)
+def test_requested_languages():
+    assert get_requested_languages() == ('en', 'fr', 'de')
+    with requested_languages(('fr',)):
+        assert get_requested_languages() == ('fr',)
+    assert get_requested_languages() == ('en', 'fr', 'de')
+
+GREEK = read_message('ecb_codelists.xml').replace(
+    b'<com:Name xml:lang="en">Frequency code list</com:Name>',
+    '<com:Name xml:lang="en">Frequency code list</com:Name>'
+    '<com:Name xml:lang="el">Συχνότητα</com:Name>'.encode()
+).replace(
+    b'<com:Name xml:lang="en">Annual</com:Name>',
+    '<com:Name xml:lang="en">Annual</com:Name>'
+    '<com:Name xml:lang="el">Ετήσια</com:Name>'.encode())
+
+class RequestedLanguagesQueryTest(SubmissionTestCase):
+    """Structure queries of the languages negotiated with Accept-Language"""
+
+    # The paths of the artefacts, the item arrays and the item subsets
+    OPTIONS = [
+        ('codelist/ECB/CL_FREQ/', {}),
+        ('codelist/ECB/CL_FREQ/', {'DEFAULT_ITEM_ARRAY_THRESHOLD': 1}),
+        ('codelist/ECB/CL_FREQ/1.0/A/', {}),
+        ('codelist/ECB/CL_FREQ/', {'DEFAULT_STREAM_STRUCTURES': True}),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.submit(GREEK)
+
+    def get(self, path, options, language=None):
+        extra = {'HTTP_ACCEPT_LANGUAGE': language} if language else {}
+        with self.settings(FIESTA=dict(FIESTA, **options)), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.query(path, **extra)
+            content = (b''.join(response.streaming_content) if response.streaming
+                       else response.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept-Language', response['Vary'])
+        # The queries of the codelists and their codes
+        sql = [query['sql'] for query in queries.captured_queries
+               if 'FROM "codelist_code' in query['sql']]
+        self.assertTrue(sql)
+        return content, ' '.join(sql)
+
+    def get_names(self, content, path):
+        return [
+            (name.get('{http://www.w3.org/XML/1998/namespace}lang'), name.text)
+            for name in xpath(content, f'{path}/common:Name')
+        ]
+
+    def test_renders_the_negotiated_language(self):
+        for path, options in self.OPTIONS:
+            with self.subTest(path=path, options=options):
+                content, sql = self.get(path, options, 'el-GR, fr;q=0.5')
+                self.assertEqual(self.get_names(content, '//structure:Code[@id="A"]'),
+                                 [('el', 'Ετήσια')])
+                if 'A/' not in path:
+                    self.assertEqual(self.get_names(content, '//structure:Codelist'),
+                                     [('el', 'Συχνότητα')])
+                # The translations of the other languages are deferred
+                self.assertIn('"name_el"', sql)
+                self.assertNotIn('"name_en"', sql)
+                self.assertNotIn('"description_en"', sql)
+
+    def test_renders_all_the_languages_by_default(self):
+        for path, options in self.OPTIONS:
+            for language in [None, '*', 'fr']:
+                with self.subTest(path=path, options=options, language=language):
+                    content, sql = self.get(path, options, language)
+                    self.assertEqual(
+                        self.get_names(content, '//structure:Code[@id="A"]'),
+                        [('en', 'Annual'), ('el', 'Ετήσια')])
+                    self.assertIn('"name_en"', sql)
+                    self.assertIn('"name_el"', sql)
+
+    def test_items_without_the_language_have_no_names(self):
+        content, _ = self.get('codelist/ECB/CL_FREQ/', {}, 'el')
+        self.assertEqual(self.get_names(content, '//structure:Code[@id="M"]'), [])
+        content, _ = self.get('codelist/ECB/CL_FREQ/', {}, 'en')
+        self.assertEqual(self.get_names(content, '//structure:Code[@id="M"]'),
+                         [('en', 'Monthly')])
@@ -0,0 +1,119 @@
+# test_uploads.py
+
+import gzip
+import io
+import zlib
+
+from unittest import mock
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from django.apps import apps
+from django.test import RequestFactory
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+
+from fiesta.parsers import XMLParser21
+
+from .test_submission import (
+    FIESTA, HIERARCHY, MEDIA_TYPE, SubmissionTestCase, read_message, xpath)
+
+ENCODINGS = {'gzip': gzip.compress, 'deflate': zlib.compress}
+
+def make_zip(*members):
+    stream = io.BytesIO()
+    with ZipFile(stream, 'w', ZIP_DEFLATED) as zf:
+        for name, content in members:
+            zf.writestr(name, content)
+    return stream.getvalue()
+
+# A message padded by a comment that compresses far beyond the ratio limit
+BOMB = HIERARCHY.replace(b'<mes:Header>', b'<!--' + b' ' * 2 ** 20 + b'--><mes:Header>')
+
+ARCHIVE = make_zip(('codelists.xml', read_message('ecb_codelists.xml')),
+                   ('areas/', b''), ('areas/hierarchy.xml', HIERARCHY))
+
+class ParserUploadTest(SubmissionTestCase):
+    """Compressed and archived bodies through XMLParser21.parse"""
+
+    def parse(self, body, encoding=None):
+        extra = {'HTTP_CONTENT_ENCODING': encoding} if encoding else {}
+        request = RequestFactory().post(
+            '/fiesta/wsreg/SubmitStructure/', body, content_type=MEDIA_TYPE, **extra)
+        request.user = self.user
+        return XMLParser21().parse(io.BytesIO(body), MEDIA_TYPE, {'request': request})
+
+    def get_codelists(self, message):
+        return [codelist.object_id
+                for codelist in message.structures.codelists.codelist]
+
+    def test_content_encodings(self):
+        for encoding, compress in ENCODINGS.items():
+            with self.subTest(encoding=encoding):
+                message = self.parse(compress(HIERARCHY), encoding)
+                self.assertEqual(message.header.object_id, 'AREAS')
+                self.assertEqual(self.get_codelists(message), ['CL_AREA'])
+
+    def test_zip_members_are_merged_under_the_first_header(self):
+        with mock.patch('fiesta.parsers.xml.parser.validate_message') as validate:
+            message = self.parse(ARCHIVE)
+        self.assertEqual(message.header.object_id, 'IDREF134865')
+        self.assertEqual(self.get_codelists(message), ['CL_DECIMALS', 'CL_FREQ', 'CL_AREA'])
+        # Each member is validated by the policy, the merged message is not
+        roots = [call[0][0] for call in validate.call_args_list]
+        self.assertEqual(len(roots), 3)
+        self.assertFalse(validate.call_args_list[-1][0][3])
+
+    def test_zip_members_must_be_structure_messages(self):
+        request = HIERARCHY.replace(b'mes:Structure', b'mes:RegistryInterface')
+        with self.assertRaises(ParseError):
+            self.parse(make_zip(('a.xml', HIERARCHY), ('b.xml', request)))
+
+    def test_rejects_unknown_encodings_and_bombs(self):
+        with self.assertRaises(UnsupportedMediaType):
+            self.parse(HIERARCHY, 'compress')
+        with self.assertRaises(ParseError):
+            self.parse(gzip.compress(BOMB), 'gzip')
+        with self.assertRaises(ParseError):
+            self.parse(make_zip(('bomb.xml', BOMB)))
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_MAX_ZIP_MEMBERS=1)):
+            with self.assertRaises(ParseError):
+                self.parse(ARCHIVE)
+
+class SubmitUploadTest(SubmissionTestCase):
+    """Compressed and archived bodies through the submit view"""
+
+    def post(self, body, **extra):
+        return self.client.post('/fiesta/wsreg/SubmitStructure/', body,
+                                content_type=MEDIA_TYPE, **extra)
+
+    def get_codelists(self):
+        return set(apps.get_model('codelist', 'Codelist').objects.values_list(
+            'object_id', flat=True))
+
+    def test_content_encodings(self):
+        for encoding, compress in ENCODINGS.items():
+            with self.subTest(encoding=encoding):
+                response = self.post(compress(HIERARCHY), HTTP_CONTENT_ENCODING=encoding)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    xpath(response.content, '//registry:StatusMessage/@status'), ['Success'])
+        self.assertEqual(self.get_codelists(), {'CL_AREA'})
+
+    def test_zip_members_form_one_submission(self):
+        response = self.post(ARCHIVE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            xpath(response.content, '//registry:MaintainableObject/Ref/@id'),
+            ['CL_DECIMALS', 'CL_FREQ', 'CL_AREA'])
+        self.assertEqual(self.get_codelists(), {'CL_DECIMALS', 'CL_FREQ', 'CL_AREA'})
+        self.assertEqual(apps.get_model('registry', 'Header').objects.count(), 1)
+        code = apps.get_model('codelist', 'Code').objects.get(object_id='GR')
+        self.assertEqual(code.get_parent().object_id, 'EU')
+
+    def test_rejected_bodies(self):
+        response = self.post(HIERARCHY, HTTP_CONTENT_ENCODING='compress')
+        self.assertEqual(response.status_code, 415)
+        with self.settings(FIESTA=dict(FIESTA, DEFAULT_MAX_ZIP_MEMBERS=1)):
+            response = self.post(ARCHIVE)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(xpath(response.content, '//message:ErrorMessage/@code'), ['400'])
+        self.assertEqual(self.get_codelists(), set())
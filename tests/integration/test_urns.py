@@ -0,0 +1,101 @@
+# test_urns.py
+
+import pytest
+from django.apps import apps
+from django.test import TestCase
+
+from fiesta.core.urns import make_item_urn, make_urn, parse_urn, resolve_urns
+
+CL_AREA = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_AREA(1.0)'
+CODE_DE = 'urn:sdmx:org.sdmx.infomodel.codelist.Code=ECB:CL_AREA(1.0).DE'
+CL_FREQ = 'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_FREQ(1.0)'
+AGENCIES = 'urn:sdmx:org.sdmx.infomodel.base.AgencyScheme=SDMX:AGENCIES(1.0)'
+PROCESS = 'urn:sdmx:org.sdmx.infomodel.process.Process=ECB:PROC(1.0)'
+
+def test_parse_maintainable_urn():
+    urn = parse_urn('urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_AREA(1.0)')
+    assert (urn.resource, urn.agency_id, urn.object_id, urn.version) == (
+        'codelist', 'ECB', 'CL_AREA', '1.0')
+    assert urn.item_id is None
+
+def test_parse_item_urn():
+    urn = parse_urn(
+        'urn:sdmx:org.sdmx.infomodel.conceptscheme.Concept=ECB:ECB_CONCEPTS(1.0).FREQ')
+    assert (urn.resource, urn.item_id) == ('conceptscheme', 'FREQ')
+    assert str(urn) == (
+        'urn:sdmx:org.sdmx.infomodel.conceptscheme.Concept=ECB:ECB_CONCEPTS(1.0).FREQ')
+
+@pytest.mark.parametrize('urn', [
+    'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_AREA',
+    'urn:sdmx:org.sdmx.infomodel.process.Process=ECB:PROC(1.0)',
+    'urn:sdmx:org.sdmx.infomodel.codelist.Code=ECB:CL_AREA(1.0)',
+    # Items are addressed by their own class, not by their scheme
+    'urn:sdmx:org.sdmx.infomodel.conceptscheme.ConceptScheme=ECB:ECB_CONCEPTS(1.0).FREQ',
+])
+def test_parse_invalid_urn(urn):
+    with pytest.raises(ValueError):
+        parse_urn(urn)
+
+def test_make_urn_uses_the_urn_version():
+    assert make_urn('codelist', 'Codelist', 'ECB', 'CL_AREA', '1.0.0') == (
+        'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_AREA(1.0)')
+    assert make_urn('codelist', 'Codelist', 'ECB', 'CL_AREA', '1.0.1') == (
+        'urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ECB:CL_AREA(1.0.1)')
+
+def test_make_item_urn():
+    container = make_urn('codelist', 'Codelist', 'ECB', 'CL_AREA', '1.0')
+    assert make_item_urn(container, 'Code', 'DE') == (
+        'urn:sdmx:org.sdmx.infomodel.codelist.Code=ECB:CL_AREA(1.0).DE')
+
+def test_parse_urn_not_strict():
+    urn = parse_urn(
+        'urn:sdmx:org.sdmx.infomodel.registry.ProvisionAgreement=ECB:PA(1.0)',
+        strict=False)
+    assert (urn.package, urn.class_name) == ('registry', 'ProvisionAgreement')
+
+class ResolveURNsTest(TestCase):
+
+    def setUp(self):
+        agency = apps.get_model('base', 'Agency').objects.create(object_id='ECB')
+        self.codelist = apps.get_model('codelist', 'Codelist').objects.create(
+            agency=agency, object_id='CL_AREA', version='1.0')
+        self.code = apps.get_model('codelist', 'Code').add_root(
+            container=self.codelist, object_id='DE')
+
+    def test_resolves_artefacts_and_items(self):
+        self.assertEqual(resolve_urns([CL_AREA, CODE_DE]),
+                         {CL_AREA: self.codelist, CODE_DE: self.code})
+
+    def test_resolves_the_urns_of_the_stored_versions(self):
+        urn = CL_AREA.replace('(1.0)', '(1.0.0)')
+        self.assertEqual(resolve_urns([urn]), {urn: self.codelist})
+
+    def test_leaves_out_the_unstored_and_unsupported_urns(self):
+        self.assertEqual(resolve_urns([CL_FREQ, AGENCIES, PROCESS, CL_AREA]),
+                         {CL_AREA: self.codelist})
+
+    def test_malformed_urn_raises(self):
+        with self.assertRaises(ValueError):
+            resolve_urns([CL_AREA, 'urn:sdmx:CL_AREA'])
+
+    def test_queries_per_model_and_chunk(self):
+        urns = [CL_AREA, CL_FREQ, CODE_DE]
+        with self.assertNumQueries(3):
+            self.assertEqual(len(resolve_urns(urns, chunk_size=1)), 2)
+
+    def test_view_reports_every_urn(self):
+        urns = [CL_AREA, CODE_DE, CL_FREQ, AGENCIES, 'urn:sdmx:CL_AREA']
+        response = self.client.get('/fiesta/wsrest/urn/', {'urn': urns})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual([result['urn'] for result in results], urns)
+        self.assertEqual([result['found'] for result in results],
+                         [True, True, False, False, False])
+        self.assertEqual(results[0]['model'], 'codelist.Codelist')
+        self.assertEqual(results[0]['path'], 'wsrest/codelist/ECB/CL_AREA/1.0/')
+        self.assertEqual(results[1]['path'], 'wsrest/codelist/ECB/CL_AREA/1.0/DE/')
+        self.assertIn('Malformed URN', results[4]['error'])
+        self.assertNotIn('error', results[3])
+
+    def test_view_requires_a_urn(self):
+        self.assertEqual(self.client.get('/fiesta/wsrest/urn/').status_code, 400)
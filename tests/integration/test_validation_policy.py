@@ -0,0 +1,69 @@
+# test_validation_policy.py
+
+from types import SimpleNamespace
+
+import pytest
+
+from django.test import override_settings
+from lxml import etree
+from rest_framework.exceptions import ParseError
+
+from fiesta.core.validation import (
+    should_validate_input, should_validate_output, validate, validation_stats
+)
+
+MESSAGE = (
+    b'<mes:Structure xmlns:mes="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message">'
+    b'<mes:Header><mes:Sender id="ECB"/></mes:Header></mes:Structure>'
+)
+
+XSD = b'''<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+<xs:element name="r"><xs:complexType><xs:attribute name="n" type="xs:int"/>
+</xs:complexType></xs:element></xs:schema>'''
+
+class RootSchema:
+
+    def __init__(self, root):
+        self.schema = etree.XMLSchema(etree.fromstring(XSD))
+
+def make_request(organisation='ECB', authenticated=True):
+    if organisation: organisation = SimpleNamespace(object_id=organisation)
+    return SimpleNamespace(user=SimpleNamespace(
+        is_authenticated=authenticated, organisation=organisation))
+
+def test_input_policy():
+    # The Sender of the message is ECB for all, only the user is trusted
+    message = etree.fromstring(MESSAGE)
+    with override_settings(FIESTA={
+            'DEFAULT_TRUSTED_SENDERS': ['ECB'],
+            'DEFAULT_TRUSTED_VALIDATION': 'sample',
+            'DEFAULT_TRUSTED_VALIDATION_RATE': 0}):
+        assert not should_validate_input(message, make_request())
+        assert should_validate_input(message, make_request(authenticated=False))
+        assert should_validate_input(message)
+        assert should_validate_input(message, make_request('OTHER'))
+        assert should_validate_input(message, make_request(None))
+    with override_settings(FIESTA={
+            'DEFAULT_TRUSTED_SENDERS': ['ECB'],
+            'DEFAULT_TRUSTED_VALIDATION': 'always'}):
+        assert should_validate_input(message, make_request())
+
+def test_output_policy():
+    for mode, debug, expected in [('always', False, True), ('debug', False, False),
+                                  ('debug', True, True), ('never', True, False)]:
+        with override_settings(DEBUG=debug, FIESTA={'DEFAULT_OUTPUT_VALIDATION': mode}):
+            assert should_validate_output() is expected
+    with override_settings(FIESTA={
+            'DEFAULT_OUTPUT_VALIDATION': 'sample',
+            'DEFAULT_OUTPUT_VALIDATION_RATE': 100}):
+        assert should_validate_output()
+
+def test_validation_is_timed():
+    validation_stats.reset()
+    validate(etree.fromstring(b'<r n="1"/>'), RootSchema, 'input')
+    validate(etree.fromstring(b'<r n="x"/>'), RootSchema, 'input', enabled=False)
+    with pytest.raises(ParseError):
+        validate(etree.fromstring(b'<r n="x"/>'), RootSchema, 'input')
+    counts = validation_stats.snapshot()['input']
+    assert counts['validated'] == 2 and counts['skipped'] == 1
+    assert counts['seconds'] > 0
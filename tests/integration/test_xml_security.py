@@ -0,0 +1,46 @@
+# test_xml_security.py
+
+import io
+import threading
+
+import pytest
+
+from lxml import etree
+
+from fiesta.parsers.xml import pool
+
+def test_external_entities_are_not_resolved(tmp_path):
+    secret = tmp_path / 'secret.txt'
+    secret.write_text('secret')
+    message = (
+        f'<?xml version="1.0"?><!DOCTYPE r [<!ENTITY x SYSTEM "{secret.as_uri()}">]>'
+        f'<r>&x;</r>'
+    ).encode()
+    with pytest.raises(pool.DTDForbiddenError):
+        pool.fromstring(message)
+    with pytest.raises(pool.DTDForbiddenError):
+        pool.parse(io.BytesIO(b'<!DOCTYPE r SYSTEM "http://example.com/r.dtd"><r/>'))
+    # Even when parsed, the entity is left unexpanded
+    root = etree.fromstring(message, pool.get_parser())
+    assert b'secret' not in etree.tostring(root)
+
+def test_billion_laughs():
+    entities = ''.join(
+        f'<!ENTITY l{level} "{f"&l{level - 1};" * 10}">' for level in range(1, 10))
+    message = (
+        f'<?xml version="1.0"?><!DOCTYPE r [<!ENTITY l0 "lol">{entities}]>'
+        f'<r>&l9;</r>'
+    ).encode()
+    with pytest.raises((etree.XMLSyntaxError, pool.DTDForbiddenError)):
+        pool.parse(io.BytesIO(message))
+
+def test_parsers_are_reused_per_thread():
+    parser = pool.get_parser()
+    assert pool.get_parser() is parser
+    assert pool.get_parser(huge_tree=True) is not parser
+    assert pool.fromstring(b'<r><c>text</c></r>')[0].text == 'text'
+    others = []
+    thread = threading.Thread(target=lambda: others.append(pool.get_parser()))
+    thread.start()
+    thread.join()
+    assert others[0] is not parser
@@ -6,8 +6,14 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:'
-    }
+    },
+    # Stand-in read replica for fiesta.routers
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:'
+    },
 }
+DATABASE_ROUTERS = ['fiesta.routers.ReplicaRouter']
 SITE_ID = 1
 SECRET_KEY = 'not very secret in tests'
 USE_I18N = True
@@ -49,6 +55,7 @@ INSTALLED_APPS = [
     'fiesta.apps.codelist',
     'fiesta.apps.conceptscheme',
     'fiesta.apps.datastructure',
+    'fiesta.apps.data',
 ]
 LANGUAGES = (
     ('en', _('English')),